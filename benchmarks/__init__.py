@@ -0,0 +1,3 @@
+"""
+Benchmarks for the GitRepoBot pipeline, run against fake LLMs so they cost no API quota.
+"""
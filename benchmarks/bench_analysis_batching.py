@@ -0,0 +1,79 @@
+"""
+Count the LLM requests made by file analysis with and without batching small files,
+against a fake LLM with injected latency.
+
+Usage:
+    python -m benchmarks.bench_analysis_batching --small 30 --large 4 --latency 0.2
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from src.models import git_repo_bot
+from src.models.backends import ExecutionBackend
+from src.models.git_repo_bot import GitRepoBot
+from src.utils.analysis_batcher import FILE_HEADING
+from src.utils.analysis_cache import AnalysisCache
+
+
+class FakeBackend(ExecutionBackend):
+    """Execution backend that counts requests and answers every file it is given."""
+
+    latency = 0.2
+
+    def run(self, agent, prompt, expected_output):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+        paths = re.findall(rf"^\s*{re.escape(FILE_HEADING)}(\S+)$", prompt, re.MULTILINE)
+        if not paths:
+            return "This file defines a request handler."
+        return "\n".join(f"{FILE_HEADING}{path}\nThis file defines a request handler." for path in paths)
+
+
+def make_repo(root: str, small: int, large: int):
+    """Create small helper modules and a few large ones."""
+    for i in range(small):
+        with open(os.path.join(root, f"helper_{i}.py"), 'w') as file:
+            file.write(f'"""Helper {i}."""\n\ndef handle_{i}(request):\n    return request\n')
+    for i in range(large):
+        with open(os.path.join(root, f"service_{i}.py"), 'w') as file:
+            for j in range(400):
+                file.write(f"def handle_requests_{j}(requests):\n    return handled(requests, {j})\n\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--small', type=int, default=30)
+    parser.add_argument('--large', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+
+    FakeBackend.latency = args.latency
+    # Measure request counts alone, without the provider rate limit
+    git_repo_bot.get_rate_limiter = lambda provider: None
+
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_dir:
+        make_repo(repo_path, args.small, args.large)
+        for label, max_files in (("one file per request", 1), ("batched", None)):
+            bot = GitRepoBot(repo_path=repo_path, analysis_max_workers=args.workers)
+            bot.backend = FakeBackend(bot.llm)
+            # A fresh cache per run so every file is analyzed
+            bot.analysis_cache = AnalysisCache(os.path.join(cache_dir, f"{label}.sqlite"))
+            if max_files is not None:
+                bot.analysis_batch_max_files = max_files
+            bot.refresh_index()
+            selected = list(bot.index.get_all_files())
+
+            start = time.perf_counter()
+            analyses = bot.analyze_files_for_query("How are requests handled?", selected)
+            elapsed = time.perf_counter() - start
+            print(f"{label:<22} files={len(analyses):<4} requests={bot.backend.requests:<4} wall={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare execution backends on the full query pipeline against a fake LLM.
+
+litellm.completion, which both backends end up calling, is replaced by a fake with
+injected latency that records every request, so requests, prompt tokens and latency
+can be compared per query. Overhead is the wall time of the same queries with zero
+LLM latency: everything the pipeline and backend do besides waiting on the model.
+
+Usage:
+    python -m benchmarks.bench_backends --files 200 --queries 3 --latency 0.2 --backends direct crew
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import litellm
+
+from benchmarks.harness import FakeLLM
+from src.models.git_repo_bot import GitRepoBot
+from src.utils.analysis_cache import AnalysisCache
+
+QUERIES = [
+    "How are requests handled?",
+    "Where is the configuration loaded?",
+    "What does the retry logic do?",
+]
+
+
+def make_repo(root: str, file_count: int):
+    """Create a synthetic repository of small request-handling modules."""
+    for i in range(file_count):
+        package = os.path.join(root, f"pkg{i // 50}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"handler_{i}.py"), 'w') as file:
+            file.write(
+                f'"""Request handler {i}."""\n\n'
+                f'def handle(request):\n    """Handle requests with retry and configuration {i}."""\n'
+                f'    return request\n'
+            )
+
+
+def run_queries(repo_path: str, cache_path: str, backend: str, queries: int, fake: FakeLLM):
+    """Answer the benchmark queries with a fresh bot and caches; return (requests, prompt tokens, seconds)."""
+    bot = GitRepoBot(repo_path=repo_path, execution_backend=backend)
+    # A fresh analysis cache per run so every backend does the same work
+    bot.analysis_cache = AnalysisCache(cache_path)
+    bot.refresh_index()
+
+    fake.reset()
+    start = time.perf_counter()
+    for query in (QUERIES * queries)[:queries]:
+        bot.answer_query(query)
+    return fake.requests, fake.prompt_tokens, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--queries', type=int, default=3)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--backends', nargs='+', default=['direct', 'crew'])
+    args = parser.parse_args()
+
+    fake = FakeLLM(args.latency)
+    litellm.completion = fake
+
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_dir:
+        make_repo(repo_path, args.files)
+        rows = []
+        for backend in args.backends:
+            # With no LLM latency, the wall time is the pipeline's own overhead
+            fake.latency = 0.0
+            _, _, overhead = run_queries(repo_path, os.path.join(cache_dir, f"{backend}-0.sqlite"), backend, args.queries, fake)
+            fake.latency = args.latency
+            requests, prompt_tokens, elapsed = run_queries(
+                repo_path, os.path.join(cache_dir, f"{backend}.sqlite"), backend, args.queries, fake
+            )
+            rows.append((backend, requests, prompt_tokens, elapsed, overhead))
+
+        queries = args.queries
+        print(f"{'backend':<8} {'requests/q':>10} {'prompt tok/q':>13} {'wall/q':>8} {'overhead/q':>11}")
+        for backend, requests, prompt_tokens, elapsed, overhead in rows:
+            print(
+                f"{backend:<8} {requests / queries:>10.1f} {prompt_tokens / queries:>13.0f} "
+                f"{elapsed / queries:>7.2f}s {overhead / queries:>10.3f}s"
+            )
+
+
+if __name__ == "__main__":
+    main()
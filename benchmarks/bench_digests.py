@@ -0,0 +1,115 @@
+"""
+Compare file-selector prompts built from raw previews with prompts built from structural digests.
+
+The synthetic files open with a license header and imports, as real ones often do, so
+the raw previews are mostly boilerplate. The preview figures use the previous selector
+format (20 files per request, path, size, extension and a 10-line preview per file);
+the digest figures come from running select_relevant_files against a fake backend.
+
+Usage:
+    python -m benchmarks.bench_digests --files 400
+"""
+
+import argparse
+import math
+import os
+import re
+import tempfile
+import time
+
+from src.models import git_repo_bot
+from src.models.backends import ExecutionBackend
+from src.models.git_repo_bot import GitRepoBot
+from src.utils.context_packer import estimate_tokens
+
+LICENSE = "".join(f"# {line}\n" for line in [
+    "Copyright 2024 The Example Authors.",
+    "",
+    "Licensed under the Apache License, Version 2.0 (the \"License\");",
+    "you may not use this file except in compliance with the License.",
+    "You may obtain a copy of the License at",
+    "",
+    "    http://www.apache.org/licenses/LICENSE-2.0",
+    "",
+    "Unless required by applicable law or agreed to in writing, software",
+    "distributed under the License is distributed on an \"AS IS\" BASIS.",
+])
+
+# Files per request in the preview-based selector
+PREVIEW_BATCH_SIZE = 20
+
+
+class FakeBackend(ExecutionBackend):
+    """Execution backend that counts requests and prompt tokens and selects nothing."""
+
+    def run(self, agent, prompt, expected_output):
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += estimate_tokens(prompt)
+        match = re.search(r"Path: (\S+)", prompt)
+        return match.group(1) if match else "No relevant files found in this batch."
+
+
+def make_repo(root: str, file_count: int):
+    """Create modules with a license header, a docstring, imports and a few functions."""
+    for i in range(file_count):
+        package = os.path.join(root, f"pkg{i // 50}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"service_{i}.py"), 'w') as file:
+            file.write(LICENSE + "\n")
+            file.write(f'"""Service {i}: stores and retries orders for tenant {i}."""\n\n')
+            file.write("import os\nimport json\nimport logging\nfrom typing import Dict, List\n\n")
+            file.write(f"from pkg{(i + 1) // 50}.service_{i + 1} import Client\n\n")
+            file.write(f"class OrderService{i}:\n")
+            for name in ("create", "cancel", "retry", "refund"):
+                file.write(f"    def {name}_order(self, order):\n        return order\n\n")
+            for j in range(5):
+                file.write(f"def helper_{i}_{j}(value):\n    return value\n\n")
+
+
+def listing_tokens(file_summaries, use_digest: bool) -> int:
+    """Estimated tokens of the file listings in the selector prompts."""
+    if use_digest:
+        entries = (f"Path: {path} ({info['size']} bytes)\n{info['digest']}\n---" for path, info in file_summaries.items())
+    else:
+        entries = (
+            f"Path: {path}\nSize: {info['size']} bytes\nExtension: {info['extension']}\nPreview:\n{info['preview']}\n---"
+            for path, info in file_summaries.items()
+        )
+    return sum(estimate_tokens(entry) for entry in entries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=400)
+    args = parser.parse_args()
+
+    git_repo_bot.get_rate_limiter = lambda provider: None
+
+    with tempfile.TemporaryDirectory() as repo_path:
+        make_repo(repo_path, args.files)
+        bot = GitRepoBot(repo_path=repo_path)
+        bot.backend = FakeBackend(bot.llm)
+        # Send every file to the selector so the number of requests scales with the repo
+        bot.rank_candidate_files = lambda query, file_summaries: list(file_summaries)
+
+        start = time.perf_counter()
+        bot.refresh_index()
+        indexing = time.perf_counter() - start
+
+        summaries = bot.index.get_file_summaries()
+        bot.select_relevant_files("Where are orders retried?")
+
+        files = len(summaries)
+        preview_tokens = listing_tokens(summaries, use_digest=False)
+        digest_tokens = listing_tokens(summaries, use_digest=True)
+        print(f"indexing with digests: {indexing:.2f}s for {files} files")
+        print(f"{'summary':<8} {'listing tokens/file':>20} {'requests':>9}")
+        print(f"{'preview':<8} {preview_tokens / files:>20.0f} {math.ceil(files / PREVIEW_BATCH_SIZE):>9}")
+        print(f"{'digest':<8} {digest_tokens / files:>20.0f} {bot.backend.requests:>9}")
+        print(f"digest selector prompts: {bot.backend.prompt_tokens} tokens in total")
+        print("\nExample digest:\n" + next(iter(summaries.values()))["digest"])
+
+
+if __name__ == "__main__":
+    main()
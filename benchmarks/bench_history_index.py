@@ -0,0 +1,123 @@
+"""
+Build the commit history index of synthetic repositories with growing histories, then
+time an incremental update, a resumed run and the history lookups used by queries.
+
+Peak Python memory of the full build should stay flat as the history grows, since the
+log is streamed and written in batches.
+
+Usage:
+    python -m benchmarks.bench_history_index --commits 1000 10000 --files 500 --files-per-commit 4
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import tempfile
+import tracemalloc
+
+from benchmarks.harness import WORDS, measure, percentile
+from src.utils.history_index import HistoryIndex
+
+AUTHORS = ["Ada", "Grace", "Linus", "Margaret", "Ken", "Barbara", "Dennis", "Frances"]
+
+
+def make_history(root: str, commits: int, file_count: int, files_per_commit: int, seed: int = 0, start: int = 0):
+    """Append commits to the repository at root with git fast-import; files change in clusters."""
+    rng = random.Random(seed + start)
+    lines = []
+    for i in range(start, start + commits):
+        author = rng.choice(AUTHORS)
+        timestamp = 1600000000 + i * 3600
+        message = f"{rng.choice(['Fix', 'Add', 'Refactor', 'Speed up'])} {' '.join(rng.sample(WORDS, 3))}\n\nNeeded for {rng.choice(WORDS)}.\n"
+        lines.append("commit refs/heads/master")
+        lines.append(f"committer {author} <{author.lower()}@example.com> {timestamp} +0000")
+        lines.append(f"data {len(message.encode())}")
+        lines.append(message)
+        if i == start and start > 0:
+            # Continue the branch written by the previous import
+            lines.append("from refs/heads/master^0")
+        # Files of a cluster tend to change together
+        cluster = rng.randrange(max(1, file_count // 10))
+        for _ in range(rng.randint(1, files_per_commit)):
+            number = (cluster * 10 + rng.randrange(10)) % file_count
+            content = f"# revision {i}\n" + "\n".join(rng.sample(WORDS, 8)) + "\n"
+            lines.append(f"M 100644 inline pkg{number // 50}/module_{number}.py")
+            lines.append(f"data {len(content.encode())}")
+            lines.append(content)
+    stream = "\n".join(lines) + "\n"
+    subprocess.run(['git', 'fast-import', '--quiet'], cwd=root, input=stream.encode(), check=True)
+    subprocess.run(['git', 'reset', '-q', '--hard', 'master'], cwd=root, check=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commits', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--files', type=int, default=500)
+    parser.add_argument('--files-per-commit', type=int, default=4)
+    parser.add_argument('--new-commits', type=int, default=20, help="commits added before the incremental update")
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'commits':>8} {'build':>8} {'peak mem':>9} {'db size':>8} {'update':>8} {'resume':>8} {'describe p50':>13} {'co-change p50':>14}")
+    for commits in args.commits:
+        with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as db_root:
+            subprocess.run(['git', 'init', '-q', '-b', 'master', repo_path], check=True)
+            make_history(repo_path, commits, args.files, args.files_per_commit, args.seed)
+            db_path = os.path.join(db_root, "history.sqlite")
+
+            index = HistoryIndex(repo_path, db_path)
+            tracemalloc.start()
+            with measure() as build:
+                index.update()
+            tracemalloc.stop()
+            assert index.stats()["commits"] == commits
+
+            make_history(repo_path, args.new_commits, args.files, args.files_per_commit, args.seed, start=commits)
+            with measure() as update:
+                added = index.update()
+            assert added == args.new_commits
+
+            # Stop a fresh build after its first batch, then finish it from where it stopped
+            resumed = HistoryIndex(repo_path, os.path.join(db_root, "resumed.sqlite"), batch_commits=max(1, commits // 4))
+            write_batch = resumed._write_batch
+
+            def interrupt(batch):
+                resumed._write_batch = write_batch
+                write_batch(batch)
+                raise KeyboardInterrupt
+
+            resumed._write_batch = interrupt
+            try:
+                resumed.update()
+            except KeyboardInterrupt:
+                pass
+            with measure() as resume:
+                resumed.update()
+            assert resumed.stats()["commits"] == index.stats()["commits"]
+            assert resumed.churn(["pkg0/module_0.py"]) == index.churn(["pkg0/module_0.py"])
+
+            rng = random.Random(args.seed)
+            describe_times, co_change_times = [], []
+            for _ in range(args.queries):
+                path = f"pkg0/module_{rng.randrange(min(50, args.files))}.py"
+                with measure() as described:
+                    index.describe(f"who changed the {rng.choice(WORDS)} in {path}?", [path])
+                describe_times.append(described.seconds)
+                with measure() as co_changed:
+                    index.co_changed([path, f"pkg0/module_{rng.randrange(min(50, args.files))}.py"])
+                co_change_times.append(co_changed.seconds)
+
+            size = sum(os.path.getsize(os.path.join(db_root, name)) for name in os.listdir(db_root) if name.startswith("history"))
+            print(
+                f"{commits:>8} {build.seconds:>7.2f}s {build.peak_bytes / 2**20:>7.1f}MB {size / 2**20:>6.1f}MB "
+                f"{update.seconds * 1000:>6.0f}ms {resume.seconds:>7.2f}s "
+                f"{percentile(describe_times, 0.5) * 1000:>11.1f}ms {percentile(co_change_times, 0.5) * 1000:>12.1f}ms"
+            )
+            index.close()
+            resumed.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Track prompt tokens per query as a conversation grows, with the bounded conversation
+memory and with the whole history inlined into every prompt as before.
+
+Each turn asks a different question, so every turn runs the selector, the analyses
+and the aggregation against the fake LLM.
+
+Usage:
+    python -m benchmarks.bench_memory --turns 30 --files 300 --answer-tokens 600
+"""
+
+import argparse
+import os
+import random
+import tempfile
+from collections import deque
+
+from benchmarks.harness import WORDS, FakeLLM, fake_llm, isolated_cache_dir, make_repo
+from src.models import git_repo_bot
+from src.models.git_repo_bot import GitRepoBot
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.conversation_memory import ConversationMemory
+
+
+class InlinedHistory(ConversationMemory):
+    """The previous behavior: the last 10 turns in full, given to every stage."""
+
+    def __init__(self):
+        super().__init__()
+        self.inlined = deque(maxlen=10)
+
+    def add(self, query, answer, files=()):
+        super().add(query, answer, files)
+        self.inlined.append(f"User: {query}\nBot: {answer}")
+
+    def context_for(self, stage, query):
+        return "\n".join(self.inlined)
+
+
+def run_session(repo_path: str, cache_path: str, memory: ConversationMemory, turns: int, fake: FakeLLM):
+    """Ask turns distinct questions; return the prompt tokens of every turn."""
+    bot = GitRepoBot(repo_path=repo_path)
+    bot.memory = memory
+    # A fresh analysis cache per session so both sessions do the same work
+    bot.analysis_cache = AnalysisCache(cache_path)
+    bot.refresh_index()
+    rng = random.Random(1)
+    tokens = []
+    for _ in range(turns):
+        a, b, c = rng.sample(WORDS, 3)
+        fake.reset()
+        bot.answer_query(f"How does the {a} {b} interact with the {c}?")
+        tokens.append(fake.stats()["prompt_tokens"])
+    return tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=30)
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--answer-tokens', type=int, default=600)
+    args = parser.parse_args()
+
+    git_repo_bot.get_rate_limiter = lambda provider: None
+    fake = FakeLLM(answer_tokens=args.answer_tokens)
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_root, \
+            isolated_cache_dir(cache_root), fake_llm(fake):
+        make_repo(repo_path, args.files)
+        inlined = run_session(repo_path, os.path.join(cache_root, "inlined.sqlite"), InlinedHistory(), args.turns, fake)
+        bounded = run_session(repo_path, os.path.join(cache_root, "bounded.sqlite"), ConversationMemory(), args.turns, fake)
+
+    print(f"{'turn':>5} {'inlined history':>16} {'bounded memory':>15}")
+    for turn in sorted({1, 2, 5, 10, 20, args.turns} & set(range(1, args.turns + 1))):
+        print(f"{turn:>5} {inlined[turn - 1]:>16} {bounded[turn - 1]:>15}")
+    print(f"{'total':>5} {sum(inlined):>16} {sum(bounded):>15}")
+
+
+if __name__ == "__main__":
+    main()
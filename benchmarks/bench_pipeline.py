@@ -0,0 +1,202 @@
+"""
+Benchmark the whole query pipeline on synthetic repositories of several sizes against
+a deterministic fake LLM, and write the results as JSON so runs on different commits
+can be compared.
+
+For every size it measures the scan, building the index and the file summaries, and
+a series of answer_query calls: end-to-end latency, wall time per pipeline stage, LLM
+requests and tokens. Peak memory is measured with tracemalloc, which slows Python
+code down; pass --no-memory for timings without it. Provider rate limits are disabled
+so only the fake LLM's latency is measured.
+
+Usage:
+    python -m benchmarks.bench_pipeline --sizes 1000 10000 100000 --queries 5 --output bench.json
+    python -m benchmarks.bench_pipeline --sizes 1000 --baseline bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List
+
+from benchmarks.harness import FakeLLM, fake_llm, isolated_cache_dir, make_repo, measure, percentile
+from src.models import git_repo_bot
+from src.models.git_repo_bot import GitRepoBot
+from src.utils.metrics import span
+from src.utils.scanner import RepoScanner
+
+QUERIES = [
+    "How are requests handled?",
+    "Where is the configuration loaded?",
+    "What does the retry backoff logic do?",
+    "How does the cache index get invalidated?",
+    "Which classes manage session tokens?",
+    "How is the stream buffer flushed by the worker thread?",
+]
+
+# Metrics compared against a baseline run, lower is better
+COMPARED_METRICS = (
+    "scan_seconds", "index_seconds", "summary_seconds", "query_p50_seconds",
+    "query_p95_seconds", "llm_requests", "prompt_tokens", "peak_memory_bytes",
+)
+
+
+def stage_durations(trace: Dict, totals: Dict[str, float] = None) -> Dict[str, float]:
+    """Sum the milliseconds spent in each stage of a trace, sub-stages included."""
+    totals = {} if totals is None else totals
+    for child in trace.get("children", []):
+        totals[child["name"]] = round(totals.get(child["name"], 0.0) + child["duration_ms"], 1)
+        stage_durations(child, totals)
+    return totals
+
+
+def git_commit() -> str:
+    """The commit of the code being benchmarked, or "" outside a git checkout."""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def run_size(file_count: int, args, fake: FakeLLM) -> Dict[str, object]:
+    """Benchmark every stage on a fresh synthetic repository of file_count modules."""
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_root, isolated_cache_dir(cache_root):
+        start = time.perf_counter()
+        make_repo(repo_path, file_count, seed=args.seed)
+        if args.git:
+            subprocess.run(['git', 'init', '-q', repo_path], check=True)
+            subprocess.run(['git', '-C', repo_path, 'add', '-A'], check=True)
+        print(f"Created {file_count} files in {time.perf_counter() - start:.1f}s")
+
+        with measure() as scan:
+            files = RepoScanner(repo_path).scan()
+
+        bot = GitRepoBot(repo_path=repo_path, execution_backend=args.backend)
+        with measure() as index:
+            bot.refresh_index()
+        with measure() as summary:
+            summaries = bot.index.get_file_summaries()
+
+        queries: List[Dict[str, object]] = []
+        for query in (QUERIES * args.queries)[:args.queries]:
+            fake.reset()
+            with measure() as measured, span("benchmark") as trace:
+                bot.answer_query(query)
+            queries.append({
+                "query": query,
+                **measured.to_dict(),
+                **fake.stats(),
+                "stages_ms": stage_durations(trace.to_dict()),
+            })
+
+        latencies = [query["seconds"] for query in queries]
+        peaks = [m.peak_bytes for m in (scan, index, summary) if m.peak_bytes is not None]
+        peaks += [query["peak_memory_bytes"] for query in queries if "peak_memory_bytes" in query]
+        return {
+            "files": file_count,
+            "scanned_files": len(files),
+            "summarized_files": len(summaries),
+            "scan": scan.to_dict(),
+            "index": index.to_dict(),
+            "summary": summary.to_dict(),
+            "queries": queries,
+            "totals": {
+                "scan_seconds": round(scan.seconds, 4),
+                "index_seconds": round(index.seconds, 4),
+                "summary_seconds": round(summary.seconds, 4),
+                "query_p50_seconds": round(statistics.median(latencies), 4),
+                "query_p95_seconds": round(percentile(latencies, 0.95), 4),
+                "llm_requests": sum(query["requests"] for query in queries),
+                "prompt_tokens": sum(query["prompt_tokens"] for query in queries),
+                "completion_tokens": sum(query["completion_tokens"] for query in queries),
+                **({"peak_memory_bytes": max(peaks)} if peaks else {}),
+            },
+        }
+
+
+def compare(results: List[Dict], baseline_path: str):
+    """Print the relative change of every compared metric against a previous run."""
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+    previous = {result["files"]: result["totals"] for result in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit', '')[:12] or 'unknown'}):")
+    for result in results:
+        before = previous.get(result["files"])
+        if before is None:
+            print(f"  {result['files']} files: not in the baseline")
+            continue
+        print(f"  {result['files']} files")
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), result["totals"].get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"    {metric:<20} {old:>14} -> {new:<14} {change}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--queries', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per LLM request")
+    parser.add_argument('--seconds-per-token', type=float, default=0.0, help="seconds per generated token")
+    parser.add_argument('--backend', default="direct")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--git', action='store_true', help="commit the synthetic repository so it is scanned from the git index")
+    parser.add_argument('--no-memory', action='store_true', help="skip tracemalloc peak memory measurement")
+    parser.add_argument('--output', help="write the JSON results to this file instead of stdout")
+    parser.add_argument('--baseline', help="JSON results of a previous run to compare with")
+    args = parser.parse_args()
+
+    git_repo_bot.get_rate_limiter = lambda provider: None
+    fake = FakeLLM(latency=args.latency, seconds_per_token=args.seconds_per_token)
+    if not args.no_memory:
+        tracemalloc.start()
+
+    results = []
+    with fake_llm(fake):
+        for file_count in args.sizes:
+            results.append(run_size(file_count, args, fake))
+
+    report = {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": vars(args),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+        print(f"Wrote {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+    print(f"\n{'files':>7} {'scan':>8} {'index':>8} {'summary':>8} {'p50':>8} {'p95':>8} {'requests':>9} {'tokens':>9} {'peak MB':>8}")
+    for result in results:
+        totals = result["totals"]
+        peak = f"{totals['peak_memory_bytes'] / 2**20:.1f}" if "peak_memory_bytes" in totals else "-"
+        print(
+            f"{result['files']:>7} {totals['scan_seconds']:>7.2f}s {totals['index_seconds']:>7.2f}s "
+            f"{totals['summary_seconds']:>7.2f}s {totals['query_p50_seconds']:>7.2f}s {totals['query_p95_seconds']:>7.2f}s "
+            f"{totals['llm_requests']:>9} {totals['prompt_tokens']:>9} {peak:>8}"
+        )
+
+    if args.baseline:
+        compare(results, args.baseline)
+
+
+if __name__ == "__main__":
+    main()
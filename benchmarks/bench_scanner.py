@@ -0,0 +1,104 @@
+"""
+Benchmark repository scanning on a synthetic tree: the previous recursive get_all_files
+against RepoScanner walking the tree and listing the git index.
+
+Usage:
+    python -m benchmarks.bench_scanner --files 100000 --git
+"""
+
+import argparse
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from src.config.settings import EXCLUDED_DIRS, CODE_EXTENSIONS
+from src.utils.scanner import RepoScanner
+
+
+def legacy_get_all_files(repo_path: str):
+    """The recursive scan get_all_files used before RepoScanner, kept as the baseline."""
+    print("Fetching all code files in the repository...")
+    repo_path = Path(repo_path)
+    file_paths = {}
+
+    def scan_directory(directory: Path):
+        try:
+            for entry in os.scandir(directory):
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name in EXCLUDED_DIRS:
+                        continue
+                    scan_directory(Path(entry.path))
+                elif entry.is_file() and Path(entry.path).suffix in CODE_EXTENSIONS:
+                    relative_path = Path(entry.path).relative_to(repo_path)
+                    file_paths[str(relative_path)] = str(entry.path)
+        except PermissionError:
+            print(f"Skipping inaccessible directory: {directory}")
+
+    scan_directory(repo_path)
+    return file_paths
+
+
+def make_tree(root: str, file_count: int, files_per_dir: int = 50):
+    """Create file_count small files, nested three levels deep, plus ignored build output."""
+    for i in range(file_count):
+        directory = os.path.join(root, f"a{i // 50000}", f"b{i // 2500}", f"c{i // files_per_dir}")
+        if i % files_per_dir == 0:
+            os.makedirs(directory, exist_ok=True)
+        extension = ".py" if i % 4 else ".txt"
+        with open(os.path.join(directory, f"file_{i}{extension}"), 'w') as file:
+            file.write(f"x = {i}\n")
+    os.makedirs(os.path.join(root, "node_modules", "dep"), exist_ok=True)
+    os.makedirs(os.path.join(root, "generated"), exist_ok=True)
+    for i in range(100):
+        with open(os.path.join(root, "generated", f"gen_{i}.py"), 'w') as file:
+            file.write("y = 1\n")
+    with open(os.path.join(root, ".gitignore"), 'w') as file:
+        file.write("generated/\n*.log\n")
+
+
+def best_of(fn, repeat: int):
+    """Run fn repeat times and return (best seconds, last result)."""
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--git', action='store_true', help="also commit the tree and time `git ls-files`")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        print(f"Creating {args.files} files...")
+        make_tree(root, args.files)
+
+        baseline, files = best_of(lambda: legacy_get_all_files(root), args.repeat)
+        print(f"{'legacy recursive scan':<28} {baseline:8.3f}s  {len(files)} files")
+
+        scanner = RepoScanner(root, use_git_index=False)
+        seconds, files = best_of(scanner.scan, args.repeat)
+        print(f"{'iterative walk':<28} {seconds:8.3f}s  {len(files)} files  {baseline / seconds:5.1f}x")
+
+        if args.git:
+            subprocess.run(['git', 'init', '-q', root], check=True)
+            subprocess.run(['git', '-C', root, 'add', '-A'], check=True)
+            scanner = RepoScanner(root, use_git_index=True)
+            seconds, files = best_of(scanner.scan, args.repeat)
+            print(f"{'git ls-files':<28} {seconds:8.3f}s  {len(files)} files  {baseline / seconds:5.1f}x")
+
+        scanner = RepoScanner(root, use_git_index=False)
+        with scanner.memoize():
+            scanner.scan()
+            seconds, _ = best_of(scanner.scan, args.repeat)
+        print(f"{'memoized rescan in a query':<28} {seconds:8.6f}s")
+
+
+if __name__ == "__main__":
+    main()
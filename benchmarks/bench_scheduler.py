@@ -0,0 +1,156 @@
+"""
+Send a burst of questions from one session together with single questions from other
+sessions, against a fake LLM that serves a limited number of requests at once like a
+provider quota, with every query started straight away and with the query scheduler.
+
+Without admission control the burst competes with everyone for the LLM, so every query
+is slow; with it, concurrency stays bounded, the other sessions are served in turn
+between the burst's queries, and the burst's excess is refused with 429.
+
+Usage:
+    python -m benchmarks.bench_scheduler --burst 12 --sessions 6 --llm-capacity 4 --latency 0.2
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from benchmarks.harness import WORDS, FakeLLM, fake_llm, isolated_cache_dir, make_repo, percentile
+from src.models import git_repo_bot
+from src.models.git_repo_bot import GitRepoBot
+from src.models.repo_state import RepoState
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.scheduler import Overloaded, QueryScheduler
+
+
+class SaturatingLLM(FakeLLM):
+    """A fake LLM serving at most capacity requests at once; the rest wait their turn."""
+
+    def __init__(self, capacity: int, **kwargs):
+        super().__init__(**kwargs)
+        self.slots = threading.Semaphore(capacity)
+        self.demand = 0
+        self.peak_demand = 0
+
+    def reset(self):
+        super().reset()
+        self.peak_demand = 0
+
+    def __call__(self, *args, **kwargs):
+        with self._lock:
+            self.demand += 1
+            self.peak_demand = max(self.peak_demand, self.demand)
+        try:
+            with self.slots:
+                return super().__call__(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.demand -= 1
+
+
+def run_mode(repos, cache_path: str, burst: int, sessions: int, scheduler, fake: SaturatingLLM, seed: int):
+    """Ask every question at once; return (results by group, wall seconds)."""
+    states = {}
+    for repo_path in repos:
+        state = RepoState(repo_path)
+        # A fresh analysis cache per mode so both modes do the same work
+        state.analysis_cache = AnalysisCache(cache_path)
+        state.refresh_index()
+        states[repo_path] = state
+
+    rng = random.Random(seed)
+    # (group, session, repository, question, start delay)
+    asks = [("burst", "burst", repos[0], f"How does the {' '.join(rng.sample(WORDS, 3))} work?", 0.0) for _ in range(burst)]
+    asks += [
+        ("others", f"session-{i}", repos[i % len(repos)], f"How does the {' '.join(rng.sample(WORDS, 3))} work?", 0.05)
+        for i in range(sessions)
+    ]
+    bots = {}
+    for _, session, repo_path, _, _ in asks:
+        if (session, repo_path) not in bots:
+            bots[(session, repo_path)] = GitRepoBot(repo_path=repo_path, state=states[repo_path])
+
+    results = {"burst": [], "others": []}
+    lock = threading.Lock()
+
+    def ask(group: str, session: str, repo_path: str, question: str, delay: float):
+        time.sleep(delay)
+        start = time.perf_counter()
+        bot = bots[(session, repo_path)]
+        try:
+            if scheduler is None:
+                bot.answer_query(question)
+            else:
+                with scheduler.admit(repo_path, session):
+                    bot.answer_query(question)
+            outcome = "served"
+        except Overloaded as e:
+            outcome = str(e.status)
+        with lock:
+            results[group].append((outcome, time.perf_counter() - start))
+
+    fake.reset()
+    threads = [threading.Thread(target=ask, args=item) for item in asks]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--burst', type=int, default=12, help="questions sent at once by one session")
+    parser.add_argument('--sessions', type=int, default=6, help="other sessions sending one question each")
+    parser.add_argument('--repos', type=int, default=2)
+    parser.add_argument('--files', type=int, default=150)
+    parser.add_argument('--llm-capacity', type=int, default=4, help="requests the fake LLM serves at once")
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--max-concurrent', type=int, default=4)
+    parser.add_argument('--max-per-repo', type=int, default=2)
+    parser.add_argument('--max-per-session', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    git_repo_bot.get_rate_limiter = lambda provider: None
+    fake = SaturatingLLM(args.llm_capacity, latency=args.latency)
+    modes = [
+        ("unbounded", None),
+        ("scheduled", QueryScheduler(
+            max_concurrent=args.max_concurrent,
+            max_per_repo=args.max_per_repo,
+            max_per_session=args.max_per_session
+        )),
+    ]
+    with tempfile.TemporaryDirectory() as root, tempfile.TemporaryDirectory() as cache_root, \
+            isolated_cache_dir(cache_root), fake_llm(fake):
+        repos = []
+        for i in range(args.repos):
+            repo_path = os.path.join(root, f"repo{i}")
+            os.makedirs(repo_path)
+            make_repo(repo_path, args.files, seed=i)
+            repos.append(repo_path)
+
+        print(f"{'mode':<10} {'group':<7} {'served':>6} {'429':>4} {'503':>4} {'p50':>7} {'p95':>7} {'LLM peak demand':>16} {'wall':>7}")
+        for label, scheduler in modes:
+            cache_path = os.path.join(cache_root, f"{label}.sqlite")
+            results, seconds = run_mode(repos, cache_path, args.burst, args.sessions, scheduler, fake, args.seed)
+            for group, outcomes in results.items():
+                served = [elapsed for outcome, elapsed in outcomes if outcome == "served"]
+                refused = [outcome for outcome, _ in outcomes if outcome != "served"]
+                print(
+                    f"{label:<10} {group:<7} {len(served):>6} {refused.count('429'):>4} {refused.count('503'):>4} "
+                    f"{percentile(served, 0.5):>6.2f}s {percentile(served, 0.95):>6.2f}s {fake.peak_demand:>16} {seconds:>6.2f}s"
+                )
+            if scheduler is not None:
+                stats = scheduler.stats()
+                assert stats["running"] == 0 and stats["queued"] == 0, "every slot must be given back"
+                print(f"{'':<10} queue wait p50 {stats['wait_seconds']['p50']:.2f}s, p95 {stats['wait_seconds']['p95']:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark concurrent file-selector batches against a fake LLM with injected latency.
+
+Usage:
+    python -m benchmarks.bench_selector --files 400 --latency 0.2 --workers 1 2 4 8
+"""
+
+import argparse
+import os
+import re
+import tempfile
+import time
+
+from src.models import git_repo_bot
+from src.models.backends import ExecutionBackend
+from src.models.git_repo_bot import GitRepoBot
+
+
+class FakeBackend(ExecutionBackend):
+    """Execution backend that sleeps instead of calling the LLM."""
+
+    latency = 0.2
+
+    def run(self, agent, prompt, expected_output):
+        time.sleep(self.latency)
+        # Select the first file of the batch so results can be checked for ordering
+        match = re.search(r"Path: (\S+)", prompt)
+        return match.group(1) if match else "No relevant files found in this batch."
+
+
+def make_repo(root: str, file_count: int):
+    """Create a synthetic repository with file_count small Python modules."""
+    for i in range(file_count):
+        package = os.path.join(root, f"pkg{i // 50}")
+        os.makedirs(package, exist_ok=True)
+        with open(os.path.join(package, f"module_{i}.py"), 'w') as file:
+            file.write(f'"""Module {i}."""\n\ndef handler_{i}(request):\n    return request\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--files', type=int, default=400)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    FakeBackend.latency = args.latency
+    # Measure the worker cap alone, without the provider rate limit
+    git_repo_bot.get_rate_limiter = lambda provider: None
+
+    with tempfile.TemporaryDirectory() as repo_path:
+        make_repo(repo_path, args.files)
+        bot = GitRepoBot(repo_path=repo_path)
+        bot.backend = FakeBackend(bot.llm)
+        # Send every file to the selector so the number of batches scales with the repo
+        bot.rank_candidate_files = lambda query, file_summaries: list(file_summaries)
+        bot.refresh_index()
+
+        baseline = None
+        for workers in args.workers:
+            bot.selector_max_workers = workers
+            start = time.perf_counter()
+            selected = bot.select_relevant_files("Where are requests handled?")
+            elapsed = time.perf_counter() - start
+            if baseline is None:
+                baseline = selected
+            assert selected == baseline, "batch results must be merged in a deterministic order"
+            print(f"workers={workers:<3} selected={len(selected):<4} wall={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
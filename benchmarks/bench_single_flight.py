@@ -0,0 +1,101 @@
+"""
+Ask the same question from many sessions on one repository at once, against a slow fake
+LLM, with single-flight coalescing off, at the selector batch and file analysis levels
+only, and at every level. Every session must get the same answer; with coalescing the
+LLM requests should match those of a single session.
+
+Usage:
+    python -m benchmarks.bench_single_flight --sessions 8 --latency 0.3 --stagger 0.02
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from benchmarks.harness import FakeLLM, fake_llm, isolated_cache_dir, make_repo
+from src.models import git_repo_bot
+from src.models.git_repo_bot import GitRepoBot
+from src.models.repo_state import RepoState
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.single_flight import Flight, SingleFlight
+
+QUERY = "Where does the retry backoff reset the session token?"
+
+
+class NoCoalescing(SingleFlight):
+    """Every caller leads its own flight."""
+
+    def claim(self, key):
+        with self._lock:
+            self.led += 1
+        return Flight(), True
+
+
+def run_sessions(repo_path: str, cache_path: str, sessions: int, stagger: float, levels: tuple, fake: FakeLLM):
+    """Ask QUERY from every session concurrently; return (answers, seconds, state)."""
+    state = RepoState(repo_path)
+    # A fresh analysis cache per run so the runs do the same work
+    state.analysis_cache = AnalysisCache(cache_path)
+    for level in ("query", "selector", "analysis"):
+        if level not in levels:
+            setattr(state, f"{level}_flights", NoCoalescing(level))
+    bots = [GitRepoBot(repo_path=repo_path, state=state) for _ in range(sessions)]
+    state.refresh_index()
+
+    answers = [None] * sessions
+
+    def ask(i: int):
+        time.sleep(i * stagger)
+        answers[i] = bots[i].answer_query(QUERY)[0]
+
+    fake.reset()
+    threads = [threading.Thread(target=ask, args=(i,)) for i in range(sessions)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return answers, time.perf_counter() - start, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=8)
+    parser.add_argument('--files', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.3)
+    parser.add_argument('--stagger', type=float, default=0.02, help="seconds between session arrivals")
+    args = parser.parse_args()
+
+    git_repo_bot.get_rate_limiter = lambda provider: None
+    fake = FakeLLM(latency=args.latency)
+    modes = [
+        ("off", ()),
+        ("selector + analysis", ("selector", "analysis")),
+        ("all levels", ("query", "selector", "analysis")),
+    ]
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_root, \
+            isolated_cache_dir(cache_root), fake_llm(fake):
+        make_repo(repo_path, args.files)
+
+        answers, _, _ = run_sessions(repo_path, os.path.join(cache_root, "single.sqlite"), 1, 0, (), fake)
+        single_requests = fake.requests
+        print(f"one session: {single_requests} LLM requests")
+
+        print(f"{'coalescing':<20} {'requests':>9} {'wall':>7} {'coalesced (query/selector/analysis)':>36}")
+        for label, levels in modes:
+            cache_path = os.path.join(cache_root, f"{label}.sqlite")
+            answers, seconds, state = run_sessions(repo_path, cache_path, args.sessions, args.stagger, levels, fake)
+            assert all(answer == answers[0] for answer in answers), "every session must get the same answer"
+            if levels == modes[-1][1]:
+                assert fake.requests == single_requests, "coalesced sessions must cost one session's requests"
+            coalesced = "/".join(
+                str(flights.stats()["coalesced"])
+                for flights in (state.query_flights, state.selector_flights, state.analysis_flights)
+            )
+            print(f"{label:<20} {fake.requests:>9} {seconds:>6.2f}s {coalesced:>36}")
+
+
+if __name__ == "__main__":
+    main()
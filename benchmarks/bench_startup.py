@@ -0,0 +1,108 @@
+"""
+Measure process startup: the import time of the web server and of the bot, and the time
+until bots are ready to answer, each in a fresh interpreter so nothing is imported yet.
+
+The first bot pays for importing the agent framework and building the shared agents;
+later bots, as created by /setup_repo, reuse them from the agent pool. "ready" includes
+indexing a small synthetic repository, whose index is reused by the second bot on it.
+
+Usage:
+    python -m benchmarks.bench_startup --repeat 5 --files 200 --top-imports 10
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.harness import make_repo
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in the fresh interpreter; prints one JSON line of timings
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter() - start
+timings = {{"import": imported}}
+if {bots}:
+    from src.models.git_repo_bot import GitRepoBot
+    start = time.perf_counter()
+    bot = GitRepoBot(repo_path=sys.argv[1])
+    timings["first_bot"] = time.perf_counter() - start
+    start = time.perf_counter()
+    bot.refresh_index()
+    timings["first_bot_ready"] = timings["first_bot"] + time.perf_counter() - start
+    start = time.perf_counter()
+    GitRepoBot(repo_path=sys.argv[1]).refresh_index()
+    timings["second_bot_ready"] = time.perf_counter() - start
+print("TIMINGS " + json.dumps(timings))
+"""
+
+
+def run_child(module: str, repo_path: str, cache_root: str, bots: bool, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Run the timing script in a fresh interpreter with its caches in cache_root."""
+    env = dict(os.environ, HOME=cache_root, LOCALAPPDATA=cache_root)
+    command = [sys.executable] + (['-X', 'importtime'] if importtime else [])
+    command += ['-c', CHILD.format(module=module, bots=bots), repo_path]
+    result = subprocess.run(command, cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise SystemExit(f"Timing {module} failed:\n{result.stderr}")
+    return result
+
+
+def parse_timings(output: str) -> dict:
+    """Read the timings line printed by the child."""
+    line = next(line for line in output.splitlines() if line.startswith("TIMINGS "))
+    return json.loads(line[len("TIMINGS "):])
+
+
+def top_imports(stderr: str, count: int):
+    """The slowest top-level imports from -X importtime output, by cumulative microseconds."""
+    imports = []
+    for line in stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        # Imports of the timing script itself and what they import directly
+        if match and len(match.group(3)) <= 3:
+            imports.append((int(match.group(2)), match.group(4)))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--files', type=int, default=200)
+    parser.add_argument('--top-imports', type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as repo_path, tempfile.TemporaryDirectory() as cache_root:
+        make_repo(repo_path, args.files)
+
+        runs = {"main": [], "src.models.git_repo_bot": []}
+        for _ in range(args.repeat):
+            for module in runs:
+                # Every run starts without an index so "ready" always includes indexing
+                for name in os.listdir(cache_root):
+                    shutil.rmtree(os.path.join(cache_root, name))
+                runs[module].append(parse_timings(run_child(module, repo_path, cache_root, bots=module != "main").stdout))
+
+        print(f"median of {args.repeat} fresh interpreters, {args.files}-file repository")
+        for module, timings in runs.items():
+            for key in timings[0]:
+                print(f"  {f'{module} {key}':<48} {statistics.median(t[key] for t in timings) * 1000:8.0f}ms")
+
+        if args.top_imports:
+            stderr = run_child("main", repo_path, cache_root, bots=False, importtime=True).stderr
+            print("\nslowest imports of main (cumulative):")
+            for microseconds, name in top_imports(stderr, args.top_imports):
+                print(f"  {name:<40} {microseconds / 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure vector index build throughput and top-K search latency over synthetic chunks,
+one query at a time and batched.
+
+Usage:
+    python -m benchmarks.bench_vector_index --chunks 100000 --chunks-per-file 10 --queries 200
+"""
+
+import argparse
+import random
+import statistics
+import tempfile
+import time
+
+from src.utils.embeddings import create_embedder
+from src.utils.vector_index import VectorIndex
+
+WORDS = (
+    "request handler config loader retry backoff cache index scanner parser token session "
+    "repository commit branch query answer file chunk vector embedding search rank batch "
+    "client server socket stream buffer queue worker thread lock timeout error status"
+).split()
+
+
+def make_chunk(rng: random.Random, i: int) -> str:
+    """A small code-like chunk built from a shared vocabulary."""
+    name = "_".join(rng.sample(WORDS, 2))
+    body = " ".join(rng.choice(WORDS) for _ in range(40))
+    return f"def {name}_{i}(value):\n    # {body}\n    return value\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=100000)
+    parser.add_argument('--chunks-per-file', type=int, default=10)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--top-k', type=int, default=50)
+    parser.add_argument('--embedder', default="hashing")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    embedder = create_embedder(args.embedder)
+    with tempfile.TemporaryDirectory() as index_dir:
+        index = VectorIndex(index_dir, embedder)
+        start = time.perf_counter()
+        for file_number in range(args.chunks // args.chunks_per_file):
+            chunks = [
+                (line, line + 2, make_chunk(rng, file_number * args.chunks_per_file + line))
+                for line in range(1, 3 * args.chunks_per_file, 3)
+            ]
+            index.upsert(f"pkg{file_number // 100}/module_{file_number}.py", str(file_number), chunks)
+        index.flush()
+        build = time.perf_counter() - start
+
+        queries = [" ".join(rng.sample(WORDS, 3)) for _ in range(args.queries)]
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, args.top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+
+        start = time.perf_counter()
+        index.search_batch(queries, args.top_k)
+        batched = (time.perf_counter() - start) * 1000 / len(queries)
+
+        # Reopening maps the stored matrix instead of re-embedding
+        index.close()
+        start = time.perf_counter()
+        reopened = VectorIndex(index_dir, embedder)
+        reopen = time.perf_counter() - start
+
+        print(f"embedder={embedder.name} chunks={len(reopened)} build={build:.1f}s ({len(reopened) / build:.0f} chunks/s)")
+        print(f"reopen={reopen * 1000:.0f}ms")
+        print(
+            f"search top-{args.top_k}: p50={statistics.median(latencies):.1f}ms "
+            f"p95={latencies[int(len(latencies) * 0.95) - 1]:.1f}ms max={latencies[-1]:.1f}ms"
+        )
+        print(f"batched search of {len(queries)} queries: {batched:.2f}ms per query")
+        reopened.close()
+
+
+if __name__ == "__main__":
+    main()
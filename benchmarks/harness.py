@@ -0,0 +1,262 @@
+"""
+Shared benchmark harness: a deterministic stand-in for the LLM, synthetic repositories
+and measurement helpers.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Dict, Iterator, List, Optional
+
+import litellm
+
+from src.utils.analysis_batcher import FILE_HEADING
+from src.utils.context_packer import estimate_tokens
+
+# Prompt markers of each pipeline stage, checked in order
+PROMPT_KINDS = (
+    ("history", re.compile(r"NEED_NEW_INFORMATION")),
+    ("analysis", re.compile(rf"^\s*{re.escape(FILE_HEADING)}\S+$|Analyze the following file", re.MULTILINE)),
+    ("selector", re.compile(r"^\s*Path: \S+", re.MULTILINE)),
+)
+
+WORDS = (
+    "request handler config loader retry backoff cache index scanner parser token session "
+    "repository commit branch query answer file chunk vector embedding search rank batch "
+    "client server socket stream buffer queue worker thread lock timeout error status"
+).split()
+
+
+def classify_prompt(prompt: str) -> str:
+    """Name the pipeline stage a prompt belongs to: history, analysis, selector or aggregate."""
+    for kind, pattern in PROMPT_KINDS:
+        if pattern.search(prompt):
+            return kind
+    return "aggregate"
+
+
+class FakeLLM:
+    """
+    Replacement for litellm.completion that answers every pipeline stage plausibly and
+    deterministically. Each request waits a fixed latency plus a delay per completion
+    token, and requests and tokens are counted per stage.
+    """
+
+    def __init__(self, latency: float = 0.0, seconds_per_token: float = 0.0, selected_per_batch: int = 3, answer_tokens: int = 200):
+        """
+        Create the fake
+
+        Args:
+            latency: Seconds every request takes before the first token
+            seconds_per_token: Seconds per generated completion token
+            selected_per_batch: Files the selector picks from every batch it is shown
+            answer_tokens: Approximate length of aggregated answers
+        """
+        self.latency = latency
+        self.seconds_per_token = seconds_per_token
+        self.selected_per_batch = selected_per_batch
+        self.answer_tokens = answer_tokens
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Zero the counters."""
+        with self._lock:
+            self.requests = 0
+            self.prompt_tokens = 0
+            self.completion_tokens = 0
+            self.requests_by_kind: Dict[str, int] = {}
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get the counters
+
+        Returns:
+            Dictionary with requests, prompt and completion tokens, and requests per stage
+        """
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "requests_by_kind": dict(sorted(self.requests_by_kind.items())),
+            }
+
+    def answer(self, prompt: str) -> str:
+        """The response to a prompt, based on the stage it belongs to."""
+        kind = classify_prompt(prompt)
+        if kind == "history":
+            return "NEED_NEW_INFORMATION"
+        if kind == "analysis":
+            batched = re.findall(rf"^\s*{re.escape(FILE_HEADING)}(\S+)$", prompt, re.MULTILINE)
+            if batched:
+                return "\n".join(f"{FILE_HEADING}{path}\nDefines handle() for incoming requests." for path in batched)
+            return "Defines handle() for incoming requests."
+        if kind == "selector":
+            paths = re.findall(r"^\s*Path: (\S+)", prompt, re.MULTILINE)
+            return "\n".join(paths[:self.selected_per_batch])
+        sentence = "Requests are handled by the handle() functions. "
+        return sentence * max(1, self.answer_tokens // estimate_tokens(sentence))
+
+    def __call__(self, model=None, messages=None, stream=False, **kwargs):
+        prompt = "\n".join(message["content"] for message in messages)
+        text = self.answer(prompt)
+        if "Final Answer:" in prompt:
+            # CrewAI agents expect the ReAct-style answer format they were prompted with
+            text = f"Thought: I now know the final answer\nFinal Answer: {text}"
+
+        prompt_tokens = estimate_tokens(prompt)
+        completion_tokens = estimate_tokens(text)
+        kind = classify_prompt(prompt)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.requests_by_kind[kind] = self.requests_by_kind.get(kind, 0) + 1
+
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        time.sleep(self.latency)
+        if stream:
+            return self.stream_chunks(text, usage)
+        time.sleep(self.seconds_per_token * completion_tokens)
+        return litellm.ModelResponse(
+            model=model,
+            choices=[{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+            usage=usage,
+        )
+
+    def stream_chunks(self, text: str, usage: Dict[str, int]) -> Iterator[SimpleNamespace]:
+        """Yield the response word by word, the way a streaming completion arrives."""
+        words = re.findall(r"\S+\s*", text)
+        for word in words:
+            time.sleep(self.seconds_per_token * estimate_tokens(word))
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+        yield SimpleNamespace(usage=SimpleNamespace(**usage), choices=[])
+
+
+@contextmanager
+def fake_llm(fake: FakeLLM) -> Iterator[FakeLLM]:
+    """Route every litellm completion to the fake while the block runs."""
+    original = litellm.completion
+    litellm.completion = fake
+    try:
+        yield fake
+    finally:
+        litellm.completion = original
+
+
+@contextmanager
+def isolated_cache_dir(cache_root: str) -> Iterator[str]:
+    """Keep the indexes and caches of the block out of the user's cache directory."""
+    saved = {name: os.environ.get(name) for name in ("HOME", "LOCALAPPDATA")}
+    os.environ["HOME"] = cache_root
+    os.environ["LOCALAPPDATA"] = cache_root
+    try:
+        yield cache_root
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def make_module(rng: random.Random, i: int, file_count: int) -> str:
+    """A Python module with a docstring, imports, a class and a few functions."""
+    topic = rng.sample(WORDS, 2)
+    neighbour = rng.randrange(file_count)
+    lines = [
+        f'"""{topic[0].capitalize()} {topic[1]} support for service {i}."""',
+        "",
+        "import os",
+        "from typing import Dict, List",
+        "",
+        f"from pkg{neighbour // 50}.module_{neighbour} import {WORDS[neighbour % len(WORDS)].capitalize()}Client",
+        "",
+        "",
+        f"class {topic[0].capitalize()}{topic[1].capitalize()}{i}:",
+        f'    """Keeps the {topic[0]} state of a {topic[1]}."""',
+        "",
+    ]
+    for method in rng.sample(WORDS, 3):
+        body = " ".join(rng.choice(WORDS) for _ in range(8))
+        lines += [
+            f"    def {method}_{topic[1]}(self, {topic[0]}):",
+            f"        # {body}",
+            f"        return self.{method}({topic[0]})",
+            "",
+        ]
+    for j in range(rng.randint(1, 4)):
+        name = "_".join(rng.sample(WORDS, 2))
+        lines += [
+            "",
+            f"def {name}_{j}(value: Dict) -> List:",
+            f'    """{" ".join(rng.choice(WORDS) for _ in range(6)).capitalize()}."""',
+            f"    return [value.get({rng.choice(WORDS)!r})]",
+        ]
+    return "\n".join(lines) + "\n"
+
+
+def make_repo(root: str, file_count: int, seed: int = 0):
+    """
+    Create a synthetic repository of Python modules, 50 per package, plus a README and
+    a few configuration files. The content is the same for the same seed.
+
+    Args:
+        root: Directory to create the files in
+        file_count: Number of modules
+        seed: Random seed
+    """
+    rng = random.Random(seed)
+    with open(os.path.join(root, "README.md"), 'w') as file:
+        file.write("# Synthetic service\n\nRequest handlers with retry, caching and configuration loading.\n")
+    for i in range(file_count):
+        package = os.path.join(root, f"pkg{i // 50}")
+        if i % 50 == 0:
+            os.makedirs(package, exist_ok=True)
+            with open(os.path.join(package, "config.json"), 'w') as file:
+                file.write(f'{{"package": {i // 50}, "retries": {rng.randint(1, 5)}}}\n')
+        with open(os.path.join(package, f"module_{i}.py"), 'w') as file:
+            file.write(make_module(rng, i, file_count))
+
+
+class Measurement:
+    """Wall time and, when tracemalloc is tracing, peak Python memory of a block."""
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.peak_bytes: Optional[int] = None
+
+    def to_dict(self) -> Dict[str, object]:
+        measured = {"seconds": round(self.seconds, 4)}
+        if self.peak_bytes is not None:
+            measured["peak_memory_bytes"] = self.peak_bytes
+        return measured
+
+
+@contextmanager
+def measure() -> Iterator[Measurement]:
+    """Time the block and record the peak memory allocated while it ran."""
+    measurement = Measurement()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield measurement
+    finally:
+        measurement.seconds = time.perf_counter() - start
+        if tracing:
+            measurement.peak_bytes = tracemalloc.get_traced_memory()[1] - baseline
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """The value below which the given fraction of the sorted values fall."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
@@ -1,11 +1,71 @@
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from src.models.git_repo_bot import GitRepoBot
+from flask import Flask, Response, render_template, request, jsonify, redirect, url_for, session, stream_with_context
+from src.config.settings import AGENT_POOL_WARM_ON_START
+from src.models.agent_pool import get_agent_pool
+from src.models.bot_registry import BotRegistry
+from src.models.jobs import JobManager
+from src.utils.analysis_cache import get_analysis_cache
+from src.utils.metrics import get_metrics_registry, span
+from src.utils.file_utils import get_cache_dir
+from src.utils.concurrency import abandoned_calls
+from src.utils.scheduler import QueryScheduler, Overloaded, DeadlineExceeded, Cancelled, cancellation
+import json
 import os
-from git import Repo, GitCommandError
+import queue
+import threading
+import uuid
 
 app = Flask(__name__)
+# Sessions identify each user's repository and conversation; set FLASK_SECRET_KEY when running several workers
+app.secret_key = os.getenv("FLASK_SECRET_KEY") or os.urandom(24)
 
-# Initialize the bot at startup with a default repository path
+# Repositories and per-session bots; repository state is shared between sessions on the same repository
+registry = BotRegistry()
+
+# Background clone/index jobs; one job per repository directory at a time
+jobs = JobManager(registry)
+
+# Admission control for queries: bounded concurrency, a fair queue across sessions and deadlines
+scheduler = QueryScheduler()
+
+# Load the agent framework off the request path so the first /setup_repo does not pay for it
+if AGENT_POOL_WARM_ON_START:
+    threading.Thread(target=get_agent_pool().warm, name="agent-pool-warm", daemon=True).start()
+
+# Gauges sampled whenever /metrics is scraped
+metrics = get_metrics_registry()
+metrics.register_gauge("raggit_loaded_repos", "Repositories with state loaded in memory", lambda: len(registry.stats()["repos"]))
+metrics.register_gauge("raggit_sessions", "Chat sessions kept by the registry", lambda: registry.stats()["sessions"])
+metrics.register_gauge("raggit_repo_memory_bytes", "Approximate bytes held by repository caches", lambda: [
+    ({"repo": repo_path}, repo["memory_bytes"]) for repo_path, repo in registry.stats()["repos"].items()
+])
+metrics.register_gauge("raggit_analysis_cache_entries", "Entries in the persistent analysis cache", lambda: get_analysis_cache().stats()["entries"])
+metrics.register_gauge("raggit_queries_running", "Queries holding a scheduler slot", lambda: scheduler.stats()["running"])
+metrics.register_gauge("raggit_abandoned_calls", "Timed-out analysis calls still running in a worker thread", abandoned_calls)
+metrics.register_gauge("raggit_queries_queued", "Queries waiting for a scheduler slot", lambda: scheduler.stats()["queued"])
+metrics.register_gauge("raggit_repo_queries_queued", "Queries waiting for a scheduler slot per repository", lambda: [
+    ({"repo": repo_path}, queued) for repo_path, queued in scheduler.stats()["queued_by_repo"].items()
+])
+metrics.register_gauge("raggit_query_wait_seconds", "Recent queue waits before a query started", lambda: [
+    ({"quantile": quantile}, seconds) for quantile, seconds in scheduler.stats()["wait_seconds"].items()
+])
+metrics.register_gauge("raggit_queries_rejected", "Queries refused since startup, by reason", lambda: [
+    ({"reason": reason}, count) for reason, count in scheduler.stats()["rejected"].items()
+] + [({"reason": "expired"}, scheduler.stats()["expired"])])
+
+def overloaded_response(error: Overloaded):
+    """Answer a refused query with 429 or 503 and when to retry."""
+    return jsonify({"status": "error", "message": str(error)}), error.status, {"Retry-After": str(error.retry_after)}
+
+def get_session_bot():
+    """Get the bot of the current user's session on the repository they loaded."""
+    repo_path = session.get('repo_path')
+    if not repo_path:
+        raise ValueError("No repository loaded. Please set up a repository first.")
+    if jobs.get_active(repo_path):
+        raise ValueError("The repository is still being loaded. Please try again in a moment.")
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
+    return registry.get_bot(repo_path, session['session_id'])
 
 @app.route('/')
 def index():
@@ -26,64 +86,126 @@ def setup_repo():
     # Use the provided target directory or the default one
     if not target_directory:
         # Get platform-appropriate cache directory
-        if os.name == 'nt':  # Windows
-            cache_dir = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), 'RAGGGIT')
-        else:
-            cache_dir = os.path.join(os.path.expanduser('~'), '.cache', 'RAGGGIT')
-        os.makedirs(cache_dir, exist_ok=True)
-
-        target_directory = cache_dir
+        target_directory = get_cache_dir()
         # target_directory = os.environ.get('DEFAULT_TARGET_DIR', "C:/Users/nithi/.cache/RAGGGIT")
 
-    try:
-        # Clone or update the repository
-        repo_path = clone_or_update_repo(repo_url, target_directory)
-        
-        if not repo_path:
-            return jsonify({"status": "error", "message": "Failed to clone repository"})
-        
-        # Update the repo_bot with the new repository path
-        global repo_bot
-        repo_bot = GitRepoBot(repo_path=repo_path)
-        
-        return jsonify({"status": "success", "message": "Repository loaded successfully"})
-    except Exception as e:
-        return jsonify({"status": "error", "message": str(e)})
+    repo_name = os.path.basename(repo_url.rstrip('/\\')).replace(".git", "")
+    repo_dir = os.path.join(target_directory, repo_name)
 
-def clone_or_update_repo(repo_url, parent_dir):
-    repo_name = os.path.basename(repo_url).replace(".git", "")
-    repo_dir = os.path.join(parent_dir, repo_name)
+    # Clone and index in the background; the page polls /jobs/<job_id> until it is done
+    job = jobs.submit(repo_url, repo_dir)
+    session['repo_path'] = repo_dir
+    if 'session_id' not in session:
+        session['session_id'] = uuid.uuid4().hex
 
-    if os.path.exists(repo_dir):
-        try:
-            print(f"Repository already exists at {repo_dir}. Pulling latest changes...")
-            repo = Repo(repo_dir)
-            repo.remotes.origin.pull()
-            print("Repository updated successfully.")
-        except GitCommandError as e:
-            print(f"Error pulling repository: {e}")
-            raise e
-    else:
-        try:
-            print(f"Cloning repository into {repo_dir}...")
-            repo = Repo.clone_from(repo_url, repo_dir)
-            print("Clone completed.")
-        except Exception as e:
-            print(f"Error cloning repository: {e}")
-            raise e
+    return jsonify({"status": "queued", "job_id": job.id, "job": job.to_dict()}), 202
 
-    return repo_dir
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"status": "success", "job": job.to_dict()})
 
 @app.route('/query', methods=['POST'])
 def process_query():
     user_query = request.json.get('query')
+    # Clients may ask for the per-stage timings and counters of this request
+    include_trace = bool(request.json.get('trace'))
+    # Clients may give up sooner than the server's deadline, in seconds
+    deadline = request.json.get('deadline')
     try:
-        response,context = repo_bot.answer_query(user_query)
+        bot = get_session_bot()
+        with span("request") as trace, scheduler.admit(bot.repo_path, session['session_id'], deadline and float(deadline)):
+            # The repository may have been evicted while the query waited for its turn
+            bot = get_session_bot()
+            response,context = bot.answer_query(user_query)
         print(response)
-        return jsonify({"status": "success", "response": response.raw, "context": context})
+        result = {"status": "success", "response": response, "context": context}
+        if include_trace:
+            result["trace"] = trace.to_dict()
+        return jsonify(result)
+    except Overloaded as e:
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        return jsonify({"status": "error", "message": str(e)}), 504
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)})
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Expose stage timings, token and cache counters in the Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/query_stream', methods=['POST'])
+def process_query_stream():
+    """Answer a query as a Server-Sent Events stream of progress events and answer tokens."""
+    user_query = request.json.get('query')
+    include_trace = bool(request.json.get('trace'))
+    deadline = request.json.get('deadline')
+    try:
+        repo_path, session_id = get_session_bot().repo_path, session['session_id']
+        # Refuse before the stream starts, so the client gets the status code and Retry-After
+        ticket = scheduler.enqueue(repo_path, session_id, deadline and float(deadline))
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)})
+    events = queue.Queue()
+    # Set when the client goes away, so the query stops at its next stage or event
+    cancelled = threading.Event()
+
+    def emit(event, data):
+        events.put((event, data))
+
+    def run():
+        try:
+            if ticket.admitted_at is None:
+                emit("queued", {"position": ticket.position})
+            with cancellation(cancelled), span("request") as trace, scheduler.run(ticket):
+                # The repository may have been evicted while the query waited for its turn
+                response, context = registry.get_bot(repo_path, session_id).answer_query(user_query, on_event=emit)
+            done = {"response": response, "context": context}
+            if include_trace:
+                done["trace"] = trace.to_dict()
+            emit("done", done)
+        except Overloaded as e:
+            emit("error", {"message": str(e), "retry_after": e.retry_after})
+        except Cancelled as e:
+            print(f"Stopped a query whose client disconnected: {e}")
+        except Exception as e:
+            emit("error", {"message": str(e)})
+        finally:
+            events.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+
+    def generate():
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=15)
+                except queue.Empty:
+                    # Comment lines keep proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if item is None:
+                    break
+                event, data = item
+                yield f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+        finally:
+            # The server closes the stream early when the client disconnects
+            cancelled.set()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    # A client gone before the first event never starts generate(), so its finally never runs
+    response.call_on_close(cancelled.set)
+    return response
+
 @app.route('/save_note', methods=['POST'])
 def save_note():
     # In a real application, you'd save this to a database
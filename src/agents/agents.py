@@ -2,9 +2,12 @@
 Agent creation functions for the GitRepoBot application.
 """
 
-from crewai import Agent, LLM
+from typing import TYPE_CHECKING
 
-def create_file_analyzer_agent(llm: LLM) -> Agent:
+if TYPE_CHECKING:
+    from crewai import Agent, LLM
+
+def create_file_analyzer_agent(llm: "LLM") -> "Agent":
     """
     Create an agent that analyzes individual files based on the query
     
@@ -14,6 +17,8 @@ def create_file_analyzer_agent(llm: LLM) -> Agent:
     Returns:
         File analyzer agent
     """
+    from crewai import Agent
+
     return Agent(
         role="Query-Focused File Analyzer",
         goal="Analyze code files to extract information specifically relevant to the user's query",
@@ -27,7 +32,7 @@ def create_file_analyzer_agent(llm: LLM) -> Agent:
         allow_delegation=True
     )
     
-def create_context_aggregator_agent(llm: LLM) -> Agent:
+def create_context_aggregator_agent(llm: "LLM") -> "Agent":
     """
     Create an agent that aggregates context from multiple files to answer a specific query
     
@@ -37,6 +42,8 @@ def create_context_aggregator_agent(llm: LLM) -> Agent:
     Returns:
         Context aggregator agent
     """
+    from crewai import Agent
+
     return Agent(
         role="Query-Focused Context Aggregator",
         goal="Combine relevant file analyses into a comprehensive answer to the user's query",
@@ -49,7 +56,7 @@ def create_context_aggregator_agent(llm: LLM) -> Agent:
         allow_delegation=False
     )
     
-def create_file_selector_agent(llm: LLM) -> Agent:
+def create_file_selector_agent(llm: "LLM") -> "Agent":
     """
     Create an agent that selects which files are likely relevant to a query
     
@@ -59,6 +66,8 @@ def create_file_selector_agent(llm: LLM) -> Agent:
     Returns:
         File selector agent
     """
+    from crewai import Agent
+
     return Agent(
         role="File Relevance Selector",
         goal="Determine which files in the repository are most likely to contain information relevant to the query",
@@ -71,7 +80,7 @@ def create_file_selector_agent(llm: LLM) -> Agent:
         allow_delegation=False
     )
 
-def create_context_memory_agent(llm: LLM) -> Agent:
+def create_context_memory_agent(llm: "LLM") -> "Agent":
     """
     Create an agent that checks if conversation history already contains the answer to a query
     
@@ -81,6 +90,8 @@ def create_context_memory_agent(llm: LLM) -> Agent:
     Returns:
         Context memory agent
     """
+    from crewai import Agent
+
     return Agent(
         role="Conversation Context Analyzer",
         goal="Determine if the conversation history already contains information relevant to the current query",
@@ -4,23 +4,200 @@ Configuration settings for the GitRepoBot application.
 
 import os
 from dotenv import load_dotenv
-import google.generativeai as genai
 
 # Load environment variables from .env file
 load_dotenv()
 
-# Configure Gemini API
+# Gemini API key, passed to the LLM client when the first bot is created
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-genai.configure(api_key=GOOGLE_API_KEY)
 
 # Default model settings
 DEFAULT_GEMINI_MODEL = "gemini-2.0-flash"
 DEFAULT_TEMPERATURE = 0.2
 
+# How agent prompts are executed: "direct" sends single-shot completions straight to the LLM,
+# "crew" runs each prompt as a one-task CrewAI crew
+EXECUTION_BACKEND = os.getenv("EXECUTION_BACKEND", "direct")
+# Verbose CrewAI logging for the "crew" backend
+CREW_VERBOSE = True
+
 # File handling settings
 CHUNK_SIZE = 4000
 CHUNK_OVERLAP = 200
 
+# Preview settings used for file summaries
+PREVIEW_LINES = 10
+PREVIEW_MAX_CHARS = 1000
+
+# Structural digests shown to the file selector in place of previews
+# Maximum estimated tokens of one file's digest
+DIGEST_TOKEN_BUDGET = 60
+# Leading lines searched for documentation and imports
+DIGEST_SCAN_LINES = 80
+
+# Files larger than this many bytes are skipped
+MAX_FILE_SIZE = 2 * 1024 * 1024
+# Number of leading bytes inspected to detect binary files
+BINARY_SNIFF_BYTES = 8192
+# Files at least this large are memory-mapped when taking a preview
+MMAP_THRESHOLD = 64 * 1024
+
+# In-memory file content cache limits (per bot)
+FILE_CACHE_MAX_BYTES = 64 * 1024 * 1024
+FILE_CACHE_MAX_ENTRY_BYTES = 8 * 1024 * 1024
+
+# Persistent repository index settings
+CACHE_DIR_NAME = 'RAGGGIT'
+INDEX_DIR_NAME = 'index'
+# Minimum number of seconds between filesystem re-scans of an indexed repository
+INDEX_REFRESH_INTERVAL = 30
+
+# File selection settings
+# Maximum number of files per file-selector LLM request
+SELECTOR_BATCH_SIZE = 100
+# Estimated tokens of file digests per file-selector LLM request
+SELECTOR_BATCH_TOKEN_BUDGET = 4000
+# Number of BM25-ranked candidate files sent to the file selector
+SELECTOR_TOP_K = 40
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Maximum number of file-selector batches sent to the LLM concurrently
+SELECTOR_MAX_WORKERS = 4
+
+# Symbol index used to resolve identifiers named in a query without the file selector
+# Names defined in more files than this are too ambiguous to resolve directly
+SYMBOL_MAX_DEFINITION_FILES = 5
+# Files referencing a resolved name that are analyzed alongside its definitions
+SYMBOL_MAX_REFERENCE_FILES = 3
+# Lines stored per referenced name and file
+SYMBOL_MAX_REFERENCE_LINES = 20
+# Lines around each reference included in the analysis excerpt
+SYMBOL_REFERENCE_CONTEXT_LINES = 3
+
+# Chunk-level vector index searched alongside BM25
+VECTOR_INDEX_ENABLED = True
+# "hashing" (offline and deterministic) or "sentence-transformers" (CPU model, optional package)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "hashing")
+# Model used by the sentence-transformers embedder
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Vector size of the hashing embedder; searches read the whole matrix, so smaller is faster
+EMBEDDING_DIMENSIONS = 256
+# Chunks embedded per call
+EMBEDDING_BATCH_SIZE = 256
+# Rows allocated when a vector matrix is created; it doubles when full
+VECTOR_INDEX_INITIAL_CAPACITY = 4096
+# Chunks returned by a vector search
+VECTOR_SEARCH_TOP_K = 50
+# Reciprocal rank fusion constant used to combine BM25 and vector rankings
+RANK_FUSION_K = 60
+
+# Commit history index, stored next to the file index and extended from the last indexed commit
+HISTORY_INDEX_ENABLED = True
+# Commits written per transaction; an interrupted run resumes after the last written batch
+HISTORY_BATCH_COMMITS = 1000
+# Commits touching more files than this (bulk renames, reformatting) do not count towards co-change
+HISTORY_COCHANGE_MAX_FILES = 50
+# Characters of each commit message body kept for answering "why" questions
+HISTORY_MESSAGE_CHARS = 400
+# Files, commits and co-changed files described for a history question
+HISTORY_MAX_FILES = 5
+HISTORY_MAX_COMMITS = 15
+HISTORY_MAX_COCHANGED = 5
+# Best-ranked candidates whose frequently co-changed files join the candidate ranking
+HISTORY_COCHANGE_SEEDS = 3
+
+# File analysis settings
+# Maximum number of per-file analyses sent to the LLM concurrently
+ANALYSIS_MAX_WORKERS = 4
+# Seconds a single file analysis may take before the answer is aggregated without it
+ANALYSIS_TIMEOUT = 90
+# Estimated tokens of file excerpts shared by all analysis prompts of one query
+ANALYSIS_TOKEN_BUDGET = 24000
+# Small files are analyzed together, several per request, up to this many excerpt tokens
+ANALYSIS_BATCH_TOKEN_BUDGET = 6000
+# Maximum number of files in one batched analysis request (1 disables batching)
+ANALYSIS_BATCH_MAX_FILES = 8
+# Files whose excerpt is larger than this always get a request of their own
+ANALYSIS_LARGE_FILE_TOKENS = 2000
+# Rough number of characters per LLM token, used for budget estimates
+CHARS_PER_TOKEN = 4
+
+# Persistent cache of per-file analyses
+ANALYSIS_CACHE_FILE = 'analysis_cache.sqlite'
+ANALYSIS_CACHE_MAX_ENTRIES = 5000
+# Seconds a cached analysis stays valid
+ANALYSIS_CACHE_TTL = 7 * 24 * 60 * 60
+# Bump whenever the analysis prompt changes so old analyses are not reused
+ANALYSIS_PROMPT_VERSION = "2"
+
+# Answer cache used to decide follow-up questions without an LLM call
+ANSWER_CACHE_MAX_ENTRIES = 50
+# Query similarity at or above which a previous answer is reused; only near-exact repeats qualify
+ANSWER_CACHE_HIT_THRESHOLD = 0.95
+# Query similarity below which the query is treated as new; values in between ask the LLM
+ANSWER_CACHE_MISS_THRESHOLD = 0.35
+
+# Conversation memory given to the pipeline stages
+# Past turns kept per session
+MEMORY_MAX_TURNS = 50
+# Most recent turns always offered to the stages, so follow-ups like "why?" keep their context
+MEMORY_RECENT_TURNS = 2
+# Query similarity at or above which an older turn counts as relevant to the current query
+MEMORY_RELEVANCE_THRESHOLD = 0.2
+# Estimated tokens of history given to each stage; the selector and analyses only see past questions
+MEMORY_STAGE_TOKEN_BUDGETS = {"history_check": 1500, "aggregate": 1000, "selector": 100, "analysis": 100}
+# Estimated tokens of the rolling summary of turns not shown in full
+MEMORY_SUMMARY_TOKEN_BUDGET = 300
+# Estimated tokens of a single past answer shown in full
+MEMORY_TURN_ANSWER_TOKENS = 400
+# Characters of an answer kept as its summary line
+MEMORY_GIST_CHARS = 160
+
+# Repository and session registry used by the web server
+REGISTRY_MAX_REPOS = 8
+# Approximate bytes of in-memory caches kept across all loaded repositories
+REGISTRY_MEMORY_BUDGET = 512 * 1024 * 1024
+REGISTRY_MAX_SESSIONS = 1000
+# Import the agent framework and build the shared agents in the background when the server starts
+AGENT_POOL_WARM_ON_START = True
+
+# Repository scanning
+# List files with `git ls-files` when the repository has a .git directory
+SCAN_USE_GIT_INDEX = True
+# Skip paths matched by .gitignore files when walking the working tree
+SCAN_RESPECT_GITIGNORE = True
+
+# Background clone/index jobs started by /setup_repo
+# Commits fetched when cloning (None for full history, which the commit history features use)
+CLONE_DEPTH = None
+# Partial clone filter; "blob:none" fetches file contents for the checked-out commit only
+CLONE_FILTER = "blob:none"
+SETUP_MAX_WORKERS = 2
+# Finished jobs kept for status lookups
+JOBS_MAX_FINISHED = 100
+
+# Admission control for /query and /query_stream
+# Queries answered at once across all repositories, and per repository
+SCHEDULER_MAX_CONCURRENT = 8
+SCHEDULER_MAX_PER_REPO = 4
+# Queries waiting for a slot before new ones are refused with 503
+SCHEDULER_MAX_QUEUED = 64
+# Queries one session may have waiting or running before new ones are refused with 429
+SCHEDULER_MAX_PER_SESSION = 2
+# Seconds a query may take from arrival, queueing included, before its remaining stages are cancelled
+SCHEDULER_DEADLINE = 180
+# Seconds a query is assumed to take until some have finished, for Retry-After estimates
+SCHEDULER_INITIAL_SERVICE_SECONDS = 20
+# Recent queue waits kept for the wait time percentiles
+SCHEDULER_WAIT_SAMPLES = 1000
+# Seconds between checks for a cancelled query while it waits for a slot or a shared answer
+SCHEDULER_CANCEL_POLL_INTERVAL = 0.5
+
+# Requests per minute allowed per LLM provider across all bots (None for no limit)
+PROVIDER_RATE_LIMITS = {
+    'gemini': 1000,
+}
+
 # Excluded directories for file scanning
 EXCLUDED_DIRS = {'.git', '__pycache__', 'node_modules', 'venv', 'env', '.venv', 'dist', 'build'}
 
@@ -29,4 +206,4 @@ CODE_EXTENSIONS = {
     '.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.c', '.cpp', '.h', '.cs', '.go', 
     '.rs', '.php', '.rb', '.swift', '.kt', '.scala', '.sh', '.md', '.json', '.yaml', 
     '.yml', '.html', '.css', '.scss', '.sql', '.graphql', '.proto'
-}
\ No newline at end of file
+}
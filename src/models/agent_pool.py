@@ -0,0 +1,119 @@
+"""
+Process-wide pool of LLM clients and agents shared by every GitRepoBot.
+"""
+
+import threading
+import time
+from typing import Dict, Optional
+
+from src.config.settings import DEFAULT_GEMINI_MODEL, GOOGLE_API_KEY
+
+
+class AgentSet:
+    """
+    The LLM client of one model and the four agents of the query pipeline built on it.
+    Agents only hold their role, goal and backstory, so one set serves every bot;
+    the crew backend runs each prompt on a copy of the agent.
+    """
+
+    def __init__(self, model: str, api_key: Optional[str]):
+        """
+        Create the LLM client and the agents, importing crewai on first use
+
+        Args:
+            model: LiteLLM model name, e.g. "gemini/gemini-2.0-flash"
+            api_key: API key of the model's provider
+        """
+        from crewai import LLM
+        from src.agents.agents import (
+            create_file_analyzer_agent,
+            create_context_aggregator_agent,
+            create_file_selector_agent,
+            create_context_memory_agent
+        )
+
+        self.llm = LLM(api_key=api_key, model=model)
+        self.file_analyzer_agent = create_file_analyzer_agent(self.llm)
+        self.context_aggregator_agent = create_context_aggregator_agent(self.llm)
+        self.file_selector_agent = create_file_selector_agent(self.llm)
+        self.context_memory_agent = create_context_memory_agent(self.llm)
+
+
+class AgentPool:
+    """
+    Thread-safe pool of AgentSets, created on first request per model and API key and
+    reused for the life of the process.
+    """
+
+    def __init__(self):
+        self._sets: Dict[tuple, AgentSet] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def get(self, model: str, api_key: Optional[str] = None) -> AgentSet:
+        """
+        Get the shared agents of a model
+
+        Args:
+            model: LiteLLM model name
+            api_key: API key of the model's provider; defaults to GOOGLE_API_KEY
+
+        Returns:
+            The model's AgentSet
+        """
+        api_key = api_key if api_key is not None else GOOGLE_API_KEY
+        key = (model, api_key)
+        with self._lock:
+            agent_set = self._sets.get(key)
+            if agent_set is None:
+                agent_set = AgentSet(model, api_key)
+                self._sets[key] = agent_set
+                self.created += 1
+            else:
+                self.reused += 1
+            return agent_set
+
+    def warm(self, model: str = f"gemini/{DEFAULT_GEMINI_MODEL}") -> float:
+        """
+        Import the agent framework and build the default agents ahead of the first bot
+
+        Args:
+            model: LiteLLM model name
+
+        Returns:
+            Seconds it took
+        """
+        start = time.perf_counter()
+        self.get(model)
+        seconds = time.perf_counter() - start
+        print(f"Agent pool warmed for {model} in {seconds:.2f}s")
+        return seconds
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get pool counters
+
+        Returns:
+            Dictionary with the number of agent sets, and how often one was created or reused
+        """
+        with self._lock:
+            return {"agent_sets": len(self._sets), "created": self.created, "reused": self.reused}
+
+
+_agent_pool: Optional[AgentPool] = None
+_agent_pool_lock = threading.Lock()
+
+
+def get_agent_pool() -> AgentPool:
+    """
+    Get the process-wide agent pool shared by all bots
+
+    Returns:
+        The shared AgentPool
+    """
+    global _agent_pool
+    with _agent_pool_lock:
+        if _agent_pool is None:
+            _agent_pool = AgentPool()
+        return _agent_pool
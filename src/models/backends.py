@@ -0,0 +1,266 @@
+"""
+Execution backends that run GitRepoBot's single-shot agent prompts.
+"""
+
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+from src.config.settings import EXECUTION_BACKEND, CREW_VERBOSE
+from src.utils.context_packer import estimate_tokens
+from src.utils.metrics import record as record_usage
+from src.utils.scheduler import check_deadline, time_left
+
+if TYPE_CHECKING:
+    from crewai import Agent, LLM
+
+
+def compact_prompt(prompt: str) -> str:
+    """
+    Remove the source-code indentation and blank-line runs that prompt templates carry
+
+    Args:
+        prompt: Prompt text, typically an indented triple-quoted f-string
+
+    Returns:
+        The prompt with the template's indentation stripped from every line that has it
+    """
+    lines = prompt.strip('\n').split('\n')
+    first = next((line for line in lines if line.strip()), '')
+    indent = first[:len(first) - len(first.lstrip())]
+
+    compacted: List[str] = []
+    for line in lines:
+        if indent and line.startswith(indent):
+            line = line[len(indent):]
+        line = line.rstrip()
+        if not line and (not compacted or not compacted[-1]):
+            continue
+        compacted.append(line)
+    return '\n'.join(compacted).strip()
+
+
+class ExecutionBackend:
+    """
+    Runs one agent prompt and returns the response text, counting requests,
+    tokens and time spent so backends can be compared.
+    """
+
+    name = "base"
+
+    def __init__(self, llm: "LLM"):
+        """
+        Create the backend
+
+        Args:
+            llm: The configured LLM every prompt is sent to
+        """
+        self.llm = llm
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, agent: "Agent", prompt: str, expected_output: str) -> str:
+        """
+        Run a prompt for an agent
+
+        Args:
+            agent: Agent whose role the prompt is run as
+            prompt: The task prompt
+            expected_output: Short description of the expected result
+
+        Returns:
+            The response text
+        """
+        raise NotImplementedError
+
+    def request_options(self) -> Dict[str, object]:
+        """Sampling options of the configured LLM, sent with every request."""
+        options = {}
+        if getattr(self.llm, 'temperature', None) is not None:
+            options['temperature'] = self.llm.temperature
+        return options
+
+    def complete(self, messages: List[Dict[str, str]], **options):
+        """
+        Send a completion request to the LLM that gives up at the query's deadline, so a
+        request whose query has run out of time does not keep its worker busy
+
+        Args:
+            messages: Chat messages
+            **options: Further litellm options, such as temperature or stream
+
+        Returns:
+            The litellm response
+
+        Raises:
+            DeadlineExceeded: If the deadline passed before or during the request
+        """
+        import litellm
+
+        left = time_left()
+        if left is not None:
+            check_deadline("an LLM request")
+            options['timeout'] = left
+        try:
+            return litellm.completion(model=self.llm.model, api_key=self.llm.api_key, messages=messages, **options)
+        except litellm.Timeout:
+            check_deadline("the LLM answered")
+            raise
+
+    def build_messages(self, agent: "Agent", prompt: str) -> List[Dict[str, str]]:
+        """Chat messages for a prompt run as an agent."""
+        return [
+            {"role": "system", "content": f"You are {agent.role}. {agent.backstory}\nYour goal: {agent.goal}"},
+            {"role": "user", "content": prompt},
+        ]
+
+    def stream(self, agent: "Agent", prompt: str, on_token: Callable[[str], None]) -> str:
+        """
+        Run a prompt directly against the LLM, streaming the response. Crews only return
+        complete results, so every backend streams through litellm, which backs crewai's LLM.
+
+        Args:
+            agent: Agent whose role, goal and backstory form the system prompt
+            prompt: The task prompt
+            on_token: Callback receiving each piece of text as it arrives
+
+        Returns:
+            The complete response text
+        """
+        messages = self.build_messages(agent, prompt)
+        start = time.perf_counter()
+        response = self.complete(messages, stream=True, stream_options={"include_usage": True}, **self.request_options())
+
+        parts = []
+        usage = None
+        for chunk in response:
+            usage = getattr(chunk, 'usage', None) or usage
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                parts.append(text)
+                on_token(text)
+        result = "".join(parts)
+        self.record(messages, result, usage, time.perf_counter() - start)
+        return result
+
+    def record(self, messages: List[Dict[str, str]], result: str, usage, seconds: float):
+        """
+        Count a finished request, estimating tokens when the provider reported no usage
+
+        Args:
+            messages: Messages that were sent
+            result: Response text
+            usage: Provider usage with prompt_tokens and completion_tokens, if any
+            seconds: Wall time of the request
+        """
+        prompt_tokens = getattr(usage, 'prompt_tokens', 0) or sum(estimate_tokens(m["content"]) for m in messages)
+        completion_tokens = getattr(usage, 'completion_tokens', 0) or estimate_tokens(result)
+        record_usage(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens)
+        with self._lock:
+            self.requests += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+            self.seconds += seconds
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get the backend's counters
+
+        Returns:
+            Dictionary with backend name, requests, prompt and completion tokens and seconds
+        """
+        with self._lock:
+            return {
+                "backend": self.name,
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "seconds": round(self.seconds, 3),
+            }
+
+
+class CrewBackend(ExecutionBackend):
+    """Runs each prompt as a one-task CrewAI crew, with the agent's full prompting."""
+
+    name = "crew"
+
+    def __init__(self, llm: "LLM", verbose: bool = CREW_VERBOSE):
+        super().__init__(llm)
+        self.verbose = verbose
+
+    def run(self, agent: "Agent", prompt: str, expected_output: str) -> str:
+        from crewai import Task, Crew, Process
+
+        # A crew's requests cannot be given a timeout per query, so at least none start late
+        check_deadline("an LLM request")
+
+        # CrewAI binds an agent to the crew running it, so concurrent prompts each get their own copy
+        agent = agent.copy()
+        task = Task(
+            description=prompt,
+            agent=agent,
+            expected_output=expected_output,
+            llm=self.llm,
+        )
+        crew = Crew(
+            agents=[agent],
+            tasks=[task],
+            verbose=self.verbose,
+            process=Process.sequential
+        )
+
+        start = time.perf_counter()
+        result = crew.kickoff()
+        # Extract the result - may vary based on crewai version
+        result_value = list(result.values())[0] if isinstance(result, dict) else result
+        result_str = str(result_value)
+        self.record(self.build_messages(agent, prompt), result_str, getattr(result, 'token_usage', None), time.perf_counter() - start)
+        return result_str
+
+
+class DirectLLMBackend(ExecutionBackend):
+    """
+    Sends each prompt as a single chat completion to the configured LLM: a compact
+    system prompt, the prompt without template indentation, no agent loop and no tracing.
+    """
+
+    name = "direct"
+
+    def build_messages(self, agent: "Agent", prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": f"You are a {agent.role}. {agent.goal}."},
+            {"role": "user", "content": compact_prompt(prompt)},
+        ]
+
+    def run(self, agent: "Agent", prompt: str, expected_output: str) -> str:
+        messages = self.build_messages(agent, prompt)
+        start = time.perf_counter()
+        response = self.complete(messages, **self.request_options())
+        result = response.choices[0].message.content or ""
+        self.record(messages, result, getattr(response, 'usage', None), time.perf_counter() - start)
+        return result
+
+
+BACKENDS = {
+    CrewBackend.name: CrewBackend,
+    DirectLLMBackend.name: DirectLLMBackend,
+}
+
+
+def create_backend(llm: "LLM", name: str = EXECUTION_BACKEND) -> ExecutionBackend:
+    """
+    Create an execution backend by name
+
+    Args:
+        llm: The configured LLM
+        name: "direct" or "crew"
+
+    Returns:
+        The backend
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown execution backend {name!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[name](llm)
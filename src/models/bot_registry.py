@@ -0,0 +1,160 @@
+"""
+Registry of repositories and chat sessions for serving many users from one process.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from src.config.settings import REGISTRY_MAX_REPOS, REGISTRY_MEMORY_BUDGET, REGISTRY_MAX_SESSIONS
+from src.models.git_repo_bot import GitRepoBot
+from src.models.repo_state import RepoState
+
+
+class BotRegistry:
+    """
+    Thread-safe registry of GitRepoBot sessions.
+
+    Heavy per-repository state (index, file cache, BM25 index) lives in one RepoState per
+    repository and is shared by every session on it; each session gets its own GitRepoBot
+    with a private conversation history. Idle repositories are evicted least recently
+    used first when there are too many or their caches exceed the memory budget; eviction
+    closes their indexes but keeps their sessions, which carry their conversation history
+    over to the repository's new state on their next query. Sessions themselves are only
+    dropped, least recently used first, beyond max_sessions.
+    """
+
+    def __init__(
+        self,
+        max_repos: int = REGISTRY_MAX_REPOS,
+        memory_budget: int = REGISTRY_MEMORY_BUDGET,
+        max_sessions: int = REGISTRY_MAX_SESSIONS
+    ):
+        """
+        Create an empty registry
+
+        Args:
+            max_repos: Maximum number of repositories kept loaded
+            memory_budget: Approximate bytes the loaded repositories' caches may use in total
+            max_sessions: Maximum number of sessions kept across all repositories
+        """
+        self.max_repos = max_repos
+        self.memory_budget = memory_budget
+        self.max_sessions = max_sessions
+        self._repos: "OrderedDict[str, RepoState]" = OrderedDict()
+        self._sessions: "OrderedDict[Tuple[str, str], GitRepoBot]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def get_repo(self, repo_path: str) -> RepoState:
+        """
+        Get the shared state of a repository, loading it if needed
+
+        Args:
+            repo_path: Path to the git repository
+
+        Returns:
+            The repository's RepoState
+        """
+        with self._lock:
+            state = self._repos.get(repo_path)
+            if state is None:
+                state = RepoState(repo_path)
+                self._repos[repo_path] = state
+            self._repos.move_to_end(repo_path)
+            state.last_used = time.time()
+            self._evict()
+            return state
+
+    def get_bot(self, repo_path: str, session_id: str) -> GitRepoBot:
+        """
+        Get the bot of a session on a repository, creating it if needed
+
+        Args:
+            repo_path: Path to the git repository
+            session_id: Identifier of the user's session
+
+        Returns:
+            The session's GitRepoBot, sharing repository state with other sessions
+        """
+        key = (repo_path, session_id)
+        with self._lock:
+            bot = self._sessions.get(key)
+            state = self.get_repo(repo_path)
+            if bot is None:
+                bot = GitRepoBot(repo_path=repo_path, state=state)
+                self._sessions[key] = bot
+            elif bot.state is not state:
+                # The repository was evicted since the session's last query
+                bot.attach(state)
+            self._sessions.move_to_end(key)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+            return bot
+
+    def _evict(self):
+        """Unload idle repositories, least recently used first, until within limits."""
+        for repo_path in list(self._repos):
+            over_count = len(self._repos) > self.max_repos
+            over_memory = self.memory_bytes() > self.memory_budget
+            if not (over_count or over_memory):
+                break
+            state = self._repos[repo_path]
+            # Never evict the most recently used repository or one serving a query
+            if repo_path == next(reversed(self._repos)) or state.active_queries:
+                continue
+            print(f"Evicting idle repository {repo_path}")
+            del self._repos[repo_path]
+            state.release()
+
+    def evict(self, repo_path: str) -> bool:
+        """
+        Unload a repository if it is not serving a query; its sessions are kept
+
+        Args:
+            repo_path: Path to the git repository
+
+        Returns:
+            True if the repository was unloaded
+        """
+        with self._lock:
+            state = self._repos.get(repo_path)
+            if state is None or state.active_queries:
+                return False
+            del self._repos[repo_path]
+            state.release()
+            return True
+
+    def memory_bytes(self) -> int:
+        """
+        Estimate the memory held by all loaded repositories
+
+        Returns:
+            Approximate size in bytes
+        """
+        with self._lock:
+            return sum(state.memory_bytes() for state in self._repos.values())
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Describe the loaded repositories and sessions
+
+        Returns:
+            Dictionary with per-repository memory, sessions and activity
+        """
+        with self._lock:
+            return {
+                "repos": {
+                    repo_path: {
+                        "memory_bytes": state.memory_bytes(),
+                        "sessions": sum(1 for key in self._sessions if key[0] == repo_path),
+                        "active_queries": state.active_queries,
+                        "idle_seconds": round(time.time() - state.last_used, 1),
+                        "file_cache": state.file_cache.stats(),
+                    }
+                    for repo_path, state in self._repos.items()
+                },
+                "sessions": len(self._sessions),
+                "memory_bytes": self.memory_bytes(),
+                "memory_budget": self.memory_budget,
+            }
@@ -2,26 +2,70 @@
 Core GitRepoBot class for analyzing Git repositories.
 """
 
-import os
-import re
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Callable, Optional
 from pathlib import Path
-from collections import deque
-from crewai import Agent, Task, Crew, Process, LLM
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
-from src.config.settings import DEFAULT_GEMINI_MODEL, DEFAULT_TEMPERATURE, CHUNK_SIZE, CHUNK_OVERLAP
-from src.utils.file_utils import get_all_files, read_file, get_file_summaries
-from src.agents.agents import (
-    create_file_analyzer_agent,
-    create_context_aggregator_agent,
-    create_file_selector_agent,
-    create_context_memory_agent
+from src.config.settings import (
+    DEFAULT_GEMINI_MODEL,
+    DEFAULT_TEMPERATURE,
+    SELECTOR_BATCH_SIZE,
+    SELECTOR_BATCH_TOKEN_BUDGET,
+    SELECTOR_MAX_WORKERS,
+    ANALYSIS_MAX_WORKERS,
+    ANALYSIS_TIMEOUT,
+    ANALYSIS_TOKEN_BUDGET,
+    ANALYSIS_BATCH_TOKEN_BUDGET,
+    ANALYSIS_BATCH_MAX_FILES,
+    EXECUTION_BACKEND,
+    SCHEDULER_CANCEL_POLL_INTERVAL,
 )
+from src.models.agent_pool import get_agent_pool
+from src.models.backends import create_backend
+from src.models.repo_state import RepoState
+from src.utils.file_utils import get_all_files, read_file, get_file_summaries
+from src.utils.analysis_cache import AnalysisCache, normalize_query
+from src.utils.answer_cache import AnswerCache
+from src.utils.conversation_memory import ConversationMemory
+from src.utils.repo_index import hash_content
+from src.utils.context_packer import pack_context, estimate_tokens
+from src.utils.analysis_batcher import FILE_HEADING, plan_batches, format_batch_files, split_batch_response
+from src.utils.concurrency import run_concurrently, run_with_timeouts, get_rate_limiter, get_provider
+from src.utils.metrics import span, traced, record
+from src.utils.single_flight import Flight, make_key
+from src.utils.history_index import is_history_query
+from src.utils.scheduler import Cancelled, DeadlineExceeded, check_cancelled, check_deadline, time_left
+
+# Callback receiving (event_name, event_data) progress events from the query pipeline
+EventCallback = Optional[Callable[[str, Dict[str, Any]], None]]
+
+
+def with_history(query: str, history: str) -> str:
+    """Prefix a query with conversation history, if there is any."""
+    return f"Previous conversation:\n{history}\n\nCurrent user query:\n{query}" if history else query
+
+
+def emit_event(on_event: EventCallback, event: str, **data):
+    """Send a progress event to the callback, if there is one, unless the query was cancelled."""
+    check_cancelled(event)
+    if on_event is not None:
+        on_event(event, data)
+
 
 class GitRepoBot:
-    def __init__(self, repo_path: str, gemini_model: str = DEFAULT_GEMINI_MODEL, temperature: float = DEFAULT_TEMPERATURE):
+    def __init__(
+        self,
+        repo_path: str,
+        gemini_model: str = DEFAULT_GEMINI_MODEL,
+        temperature: float = DEFAULT_TEMPERATURE,
+        selector_max_workers: int = SELECTOR_MAX_WORKERS,
+        analysis_max_workers: int = ANALYSIS_MAX_WORKERS,
+        analysis_timeout: float = ANALYSIS_TIMEOUT,
+        analysis_token_budget: int = ANALYSIS_TOKEN_BUDGET,
+        analysis_batch_token_budget: int = ANALYSIS_BATCH_TOKEN_BUDGET,
+        analysis_batch_max_files: int = ANALYSIS_BATCH_MAX_FILES,
+        execution_backend: str = EXECUTION_BACKEND,
+        state: Optional[RepoState] = None
+    ):
         """
         Initialize the Git Repository Bot with query-focused analysis
         
@@ -29,45 +73,180 @@ class GitRepoBot:
             repo_path: Path to the git repository
             gemini_model: Gemini model to use
             temperature: Temperature for the model
+            selector_max_workers: Maximum number of file-selector batches run concurrently
+            analysis_max_workers: Maximum number of file analyses run concurrently
+            analysis_timeout: Seconds a single file analysis may take before it is skipped
+            analysis_token_budget: Estimated tokens of file excerpts shared by all analyses of a query
+            analysis_batch_token_budget: Estimated excerpt tokens of small files packed into one analysis request
+            analysis_batch_max_files: Maximum number of files analyzed by one request (1 disables batching)
+            execution_backend: "direct" to send prompts straight to the LLM, "crew" to run them as CrewAI crews
+            state: Shared state of the repository; a private one is created when omitted
         """
         self.repo_path = repo_path
         self.gemini_model = gemini_model
         self.temperature = temperature
-        self.conversation_history = deque(maxlen=10)
+        self.selector_max_workers = selector_max_workers
+        self.analysis_max_workers = analysis_max_workers
+        self.analysis_timeout = analysis_timeout
+        self.analysis_token_budget = analysis_token_budget
+        self.analysis_batch_token_budget = analysis_batch_token_budget
+        self.analysis_batch_max_files = analysis_batch_max_files
+        # Past turns of this session, of which each stage gets a view within a token budget
+        self.memory = ConversationMemory()
         
-        # Initialize Gemini model for Langchain
-        self.llm = LLM(
-            api_key=os.getenv("GOOGLE_API_KEY"),
-            model="gemini/gemini-2.0-flash",
-        )
+        # LLM client and agents, shared by every bot in the process
+        agents = get_agent_pool().get(f"gemini/{gemini_model}")
+        self.llm = agents.llm
+        self.file_analyzer_agent = agents.file_analyzer_agent
+        self.context_aggregator_agent = agents.context_aggregator_agent
+        self.file_selector_agent = agents.file_selector_agent
+        self.context_memory_agent = agents.context_memory_agent
+
+        # Runs every agent prompt of the pipeline
+        self.backend = create_backend(self.llm, execution_backend)
         
-        # Text splitter for chunking large files
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP,
-            length_function=len
-        )
+        # Index, caches and text splitter, shared with other sessions on the same repository
+        self.state = state or RepoState(repo_path)
+
+        # Cache of per-file analyses shared by all bots in the process
+        self.analysis_cache = self.state.analysis_cache
+
+        # Past answers of this session, matched by query similarity to short-circuit follow-up questions
+        self.answer_cache = AnswerCache()
+        self.state.register_answer_cache(self.answer_cache)
+
+    def attach(self, state: RepoState):
+        """
+        Move the session onto a newly loaded state of its repository, keeping its conversation
+
+        Args:
+            state: The repository's current shared state
+        """
+        self.state = state
+        self.analysis_cache = state.analysis_cache
+        # Files may have changed while the repository was unloaded, so past answers are not reused as is
+        self.answer_cache.invalidate_all()
+        state.register_answer_cache(self.answer_cache)
+
+    @property
+    def index(self):
+        """The persistent file index of the repository."""
+        return self.state.index
+
+    @property
+    def file_cache(self):
+        """The repository's shared file content cache."""
+        return self.state.file_cache
+
+    @property
+    def text_splitter(self):
+        """The text splitter used for chunking file content."""
+        return self.state.text_splitter
+
+    @property
+    def indexed_commit(self) -> Optional[str]:
+        """The HEAD commit the repository index was last synchronised with."""
+        return self.state.indexed_commit
+
+    def refresh_index(self):
+        """Re-scan the repository if the index is stale and propagate changes to derived indexes."""
+        self.state.refresh_index()
+
+    def invalidate_paths(self, paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drop and rebuild all derived state for the given repository paths
+        
+        Args:
+            paths: Relative paths that were added, modified, renamed or deleted
+            
+        Returns:
+            Tuple of (changed_or_added_paths, removed_paths) as seen by the index
+        """
+        return self.state.invalidate_paths(paths)
+
+    def sync_with_head(self) -> List[str]:
+        """
+        Bring the repository state up to date with its current HEAD, re-indexing only changed paths
         
-        # Cache for file content to avoid re-reading
-        self.file_cache = {}
+        Returns:
+            List of relative paths that were re-indexed
+        """
+        return self.state.sync_with_head()
+
+    def rank_candidate_files(self, query: str, file_summaries: Dict[str, Dict]) -> List[str]:
+        """
+        Pre-rank files with BM25 so only the best candidates are sent to the file selector
+        
+        Args:
+            query: The user's query about the repository
+            file_summaries: Summaries of all files in the repository
+            
+        Returns:
+            List of candidate file paths, best first
+        """
+        return self.state.rank_candidate_files(query, file_summaries)
+
+    @traced("resolve_symbols")
+    def resolve_symbols(self, query: str) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Resolve identifiers named in the query to the files and line spans defining and using them
         
-        # Initialize agents
-        self.file_analyzer_agent = create_file_analyzer_agent(self.llm)
-        self.context_aggregator_agent = create_context_aggregator_agent(self.llm)
-        self.file_selector_agent = create_file_selector_agent(self.llm)
-        self.context_memory_agent = create_context_memory_agent(self.llm)
+        Args:
+            query: The user's query about the repository
+            
+        Returns:
+            Dictionary mapping relative paths to line spans, empty if nothing resolved
+        """
+        self.refresh_index()
+        return self.state.resolve_symbols(query)
+
+    @traced("history")
+    def describe_history(self, query: str, paths: List[str] = ()) -> str:
+        """
+        Describe the commit history relevant to the query from the repository's history index
 
-    def add_to_history(self, user_query: str, bot_response: str):
+        Args:
+            query: The user's query about the repository
+            paths: Relative paths the query is about; the whole repository when empty
+
+        Returns:
+            History text, empty if the history is not indexed
+        """
+        return self.state.describe_history(query, paths)
+
+    @staticmethod
+    def bounded_timeout(timeout: float) -> float:
+        """Limit a timeout to the time left before the query's deadline, if it has one."""
+        left = time_left()
+        return timeout if left is None else max(0.0, min(timeout, left))
+
+    def add_to_history(self, user_query: str, bot_response: str, files: List[str] = ()):
         """Store the latest interaction in the history."""
-        self.conversation_history.append({"user": user_query, "bot": bot_response})
+        self.memory.add(user_query, bot_response, files)
+
+    def get_conversation_context(self, query: str, stage: str = "aggregate") -> str:
+        """
+        Format the part of the conversation history a stage needs for the query
+
+        Args:
+            query: The user's query
+            stage: "history_check", "aggregate", "selector" or "analysis"
+
+        Returns:
+            History text within the stage's token budget, empty when there is no history
+        """
+        return self.memory.context_for(stage, query)
 
-    def get_conversation_context(self):
-        """Format the past conversation history for context."""
-        return "\n".join([f"User: {msg['user']}\nBot: {msg['bot']}" for msg in self.conversation_history])
+    def contextualize(self, query: str, stage: str) -> str:
+        """The query preceded by the conversation history the stage needs, if any."""
+        return with_history(query, self.get_conversation_context(query, stage))
     
+    @traced("history_check")
     def check_conversation_history(self, query: str) -> Tuple[bool, str]:
         """
-        Check if the conversation history already contains information relevant to the current query
+        Check if the conversation history already contains information relevant to the current query.
+        The answer cache settles clear repeats and clearly new questions without an LLM call;
+        only queries in the ambiguous similarity band are sent to the context memory agent.
         
         Args:
             query: The user's query about the repository
@@ -76,14 +255,23 @@ class GitRepoBot:
             Tuple of (has_relevant_info, answer_from_history)
         """
         # If no conversation history, we need to search files
-        if not self.conversation_history:
+        if not len(self.memory):
+            return False, ""
+
+        # Decide locally when the query clearly repeats, or clearly differs from, a past question
+        decision, entry = self.answer_cache.lookup(query)
+        if decision == "hit":
+            print(f"Answer cache hit for similar query: {entry['query']}")
+            record(cache_hits=1)
+            return True, entry["answer"]
+        if decision == "miss":
+            record(cache_misses=1)
             return False, ""
         
         # Format conversation history for the agent
-        conversation_context = self.get_conversation_context()
+        conversation_context = self.get_conversation_context(query, "history_check")
         
-        task = Task(
-            description=f"""
+        prompt = f"""
             CURRENT USER QUERY: {query}
             
             Based on the conversation history below, determine if the information needed to answer
@@ -100,67 +288,73 @@ class GitRepoBot:
             
             If you can answer the query from existing context, provide a complete answer.
             Otherwise, respond with "NEED_NEW_INFORMATION" to indicate that a file search is required.
-            """,
-            agent=self.context_memory_agent,
-            expected_output="Either an answer from existing context or NEED_NEW_INFORMATION",
-            llm=self.llm,
-        )
-        
-        # Use a temporary crew to run the task
-        temp_crew = Crew(
-            agents=[self.context_memory_agent],
-            tasks=[task],
-            verbose=True,
-            process=Process.sequential
-        )
-        
-        # Run the task
+            """
+
         print("Checking if conversation history contains relevant information...")
-        result = temp_crew.kickoff()
-        
-        # Extract the result
-        result_value = list(result.values())[0] if isinstance(result, dict) else result
-        result_str = str(result_value)
+        result = self.backend.run(
+            self.context_memory_agent,
+            prompt,
+            expected_output="Either an answer from existing context or NEED_NEW_INFORMATION"
+        )
         
         # If the agent indicates we need new information
-        if "NEED_NEW_INFORMATION" in result_str:
+        if "NEED_NEW_INFORMATION" in result:
             return False, ""
         else:
             # The agent provided an answer from the conversation history
-            return True, result_str
+            return True, result
     
-    def select_relevant_files(self, query: str) -> List[str]:
+    @traced("select_files")
+    def select_relevant_files(self, query: str, on_event: EventCallback = None) -> List[str]:
         """
         Use the file selector agent to determine which files are relevant to the query
         
         Args:
             query: The user's query about the repository
+            on_event: Optional callback receiving progress events
             
         Returns:
             List of file paths relevant to the query
         """
-        file_summaries = get_file_summaries(self.repo_path, self.file_cache)
+        with span("scan"):
+            self.refresh_index()
+        with span("summaries"):
+            file_summaries = get_file_summaries(self.repo_path, self.file_cache, index=self.index)
 
         print('Received Summaries')
+        emit_event(on_event, "files_scanned", files=len(file_summaries))
+
+        with span("rank"):
+            candidates = self.rank_candidate_files(query, file_summaries)
+        print(f"Pre-ranked {len(candidates)} candidate files out of {len(file_summaries)}")
+        emit_event(on_event, "candidates_ranked", candidates=len(candidates))
         
-        # Prepare a condensed version for the agent
+        # Describe each file to the agent by its structural digest
         file_info = []
-        for path, info in file_summaries.items():
+        for path in candidates:
+            info = file_summaries[path]
             if "error" not in info:
-                file_info.append(f"Path: {path}\nSize: {info['size']} bytes\nExtension: {info['extension']}\nPreview:\n{info['preview']}\n---")
-        
-        # Split files into batches if there are too many
-        batch_size = 20
-        file_batches = [file_info[i:i + batch_size] for i in range(0, len(file_info), batch_size)]
+                file_info.append(f"Path: {path} ({info['size']} bytes)\n{info.get('digest', info['preview'])}\n---")
         
-        all_selected_files = []
+        # Fill each selector request up to its token budget
+        file_batches: List[List[str]] = []
+        batch_tokens = 0
+        for entry in file_info:
+            tokens = estimate_tokens(entry)
+            if (not file_batches or len(file_batches[-1]) >= SELECTOR_BATCH_SIZE
+                    or batch_tokens + tokens > SELECTOR_BATCH_TOKEN_BUDGET):
+                file_batches.append([])
+                batch_tokens = 0
+            file_batches[-1].append(entry)
+            batch_tokens += tokens
         
-        for batch_idx, file_batch in enumerate(file_batches):
+        @traced("selector_batch")
+        def select_from_batch(batch: Tuple[int, List[str]]) -> List[str]:
+            batch_idx, file_batch = batch
             print(f"Processing batch {batch_idx + 1} of {len(file_batches)}...")
             batch_info = "\n".join(file_batch)
-            
-            task = Task(
-                description=f"""
+
+            prompt = f"""
                 QUERY: {query}
                 
                 Based on the user's query above, analyze the following list of files in the repository
@@ -172,155 +366,292 @@ class GitRepoBot:
                 Return ONLY a list of file paths that are relevant to the query, one per line.
                 Focus on being precise - only include files that are truly relevant.
                 If no files in this batch seem relevant, return "No relevant files found in this batch."
-                """,
-                agent=self.file_selector_agent,
-                expected_output="A list of file paths relevant to the query",
-                llm=self.llm,
-            )
-            
-            # Use a temporary crew to run the task
-            temp_crew = Crew(
-                agents=[self.file_selector_agent],
-                tasks=[task],
-                verbose=True,
-                process=Process.sequential
-            )
-            
-            # Run the task
+                """
+
             print("Running file selector agent...")
-            result = temp_crew.kickoff()
+            # Sessions sending the same batch at the same time share one request
+            flights = self.state.selector_flights
+            key = make_key(self.llm.model, prompt)
+            while True:
+                flight, leader = flights.claim(key)
+                if leader:
+                    try:
+                        result = self.backend.run(
+                            self.file_selector_agent,
+                            prompt,
+                            expected_output="A list of file paths relevant to the query"
+                        )
+                    except BaseException as e:
+                        flights.resolve(key, flight, error=e)
+                        raise
+                    flights.resolve(key, flight, result)
+                    break
+                try:
+                    result = self.wait_for_flight(flight, "file selection")
+                except (DeadlineExceeded, Cancelled):
+                    # The leader's deadline or cancellation, not necessarily this session's
+                    check_deadline("file selection")
+                    print("An identical selector batch in progress stopped early; running it again")
+                    continue
+                print("Shared the result of an identical selector batch in progress")
+                record(coalesced=1)
+                break
             print(f"File selection result: {result}")
 
-            # Extract the result - may vary based on crewai version
-            result_value = list(result.values())[0] if isinstance(result, dict) else result
-            
             # Extract file paths from the result
             selected_files = []
-            for line in str(result_value).split('\n'):
+            for line in result.split('\n'):
                 line = line.strip()
                 for path in file_summaries:
                     # Check if the line contains or exactly matches a file path
                     if path == line or f"Path: {path}" in line:
                         selected_files.append(path)
                         break
-            
-            all_selected_files.extend(selected_files)
+
+            emit_event(on_event, "batch_selected", batch=batch_idx + 1, batches=len(file_batches), files=selected_files)
+            return selected_files
+
+        # Batches are independent, so dispatch them concurrently and merge in batch order
+        batch_results = run_concurrently(
+            select_from_batch,
+            enumerate(file_batches),
+            max_workers=self.selector_max_workers,
+            rate_limiter=get_rate_limiter(get_provider(self.llm.model))
+        )
+        all_selected_files = [path for selected_files in batch_results for path in selected_files]
         
         # If we didn't find any relevant files, include some default files
-        if not all_selected_files and file_summaries:
-            # Include up to 5 files as fallback
-            all_selected_files = list(file_summaries.keys())[:5]
+        if not all_selected_files and candidates:
+            # Include up to 5 of the best-ranked candidates as fallback
+            all_selected_files = candidates[:5]
             
         return all_selected_files
     
-    def analyze_files_for_query(self, query: str, selected_files: List[str]) -> Dict[str, str]:
+    @traced("analyze_files")
+    def analyze_files_for_query(
+        self,
+        query: str,
+        selected_files: List[str],
+        on_event: EventCallback = None,
+        pinned: Optional[Dict[str, List[Tuple[int, int]]]] = None
+    ) -> Dict[str, str]:
         """
-        Analyze selected files specifically in the context of the query
+        Analyze selected files specifically in the context of the query.
+        Small files are packed several to a request and large files get their own; requests
+        run concurrently with a per-request timeout, and files whose analysis fails or
+        times out are left out of the result.
+        Analyses are cached by file content hash, model and normalized query, so a
+        standalone question repeated on unchanged files skips the LLM entirely, and
+        an analysis another session has in progress under the same key is waited for.
         
         Args:
             query: The user's query about the repository
             selected_files: List of files to analyze
+            on_event: Optional callback receiving an event as each file analysis completes
+            pinned: Optional line spans per file that the excerpts must include
             
         Returns:
             Dictionary mapping file paths to their analyses
         """
-        file_paths = get_all_files(self.repo_path)
+        file_paths = get_all_files(self.repo_path, index=self.index)
         file_analyses = {}
 
-        # Create file analysis tasks
-        file_tasks = []
-        for relative_path in selected_files:
-            if relative_path not in file_paths:
-                continue
-                
-            full_path = file_paths[relative_path]
-            content = read_file(full_path, self.file_cache)
+        # Collect the content of each file that has no cached analysis yet
+        contents = {}
+        cache_entries = {}
+        # Analyses this call does for sessions waiting on them, and those it waits on instead
+        led_flights = {}
+        followed_flights = {}
+        try:
+            for relative_path in selected_files:
+                if relative_path not in file_paths:
+                    continue
 
-            # Skip empty or unreadable files
-            if not content or content.startswith("Error reading file"):
-                continue
+                full_path = file_paths[relative_path]
+                content = read_file(full_path, self.file_cache)
 
-            # Handle large files by taking key parts
-            if len(content) > 60000:
-                chunks = self.text_splitter.split_text(content)
-                if len(chunks) >= 3:
-                    content_sample = (
-                        f"\n\n--- BEGINNING OF FILE ---\n\n{chunks[0]}"
-                        f"\n\n--- MIDDLE OF FILE ---\n\n{chunks[len(chunks)//2]}"
-                        f"\n\n--- END OF FILE ---\n\n{chunks[-1]}"
-                    )
-                else:
-                    content_sample = "\n\n".join(chunks[:3])  # Take first few chunks
-            else:
-                content_sample = content
+                # Skip empty or unreadable files
+                if not content or content.startswith("Error reading file"):
+                    continue
+
+                content_hash = self.index.get_hash(relative_path) or hash_content(content.encode('utf-8'))
+                cache_key = AnalysisCache.make_key(self.repo_path, content_hash, self.llm.model, query)
+                cached_analysis = self.analysis_cache.get(cache_key)
+                if cached_analysis is not None:
+                    print(f"Using cached analysis of {relative_path}")
+                    record(cache_hits=1)
+                    file_analyses[relative_path] = cached_analysis
+                    emit_event(on_event, "file_analyzed", path=relative_path, cached=True)
+                    continue
 
-            task = Task(
-                description=f"""
+                record(cache_misses=1)
+                flight, leader = self.state.analysis_flights.claim(cache_key)
+                if not leader:
+                    followed_flights[relative_path] = flight
+                    continue
+                led_flights[relative_path] = flight
+                contents[relative_path] = content
+                cache_entries[relative_path] = (content_hash, cache_key)
+        except BaseException as e:
+            # A cancelled or timed-out query must not leave the analyses it claimed in flight
+            for relative_path, flight in led_flights.items():
+                self.state.analysis_flights.resolve(cache_entries[relative_path][1], flight, error=e)
+            raise
+
+        @traced("file_analysis")
+        def analyze_batch(paths: List[str]) -> Dict[str, str]:
+            if len(paths) == 1:
+                relative_path = paths[0]
+                description = f"""
                 USER QUERY: {query}
                 
                 Analyze the following file IN THE CONTEXT OF THE USER QUERY:
                 File: {relative_path}
                 
-                File content:
+                File excerpts (each line is prefixed with its line number, "..." marks omitted lines):
                 ```
-                {content_sample}
+                {excerpts[relative_path]}
                 ```
                 
                 Focus ONLY on extracting information that helps answer the user's query.
                 Ignore irrelevant parts of the file. Be concise and specific. If there is no relevant information, return nothing.
                 
                 Include:
-                1. Relevant code sections (with line numbers if possible)
+                1. Relevant code sections (with line numbers)
                 2. Explanation of how this file relates to the query
                 3. Important functions, classes, or variables that address the query
                 
                 If this file doesn't contain relevant information for the query, state that briefly.
-                """,
-                agent=self.file_analyzer_agent,
-                expected_output=f"Query-relevant analysis of {relative_path}",
-                llm=self.llm,
+                """
+                expected_output = f"Query-relevant analysis of {relative_path}"
+            else:
+                description = f"""
+                USER QUERY: {query}
+                
+                Analyze each of the following {len(paths)} files IN THE CONTEXT OF THE USER QUERY.
+                Each file starts with a "{FILE_HEADING}<path>" line followed by its excerpts
+                (each line is prefixed with its line number, "..." marks omitted lines).
+                
+                {format_batch_files(excerpts, paths)}
+                
+                Focus ONLY on extracting information that helps answer the user's query.
+                Ignore irrelevant parts of the files. Be concise and specific.
+                
+                For each file include:
+                1. Relevant code sections (with line numbers)
+                2. Explanation of how this file relates to the query
+                3. Important functions, classes, or variables that address the query
+                
+                FORMAT: write one section per file, in the order given. Start each section with the
+                line "{FILE_HEADING}<path>" using the exact path shown above, then the analysis.
+                If a file doesn't contain relevant information for the query, state that briefly in its section.
+                """
+                expected_output = f"One query-relevant analysis section per file, each headed {FILE_HEADING}<path>"
+
+            print(f"Analyzing {', '.join(paths)}...")
+            result = self.backend.run(self.file_analyzer_agent, description, expected_output)
+            analyses = {paths[0]: result} if len(paths) == 1 else split_batch_response(result, paths)
+            for relative_path in analyses:
+                emit_event(on_event, "file_analyzed", path=relative_path, cached=False)
+            return analyses
+
+        def run_batches(batches: List[List[str]]) -> List[str]:
+            """Run analysis requests concurrently, keep their results and return the paths left unanalyzed."""
+            results = run_with_timeouts(
+                analyze_batch,
+                batches,
+                max_workers=self.analysis_max_workers,
+                timeout=self.bounded_timeout(self.analysis_timeout),
+                rate_limiter=get_rate_limiter(get_provider(self.llm.model))
+            )
+            unanswered = []
+            for paths, analyses in zip(batches, results):
+                if analyses is None:
+                    continue
+                for relative_path in paths:
+                    if relative_path not in analyses:
+                        unanswered.append(relative_path)
+                        continue
+                    file_analyses[relative_path] = analyses[relative_path]
+                    content_hash, cache_key = cache_entries[relative_path]
+                    self.analysis_cache.put(cache_key, self.repo_path, relative_path, content_hash, analyses[relative_path])
+            return unanswered
+
+        try:
+            # Share one token budget across all files, spending it on the chunks that best match the query
+            # Chunks close to the query in the vector index count alongside BM25 matches
+            related = [
+                (path, first_line, last_line)
+                for path, first_line, last_line, _ in self.state.search_chunks(query, paths=list(contents))
+            ]
+            excerpts = pack_context(
+                query, contents, self.text_splitter, self.analysis_token_budget, pinned=pinned, related=related
             )
-            file_tasks.append(task)
-
-        if file_tasks:
-            # Create and run the crew for file analysis
-            file_crew = Crew(
-                agents=[self.file_analyzer_agent],
-                tasks=file_tasks,
-                verbose=True
+            omitted = [relative_path for relative_path in contents if relative_path not in excerpts]
+            if omitted:
+                print(f"Token budget used up; not analyzing {len(omitted)} files: {', '.join(omitted)}")
+
+            # Small files share a request; large ones get their own
+            batches = plan_batches(
+                excerpts,
+                token_budget=self.analysis_batch_token_budget,
+                max_files=self.analysis_batch_max_files
             )
+            print(f"Analyzing {len(excerpts)} files in {len(batches)} requests")
 
-            # Start analysis
-            file_results = file_crew.kickoff()
+            # Files a batched response skipped or mislabelled are retried on their own
+            unanswered = run_batches(batches)
+            if unanswered and self.bounded_timeout(self.analysis_timeout) > 0:
+                print(f"Re-analyzing {len(unanswered)} files missing from batched responses")
+                run_batches([[relative_path] for relative_path in unanswered])
+        finally:
+            # Hand the analyses to the sessions waiting for them; None for files that failed
+            for relative_path, flight in led_flights.items():
+                self.state.analysis_flights.resolve(
+                    cache_entries[relative_path][1], flight, file_analyses.get(relative_path)
+                )
 
-            # Process results
-            for task, result in zip(file_tasks, file_results):
-                match = re.search(r"analysis of (.+)", task.expected_output)
-                if match:
-                    file_path = match.group(1)
-                    file_analyses[file_path] = result
+        # Files another session was already analyzing for the same query
+        for relative_path, flight in followed_flights.items():
+            try:
+                analysis = flight.wait(timeout=self.bounded_timeout(2 * self.analysis_timeout))
+            except Exception as e:
+                print(f"Skipping {relative_path}: shared analysis failed: {e}")
+                continue
+            if analysis is None:
+                continue
+            print(f"Shared the analysis of {relative_path} in progress")
+            record(coalesced=1)
+            file_analyses[relative_path] = analysis
+            emit_event(on_event, "file_analyzed", path=relative_path, cached=True)
 
         return file_analyses
         
-    def aggregate_analyses(self, query: str, file_analyses: Dict[str, str]) -> str:
+    def build_aggregation_prompt(self, query: str, file_analyses: Dict[str, str], history: str = "") -> str:
         """
-        Aggregate the file analyses to answer the query
+        Build the aggregator prompt from the file analyses
         
         Args:
             query: The user's query about the repository
             file_analyses: Dictionary mapping file paths to their analyses
+            history: Commit history relevant to the query, if it asks about the history
             
         Returns:
-            Comprehensive answer to the query
+            Prompt asking for a comprehensive answer to the query
         """
         # Format the file analyses for the aggregator
         analyses_text = ""
         if file_analyses:
             for file_path, analysis in file_analyses.items():
                 analyses_text += f"\n\n--- ANALYSIS OF {file_path} ---\n{analysis}"
+        if history:
+            analyses_text += (
+                "\n\n--- COMMIT HISTORY ---\n"
+                "Answer questions about who changed what, when and why from these commits.\n"
+                f"{history}"
+            )
         
-        task = Task(
-            description=f"""
+        return f"""
             USER QUERY and HISTORY: {query}
             
             Based on the analyses of relevant files below, provide a comprehensive answer to the user's query.
@@ -337,64 +668,231 @@ class GitRepoBot:
             4. Include code examples where helpful
             
             Do not repeat all the file analyses - synthesize the information to provide a unified, coherent answer.
-            """,
-            agent=self.context_aggregator_agent,
-            expected_output="A comprehensive answer to the user's query",
-            llm=self.llm,
-        )
+            """
+
+    @traced("aggregate")
+    def aggregate_analyses(
+        self,
+        query: str,
+        file_analyses: Dict[str, str],
+        on_token: Callable[[str], None] = None,
+        history: str = ""
+    ) -> str:
+        """
+        Aggregate the file analyses to answer the query
         
-        crew = Crew(agents=[self.context_aggregator_agent], tasks=[task])
-        result = crew.kickoff()
+        Args:
+            query: The user's query about the repository
+            file_analyses: Dictionary mapping file paths to their analyses
+            on_token: Optional callback; when given, the answer is streamed from the LLM
+                and each piece of text is passed to it as it arrives
+            history: Commit history relevant to the query, if it asks about the history
+            
+        Returns:
+            Comprehensive answer to the query
+        """
+        prompt = self.build_aggregation_prompt(query, file_analyses, history)
 
-        return result
+        if on_token is not None:
+            return self.backend.stream(self.context_aggregator_agent, prompt, on_token)
 
-    def answer_query(self, query: str) -> str:
+        return self.backend.run(
+            self.context_aggregator_agent,
+            prompt,
+            expected_output="A comprehensive answer to the user's query"
+        )
+
+    def answer_query(self, query: str, on_event: EventCallback = None) -> Tuple[str, str]:
         """
         Process a query about the repository with context-based file analysis,
         first checking if the conversation history already contains the answer
         
         Args:
             query: The user's question about the repository
+            on_event: Optional callback receiving (event, data) progress events for each
+                stage; when given, the final answer is also streamed as "answer_token" events
             
         Returns:
-            A comprehensive answer based on relevant files in the repository or from conversation history
+            Tuple of (answer, context) where the answer is based on relevant files in the repository
+            or on conversation history, and context describes the information used
         """
+        # Keep the repository from being evicted while the query runs, and list its files at most once
+        with span("query"), self.state.in_use(), self.index.scanner.memoize():
+            return self._answer_query(query, on_event)
+
+    def _answer_query(self, query: str, on_event: EventCallback = None) -> Tuple[str, str]:
+        """Run the query pipeline; see answer_query."""
         print(f"Processing query: {query}")
         
         # First check if we already have relevant information in conversation history
+        emit_event(on_event, "stage", name="checking_history")
         has_relevant_info, answer_from_history = self.check_conversation_history(query)
 
-        
-        # Add conversation context to the query for better contextual understanding
-        context = self.get_conversation_context()
-        full_query = f"Previous conversation:\n{context}\n\nCurrent user query:\n{query}" if context else query
-
         if has_relevant_info:
+            # The cached answer or the memory agent's synthesis already answers the query
             print("Found relevant information in conversation history")
-            answer = self.aggregate_analyses(full_query, {})
-            self.add_to_history(query, answer)
-            return answer, "PREVIOUS CONTEXT USED"
-        
-        # Step 1: Select relevant files for the query
-        print(f"Selecting relevant files for query")
-        relevant_files = self.select_relevant_files(full_query)
-        print(f"Selected {len(relevant_files)} relevant files")
+            self.add_to_history(query, answer_from_history)
+            return answer_from_history, "PREVIOUS CONTEXT USED"
+
+        # Sessions asking the same question with the same relevant history at the same time
+        # share one run of the pipeline
+        histories = {stage: self.get_conversation_context(query, stage) for stage in ("selector", "analysis", "aggregate")}
+        key = make_key(self.llm.model, normalize_query(query), *histories.values())
+        stage_queries = {stage: with_history(query, history) for stage, history in histories.items()}
+        # Followers only see the answer streamed if the leading session streams it
+        (answer, context, files), shared = self.share_pipeline(
+            key, lambda emit: self.run_pipeline(query, stage_queries, emit, stream=on_event is not None), on_event
+        )
+        if shared:
+            print("Shared the answer of an identical query in progress")
+            record(coalesced=1)
+            emit_event(on_event, "query_coalesced")
+
+        # Store the interaction in conversation history
+        self.add_to_history(query, answer, files)
+        self.answer_cache.add(query, answer, files)
+
+        return answer, context
+
+    def share_pipeline(
+        self,
+        key: str,
+        run: Callable[[EventCallback], Tuple[str, str, List[str]]],
+        on_event: EventCallback = None
+    ) -> Tuple[Tuple[str, str, List[str]], bool]:
+        """
+        Run the pipeline unless an identical query is already running it, in which case
+        wait for that run instead. Every session gets the run's progress events, and waits
+        no longer than its own deadline. A run that stops because its leader ran out of
+        time or was cancelled does not fail the other sessions; one of them runs it again.
+
+        Args:
+            key: Identity of the query and its conversation history
+            run: Runs the pipeline, sending progress events to the callback it is given
+            on_event: Optional callback receiving this session's progress events
+
+        Returns:
+            Tuple of (pipeline result, shared) where shared is True if another session ran it
+
+        Raises:
+            DeadlineExceeded: If this session's deadline passes first
+            Cancelled: If this session's query is cancelled first
+        """
+        flights = self.state.query_flights
+        while True:
+            flight, leader = flights.claim(key)
+            flight.subscribe(on_event)
+            try:
+                if leader:
+                    try:
+                        result = run(flight.emit)
+                    except BaseException as e:
+                        flights.resolve(key, flight, error=e)
+                        raise
+                    flights.resolve(key, flight, result)
+                    return result, False
+                try:
+                    return self.wait_for_flight(flight, "the answer"), True
+                except (DeadlineExceeded, Cancelled):
+                    # The leader's deadline or cancellation, not necessarily this session's
+                    check_deadline("the answer")
+                    print("An identical query in progress stopped early; running it again")
+            finally:
+                flight.unsubscribe(on_event)
+
+    @staticmethod
+    def wait_for_flight(flight: Flight, stage: str) -> Any:
+        """
+        Wait for the result of work another session leads, no longer than this query's
+        deadline and only until it is cancelled
+
+        Args:
+            flight: The flight the work runs in
+            stage: Pipeline stage waiting, for the deadline error
+
+        Returns:
+            The leader's result
+
+        Raises:
+            DeadlineExceeded: If this query's deadline passes first
+            Cancelled: If this query is cancelled first
+            Exception: Whatever the leader failed with, including its own deadline or cancellation
+        """
+        # Wake up now and then to notice this session's deadline or cancellation
+        while not flight.done.wait(min(time_left() or SCHEDULER_CANCEL_POLL_INTERVAL, SCHEDULER_CANCEL_POLL_INTERVAL)):
+            check_deadline(stage)
+        return flight.wait()
+
+    def run_pipeline(
+        self,
+        query: str,
+        stage_queries: Dict[str, str],
+        on_event: EventCallback = None,
+        stream: bool = None
+    ) -> Tuple[str, str, List[str]]:
+        """
+        Select, analyze and aggregate to answer a query from the repository's files, and
+        from its commit history when the query asks about it
+
+        Args:
+            query: The user's query about the repository
+            stage_queries: The query with the conversation history of each stage, by stage
+            on_event: Optional callback receiving progress events
+            stream: Whether to stream the answer as answer_token events; by default, whenever
+                on_event is given
+
+        Returns:
+            Tuple of (answer, context, paths of the analyzed files)
+        """
+        # Step 1: Select relevant files for the query, straight from the symbol index when it
+        # names identifiers defined in the repository
+        check_deadline("file selection")
+        emit_event(on_event, "stage", name="selecting_files")
+        history_question = self.state.history_index is not None and is_history_query(query)
+        symbol_spans = self.resolve_symbols(query)
+        if symbol_spans:
+            relevant_files = list(symbol_spans)
+            print(f"Resolved query identifiers to {len(relevant_files)} files")
+            emit_event(on_event, "symbols_resolved", files=relevant_files)
+        elif history_question:
+            # Questions about the history are answered from the commits; only the files the
+            # query names are analyzed as well
+            relevant_files = self.state.find_mentioned_paths(query)
+            print(f"History question naming {len(relevant_files)} files")
+        else:
+            print(f"Selecting relevant files for query")
+            relevant_files = self.select_relevant_files(stage_queries["selector"], on_event=on_event)
+            print(f"Selected {len(relevant_files)} relevant files")
+        emit_event(on_event, "files_selected", files=relevant_files)
 
         context = "" 
         context += f"--- SELECTED FILES ---\n{relevant_files}\n"
+
+        history = ""
+        if history_question:
+            print("Reading the commit history...")
+            emit_event(on_event, "stage", name="reading_history")
+            history = self.describe_history(query, relevant_files)
+            context += f"--- HISTORY ---\n{history}\n"
         
         # Step 2: Analyze the selected files in the context of the query
+        check_deadline("file analysis")
         print("Analyzing selected files...")
-        file_analyses = self.analyze_files_for_query(full_query, relevant_files)
+        emit_event(on_event, "stage", name="analyzing_files")
+        file_analyses = self.analyze_files_for_query(
+            stage_queries["analysis"], relevant_files, on_event=on_event, pinned=symbol_spans
+        )
         print(f"Completed analysis of {len(file_analyses)} files")
 
         context += f"--- ANALYSES ---\n{file_analyses}\n"
         
         # Step 3: Aggregate analyses to answer the query
+        check_deadline("aggregation")
         print("Aggregating analyses to answer query...")
-        answer = self.aggregate_analyses(full_query, file_analyses)
-        
-        # Store the interaction in conversation history
-        self.add_to_history(query, answer)
-        
-        return answer, context
\ No newline at end of file
+        emit_event(on_event, "stage", name="aggregating")
+        if stream is None:
+            stream = on_event is not None
+        on_token = (lambda text: emit_event(on_event, "answer_token", text=text)) if stream and on_event else None
+        answer = self.aggregate_analyses(stage_queries["aggregate"], file_analyses, on_token=on_token, history=history)
+
+        return answer, context, list(file_analyses)
\ No newline at end of file
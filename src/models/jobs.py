@@ -0,0 +1,148 @@
+"""
+Background jobs that clone and index repositories for the web server.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+
+from src.config.settings import SETUP_MAX_WORKERS, JOBS_MAX_FINISHED
+from src.models.bot_registry import BotRegistry
+from src.utils.git_utils import clone_or_update_repo
+
+
+class SetupJob:
+    """
+    Status of one clone-and-index job. Fields are updated by the worker thread and
+    read by status requests, so they are always replaced as a whole.
+    """
+
+    def __init__(self, repo_url: str, repo_dir: str):
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.repo_dir = repo_dir
+        self.status = "queued"  # queued, cloning, indexing, done or failed
+        self.stage = "waiting for a worker"
+        self.percent: Optional[float] = None
+        self.error: Optional[str] = None
+        self.files_indexed: Optional[int] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def to_dict(self) -> Dict[str, object]:
+        """Describe the job for the /jobs endpoint."""
+        end = self.finished_at or time.time()
+        return {
+            "job_id": self.id,
+            "repo_url": self.repo_url,
+            "status": self.status,
+            "stage": self.stage,
+            "percent": self.percent,
+            "files_indexed": self.files_indexed,
+            "error": self.error,
+            "elapsed_seconds": round(end - self.created_at, 1),
+        }
+
+
+class JobManager:
+    """
+    Runs repository setup (clone or pull, then index) on a small worker pool.
+
+    Only one job per target directory runs at a time: a request for a repository that is
+    already being set up gets the running job back instead of starting another clone.
+    """
+
+    def __init__(self, registry: BotRegistry, max_workers: int = SETUP_MAX_WORKERS, max_finished: int = JOBS_MAX_FINISHED):
+        """
+        Create the job manager
+
+        Args:
+            registry: Registry whose repository state the jobs index
+            max_workers: Number of jobs running at the same time
+            max_finished: Number of finished jobs kept for status lookups
+        """
+        self.registry = registry
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="setup-job")
+        self._jobs: "OrderedDict[str, SetupJob]" = OrderedDict()
+        self._active: Dict[str, SetupJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, repo_url: str, repo_dir: str) -> SetupJob:
+        """
+        Queue the setup of a repository, or return the job already setting it up
+
+        Args:
+            repo_url: Remote URL or local path of the repository
+            repo_dir: Directory the repository is cloned into
+
+        Returns:
+            The queued or running job
+        """
+        with self._lock:
+            job = self._active.get(repo_dir)
+            if job is not None:
+                return job
+            job = SetupJob(repo_url, repo_dir)
+            self._jobs[job.id] = job
+            self._active[repo_dir] = job
+            self._prune()
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[SetupJob]:
+        """Get a job by id, or None if it is unknown or was pruned."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_active(self, repo_dir: str) -> Optional[SetupJob]:
+        """Get the unfinished job setting up a directory, if any."""
+        with self._lock:
+            return self._active.get(repo_dir)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: SetupJob):
+        def on_progress(stage, percent):
+            job.stage = stage
+            job.percent = percent
+
+        try:
+            job.status = "cloning"
+            job.stage = "contacting remote"
+            clone_or_update_repo(job.repo_url, job.repo_dir, on_progress=on_progress)
+
+            job.status = "indexing"
+            job.stage = "indexing files"
+            job.percent = None
+            state = self.registry.get_repo(job.repo_dir)
+            # Keep the registry from evicting the repository while it is being indexed
+            with state.in_use():
+                state.sync_with_head()
+                job.files_indexed = len(state.index.get_all_files())
+
+                job.stage = "indexing commit history"
+                state.update_history()
+
+            job.stage = "ready"
+            job.status = "done"
+        except Exception as e:
+            print(f"Setup of {job.repo_url} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._active.get(job.repo_dir) is job:
+                    del self._active[job.repo_dir]
@@ -0,0 +1,453 @@
+"""
+Per-repository state shared by every GitRepoBot session on the same repository.
+"""
+
+import os
+import re
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import (
+    HISTORY_INDEX_ENABLED,
+    HISTORY_COCHANGE_SEEDS,
+    SELECTOR_TOP_K,
+    SYMBOL_MAX_DEFINITION_FILES,
+    SYMBOL_MAX_REFERENCE_FILES,
+    SYMBOL_REFERENCE_CONTEXT_LINES,
+    VECTOR_INDEX_ENABLED,
+    VECTOR_SEARCH_TOP_K,
+)
+from src.utils.file_utils import read_file
+from src.utils.file_cache import FileCache
+from src.utils.repo_index import RepoIndex
+from src.utils.git_utils import get_head_commit, get_changed_paths
+from src.utils.lexical_index import BM25Index
+from src.utils.analysis_cache import get_analysis_cache
+from src.utils.answer_cache import AnswerCache
+from src.utils.single_flight import SingleFlight
+from src.utils.symbols import find_query_identifiers
+from src.utils.context_packer import get_text_splitter, split_with_line_numbers
+from src.utils.embeddings import create_embedder
+from src.utils.vector_index import VectorIndex, reciprocal_rank_fusion
+from src.utils.history_index import HistoryIndex
+
+# Words of a query that may name a file, such as "config.py" or "src/utils"
+PATH_MENTION_RE = re.compile(r"[\w.-]*[./][\w./-]*\w")
+
+
+class RepoState:
+    """
+    Heavy, query-independent state of one repository: the persistent file index, the file
+    content cache, the BM25 index, the chunk vector index and the commit history index. Sessions keep their own conversation history and
+    answer cache, which are registered here so they are invalidated when files change.
+    """
+
+    def __init__(self, repo_path: str):
+        """
+        Open the state of a repository
+
+        Args:
+            repo_path: Path to the git repository
+        """
+        self.repo_path = repo_path
+
+        # Memory-bounded cache for file content to avoid re-reading
+        self.file_cache = FileCache()
+
+        # Persistent index of file metadata and previews, refreshed incrementally
+        self.index = RepoIndex(repo_path)
+
+        # BM25 index over file paths and chunks, built on first use and updated incrementally
+        self.lexical_index = BM25Index()
+        self.lexical_index_built = False
+
+        # Embeddings of every chunk, persisted next to the file index and synced by content hash
+        self.vector_index = None
+        if VECTOR_INDEX_ENABLED:
+            self.vector_index = VectorIndex(
+                os.path.splitext(self.index.index_path)[0] + ".vectors",
+                create_embedder()
+            )
+        self.vector_index_synced = False
+
+        # Commits, churn and co-change of every file, persisted next to the file index
+        self.history_index = None
+        if HISTORY_INDEX_ENABLED:
+            self.history_index = HistoryIndex(repo_path, os.path.splitext(self.index.index_path)[0] + ".history.sqlite")
+
+        # Cache of per-file analyses shared by all repositories in the process, scoped by repository
+        self.analysis_cache = get_analysis_cache()
+
+        # Answer caches of the sessions using this repository
+        self.answer_caches = weakref.WeakSet()
+
+        # Identical queries, selector batches and file analyses in progress, shared by all sessions
+        self.query_flights = SingleFlight("query")
+        self.selector_flights = SingleFlight("selector_batch")
+        self.analysis_flights = SingleFlight("file_analysis")
+
+        self.last_used = time.time()
+        self.active_queries = 0
+        self.released = False
+        self.lock = threading.RLock()
+
+    @contextmanager
+    def in_use(self):
+        """
+        Mark the repository as busy so the registry does not evict it mid-query
+
+        Raises:
+            RuntimeError: If the state was already released
+        """
+        with self.lock:
+            if self.released:
+                raise RuntimeError("The repository was unloaded to free memory. Please try again.")
+            self.active_queries += 1
+            self.last_used = time.time()
+        try:
+            yield self
+        finally:
+            with self.lock:
+                self.active_queries -= 1
+                self.last_used = time.time()
+
+    def memory_bytes(self) -> int:
+        """
+        Estimate the memory held by this repository's in-process caches
+
+        Returns:
+            Approximate size in bytes
+        """
+        return self.file_cache.current_bytes + self.lexical_index.memory_estimate()
+
+    @property
+    def text_splitter(self):
+        """The text splitter used for chunking file content, shared by all repositories."""
+        return get_text_splitter()
+
+    @property
+    def indexed_commit(self) -> Optional[str]:
+        """The HEAD commit the repository index was last synchronised with."""
+        return self.index.get_meta("indexed_commit")
+
+    def register_answer_cache(self, answer_cache: AnswerCache):
+        """Invalidate a session's answer cache whenever files of this repository change."""
+        self.answer_caches.add(answer_cache)
+
+    def apply_changes(self, changed: List[str], removed: List[str]):
+        """
+        Propagate index changes to every derived cache and index
+
+        Args:
+            changed: Relative paths that were added or modified
+            removed: Relative paths that were deleted
+        """
+        with self.lock:
+            # Drop old contents first, so nothing analyzed from here on is read from a stale copy
+            for path in changed + removed:
+                self.file_cache.pop(os.path.join(self.repo_path, path), None)
+            self.update_search_indexes(changed, removed)
+        for path in changed:
+            self.analysis_cache.invalidate(self.repo_path, path, keep_hash=self.index.get_hash(path))
+        for path in removed:
+            self.analysis_cache.invalidate(self.repo_path, path)
+        if changed or removed:
+            for answer_cache in list(self.answer_caches):
+                answer_cache.invalidate_paths(changed + removed)
+
+    def invalidate_paths(self, paths: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        Drop and rebuild all derived state for the given repository paths
+
+        Args:
+            paths: Relative paths that were added, modified, renamed or deleted
+
+        Returns:
+            Tuple of (changed_or_added_paths, removed_paths) as seen by the index
+        """
+        # Git reports paths with forward slashes; the index uses the platform separator
+        paths = [os.path.normpath(path) for path in paths]
+        with self.lock:
+            for path in paths:
+                self.file_cache.pop(os.path.join(self.repo_path, path), None)
+            changed, removed = self.index.refresh(paths)
+            self.apply_changes(changed, removed)
+        return changed, removed
+
+    def refresh_index(self):
+        """Re-scan the repository if the index is stale and propagate changes to derived indexes."""
+        with self.lock:
+            changed, removed = self.index.refresh_if_stale()
+            self.apply_changes(changed, removed)
+
+    def update_search_indexes(self, changed: List[str], removed: List[str]):
+        """
+        Apply file changes to the BM25 and vector indexes, reading and chunking each file once.
+        The BM25 index is built from scratch on first use; the persistent vector index is
+        first brought in line with the file index by comparing content hashes.
+
+        Args:
+            changed: Relative paths that were added or modified
+            removed: Relative paths that were deleted
+        """
+        with self.lock:
+            lexical_paths = set(changed)
+            vector_paths = set(changed) if self.vector_index is not None else set()
+
+            if not self.lexical_index_built:
+                lexical_paths = set(self.index.get_all_files())
+                print(f"Building lexical index over {len(lexical_paths)} files...")
+                self.lexical_index_built = True
+
+            hashes = self.index.get_hashes()
+            if self.vector_index is not None and not self.vector_index_synced:
+                vector_paths = {path for path, content_hash in hashes.items() if self.vector_index.get_hash(path) != content_hash}
+                removed = list(removed) + [path for path in self.vector_index.indexed_paths() if path not in hashes]
+                if vector_paths:
+                    print(f"Embedding chunks of {len(vector_paths)} files...")
+                self.vector_index_synced = True
+
+            for path in removed:
+                self.lexical_index.remove_file(path)
+                if self.vector_index is not None:
+                    self.vector_index.delete(path)
+
+            for path in sorted(lexical_paths | vector_paths):
+                content = read_file(os.path.join(self.repo_path, path))
+                if content.startswith("Error reading file"):
+                    self.lexical_index.remove_file(path)
+                    if self.vector_index is not None:
+                        self.vector_index.delete(path)
+                    continue
+                chunks = split_with_line_numbers(content, self.text_splitter)
+                if path in lexical_paths:
+                    self.lexical_index.add_file(path, [chunk for _, _, chunk in chunks])
+                if path in vector_paths and path in hashes:
+                    self.vector_index.upsert(path, hashes[path], chunks)
+
+            if self.vector_index is not None and (vector_paths or removed):
+                self.vector_index.flush()
+
+    def search_chunks(self, query: str, top_k: int = VECTOR_SEARCH_TOP_K, paths: Optional[List[str]] = None) -> List[Tuple[str, int, int, float]]:
+        """
+        Find the chunks closest to the query in the vector index
+
+        Args:
+            query: The user's query about the repository
+            top_k: Maximum number of chunks
+            paths: Optional relative paths to restrict the search to
+
+        Returns:
+            List of (path, first_line, last_line, similarity), best first; empty without a vector index
+        """
+        if self.vector_index is None:
+            return []
+        return self.vector_index.search(query, top_k, paths=paths)
+
+    def rank_candidate_files(self, query: str, file_summaries: Dict[str, Dict], top_k: int = SELECTOR_TOP_K) -> List[str]:
+        """
+        Pre-rank files with BM25 fused with vector search and the commit history, so only the
+        best candidates are sent to the file selector
+
+        Args:
+            query: The user's query about the repository
+            file_summaries: Summaries of all files in the repository
+            top_k: Maximum number of candidates to return
+
+        Returns:
+            List of candidate file paths, best first
+        """
+        if len(file_summaries) <= top_k:
+            return list(file_summaries)
+
+        with self.lock:
+            matches = self.lexical_index.search(query, top_k)
+        rankings = [[path for path, _ in matches if path in file_summaries]]
+        if self.vector_index is not None:
+            # Fuse with the files of the closest chunks, which match by meaning rather than exact terms
+            rankings.append([path for path in self.vector_index.search_files(query) if path in file_summaries])
+        if self.history_index is not None:
+            rankings.extend(self.history_rankings(reciprocal_rank_fusion(rankings), file_summaries))
+        ranked = reciprocal_rank_fusion(rankings)[:top_k]
+        if len(ranked) < top_k:
+            # Pad with top-level files (README, entry points) when few files match lexically
+            chosen = set(ranked)
+            shallow = sorted(
+                (path for path in file_summaries if path not in chosen),
+                key=lambda path: (len(Path(path).parts), path)
+            )
+            ranked.extend(shallow[:top_k - len(ranked)])
+        return ranked
+
+    def history_rankings(self, candidates: List[str], file_summaries: Dict[str, Dict]) -> List[List[str]]:
+        """
+        Rank files by their commit history: the files most often changed together with the
+        best candidates, and the candidates by how often they changed
+
+        Args:
+            candidates: Candidate file paths, best first
+            file_summaries: Summaries of all files in the repository
+
+        Returns:
+            Rankings to fuse with the search rankings; empty when there is no history
+        """
+        co_changed = [
+            path for path, _ in self.history_index.co_changed(candidates[:HISTORY_COCHANGE_SEEDS], limit=len(candidates) or 1)
+            if path in file_summaries
+        ]
+        churn = self.history_index.churn(candidates)
+        return [ranking for ranking in (co_changed, sorted(churn, key=lambda path: -churn[path])) if ranking]
+
+    def update_history(self) -> int:
+        """
+        Index the commits made since the history was last indexed
+
+        Returns:
+            Number of commits added
+        """
+        if self.history_index is None:
+            return 0
+        try:
+            return self.history_index.update()
+        except Exception as e:
+            print(f"Could not index the commit history of {self.repo_path}: {e}")
+            return 0
+
+    def find_mentioned_paths(self, query: str) -> List[str]:
+        """
+        Find the indexed files a query names by path or file name
+
+        Args:
+            query: The user's query about the repository
+
+        Returns:
+            Relative paths, in the order the query mentions them
+        """
+        files = self.index.get_all_files()
+        paths = []
+        for mention in PATH_MENTION_RE.findall(query):
+            mention = os.path.normpath(mention)
+            for path in files:
+                if path not in paths and (path == mention or path.endswith(os.sep + mention)):
+                    paths.append(path)
+        return paths
+
+    def describe_history(self, query: str, paths: List[str] = ()) -> str:
+        """
+        Describe the commit history relevant to a query, bringing the history index up to date first
+
+        Args:
+            query: The user's query about the repository
+            paths: Relative paths the query is about
+
+        Returns:
+            History text for the aggregator, or "" without a history index
+        """
+        if self.history_index is None:
+            return ""
+        self.update_history()
+        return self.history_index.describe(query, paths)
+
+    def resolve_symbols(
+        self,
+        query: str,
+        max_definition_files: int = SYMBOL_MAX_DEFINITION_FILES,
+        max_reference_files: int = SYMBOL_MAX_REFERENCE_FILES,
+        context_lines: int = SYMBOL_REFERENCE_CONTEXT_LINES
+    ) -> Dict[str, List[Tuple[int, int]]]:
+        """
+        Resolve the identifiers named in a query to the files and lines defining them,
+        followed by the files that use them most
+
+        Args:
+            query: The user's query about the repository
+            max_definition_files: Names defined in more files than this are skipped as ambiguous
+            max_reference_files: Referencing files included per resolved name
+            context_lines: Lines kept around each reference
+
+        Returns:
+            Dictionary mapping relative paths to 1-based inclusive line spans, definition files
+            first; empty when the query names no identifier the index can resolve
+        """
+        definition_spans: Dict[str, List[Tuple[int, int]]] = {}
+        reference_spans: Dict[str, List[Tuple[int, int]]] = {}
+        for identifier in find_query_identifiers(query):
+            definitions = self.index.find_definitions(identifier)
+            defining_files = {path for path, _ in definitions}
+            if not definitions or len(defining_files) > max_definition_files:
+                continue
+            for path, (_, _, _, start_line, end_line) in definitions:
+                definition_spans.setdefault(path, []).append((start_line, end_line))
+
+            references = self.index.find_references(identifier.split('.')[-1])
+            users = sorted(
+                (path for path in references if path not in defining_files),
+                key=lambda path: (-len(references[path]), path)
+            )
+            for path in users[:max_reference_files]:
+                reference_spans.setdefault(path, []).extend(
+                    (max(1, line - context_lines), line + context_lines) for line in references[path]
+                )
+
+        spans = dict(definition_spans)
+        for path, path_spans in reference_spans.items():
+            spans.setdefault(path, []).extend(path_spans)
+        return spans
+
+    def sync_with_head(self) -> List[str]:
+        """
+        Bring the derived state up to date with the repository's current HEAD.
+        Only paths touched between the last indexed commit and HEAD are re-indexed;
+        a full re-scan is done when there is no usable previous commit.
+
+        Returns:
+            List of relative paths that were re-indexed
+        """
+        with self.lock:
+            new_head = get_head_commit(self.repo_path)
+            old_head = self.indexed_commit
+
+            if new_head is None:
+                changed, removed = self.index.refresh()
+                self.apply_changes(changed, removed)
+                return changed + removed
+
+            if old_head == new_head:
+                print(f"Index already at {new_head[:8]}")
+                return []
+
+            touched = get_changed_paths(self.repo_path, old_head, new_head) if old_head else None
+            if touched is None:
+                print("Re-indexing the whole repository...")
+                self.file_cache.clear()
+                changed, removed = self.index.refresh()
+                self.apply_changes(changed, removed)
+                touched = changed + removed
+            else:
+                print(f"Re-indexing {len(touched)} paths changed between {old_head[:8]} and {new_head[:8]}")
+                self.invalidate_paths(touched)
+                self.index.mark_fresh()
+
+            self.index.set_meta("indexed_commit", new_head)
+            return touched
+
+    def release(self):
+        """
+        Free the in-memory caches and close the file, vector and history indexes. The state
+        cannot be used afterwards; the registry only releases a repository no query is
+        using, and loads a new state the next time the repository is asked about.
+        """
+        with self.lock:
+            self.released = True
+            self.file_cache.clear()
+            self.lexical_index = BM25Index()
+            self.lexical_index_built = False
+            self.index.close()
+            if self.vector_index is not None:
+                self.vector_index.close()
+            if self.history_index is not None:
+                self.history_index.close()
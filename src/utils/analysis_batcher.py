@@ -0,0 +1,105 @@
+"""
+Grouping of small files into shared analysis requests and splitting of the batched responses.
+"""
+
+import re
+from typing import Dict, List
+
+from src.config.settings import ANALYSIS_BATCH_TOKEN_BUDGET, ANALYSIS_BATCH_MAX_FILES, ANALYSIS_LARGE_FILE_TOKENS
+from src.utils.context_packer import estimate_tokens
+
+# Heading that starts each file's section in a batched analysis response
+FILE_HEADING = "### FILE: "
+FILE_HEADING_RE = re.compile(r"^[ \t>*#]*FILE:[ \t]*[`*]*(?P<path>[^`*\n]+?)[`*]*[ \t]*$", re.MULTILINE)
+
+
+def plan_batches(
+    excerpts: Dict[str, str],
+    token_budget: int = ANALYSIS_BATCH_TOKEN_BUDGET,
+    max_files: int = ANALYSIS_BATCH_MAX_FILES,
+    large_file_tokens: int = ANALYSIS_LARGE_FILE_TOKENS
+) -> List[List[str]]:
+    """
+    Group files into analysis requests. Large files get a request of their own; small
+    ones are packed first-fit, largest first, into batches bounded by tokens and file count.
+
+    Args:
+        excerpts: Mapping of relative path to the excerpt that will be analyzed
+        token_budget: Maximum estimated excerpt tokens in one batched request
+        max_files: Maximum number of files in one batched request
+        large_file_tokens: Excerpts above this many tokens are never batched
+
+    Returns:
+        List of batches, each a list of relative paths in the original order
+    """
+    order = {path: position for position, path in enumerate(excerpts)}
+    sizes = {path: estimate_tokens(excerpt) for path, excerpt in excerpts.items()}
+
+    batches: List[List[str]] = []
+    loads: List[int] = []
+    singles: List[List[str]] = []
+    for path in sorted(excerpts, key=lambda path: (-sizes[path], order[path])):
+        size = sizes[path]
+        if max_files <= 1 or size > large_file_tokens:
+            singles.append([path])
+            continue
+        for i, batch in enumerate(batches):
+            if len(batch) < max_files and loads[i] + size <= token_budget:
+                batch.append(path)
+                loads[i] += size
+                break
+        else:
+            batches.append([path])
+            loads.append(size)
+
+    batches.extend(singles)
+    for batch in batches:
+        batch.sort(key=order.get)
+    batches.sort(key=lambda batch: order[batch[0]])
+    return batches
+
+
+def format_batch_files(excerpts: Dict[str, str], paths: List[str]) -> str:
+    """
+    Render the files of a batch for the analysis prompt
+
+    Args:
+        excerpts: Mapping of relative path to line-numbered excerpt
+        paths: Paths in the batch
+
+    Returns:
+        One delimited section per file
+    """
+    return "\n\n".join(
+        f"{FILE_HEADING}{path}\n```\n{excerpts[path]}\n```"
+        for path in paths
+    )
+
+
+def split_batch_response(response: str, paths: List[str]) -> Dict[str, str]:
+    """
+    Split a batched analysis into per-file analyses using the "### FILE: <path>" headings
+
+    Args:
+        response: Text returned by the batched analysis request
+        paths: Paths that were in the batch
+
+    Returns:
+        Mapping of relative path to its analysis, for the paths found in the response
+    """
+    known = set(paths)
+    headings = [
+        (match.start(), match.end(), match.group('path').strip())
+        for match in FILE_HEADING_RE.finditer(response)
+    ]
+
+    analyses: Dict[str, str] = {}
+    for i, (_, end, path) in enumerate(headings):
+        if path not in known:
+            continue
+        next_start = headings[i + 1][0] if i + 1 < len(headings) else len(response)
+        analysis = response[end:next_start].strip()
+        if analysis:
+            # A repeated heading continues the same file's analysis
+            analyses[path] = f"{analyses[path]}\n\n{analysis}" if path in analyses else analysis
+    return analyses
@@ -0,0 +1,213 @@
+"""
+Persistent cache of per-file LLM analyses keyed by file content and query.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from src.config.settings import (
+    ANALYSIS_CACHE_FILE,
+    ANALYSIS_CACHE_MAX_ENTRIES,
+    ANALYSIS_CACHE_TTL,
+    ANALYSIS_PROMPT_VERSION,
+)
+from src.utils.file_utils import get_cache_dir
+from src.utils.lexical_index import IDENTIFIER_RE, STOP_WORDS
+
+ANALYSIS_SCHEMA_VERSION = "2"
+
+
+def normalize_query(query: str) -> str:
+    """
+    Reduce a query to a canonical form so trivially different phrasings share cache entries
+    ("How does auth work?" and "how does AUTH work" both become "auth work")
+
+    Args:
+        query: Query text
+
+    Returns:
+        Lowercase words without punctuation and stop words, separated by single spaces
+    """
+    words = (word.lower() for word in IDENTIFIER_RE.findall(query))
+    return " ".join(word for word in words if word not in STOP_WORDS)
+
+
+class AnalysisCache:
+    """
+    SQLite-backed cache of file analyses with LRU and TTL eviction.
+
+    Entries are keyed by (repository, content hash, prompt version, model, normalized query),
+    so an edited file never matches an old entry; stale entries for a path of one repository
+    can also be dropped eagerly without touching other repositories with the same path.
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[str] = None,
+        max_entries: int = ANALYSIS_CACHE_MAX_ENTRIES,
+        ttl: float = ANALYSIS_CACHE_TTL
+    ):
+        """
+        Open (or create) the analysis cache
+
+        Args:
+            cache_path: Optional explicit location of the cache database
+            max_entries: Maximum number of entries kept before least recently used ones are evicted
+            ttl: Seconds an entry stays valid after it was written
+        """
+        self.cache_path = cache_path or os.path.join(get_cache_dir(), ANALYSIS_CACHE_FILE)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_path, check_same_thread=False, timeout=30)
+        # WAL lets several server processes read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != ANALYSIS_SCHEMA_VERSION:
+                # Entries written without their repository cannot be invalidated safely
+                self._conn.execute("DROP TABLE IF EXISTS analyses")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (ANALYSIS_SCHEMA_VERSION,))
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    repo TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    analysis TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    last_access REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_path ON analyses (repo, path)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS analyses_last_access ON analyses (last_access)")
+
+    @staticmethod
+    def make_key(repo: str, content_hash: str, model: str, query: str) -> str:
+        """
+        Build the cache key for an analysis
+
+        Args:
+            repo: Path of the repository the file belongs to
+            content_hash: Hash of the analyzed file content
+            model: Name of the model producing the analysis
+            query: Query the analysis answers (normalized before hashing)
+
+        Returns:
+            Hex digest identifying the analysis
+        """
+        parts = [os.path.abspath(repo), content_hash, ANALYSIS_PROMPT_VERSION, model, normalize_query(query)]
+        return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Look up an analysis, counting the hit or miss
+
+        Args:
+            key: Key from make_key
+
+        Returns:
+            The cached analysis, or None if absent or expired
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT analysis, created_at FROM analyses WHERE key = ?", (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM analyses WHERE key = ?", (key,))
+                self.evictions += 1
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, repo: str, path: str, content_hash: str, analysis: str):
+        """
+        Store an analysis and evict expired or least recently used entries beyond the size limit
+
+        Args:
+            key: Key from make_key
+            repo: Path of the repository the file belongs to
+            path: Relative path of the analyzed file
+            content_hash: Hash of the analyzed file content
+            analysis: Analysis text
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, repo, path, content_hash, analysis, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, os.path.abspath(repo), path, content_hash, analysis, now, now),
+            )
+            expired = self._conn.execute("DELETE FROM analyses WHERE created_at < ?", (now - self.ttl,)).rowcount
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()
+            overflow = max(0, count - self.max_entries)
+            if overflow:
+                self._conn.execute(
+                    "DELETE FROM analyses WHERE key IN "
+                    "(SELECT key FROM analyses ORDER BY last_access ASC LIMIT ?)",
+                    (overflow,),
+                )
+            self.evictions += expired + overflow
+
+    def invalidate(self, repo: str, path: str, keep_hash: Optional[str] = None) -> int:
+        """
+        Drop the entries of a file whose content changed or was removed
+
+        Args:
+            repo: Path of the repository the file belongs to
+            path: Relative path of the file
+            keep_hash: Content hash whose entries are still valid, if the file still exists
+
+        Returns:
+            Number of entries removed
+        """
+        with self._lock, self._conn:
+            removed = self._conn.execute(
+                "DELETE FROM analyses WHERE repo = ? AND path = ? AND content_hash != ?",
+                (os.path.abspath(repo), path, keep_hash or "")
+            ).rowcount
+            self.evictions += removed
+            return removed
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with entries, hits, misses and evictions
+        """
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM analyses").fetchone()
+            return {"entries": entries, "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """
+    Get the process-wide analysis cache shared by all bots
+
+    Returns:
+        The shared AnalysisCache
+    """
+    global _analysis_cache
+    with _analysis_cache_lock:
+        if _analysis_cache is None:
+            _analysis_cache = AnalysisCache()
+        return _analysis_cache
@@ -0,0 +1,180 @@
+"""
+Local similarity cache of past answers, used to decide follow-up questions without an LLM call.
+"""
+
+import math
+import threading
+from collections import Counter, deque
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import (
+    ANSWER_CACHE_MAX_ENTRIES,
+    ANSWER_CACHE_HIT_THRESHOLD,
+    ANSWER_CACHE_MISS_THRESHOLD,
+)
+from src.utils.lexical_index import IDENTIFIER_RE, STOP_WORDS
+
+# Question words decide what is being asked about a symbol, so they are never ignored
+INTERROGATIVES = {'what', 'who', 'where', 'when', 'why', 'how', 'which'}
+QUERY_STOP_WORDS = STOP_WORDS - INTERROGATIVES
+
+
+def query_terms(query: str) -> Counter:
+    """
+    Split a query into the terms used to compare it with past queries. Unlike the search
+    tokenizer, identifiers are kept whole rather than expanded into their parts, which would
+    make any two questions about the same symbol look alike, and question words are kept.
+
+    Args:
+        query: The user's query
+
+    Returns:
+        Term counts
+    """
+    return Counter(
+        term for term in (identifier.lower() for identifier in IDENTIFIER_RE.findall(query))
+        if term not in QUERY_STOP_WORDS
+    )
+
+
+def query_similarity(terms_a: Counter, terms_b: Counter) -> float:
+    """
+    Cosine similarity between two bags of query terms
+
+    Args:
+        terms_a: Term counts of the first query
+        terms_b: Term counts of the second query
+
+    Returns:
+        Similarity between 0 and 1
+    """
+    if not terms_a or not terms_b:
+        return 0.0
+    dot = sum(count * terms_b[term] for term, count in terms_a.items() if term in terms_b)
+    norm_a = math.sqrt(sum(count * count for count in terms_a.values()))
+    norm_b = math.sqrt(sum(count * count for count in terms_b.values()))
+    return dot / (norm_a * norm_b)
+
+
+class AnswerCache:
+    """
+    Bounded store of (query, answer, files used) entries matched by query similarity.
+
+    A lookup is a hit only when the best match is a near-exact repeat: it scores at least
+    hit_threshold and asks with the same question words. It is a miss when the best match
+    scores below miss_threshold; anything in between is ambiguous and left to the LLM.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = ANSWER_CACHE_MAX_ENTRIES,
+        hit_threshold: float = ANSWER_CACHE_HIT_THRESHOLD,
+        miss_threshold: float = ANSWER_CACHE_MISS_THRESHOLD
+    ):
+        """
+        Create an empty answer cache
+
+        Args:
+            max_entries: Maximum number of answers kept (oldest are dropped first)
+            hit_threshold: Similarity at or above which a cached answer is reused
+            miss_threshold: Similarity below which the query is treated as new
+        """
+        self.entries = deque(maxlen=max_entries)
+        self.hit_threshold = hit_threshold
+        self.miss_threshold = miss_threshold
+        self.hits = 0
+        self.misses = 0
+        self.llm_checks = 0
+        self._lock = threading.Lock()
+
+    def add(self, query: str, answer: str, files: List[str]):
+        """
+        Remember an answer
+
+        Args:
+            query: The user's query
+            answer: The answer that was given
+            files: Relative paths of the files the answer was based on
+        """
+        with self._lock:
+            self.entries.append({
+                "query": query,
+                "answer": answer,
+                "files": set(files),
+                "terms": query_terms(query),
+            })
+
+    def lookup(self, query: str) -> Tuple[str, Optional[Dict]]:
+        """
+        Classify a query against the cached answers
+
+        Args:
+            query: The user's query
+
+        Returns:
+            Tuple of (decision, best_entry) where decision is "hit", "miss" or "ambiguous"
+        """
+        terms = query_terms(query)
+        asks = terms.keys() & INTERROGATIVES
+        with self._lock:
+            best_entry, best_score = None, 0.0
+            for entry in self.entries:
+                score = query_similarity(terms, entry["terms"])
+                if score > best_score:
+                    best_entry, best_score = entry, score
+
+            if (best_entry is not None and best_score >= self.hit_threshold
+                    and asks == best_entry["terms"].keys() & INTERROGATIVES):
+                self.hits += 1
+                return "hit", best_entry
+            if best_score < self.miss_threshold:
+                self.misses += 1
+                return "miss", best_entry
+            self.llm_checks += 1
+            return "ambiguous", best_entry
+
+    def invalidate_paths(self, paths: List[str]) -> int:
+        """
+        Forget answers that were based on files that have since changed
+
+        Args:
+            paths: Relative paths that changed or were removed
+
+        Returns:
+            Number of answers dropped
+        """
+        paths = set(paths)
+        with self._lock:
+            kept = [entry for entry in self.entries if not entry["files"] & paths]
+            dropped = len(self.entries) - len(kept)
+            self.entries.clear()
+            self.entries.extend(kept)
+            return dropped
+
+    def invalidate_all(self) -> int:
+        """
+        Forget every answer
+
+        Returns:
+            Number of answers dropped
+        """
+        with self._lock:
+            dropped = len(self.entries)
+            self.entries.clear()
+            return dropped
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with entries, hits, misses, LLM checks and LLM checks avoided
+        """
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "llm_checks": self.llm_checks,
+                "llm_checks_avoided": self.hits + self.misses,
+            }
@@ -0,0 +1,226 @@
+"""
+Concurrency helpers for dispatching independent LLM requests in parallel.
+"""
+
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.config.settings import PROVIDER_RATE_LIMITS
+from src.utils.scheduler import deadline
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket limiting how many requests start per minute.
+    """
+
+    def __init__(self, requests_per_minute: float, burst: Optional[int] = None):
+        """
+        Create a rate limiter
+
+        Args:
+            requests_per_minute: Sustained number of requests allowed per minute
+            burst: Maximum number of requests that may start back to back (defaults to one second's worth, at least 1)
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, int(self.rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may start."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+_rate_limiters: Dict[str, Optional[RateLimiter]] = {}
+_rate_limiters_lock = threading.Lock()
+
+# Calls run_with_timeouts gave up on that have not returned yet
+_abandoned_running = 0
+_abandoned_lock = threading.Lock()
+
+
+def abandoned_calls() -> int:
+    """
+    Get the number of calls that timed out but are still running in a worker thread
+
+    Returns:
+        Number of such calls across all run_with_timeouts runs
+    """
+    with _abandoned_lock:
+        return _abandoned_running
+
+
+def _abandon(future):
+    """Count a timed-out call until it returns; called once per abandoned future."""
+    global _abandoned_running
+    with _abandoned_lock:
+        _abandoned_running += 1
+
+    def finished(_):
+        global _abandoned_running
+        with _abandoned_lock:
+            _abandoned_running -= 1
+
+    future.add_done_callback(finished)
+
+
+def get_provider(model: str) -> str:
+    """
+    Get the provider prefix of a litellm-style model name (e.g. "gemini/gemini-2.0-flash" -> "gemini")
+
+    Args:
+        model: Model name
+
+    Returns:
+        Provider name
+    """
+    return model.split('/', 1)[0] if '/' in model else model
+
+
+def get_rate_limiter(provider: str) -> Optional[RateLimiter]:
+    """
+    Get the process-wide rate limiter for a provider, shared by all bots
+
+    Args:
+        provider: Provider name as returned by get_provider
+
+    Returns:
+        The provider's RateLimiter, or None if the provider is not rate limited
+    """
+    with _rate_limiters_lock:
+        if provider not in _rate_limiters:
+            limit = PROVIDER_RATE_LIMITS.get(provider)
+            _rate_limiters[provider] = RateLimiter(limit) if limit else None
+        return _rate_limiters[provider]
+
+
+def run_concurrently(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    rate_limiter: Optional[RateLimiter] = None
+) -> List[Any]:
+    """
+    Apply a function to every item using a bounded thread pool
+
+    Args:
+        fn: Function to call for each item
+        items: Items to process
+        max_workers: Maximum number of calls in flight at once
+        rate_limiter: Optional limiter acquired before each call starts
+
+    Returns:
+        Results in the same order as the items, regardless of completion order
+    """
+    items = list(items)
+
+    def call(item):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return fn(item)
+
+    if max_workers <= 1 or len(items) <= 1:
+        return [call(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        # Each call runs in a copy of the caller's context so tracing spans nest under the caller's
+        futures = [executor.submit(contextvars.copy_context().run, call, item) for item in items]
+        return [future.result() for future in futures]
+
+
+def run_with_timeouts(
+    fn: Callable[[Any], Any],
+    items: Iterable[Any],
+    max_workers: int,
+    timeout: float,
+    rate_limiter: Optional[RateLimiter] = None
+) -> List[Optional[Any]]:
+    """
+    Apply a function to every item using a bounded thread pool, giving each call its own time limit.
+    Calls that fail or exceed the limit are abandoned so the caller can carry on with the rest.
+    Each call runs under a deadline of its time limit, so LLM requests it makes give up by
+    themselves instead of holding a worker after the call was abandoned; abandoned_calls
+    counts those still running.
+
+    Args:
+        fn: Function to call for each item
+        items: Items to process
+        max_workers: Maximum number of calls in flight at once
+        timeout: Seconds each call may run, measured from when it starts
+        rate_limiter: Optional limiter acquired before each call starts
+
+    Returns:
+        Results in the same order as the items, with None for calls that failed or timed out
+    """
+    items = list(items)
+    results: List[Optional[Any]] = [None] * len(items)
+    if not items:
+        return results
+
+    started: Dict[int, float] = {}
+
+    def call(position: int):
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        started[position] = time.monotonic()
+        with deadline(timeout):
+            return fn(items[position])
+
+    workers = max(1, min(max_workers, len(items)))
+    # Upper bound for the whole run, so calls stuck behind abandoned ones cannot wait forever
+    overall_deadline = time.monotonic() + timeout * -(-len(items) // workers)
+
+    executor = ThreadPoolExecutor(max_workers=workers)
+    futures = {
+        executor.submit(contextvars.copy_context().run, call, position): position
+        for position in range(len(items))
+    }
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            if now >= overall_deadline:
+                print(f"Abandoning {len(pending)} of {len(items)} tasks that did not finish in time")
+                break
+            deadlines = [started[futures[f]] + timeout for f in pending if futures[f] in started]
+            deadlines.append(overall_deadline)
+            wait_for = max(0.0, min(deadlines) - now)
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                position = futures[future]
+                try:
+                    results[position] = future.result()
+                except Exception as e:
+                    print(f"Task {position + 1} of {len(items)} failed: {e}")
+
+            now = time.monotonic()
+            expired = {
+                future for future in pending
+                if futures[future] in started and now - started[futures[future]] >= timeout
+            }
+            for future in expired:
+                print(f"Task {futures[future] + 1} of {len(items)} timed out after {timeout}s")
+            pending -= expired
+    finally:
+        # Abandon timed-out calls instead of blocking on them; queued calls are cancelled
+        executor.shutdown(wait=False, cancel_futures=True)
+        for future in futures:
+            if not future.done():
+                _abandon(future)
+
+    return results
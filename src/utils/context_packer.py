@@ -0,0 +1,282 @@
+"""
+Token-budget-aware packing of file excerpts for the file analysis prompts.
+"""
+
+import math
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import BM25_B, BM25_K1, CHARS_PER_TOKEN, CHUNK_SIZE, CHUNK_OVERLAP, RANK_FUSION_K
+from src.utils.lexical_index import tokenize
+
+_text_splitter = None
+_text_splitter_lock = threading.Lock()
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Roughly estimate the number of LLM tokens in a piece of text
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def get_text_splitter():
+    """
+    Get the process-wide text splitter used for chunking file content, importing
+    langchain on first use
+
+    Returns:
+        The shared RecursiveCharacterTextSplitter
+    """
+    global _text_splitter
+    with _text_splitter_lock:
+        if _text_splitter is None:
+            from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+            _text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                length_function=len
+            )
+        return _text_splitter
+
+
+def split_with_line_numbers(content: str, text_splitter) -> List[Tuple[int, int, str]]:
+    """
+    Split content with the text splitter and locate each chunk in the original content
+
+    Args:
+        content: File content
+        text_splitter: Splitter used for chunking (e.g. RecursiveCharacterTextSplitter)
+
+    Returns:
+        List of (first_line, last_line, chunk) tuples with 1-based, inclusive line numbers
+    """
+    chunks = []
+    search_from = 0
+    for chunk in text_splitter.split_text(content):
+        offset = content.find(chunk, search_from)
+        if offset == -1:
+            offset = content.find(chunk)
+        if offset == -1:
+            # The splitter stripped or rewrote whitespace; fall back to the running position
+            offset = search_from
+        first_line = content.count('\n', 0, offset) + 1
+        last_line = first_line + chunk.count('\n')
+        chunks.append((first_line, last_line, chunk))
+        search_from = offset + 1
+    return chunks
+
+
+def render_line_ranges(content: str, ranges: List[Tuple[int, int]]) -> str:
+    """
+    Render the selected line ranges of a file with line numbers, marking skipped regions
+
+    Args:
+        content: File content
+        ranges: 1-based inclusive (first_line, last_line) ranges to include
+
+    Returns:
+        Excerpt text with each line prefixed by its line number
+    """
+    lines = content.split('\n')
+    merged: List[List[int]] = []
+    for first_line, last_line in sorted(ranges):
+        if merged and first_line <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last_line)
+        else:
+            merged.append([first_line, last_line])
+
+    width = len(str(len(lines)))
+    parts = []
+    for first_line, last_line in merged:
+        if first_line > 1:
+            parts.append("...")
+        parts.extend(
+            f"{number:>{width}} | {lines[number - 1]}"
+            for number in range(first_line, min(last_line, len(lines)) + 1)
+        )
+    if merged and merged[-1][1] < len(lines):
+        parts.append("...")
+    return '\n'.join(parts)
+
+
+def fit_lines(lines: List[str], first_line: int, last_line: int, allowance: int) -> Tuple[int, int]:
+    """
+    Find how much of a line span fits in a token allowance, from its first line on
+
+    Args:
+        lines: Lines of the file
+        first_line: 1-based first line of the span
+        last_line: 1-based inclusive last line of the span
+        allowance: Estimated tokens available
+
+    Returns:
+        Tuple of (last line that fits, or first_line - 1 if none does, tokens used)
+    """
+    kept, used = first_line - 1, 0
+    for number in range(first_line, min(last_line, len(lines)) + 1):
+        # Same estimate as a chunk: its text plus a line-number prefix per line
+        cost = estimate_tokens(lines[number - 1]) + 2
+        if used + cost > allowance:
+            break
+        used += cost
+        kept = number
+    return kept, used
+
+
+def pin_line_ranges(
+    contents: Dict[str, str],
+    pinned: Dict[str, List[Tuple[int, int]]],
+    token_budget: int
+) -> Tuple[Dict[str, List[Tuple[int, int]]], int]:
+    """
+    Reserve budget for line spans that must be in the excerpts, such as the definitions of
+    symbols named in the query. Files share the budget evenly and spans that do not fit
+    their file's share are cut short.
+
+    Args:
+        contents: Mapping of relative path to file content
+        pinned: Mapping of relative path to 1-based inclusive line spans
+        token_budget: Total estimated tokens available for all excerpts
+
+    Returns:
+        Tuple of (ranges kept per path, tokens used)
+    """
+    paths = [path for path in pinned if path in contents]
+    share = token_budget // max(1, len(paths))
+    ranges: Dict[str, List[Tuple[int, int]]] = {}
+    used = 0
+    for path in paths:
+        lines = contents[path].split('\n')
+        allowance = share
+        for first_line, last_line in pinned[path]:
+            kept, cost = fit_lines(lines, first_line, last_line, allowance)
+            allowance -= cost
+            if kept >= first_line:
+                ranges.setdefault(path, []).append((first_line, kept))
+        used += share - allowance
+    return ranges, used
+
+
+def pack_context(
+    query: str,
+    contents: Dict[str, str],
+    text_splitter,
+    token_budget: int,
+    pinned: Optional[Dict[str, List[Tuple[int, int]]]] = None,
+    related: Optional[List[Tuple[str, int, int]]] = None
+) -> Dict[str, str]:
+    """
+    Fill a shared token budget with the chunks of the selected files that best match the query.
+
+    Pinned line spans are included first. Every other file then gets its best chunk (or its
+    first chunk if nothing matches), cut short if it does not fit what is left of the budget,
+    and the remaining budget goes to the highest-scoring
+    chunks across all files. Chunks are scored with BM25 against the query, computed over
+    the chunks of the selected files, fused by reciprocal rank with the order of any related
+    line ranges (such as vector search hits).
+
+    Args:
+        query: The user's query about the repository
+        contents: Mapping of relative path to file content
+        text_splitter: Splitter used for chunking
+        token_budget: Total estimated tokens available for all excerpts
+        pinned: Optional mapping of relative path to line spans that must be included
+        related: Optional (path, first_line, last_line) ranges found by another retriever, best first
+
+    Returns:
+        Mapping of relative path to a line-numbered excerpt; a file is left out only when the
+        budget is used up before even one line of it fits
+    """
+    candidates = []  # (path, first_line, last_line, terms, tokens)
+    for path, content in contents.items():
+        for first_line, last_line, chunk in split_with_line_numbers(content, text_splitter):
+            # Line-number prefixes add a few tokens per line on top of the chunk itself
+            tokens = estimate_tokens(chunk) + 2 * (last_line - first_line + 1)
+            candidates.append((path, first_line, last_line, Counter(tokenize(chunk)), tokens))
+
+    if not candidates:
+        return {}
+
+    # BM25 over the chunks of the selected files
+    query_terms = set(tokenize(query))
+    document_frequency = Counter(term for candidate in candidates for term in query_terms & candidate[3].keys())
+    average_length = sum(sum(candidate[3].values()) for candidate in candidates) / len(candidates) or 1.0
+    k1, b = BM25_K1, BM25_B
+
+    scores = []
+    for candidate in candidates:
+        terms = candidate[3]
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = terms.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(candidates) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (k1 + 1) / (frequency + k1 * (1 - b + b * length / average_length))
+        scores.append(score)
+
+    order = sorted(range(len(candidates)), key=lambda i: (-scores[i], candidates[i][0], candidates[i][1]))
+
+    if related:
+        # Chunks overlapping a related range take the rank of the best range they overlap
+        related_rank: Dict[int, int] = {}
+        for rank, (path, first_line, last_line) in enumerate(related):
+            for i, candidate in enumerate(candidates):
+                if candidate[0] == path and candidate[1] <= last_line and first_line <= candidate[2]:
+                    related_rank.setdefault(i, rank)
+        lexical_rank = {i: rank for rank, i in enumerate(order) if scores[i] > 0}
+        scores = [
+            (1.0 / (RANK_FUSION_K + lexical_rank[i]) if i in lexical_rank else 0.0)
+            + (1.0 / (RANK_FUSION_K + related_rank[i]) if i in related_rank else 0.0)
+            for i in range(len(candidates))
+        ]
+        order = sorted(range(len(candidates)), key=lambda i: (-scores[i], candidates[i][0], candidates[i][1]))
+
+    ranges, used = pin_line_ranges(contents, pinned or {}, token_budget)
+    chosen = set()
+    remaining = token_budget - used
+
+    # One chunk per file first, so every selected file is represented
+    seen_paths = set(ranges)
+    for i in order:
+        path = candidates[i][0]
+        if path in seen_paths:
+            continue
+        seen_paths.add(path)
+        if candidates[i][4] <= remaining:
+            chosen.add(i)
+            remaining -= candidates[i][4]
+            continue
+        # Rather than drop the file, keep as much of its best chunk as fits
+        _, first_line, last_line, _, _ = candidates[i]
+        kept, cost = fit_lines(contents[path].split('\n'), first_line, last_line, remaining)
+        if kept >= first_line:
+            ranges[path] = [(first_line, kept)]
+            remaining -= cost
+
+    # Then the best remaining matching chunks across all files
+    for i in order:
+        if scores[i] <= 0:
+            break
+        if i not in chosen and candidates[i][4] <= remaining:
+            chosen.add(i)
+            remaining -= candidates[i][4]
+
+    for i in chosen:
+        path, first_line, last_line, _, _ = candidates[i]
+        ranges.setdefault(path, []).append((first_line, last_line))
+
+    return {
+        path: render_line_ranges(contents[path], ranges[path])
+        for path in contents if path in ranges
+    }
@@ -0,0 +1,235 @@
+"""
+Bounded conversation memory that gives each pipeline stage only the history it needs.
+"""
+
+import re
+import threading
+from collections import Counter, deque
+from typing import Dict, List
+
+from src.config.settings import (
+    CHARS_PER_TOKEN,
+    MEMORY_MAX_TURNS,
+    MEMORY_RECENT_TURNS,
+    MEMORY_RELEVANCE_THRESHOLD,
+    MEMORY_STAGE_TOKEN_BUDGETS,
+    MEMORY_SUMMARY_TOKEN_BUDGET,
+    MEMORY_TURN_ANSWER_TOKENS,
+    MEMORY_GIST_CHARS,
+)
+from src.utils.answer_cache import query_similarity
+from src.utils.context_packer import estimate_tokens
+from src.utils.lexical_index import tokenize
+
+# Stages that only need to know what was asked before, not what was answered
+QUESTION_STAGES = ("selector", "analysis")
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s")
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text to roughly max_tokens estimated tokens at a word boundary
+
+    Args:
+        text: Text to cut
+        max_tokens: Maximum estimated tokens
+
+    Returns:
+        The text, with "..." appended if it was cut
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars - 3]
+    if ' ' in cut:
+        cut = cut.rsplit(' ', 1)[0]
+    return cut + "..."
+
+
+def answer_gist(answer: str, max_chars: int = MEMORY_GIST_CHARS) -> str:
+    """
+    The first sentence of an answer, without Markdown headings and code blocks
+
+    Args:
+        answer: Answer text
+        max_chars: Maximum length
+
+    Returns:
+        The gist on one line
+    """
+    prose = []
+    in_code = False
+    for line in answer.split('\n'):
+        stripped = line.strip()
+        if stripped.startswith('```'):
+            in_code = not in_code
+            continue
+        if in_code or not stripped or stripped.startswith('#'):
+            continue
+        prose.append(stripped.lstrip('*->0123456789. ').strip())
+    text = ' '.join(part for part in prose if part)
+    sentence = SENTENCE_END_RE.split(text, 1)[0]
+    return truncate_to_tokens(sentence, max_chars // CHARS_PER_TOKEN)
+
+
+class ConversationMemory:
+    """
+    The turns of one conversation, kept up to max_turns, and a view of them per pipeline stage.
+
+    A view holds the most recent turns and the older turns relevant to the current query,
+    most relevant first until the stage's token budget is spent, followed by a rolling
+    summary of one line per remaining turn. The selector and the file analyses only get
+    the past questions and the files they were answered from. Views never exceed their
+    budget, so prompt size stays flat however long the conversation gets.
+    """
+
+    def __init__(
+        self,
+        max_turns: int = MEMORY_MAX_TURNS,
+        recent_turns: int = MEMORY_RECENT_TURNS,
+        relevance_threshold: float = MEMORY_RELEVANCE_THRESHOLD,
+        stage_budgets: Dict[str, int] = MEMORY_STAGE_TOKEN_BUDGETS,
+        summary_budget: int = MEMORY_SUMMARY_TOKEN_BUDGET,
+        turn_answer_tokens: int = MEMORY_TURN_ANSWER_TOKENS
+    ):
+        """
+        Create an empty memory
+
+        Args:
+            max_turns: Maximum number of turns kept
+            recent_turns: Number of latest turns offered to every stage regardless of relevance
+            relevance_threshold: Query similarity at which an older turn is relevant
+            stage_budgets: Estimated tokens of history per stage
+            summary_budget: Estimated tokens of the rolling summary
+            turn_answer_tokens: Estimated tokens of one answer shown in full
+        """
+        self.turns = deque(maxlen=max_turns)
+        self.recent_turns = recent_turns
+        self.relevance_threshold = relevance_threshold
+        self.stage_budgets = stage_budgets
+        self.summary_budget = summary_budget
+        self.turn_answer_tokens = turn_answer_tokens
+        self.total_turns = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self.turns)
+
+    def add(self, query: str, answer: str, files: List[str] = ()):
+        """
+        Remember a turn
+
+        Args:
+            query: The user's query
+            answer: The answer that was given
+            files: Relative paths of the files the answer was based on
+        """
+        with self._lock:
+            self.total_turns += 1
+            self.turns.append({
+                "number": self.total_turns,
+                "query": query,
+                "answer": truncate_to_tokens(answer, self.turn_answer_tokens),
+                "gist": answer_gist(answer),
+                "files": list(files),
+                "query_terms": Counter(tokenize(query)),
+                "answer_terms": Counter(tokenize(answer)),
+            })
+
+    def rank_turns(self, query: str) -> List[Dict]:
+        """
+        Order the turns for a query: the most recent ones first, then the relevant older ones
+
+        Args:
+            query: The current query
+
+        Returns:
+            Turns worth showing, in the order they should get the budget
+        """
+        terms = Counter(tokenize(query))
+        with self._lock:
+            turns = list(self.turns)
+        recent = turns[len(turns) - self.recent_turns:] if self.recent_turns else []
+        scored = []
+        for turn in turns[:len(turns) - len(recent)]:
+            # Answers share many incidental words with any query, so their similarity counts for less
+            score = max(query_similarity(terms, turn["query_terms"]), 0.5 * query_similarity(terms, turn["answer_terms"]))
+            if score >= self.relevance_threshold:
+                scored.append((score, turn))
+        scored.sort(key=lambda item: -item[0])
+        return list(reversed(recent)) + [turn for _, turn in scored]
+
+    def context_for(self, stage: str, query: str) -> str:
+        """
+        Build the history a stage gets for a query
+
+        Args:
+            stage: "history_check", "aggregate", "selector" or "analysis"
+            query: The current query
+
+        Returns:
+            History text within the stage's token budget, or "" if there is none
+        """
+        budget = self.stage_budgets.get(stage, 0)
+        if budget <= 0 or not len(self):
+            return ""
+
+        chosen, used = [], 0
+        for turn in self.rank_turns(query):
+            if stage in QUESTION_STAGES:
+                text = f"User asked: {turn['query']}"
+                if turn["files"]:
+                    text += f" (answered from {', '.join(turn['files'][:5])})"
+            else:
+                text = f"User: {turn['query']}\nBot: {turn['answer']}"
+            cost = estimate_tokens(text)
+            if used + cost > budget:
+                if stage in QUESTION_STAGES:
+                    break
+                continue
+            chosen.append((turn["number"], text))
+            used += cost
+        sections = ['\n'.join(text for _, text in sorted(chosen))] if chosen else []
+
+        if stage not in QUESTION_STAGES:
+            summary = self.summary(exclude={number for number, _ in chosen}, budget=min(self.summary_budget, budget - used))
+            if summary:
+                sections.insert(0, f"Earlier in this conversation:\n{summary}")
+        return '\n\n'.join(sections)
+
+    def summary(self, exclude=frozenset(), budget: int = MEMORY_SUMMARY_TOKEN_BUDGET) -> str:
+        """
+        Rolling summary with one line per turn, newest turns kept when the budget runs out
+
+        Args:
+            exclude: Numbers of turns left out because they are shown in full
+            budget: Maximum estimated tokens
+
+        Returns:
+            Summary lines in conversation order
+        """
+        with self._lock:
+            turns = list(self.turns)
+        lines, used = [], 0
+        for turn in reversed(turns):
+            if turn["number"] in exclude:
+                continue
+            line = f"- {turn['query']} -> {turn['gist']}"
+            cost = estimate_tokens(line)
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        return '\n'.join(reversed(lines))
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get memory counters
+
+        Returns:
+            Dictionary with the turns kept and the turns seen in total
+        """
+        with self._lock:
+            return {"turns": len(self.turns), "total_turns": self.total_turns}
@@ -0,0 +1,190 @@
+"""
+Compact structural digests of files, shown to the file selector instead of raw previews.
+"""
+
+import re
+from typing import List, Optional
+
+from src.config.settings import CHARS_PER_TOKEN, DIGEST_TOKEN_BUDGET, DIGEST_SCAN_LINES
+from src.utils.symbols import Definition
+
+# Import statements of the supported languages; group 1 is the imported module
+IMPORT_PATTERNS = [
+    re.compile(r"^\s*from\s+([\w.]+)\s+import\b"),
+    re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+)\s*;?\s*(?:#.*)?$"),
+    re.compile(r"^\s*import\b[^'\"]*?\bfrom\s+['\"]([^'\"]+)['\"]"),
+    re.compile(r"^\s*import\s+['\"]([^'\"]+)['\"]"),
+    re.compile(r"\brequire(?:_relative)?\s*\(?\s*['\"]([^'\"]+)['\"]"),
+    re.compile(r"^\s*#\s*include\s*[<\"]([^>\"]+)[>\"]"),
+    re.compile(r"^\s*(?:pub\s+)?use\s+([\w:\\]+)"),
+    re.compile(r"^\s*using\s+(?:static\s+)?([\w.]+)\s*;"),
+]
+
+# Modules imported almost everywhere, which say nothing about what a file does
+COMMON_IMPORTS = {
+    '__future__', 'typing', 'os', 'sys', 're', 'json', 'time', 'abc', 'functools', 'itertools',
+    'collections', 'dataclasses', 'pathlib', 'logging', 'stdio.h', 'stdlib.h', 'string.h', 'std',
+    'java.util', 'System', 'react',
+}
+
+# Comment and docstring openers, with the closer of those that open a block
+BLOCK_MARKERS = {'"""': '"""', "'''": "'''", '/**': '*/', '/*': '*/', '<!--': '-->'}
+LINE_MARKERS = ('//', '#', '--', ';;', '*')
+# Leading lines that are never the documentation of a file
+BOILERPLATE_RE = re.compile(r"(?i)copyright|license|spdx|all rights reserved|-\*- coding|^#!|^=+$|^-+$")
+
+
+def first_doc_line(content: str, scan_lines: int = DIGEST_SCAN_LINES) -> str:
+    """
+    Find the first line of a file's leading docstring, comment or Markdown heading,
+    skipping shebangs, encoding lines and license headers
+
+    Args:
+        content: File content
+        scan_lines: Number of leading lines to look at
+
+    Returns:
+        The documentation line without comment markers, or "" if the file starts with code
+    """
+    closer = None
+    # Set inside a comment block that turned out to be a license header
+    in_boilerplate = False
+    for line in content.split('\n', scan_lines)[:scan_lines]:
+        stripped = line.strip()
+        if not stripped:
+            in_boilerplate = False
+            continue
+        if closer is not None:
+            text = stripped.split(closer)[0]
+            if closer in stripped:
+                closer = None
+        else:
+            opener = next((marker for marker in BLOCK_MARKERS if stripped.startswith(marker)), None)
+            if opener is not None:
+                in_boilerplate = False
+                rest = stripped[len(opener):]
+                if BLOCK_MARKERS[opener] not in rest:
+                    closer = BLOCK_MARKERS[opener]
+                text = rest.split(BLOCK_MARKERS[opener])[0]
+            elif stripped.startswith(LINE_MARKERS):
+                text = stripped
+            else:
+                # First line of code: the file has no leading documentation
+                return ""
+        text = text.strip(' *#/-;!').strip()
+        if BOILERPLATE_RE.search(stripped) or BOILERPLATE_RE.search(text):
+            in_boilerplate = True
+        elif text and not in_boilerplate:
+            return text
+    return ""
+
+
+def find_key_imports(content: str, scan_lines: int = DIGEST_SCAN_LINES) -> List[str]:
+    """
+    List the modules a file imports, leaving out ubiquitous ones
+
+    Args:
+        content: File content
+        scan_lines: Number of leading lines to look at
+
+    Returns:
+        Distinct module names in order of appearance
+    """
+    modules: List[str] = []
+    for line in content.split('\n', scan_lines)[:scan_lines]:
+        for pattern in IMPORT_PATTERNS:
+            match = pattern.search(line)
+            if not match:
+                continue
+            module = match.group(1).rstrip(':;')
+            top_level = re.split(r"[.:/\\]", module)[0]
+            if module not in COMMON_IMPORTS and top_level not in COMMON_IMPORTS and module not in modules:
+                modules.append(module)
+            break
+    return modules
+
+
+def fit_list(label: str, items: List[str], max_chars: int) -> Optional[str]:
+    """
+    Render "label: a, b, c" with as many items as fit, noting how many were left out
+
+    Returns:
+        The line, or None if not even one item fits
+    """
+    used = len(label) + 2
+    count = 0
+    for item in items:
+        left = len(items) - count - 1
+        suffix = len(f" (+{left} more)") if left else 0
+        cost = len(item) + (2 if count else 0)
+        if used + cost + suffix > max_chars:
+            break
+        used += cost
+        count += 1
+    if not count:
+        return None
+    left = len(items) - count
+    return f"{label}: {', '.join(items[:count])}" + (f" (+{left} more)" if left else "")
+
+
+def build_digest(
+    content: str,
+    definitions: Optional[List[Definition]] = None,
+    token_budget: int = DIGEST_TOKEN_BUDGET
+) -> str:
+    """
+    Summarize a file's structure within a token budget: the first documentation line, the
+    top-level classes with their methods, functions, key imports and module-level names.
+    Files without extracted symbols fall back to their first non-blank lines.
+
+    Args:
+        content: File content, or at least its leading part
+        definitions: Definitions from symbols.extract_symbols, if the file has an extractor
+        token_budget: Maximum estimated tokens of the digest
+
+    Returns:
+        Digest text, one fact per line
+    """
+    max_chars = token_budget * CHARS_PER_TOKEN
+    lines: List[str] = []
+
+    def add(line: Optional[str]):
+        nonlocal max_chars
+        if line and len(line) <= max_chars:
+            lines.append(line)
+            max_chars -= len(line) + 1
+
+    doc = first_doc_line(content)
+    if doc:
+        add(doc if len(doc) <= max_chars // 2 else doc[:max_chars // 2 - 3] + "...")
+
+    if definitions is None:
+        # No structure to show: condense the opening lines instead
+        for line in content.split('\n', DIGEST_SCAN_LINES)[:DIGEST_SCAN_LINES]:
+            line = line.strip()
+            if line and line.strip(' *#/-;!<>').strip() != doc and not BOILERPLATE_RE.search(line):
+                if len(line) + 1 > max_chars:
+                    break
+                add(line)
+        return '\n'.join(lines)
+
+    containers = [definition for definition in definitions if definition[2] in ("class", "impl", "module")]
+    top_level = [definition for definition in definitions if definition[0] == definition[1]]
+    # Public names first; private helpers only if there is room left
+    functions = sorted(
+        (name for name, _, kind, _, _ in top_level if kind in ("function", "method", "type")),
+        key=lambda name: name.startswith('_')
+    )
+    variables = [name for name, _, kind, _, _ in top_level if kind == "variable"]
+    imports = find_key_imports(content)
+
+    for name, qualname, kind, _, _ in containers[:4]:
+        members = [
+            member_name for member_name, member_qualname, _, _, _ in definitions
+            if member_qualname == f"{qualname}.{member_name}" and not member_name.startswith('_')
+        ]
+        add(fit_list(f"{kind} {qualname}", members, max_chars) if members else f"{kind} {qualname}")
+    add(fit_list("defines", functions, max_chars))
+    add(fit_list("imports", imports, max_chars))
+    add(fit_list("names", variables, max_chars))
+    return '\n'.join(lines)
@@ -0,0 +1,132 @@
+"""
+Pluggable text embedders for the chunk vector index.
+"""
+
+import functools
+import math
+import zlib
+from collections import Counter
+from typing import List
+
+import numpy as np
+
+from src.config.settings import EMBEDDING_BACKEND, EMBEDDING_DIMENSIONS, EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE
+from src.utils.lexical_index import tokenize
+
+
+@functools.lru_cache(maxsize=1 << 16)
+def hash_term(term: str) -> int:
+    """Stable 32-bit hash of a term (Python's hash() changes between processes)."""
+    return zlib.crc32(term.encode('utf-8'))
+
+
+@functools.lru_cache(maxsize=64)
+def log_weight(count: int) -> float:
+    """Sublinear term frequency weight."""
+    return 1.0 + math.log(count)
+
+
+class Embedder:
+    """
+    Turns texts into L2-normalized float32 vectors, so a dot product is a cosine similarity.
+    The name identifies the vectors it produces; an index built with another name is rebuilt.
+    """
+
+    name = "base"
+    dimensions = 0
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            Matrix of shape (len(texts), dimensions) with unit-length rows (zero rows for empty texts)
+        """
+        raise NotImplementedError
+
+
+class HashingEmbedder(Embedder):
+    """
+    Deterministic, offline embedder: the search terms of a text (identifiers and their
+    snake_case/camelCase parts) are hashed into a fixed number of signed buckets with
+    sublinear term frequency. No model, no network and no corpus statistics, so vectors
+    never go stale as other files change.
+    """
+
+    def __init__(self, dimensions: int = EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        rows: List[int] = []
+        hashes: List[int] = []
+        weights: List[float] = []
+        for row, text in enumerate(texts):
+            for term, count in Counter(tokenize(text)).items():
+                rows.append(row)
+                hashes.append(hash_term(term))
+                weights.append(log_weight(count))
+        if rows:
+            hash_array = np.array(hashes, dtype=np.uint32)
+            # The top bit picks the sign so colliding terms tend to cancel rather than add up
+            signs = np.where(hash_array & 0x80000000, -1.0, 1.0).astype(np.float32)
+            np.add.at(matrix, (np.array(rows), hash_array % self.dimensions), np.array(weights, dtype=np.float32) * signs)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """
+    Embeds with a sentence-transformers model on the CPU. The sentence-transformers
+    package is optional and only imported when this embedder is used.
+    """
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, batch_size: int = EMBEDDING_BATCH_SIZE):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "The sentence-transformers embedder needs `pip install sentence-transformers`"
+            ) from e
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.batch_size = batch_size
+        self.dimensions = self.model.get_sentence_embedding_dimension()
+        self.name = f"sentence-transformers/{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimensions), dtype=np.float32)
+        vectors = self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        return vectors.astype(np.float32, copy=False)
+
+
+EMBEDDERS = {
+    "hashing": HashingEmbedder,
+    "sentence-transformers": SentenceTransformerEmbedder,
+}
+
+
+def create_embedder(name: str = EMBEDDING_BACKEND) -> Embedder:
+    """
+    Create an embedder by name
+
+    Args:
+        name: "hashing" or "sentence-transformers"
+
+    Returns:
+        The embedder
+    """
+    if name not in EMBEDDERS:
+        raise ValueError(f"Unknown embedding backend {name!r}; expected one of {', '.join(EMBEDDERS)}")
+    return EMBEDDERS[name]()
@@ -0,0 +1,106 @@
+"""
+Memory-bounded LRU cache of file contents for the GitRepoBot application.
+"""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from src.config.settings import FILE_CACHE_MAX_BYTES, FILE_CACHE_MAX_ENTRY_BYTES
+
+
+class FileCache:
+    """
+    Thread-safe LRU mapping of file path to content, bounded by the memory the contents use.
+
+    It supports the dict operations read_file relies on (`get`, assignment, `pop`),
+    so it can be passed anywhere a plain dict cache was used before.
+    """
+
+    def __init__(self, max_bytes: int = FILE_CACHE_MAX_BYTES, max_entry_bytes: int = FILE_CACHE_MAX_ENTRY_BYTES):
+        """
+        Create an empty cache
+
+        Args:
+            max_bytes: Total memory the cached contents may use before least recently used ones are evicted
+            max_entry_bytes: Contents larger than this are never cached
+        """
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, path: str) -> bool:
+        with self._lock:
+            return path in self._entries
+
+    def __getitem__(self, path: str) -> str:
+        with self._lock:
+            self._entries.move_to_end(path)
+            return self._entries[path]
+
+    def __setitem__(self, path: str, content: str):
+        size = sys.getsizeof(content)
+        with self._lock:
+            self._remove(path)
+            if size > self.max_entry_bytes:
+                return
+            self._entries[path] = content
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, path: str) -> Optional[str]:
+        content = self._entries.pop(path, None)
+        if content is not None:
+            self.current_bytes -= sys.getsizeof(content)
+        return content
+
+    def get(self, path: str, default: Optional[str] = None) -> Optional[str]:
+        """Get a cached content, counting the hit or miss."""
+        with self._lock:
+            if path not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(path)
+            return self._entries[path]
+
+    def pop(self, path: str, default: Optional[str] = None) -> Optional[str]:
+        """Remove a path from the cache and return its content."""
+        with self._lock:
+            content = self._remove(path)
+            return default if content is None else content
+
+    def clear(self):
+        """Remove every cached content."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with entries, bytes, max_bytes, hits, misses and evictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
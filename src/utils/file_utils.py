@@ -2,45 +2,159 @@
 Utility functions for file operations in the GitRepoBot application.
 """
 
+import mmap
 import os
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional
 
-from src.config.settings import EXCLUDED_DIRS, CODE_EXTENSIONS
+from src.config.settings import (
+    EXCLUDED_DIRS,
+    CODE_EXTENSIONS,
+    CACHE_DIR_NAME,
+    PREVIEW_LINES,
+    PREVIEW_MAX_CHARS,
+    MAX_FILE_SIZE,
+    BINARY_SNIFF_BYTES,
+    MMAP_THRESHOLD,
+)
+from src.utils.scanner import scan_repository
+from src.utils.metrics import record
+from src.utils.symbols import get_language, extract_symbols
+from src.utils.digest import build_digest
 
-def get_all_files(repo_path: str) -> Dict[str, str]:
+def get_cache_dir() -> str:
     """
-    Get all code files in the repository with their relative paths while efficiently skipping excluded directories.
+    Get the platform-appropriate cache directory for the application, creating it if needed
+    
+    Returns:
+        Path to the cache directory
+    """
+    if os.name == 'nt':  # Windows
+        cache_dir = os.path.join(os.environ.get('LOCALAPPDATA', os.path.expanduser('~')), CACHE_DIR_NAME)
+    else:
+        cache_dir = os.path.join(os.path.expanduser('~'), '.cache', CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+def make_preview(content: str) -> str:
+    """
+    Build the short preview of a file shown to the file selector
+    
+    Args:
+        content: File content
+        
+    Returns:
+        The first few lines of the content, truncated if too long
+    """
+    preview = '\n'.join(content.split('\n')[:PREVIEW_LINES])
+    if len(preview) > PREVIEW_MAX_CHARS:
+        preview = preview[:PREVIEW_MAX_CHARS] + "..."
+    return preview
+
+def is_code_file(relative_path: str) -> bool:
+    """
+    Check whether a repository-relative path would be picked up by get_all_files
+    
+    Args:
+        relative_path: Path relative to the repository root
+        
+    Returns:
+        True if the file has a code extension and is outside excluded directories
+    """
+    parts = Path(relative_path).parts
+    if any(part in EXCLUDED_DIRS for part in parts[:-1]):
+        return False
+    return Path(relative_path).suffix in CODE_EXTENSIONS
+
+def get_all_files(repo_path: str, index=None) -> Dict[str, str]:
+    """
+    Get all code files in the repository with their relative paths, skipping excluded
+    directories and paths ignored by git.
     
     Args:
         repo_path: Path to the git repository
+        index: Optional RepoIndex to serve the listing from instead of scanning the repository
         
     Returns:
         Dictionary mapping relative paths to full paths
     """
-    print("Fetching all code files in the repository...")
+    if index is not None:
+        index.refresh_if_stale()
+        return index.get_all_files()
 
-    repo_path = Path(repo_path)
-    file_paths = {}
+    return scan_repository(repo_path)
 
-    def scan_directory(directory: Path):
-        """Recursively scan directory while skipping excluded folders."""
-        try:
-            for entry in os.scandir(directory):
-                if entry.is_dir(follow_symlinks=False):
-                    # Skip excluded directories
-                    if entry.name in EXCLUDED_DIRS:
-                        continue
-                    scan_directory(Path(entry.path))  # Recursively scan subdirectory
-                elif entry.is_file() and Path(entry.path).suffix in CODE_EXTENSIONS:
-                    relative_path = Path(entry.path).relative_to(repo_path)
-                    file_paths[str(relative_path)] = str(entry.path)
-        except PermissionError:
-            print(f"Skipping inaccessible directory: {directory}")
-
-    scan_directory(repo_path)
-
-    return file_paths
+def is_binary(sample: bytes) -> bool:
+    """
+    Detect binary content from the first bytes of a file
+    
+    Args:
+        sample: Leading bytes of the file
+        
+    Returns:
+        True if the sample contains a NUL byte, which text files never do
+    """
+    return b'\0' in sample
+
+def check_readable(file_path: str, size: Optional[int] = None) -> Optional[str]:
+    """
+    Check whether a file is worth reading as text, without reading all of it
+    
+    Args:
+        file_path: Path to the file
+        size: File size if already known from a stat call
+        
+    Returns:
+        Reason the file should be skipped, or None if it can be read
+    """
+    try:
+        if size is None:
+            size = os.path.getsize(file_path)
+        if size > MAX_FILE_SIZE:
+            return f"file is larger than {MAX_FILE_SIZE} bytes"
+        with open(file_path, 'rb') as file:
+            if is_binary(file.read(BINARY_SNIFF_BYTES)):
+                return "binary file"
+    except OSError as e:
+        return str(e)
+    return None
+
+def read_preview(file_path: str, size: Optional[int] = None) -> str:
+    """
+    Read the preview of a file without decoding all of it. Large files are
+    memory-mapped so only the bytes up to the last preview line are touched.
+    
+    Args:
+        file_path: Path to the file
+        size: File size if already known from a stat call
+        
+    Returns:
+        Preview text as produced by make_preview
+    """
+    if size is None:
+        size = os.path.getsize(file_path)
+    # Enough bytes for PREVIEW_MAX_CHARS characters even in a 4-byte encoding
+    limit = min(size, PREVIEW_MAX_CHARS * 4)
+
+    with open(file_path, 'rb') as file:
+        if size < MMAP_THRESHOLD or size == 0:
+            head = file.read(limit)
+        else:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = -1
+                for _ in range(PREVIEW_LINES):
+                    end = mapped.find(b'\n', end + 1, limit)
+                    if end == -1:
+                        end = limit
+                        break
+                head = mapped[:end]
+
+    try:
+        text = head.decode('utf-8')
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off at the end is dropped; other failures fall back to latin-1 like read_file
+        text = head[:e.start].decode('utf-8') if e.start >= len(head) - 3 else head.decode('latin-1')
+    return make_preview(text)
 
 def read_file(file_path: str, file_cache: Dict[str, str] = None) -> str:
     """
@@ -53,12 +167,22 @@ def read_file(file_path: str, file_cache: Dict[str, str] = None) -> str:
     Returns:
         File content as string
     """
-    if file_cache is not None and file_path in file_cache:
-        return file_cache[file_path]
+    if file_cache is not None:
+        cached = file_cache.get(file_path)
+        if cached is not None:
+            record(cache_hits=1)
+            return cached
+        record(cache_misses=1)
+
+    # Reject oversized and binary files before decoding anything
+    skip_reason = check_readable(file_path)
+    if skip_reason:
+        return f"Error reading file: {skip_reason}"
     
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
             content = file.read()
+            record(bytes_read=len(content))
             # Cache content if cache is provided
             if file_cache is not None:
                 file_cache[file_path] = content
@@ -68,6 +192,7 @@ def read_file(file_path: str, file_cache: Dict[str, str] = None) -> str:
             # Try with a different encoding
             with open(file_path, 'r', encoding='latin-1') as file:
                 content = file.read()
+                record(bytes_read=len(content))
                 if file_cache is not None:
                     file_cache[file_path] = content
                 return content
@@ -76,17 +201,22 @@ def read_file(file_path: str, file_cache: Dict[str, str] = None) -> str:
     except Exception as e:
         return f"Error reading file: {str(e)}"
 
-def get_file_summaries(repo_path: str, file_cache: Dict[str, str] = None) -> Dict[str, Dict]:
+def get_file_summaries(repo_path: str, file_cache: Dict[str, str] = None, index=None) -> Dict[str, Dict]:
     """
-    Get a brief summary of each file (first few lines + size + extension)
+    Get a brief summary of each file (structural digest, first few lines, size and extension)
     
     Args:
         repo_path: Path to the git repository
         file_cache: Optional cache dictionary to store file contents
+        index: Optional RepoIndex to serve the summaries from instead of reading every file
         
     Returns:
         Dictionary with file summaries
     """
+    if index is not None:
+        index.refresh_if_stale()
+        return index.get_file_summaries()
+
     file_paths = get_all_files(repo_path)
     print('Fetched all the code files')
     file_summaries = {}
@@ -95,19 +225,18 @@ def get_file_summaries(repo_path: str, file_cache: Dict[str, str] = None) -> Dic
         try:
             content = read_file(full_path, file_cache)
             file_size = len(content)
-            # Get first few lines (max 5) for a preview
-            preview_lines = content.split('\n')[:10]
-            preview = '\n'.join(preview_lines)
-            
-            # Truncate preview if it's too long
-            if len(preview) > 1000:
-                preview = preview[:1000] + "..."
+            preview = make_preview(content)
+            if get_language(relative_path) is None:
+                digest = build_digest(preview)
+            else:
+                digest = build_digest(content, extract_symbols(relative_path, content)[0])
             
             file_summaries[relative_path] = {
                 "path": relative_path,
                 "size": file_size,
                 "extension": os.path.splitext(relative_path)[1],
-                "preview": preview
+                "preview": preview,
+                "digest": digest
             }
         except Exception as e:
             file_summaries[relative_path] = {
@@ -115,4 +244,4 @@ def get_file_summaries(repo_path: str, file_cache: Dict[str, str] = None) -> Dic
                 "error": str(e)
             }
     
-    return file_summaries
\ No newline at end of file
+    return file_summaries
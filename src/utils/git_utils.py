@@ -0,0 +1,167 @@
+"""
+Git helper functions for the GitRepoBot application.
+"""
+
+import os
+import shutil
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from git import RemoteProgress, Repo
+from git.exc import BadName, GitCommandError
+
+from src.config.settings import CLONE_DEPTH, CLONE_FILTER
+
+
+def get_head_commit(repo_path: str) -> Optional[str]:
+    """
+    Get the commit hash currently checked out in a repository
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        Hex SHA of HEAD, or None if the path is not a repository with commits
+    """
+    try:
+        return Repo(repo_path).head.commit.hexsha
+    except (ValueError, BadName, GitCommandError):
+        return None
+    except Exception as e:
+        print(f"Could not resolve HEAD for {repo_path}: {e}")
+        return None
+
+
+def get_changed_paths(repo_path: str, old_commit: str, new_commit: str) -> Optional[List[str]]:
+    """
+    List the paths touched between two commits, including both sides of renames
+
+    Args:
+        repo_path: Path to the git repository
+        old_commit: Commit the repository was previously indexed at
+        new_commit: Commit the repository is now at
+
+    Returns:
+        Sorted list of relative paths that were added, modified, renamed or deleted,
+        or None if the diff could not be computed (e.g. the old commit is gone)
+    """
+    try:
+        repo = Repo(repo_path)
+        diff = repo.commit(old_commit).diff(repo.commit(new_commit))
+    except (ValueError, BadName, GitCommandError) as e:
+        print(f"Could not diff {old_commit}..{new_commit}: {e}")
+        return None
+
+    paths = set()
+    for change in diff:
+        if change.a_path:
+            paths.add(change.a_path)
+        if change.b_path:
+            paths.add(change.b_path)
+    return sorted(paths)
+
+
+def is_partial_clone(repo_path: str) -> bool:
+    """
+    Check whether a repository was cloned with a blob filter, so file contents of
+    older commits are only fetched from the remote on demand
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        True if the repository has a promisor remote
+    """
+    try:
+        reader = Repo(repo_path).config_reader()
+        return bool(reader.get_value("extensions", "partialclone", "")) or any(
+            reader.get_value(section, "promisor", False)
+            for section in reader.sections() if section.startswith("remote ")
+        )
+    except Exception as e:
+        print(f"Could not read the git config of {repo_path}: {e}")
+        return False
+
+
+class CloneProgress(RemoteProgress):
+    """Forward git clone/fetch progress to a callback as (stage, percent)."""
+
+    STAGES = {
+        RemoteProgress.COUNTING: "counting objects",
+        RemoteProgress.COMPRESSING: "compressing objects",
+        RemoteProgress.RECEIVING: "receiving objects",
+        RemoteProgress.RESOLVING: "resolving deltas",
+        RemoteProgress.CHECKING_OUT: "checking out files",
+    }
+
+    def __init__(self, callback: Callable[[str, Optional[float]], None]):
+        super().__init__()
+        self.callback = callback
+
+    def update(self, op_code, cur_count, max_count=None, message=''):
+        stage = self.STAGES.get(op_code & RemoteProgress.OP_MASK)
+        if stage is None:
+            return
+        percent = round(100.0 * float(cur_count) / float(max_count), 1) if max_count else None
+        self.callback(stage, percent)
+
+
+def get_clone_url(repo_url: str) -> str:
+    """
+    Turn a local repository path into a file:// URL; git ignores --depth and --filter
+    for plain local paths
+
+    Args:
+        repo_url: Remote URL or local path of the repository
+
+    Returns:
+        URL to pass to git clone
+    """
+    if os.path.isdir(repo_url):
+        return Path(repo_url).resolve().as_uri()
+    return repo_url
+
+
+def clone_or_update_repo(
+    repo_url: str,
+    repo_dir: str,
+    depth: Optional[int] = CLONE_DEPTH,
+    blob_filter: Optional[str] = CLONE_FILTER,
+    on_progress: Optional[Callable[[str, Optional[float]], None]] = None
+) -> str:
+    """
+    Clone a repository, or pull the latest changes if it was cloned before
+
+    Args:
+        repo_url: Remote URL or local path of the repository
+        repo_dir: Directory to clone into
+        depth: Number of commits to fetch (None for full history)
+        blob_filter: Partial clone filter such as "blob:none" (None to fetch everything)
+        on_progress: Optional callback receiving (stage, percent) updates
+
+    Returns:
+        Path to the local repository
+    """
+    progress = CloneProgress(on_progress) if on_progress else None
+
+    if os.path.exists(repo_dir):
+        print(f"Repository already exists at {repo_dir}. Pulling latest changes...")
+        repo = Repo(repo_dir)
+        repo.remotes.origin.pull(progress=progress)
+        print("Repository updated successfully.")
+        return repo_dir
+
+    options = {}
+    if depth:
+        options['depth'] = depth
+    if blob_filter:
+        options['filter'] = blob_filter
+    print(f"Cloning repository into {repo_dir}...")
+    try:
+        Repo.clone_from(get_clone_url(repo_url), repo_dir, progress=progress, **options)
+    except GitCommandError:
+        # Remove the partial checkout so the next attempt clones again instead of pulling
+        shutil.rmtree(repo_dir, ignore_errors=True)
+        raise
+    print("Clone completed.")
+    return repo_dir
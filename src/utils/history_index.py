@@ -0,0 +1,657 @@
+"""
+Persistent, incrementally built index of a repository's commit history for the GitRepoBot application.
+"""
+
+import codecs
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from itertools import combinations
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from git import Repo
+from git.exc import GitCommandError
+
+from src.config.settings import (
+    HISTORY_BATCH_COMMITS,
+    HISTORY_COCHANGE_MAX_FILES,
+    HISTORY_MESSAGE_CHARS,
+    HISTORY_MAX_FILES,
+    HISTORY_MAX_COMMITS,
+    HISTORY_MAX_COCHANGED,
+)
+from src.utils.git_utils import get_head_commit, is_partial_clone
+from src.utils.lexical_index import tokenize
+
+# Bump whenever the on-disk layout changes so stale history indexes are rebuilt
+HISTORY_SCHEMA_VERSION = "1"
+
+# One record per commit: a record separator, the fields separated by unit separators, and
+# a group separator after the message body, which may span several lines
+LOG_FORMAT = "%x1e%H%x1f%an%x1f%ae%x1f%at%x1f%s%x1f%b%x1d"
+
+# Queries about who changed what, when and why
+HISTORY_QUERY_PATTERNS = [
+    re.compile(r"\b(commits?|committed|committers?|authors?|authored|contributors?|contributed|blame|churn|changelog|git log)\b"),
+    re.compile(r"\bhistory\b"),
+    re.compile(r"\bwho\b.*\b(wrote|written|write|changed?|changes|modified|added|introduced|removed|created|maintains?|owns?|touched|worked|works|committed|authored|refactored)\b"),
+    re.compile(r"\b(when|why)\b.*\b(changed|added|introduced|removed|modified|renamed|deleted|rewritten|refactored|written|created)\b"),
+    re.compile(r"\b(recent|recently|latest|last)\b.*\b(changes?|changed|modified|updates?|updated)\b"),
+    re.compile(r"\b(changed?|changes|modified) (the )?(most|often|together|recently)\b"),
+]
+
+
+def is_history_query(query: str) -> bool:
+    """
+    Check whether a query asks about the commit history rather than the current code
+
+    Args:
+        query: The user's query about the repository
+
+    Returns:
+        True if the query mentions commits, authors or when/why something changed
+    """
+    lowered = query.lower()
+    return any(pattern.search(lowered) for pattern in HISTORY_QUERY_PATTERNS)
+
+
+def format_date(timestamp: Optional[int]) -> str:
+    """Format a commit timestamp as a UTC date."""
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp or 0))
+
+
+def unquote_path(path: str) -> str:
+    """Undo git's C-style quoting of paths with special characters."""
+    if len(path) > 1 and path.startswith('"') and path.endswith('"'):
+        return codecs.escape_decode(path[1:-1].encode('utf-8'))[0].decode('utf-8', errors='replace')
+    return path
+
+
+def parse_log(lines: Iterable[bytes], numstat: bool = True, message_chars: int = HISTORY_MESSAGE_CHARS) -> Iterator[Dict]:
+    """
+    Parse `git log --format=LOG_FORMAT` output one commit at a time
+
+    Args:
+        lines: Output lines, as read from the git process
+        numstat: True for --numstat output, False for --name-only output
+        message_chars: Characters of the message body kept
+
+    Yields:
+        Dictionaries with sha, author, email, time, subject, body and files, a list of
+        (path, lines_added, lines_deleted) where the line counts are None for binary
+        files and --name-only output
+    """
+    commit = None
+    header = None
+    for raw in lines:
+        line = raw.decode('utf-8', errors='replace')
+        if line.startswith('\x1e'):
+            if commit is not None:
+                yield commit
+            commit, header = None, line[1:]
+        elif header is not None:
+            header += line
+        else:
+            line = line.rstrip('\n')
+            if commit is None or not line:
+                continue
+            if numstat:
+                added, deleted, path = line.split('\t', 2)
+                commit["files"].append((
+                    unquote_path(path),
+                    int(added) if added.isdigit() else None,
+                    int(deleted) if deleted.isdigit() else None,
+                ))
+            else:
+                commit["files"].append((unquote_path(line), None, None))
+            continue
+
+        if '\x1d' in header:
+            fields = header.split('\x1d', 1)[0].split('\x1f', 5)
+            header = None
+            sha, author, email, timestamp, subject, body = fields
+            commit = {
+                "sha": sha,
+                "author": author,
+                "email": email,
+                "time": int(timestamp or 0),
+                "subject": subject,
+                "body": body.strip()[:message_chars],
+                "files": [],
+            }
+    if commit is not None:
+        yield commit
+
+
+class HistoryIndex:
+    """
+    Commit metadata, per-file churn and co-change counts of a repository in SQLite.
+
+    The history is streamed from `git log --numstat` oldest commit first and written in
+    batches, so memory stays flat however long the history is, and an interrupted run
+    picks up after the last written batch. Later updates only read the commits since the
+    last indexed one; if that commit is no longer an ancestor of HEAD (a force push),
+    the index is rebuilt.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        db_path: str,
+        batch_commits: int = HISTORY_BATCH_COMMITS,
+        cochange_max_files: int = HISTORY_COCHANGE_MAX_FILES,
+        message_chars: int = HISTORY_MESSAGE_CHARS
+    ):
+        """
+        Open (or create) the history index of a repository
+
+        Args:
+            repo_path: Path to the git repository
+            db_path: Path of the SQLite database
+            batch_commits: Commits written per transaction
+            cochange_max_files: Commits touching more files than this are left out of co-change counts
+            message_chars: Characters of each commit message body kept
+        """
+        self.repo_path = repo_path
+        self.db_path = db_path
+        self.batch_commits = batch_commits
+        self.cochange_max_files = cochange_max_files
+        self.message_chars = message_chars
+        self._lock = threading.RLock()
+        self._update_lock = threading.Lock()
+        self._path_ids: Optional[Dict[str, int]] = None
+        os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._open()
+
+    def _open(self):
+        """Create the tables, dropping them first if they were written by another schema version."""
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+            if row is None or row[0] != HISTORY_SCHEMA_VERSION:
+                for table in ("commits", "paths", "changes", "co_changes"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('schema', ?)", (HISTORY_SCHEMA_VERSION,))
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS commits (
+                    id INTEGER PRIMARY KEY,
+                    sha TEXT UNIQUE NOT NULL,
+                    author TEXT NOT NULL,
+                    email TEXT NOT NULL,
+                    time INTEGER NOT NULL,
+                    subject TEXT NOT NULL,
+                    body TEXT NOT NULL,
+                    files INTEGER NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS commits_time ON commits (time);
+                CREATE TABLE IF NOT EXISTS paths (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    commits INTEGER NOT NULL DEFAULT 0,
+                    added INTEGER NOT NULL DEFAULT 0,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    last_time INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS changes (
+                    path_id INTEGER NOT NULL,
+                    commit_id INTEGER NOT NULL,
+                    added INTEGER,
+                    deleted INTEGER,
+                    PRIMARY KEY (path_id, commit_id)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS changes_commit ON changes (commit_id);
+                CREATE TABLE IF NOT EXISTS co_changes (
+                    a INTEGER NOT NULL,
+                    b INTEGER NOT NULL,
+                    count INTEGER NOT NULL,
+                    PRIMARY KEY (a, b)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS co_changes_b ON co_changes (b);
+                """
+            )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        """Read a value from the meta table."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def indexed_commit(self) -> Optional[str]:
+        """The newest commit whose history is fully indexed."""
+        return self.get_meta("last_commit")
+
+    def reset(self):
+        """Forget the whole history."""
+        with self._lock, self._conn:
+            for table in ("commits", "paths", "changes", "co_changes"):
+                self._conn.execute(f"DELETE FROM {table}")
+            self._conn.execute("DELETE FROM meta WHERE key = 'last_commit'")
+            self._path_ids = None
+
+    def update(self) -> int:
+        """
+        Index the commits between the last indexed commit and HEAD
+
+        Returns:
+            Number of commits added
+        """
+        with self._update_lock:
+            head = get_head_commit(self.repo_path)
+            last = self.indexed_commit
+            if head is None or head == last:
+                return 0
+
+            repo = Repo(self.repo_path)
+            if last is not None:
+                try:
+                    usable = repo.is_ancestor(last, head)
+                except GitCommandError:
+                    usable = False
+                if not usable:
+                    print(f"Commit {last[:8]} is no longer in the history of HEAD; re-indexing the history...")
+                    self.reset()
+                    last = None
+
+            # Line counts need the contents of old commits, which a partial clone would fetch one
+            # blob at a time; there only the changed paths are read
+            numstat = not is_partial_clone(self.repo_path)
+            command = [
+                'git', '-c', 'core.quotepath=off', 'log', '--topo-order', '--reverse', '--no-renames',
+                f'--format={LOG_FORMAT}', '--numstat' if numstat else '--name-only',
+                f"{last}..{head}" if last else head,
+            ]
+            print(f"Indexing commit history {'since ' + last[:8] if last else 'from the first commit'}...")
+            process = repo.git.execute(command, as_process=True)
+            added, batch = 0, []
+            for commit in parse_log(process.stdout, numstat, self.message_chars):
+                batch.append(commit)
+                if len(batch) >= self.batch_commits:
+                    added += self._write(batch)
+                    batch = []
+            added += self._write(batch)
+            try:
+                process.wait()
+            except GitCommandError as e:
+                # HEAD is not recorded as indexed; the commits written so far stay and are
+                # skipped when the next update reads them again
+                print(f"git log failed after {added} commits (exit code {e.status}): {e.stderr.strip()}")
+                with self._lock:
+                    self._path_ids = None
+                raise
+
+            with self._lock, self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_commit', ?)", (head,))
+                # The path ids are only needed while writing
+                self._path_ids = None
+            print(f"Indexed {added} commits up to {head[:8]}")
+            return added
+
+    def _path_id(self, path: str) -> int:
+        """Get the id of a path, adding it if it is new; called inside a write transaction."""
+        if self._path_ids is None:
+            self._path_ids = dict((path, path_id) for path_id, path in self._conn.execute("SELECT id, path FROM paths"))
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = self._conn.execute("INSERT INTO paths (path) VALUES (?)", (path,)).lastrowid
+            self._path_ids[path] = path_id
+        return path_id
+
+    def _write(self, batch: List[Dict]) -> int:
+        """
+        Store a batch of commits with their churn and co-change counts in one transaction,
+        and record the last of them as indexed
+
+        Args:
+            batch: Commits from parse_log, oldest first
+
+        Returns:
+            Number of commits that were not indexed before
+        """
+        if not batch:
+            return 0
+        with self._lock:
+            try:
+                return self._write_batch(batch)
+            except Exception:
+                # Paths added by the rolled back transaction are gone again
+                self._path_ids = None
+                raise
+
+    def _write_batch(self, batch: List[Dict]) -> int:
+        """Write a batch; see _write."""
+        written = 0
+        churn: Dict[int, List[int]] = {}
+        co_changes = Counter()
+        with self._conn:
+            for commit in batch:
+                # Commits of a batch interrupted before it was committed are not in the index;
+                # commits on side branches may have been written by an earlier run
+                if self._conn.execute("SELECT 1 FROM commits WHERE sha = ?", (commit["sha"],)).fetchone():
+                    continue
+                files = commit["files"]
+                commit_id = self._conn.execute(
+                    "INSERT INTO commits (sha, author, email, time, subject, body, files) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (commit["sha"], commit["author"], commit["email"], commit["time"], commit["subject"], commit["body"], len(files))
+                ).lastrowid
+                path_ids = []
+                for path, lines_added, lines_deleted in files:
+                    path_id = self._path_id(os.path.normpath(path))
+                    path_ids.append(path_id)
+                    self._conn.execute(
+                        "INSERT OR IGNORE INTO changes (path_id, commit_id, added, deleted) VALUES (?, ?, ?, ?)",
+                        (path_id, commit_id, lines_added, lines_deleted)
+                    )
+                    stats = churn.setdefault(path_id, [0, 0, 0, 0])
+                    stats[0] += 1
+                    stats[1] += lines_added or 0
+                    stats[2] += lines_deleted or 0
+                    stats[3] = max(stats[3], commit["time"])
+                if len(path_ids) <= self.cochange_max_files:
+                    co_changes.update(combinations(sorted(set(path_ids)), 2))
+                written += 1
+
+            self._conn.executemany(
+                """
+                UPDATE paths SET commits = commits + ?, added = added + ?, deleted = deleted + ?,
+                    last_time = MAX(last_time, ?)
+                WHERE id = ?
+                """,
+                [(*stats, path_id) for path_id, stats in churn.items()]
+            )
+            self._conn.executemany(
+                """
+                INSERT INTO co_changes (a, b, count) VALUES (?, ?, ?)
+                ON CONFLICT (a, b) DO UPDATE SET count = count + excluded.count
+                """,
+                [(a, b, count) for (a, b), count in co_changes.items()]
+            )
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_commit', ?)", (batch[-1]["sha"],))
+        return written
+
+    def stats(self) -> Dict:
+        """
+        Get index counters
+
+        Returns:
+            Dictionary with the commits and paths indexed and the last indexed commit
+        """
+        with self._lock:
+            commits = self._conn.execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+            paths = self._conn.execute("SELECT COUNT(*) FROM paths").fetchone()[0]
+        return {"commits": commits, "paths": paths, "last_commit": self.indexed_commit}
+
+    def churn(self, paths: List[str]) -> Dict[str, int]:
+        """
+        Get the number of commits that touched each path
+
+        Args:
+            paths: Relative paths
+
+        Returns:
+            Dictionary mapping the paths that have history to their commit counts
+        """
+        counts = {}
+        with self._lock:
+            for start in range(0, len(paths), 500):
+                chunk = paths[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT path, commits FROM paths WHERE path IN ({','.join('?' * len(chunk))})", chunk
+                )
+                counts.update(rows)
+        return counts
+
+    def co_changed(self, paths: List[str], limit: int = HISTORY_MAX_COCHANGED) -> List[Tuple[str, int]]:
+        """
+        Find the files most often changed in the same commits as the given files
+
+        Args:
+            paths: Relative paths
+            limit: Maximum number of files
+
+        Returns:
+            List of (path, commits in common with any of the given files), most first,
+            without the given files
+        """
+        counts = Counter()
+        with self._lock:
+            for path in paths:
+                row = self._conn.execute("SELECT id FROM paths WHERE path = ?", (path,)).fetchone()
+                if row is None:
+                    continue
+                rows = self._conn.execute(
+                    """
+                    SELECT p.path, c.count FROM co_changes c JOIN paths p ON p.id = c.b WHERE c.a = ?
+                    UNION ALL
+                    SELECT p.path, c.count FROM co_changes c JOIN paths p ON p.id = c.a WHERE c.b = ?
+                    """,
+                    (row[0], row[0])
+                )
+                for other, count in rows:
+                    counts[other] += count
+        for path in paths:
+            counts.pop(path, None)
+        return counts.most_common(limit)
+
+    def _commits(self, where: str, params: tuple, order: str = "c.time DESC", limit: int = HISTORY_MAX_COMMITS) -> List[Dict]:
+        """Select commits as dictionaries."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT c.id, c.sha, c.author, c.time, c.subject, c.body, c.files FROM commits c WHERE {where} ORDER BY {order} LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+        keys = ("id", "sha", "author", "time", "subject", "body", "files")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def file_history(self, path: str, limit: int = HISTORY_MAX_COMMITS) -> List[Dict]:
+        """
+        Get the latest commits that touched a file
+
+        Args:
+            path: Relative path
+            limit: Maximum number of commits
+
+        Returns:
+            Commits, newest first, with the lines they added and deleted in the file
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT c.sha, c.author, c.time, c.subject, c.body, ch.added, ch.deleted
+                FROM changes ch JOIN commits c ON c.id = ch.commit_id JOIN paths p ON p.id = ch.path_id
+                WHERE p.path = ? ORDER BY c.time DESC LIMIT ?
+                """,
+                (path, limit)
+            ).fetchall()
+        keys = ("sha", "author", "time", "subject", "body", "added", "deleted")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def file_summary(self, path: str) -> Optional[Dict]:
+        """
+        Get the churn and authors of a file
+
+        Args:
+            path: Relative path
+
+        Returns:
+            Dictionary with commits, added, deleted, last_time and authors, a list of
+            (author, commits) with the most active first; None if the file has no history
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, commits, added, deleted, last_time FROM paths WHERE path = ?", (path,)
+            ).fetchone()
+            if row is None:
+                return None
+            authors = self._conn.execute(
+                """
+                SELECT c.author, COUNT(*) AS n FROM changes ch JOIN commits c ON c.id = ch.commit_id
+                WHERE ch.path_id = ? GROUP BY c.author ORDER BY n DESC LIMIT 5
+                """,
+                (row[0],)
+            ).fetchall()
+        return {"commits": row[1], "added": row[2], "deleted": row[3], "last_time": row[4], "authors": authors}
+
+    def commit_files(self, commit_id: int, limit: int = 10) -> List[str]:
+        """List up to limit paths changed by a commit."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.path FROM changes ch JOIN paths p ON p.id = ch.path_id WHERE ch.commit_id = ? LIMIT ?",
+                (commit_id, limit)
+            )
+            return [path for path, in rows]
+
+    def search_commits(self, query: str, limit: int = HISTORY_MAX_COMMITS) -> List[Dict]:
+        """
+        Find the commits whose message or author mentions the most terms of a query
+
+        Args:
+            query: The user's query about the repository
+            limit: Maximum number of commits
+
+        Returns:
+            Matching commits, most matching terms first, then newest first
+        """
+        terms = sorted(set(term for term in tokenize(query) if len(term) > 2))[:10]
+        if not terms:
+            return []
+        score = " + ".join(["(c.subject LIKE ? OR c.body LIKE ? OR c.author LIKE ?)"] * len(terms))
+        params = tuple(f"%{term}%" for term in terms for _ in range(3))
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT c.id, {score} AS score FROM commits c WHERE score > 0 ORDER BY score DESC, c.time DESC LIMIT ?",
+                params + (limit,)
+            ).fetchall()
+        order = {commit_id: rank for rank, (commit_id, _) in enumerate(rows)}
+        if not order:
+            return []
+        commits = self._commits(f"c.id IN ({','.join('?' * len(order))})", tuple(order), limit=limit)
+        return sorted(commits, key=lambda commit: order[commit["id"]])
+
+    def top_authors(self, limit: int = 10) -> List[Tuple[str, int, int, int]]:
+        """
+        Get the authors with the most commits
+
+        Args:
+            limit: Maximum number of authors
+
+        Returns:
+            List of (author, commits, first commit time, last commit time)
+        """
+        with self._lock:
+            return self._conn.execute(
+                """
+                SELECT author, COUNT(*) AS n, MIN(time), MAX(time) FROM commits
+                GROUP BY author ORDER BY n DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+
+    def hot_files(self, limit: int = 10) -> List[Tuple[str, int, int]]:
+        """
+        Get the files changed in the most commits
+
+        Args:
+            limit: Maximum number of files
+
+        Returns:
+            List of (path, commits, lines added plus deleted)
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT path, commits, added + deleted FROM paths ORDER BY commits DESC LIMIT ?", (limit,)
+            ).fetchall()
+
+    def format_commit(self, commit: Dict, with_files: bool = False) -> str:
+        """Describe a commit on one line, with its message body and files underneath."""
+        text = f"- {commit['sha'][:8]} {format_date(commit['time'])} {commit['author']}: {commit['subject']}"
+        if commit.get("added") is not None or commit.get("deleted") is not None:
+            text += f" (+{commit.get('added') or 0}/-{commit.get('deleted') or 0})"
+        if commit["body"]:
+            text += "\n    " + commit["body"].replace("\n", "\n    ")
+        if with_files:
+            files = self.commit_files(commit["id"])
+            if files:
+                more = f" and {commit['files'] - len(files)} more" if commit["files"] > len(files) else ""
+                text += f"\n    files: {', '.join(files)}{more}"
+        return text
+
+    def describe(
+        self,
+        query: str,
+        paths: List[str] = (),
+        max_files: int = HISTORY_MAX_FILES,
+        max_commits: int = HISTORY_MAX_COMMITS,
+        max_cochanged: int = HISTORY_MAX_COCHANGED
+    ) -> str:
+        """
+        Describe the history relevant to a query: that of the given files, or of the whole
+        repository when there are none, followed by the commits whose messages match the query
+
+        Args:
+            query: The user's query about the repository
+            paths: Relative paths the query is about
+            max_files: Maximum number of files described
+            max_commits: Maximum number of commits listed per section
+            max_cochanged: Maximum number of co-changed files listed per file
+
+        Returns:
+            History text for the aggregator, or "" if nothing is indexed
+        """
+        stats = self.stats()
+        if not stats["commits"]:
+            return ""
+        sections = []
+        described = 0
+        for path in paths:
+            if described >= max_files:
+                break
+            summary = self.file_summary(path)
+            if summary is None:
+                continue
+            described += 1
+            lines = [
+                f"{path}: changed in {summary['commits']} commits (+{summary['added']}/-{summary['deleted']} lines), "
+                f"last on {format_date(summary['last_time'])}",
+                "Authors: " + ", ".join(f"{author} ({count} commits)" for author, count in summary["authors"]),
+            ]
+            co_changed = self.co_changed([path], max_cochanged)
+            if co_changed:
+                lines.append("Often changed together with: " + ", ".join(f"{other} ({count})" for other, count in co_changed))
+            lines.append("Latest commits:")
+            lines.extend(self.format_commit(commit) for commit in self.file_history(path, max_commits))
+            sections.append("\n".join(lines))
+
+        if not described:
+            with self._lock:
+                first, last = self._conn.execute("SELECT MIN(time), MAX(time) FROM commits").fetchone()
+            lines = [
+                f"{stats['commits']} commits from {format_date(first)} to {format_date(last)}",
+                "Top authors: " + ", ".join(
+                    f"{author} ({count} commits, {format_date(first_time)} to {format_date(last_time)})"
+                    for author, count, first_time, last_time in self.top_authors()
+                ),
+                "Most frequently changed files: " + ", ".join(
+                    f"{path} ({count} commits)" for path, count, _ in self.hot_files()
+                ),
+                "Latest commits:",
+            ]
+            lines.extend(self.format_commit(commit, with_files=True) for commit in self._commits("1", (), limit=max_commits))
+            sections.append("\n".join(lines))
+
+        matches = self.search_commits(query, max_commits)
+        if matches:
+            sections.append("Commits matching the query:\n" + "\n".join(self.format_commit(commit, with_files=True) for commit in matches))
+        return "\n\n".join(sections)
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,177 @@
+"""
+In-process BM25 index used to pre-rank repository files before LLM file selection.
+"""
+
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from src.config.settings import BM25_K1, BM25_B
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+CAMEL_CASE_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+STOP_WORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'can', 'do', 'does', 'for', 'from', 'how',
+    'i', 'in', 'is', 'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'what', 'where',
+    'which', 'who', 'why', 'with', 'you', 'me', 'my', 'we', 'our', 'there', 'these', 'those',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase search terms. Identifiers are kept whole and also
+    broken into their snake_case / camelCase parts so "parseConfig" matches "config".
+
+    Args:
+        text: Text to tokenize
+
+    Returns:
+        List of terms (with repetitions)
+    """
+    terms = []
+    for identifier in IDENTIFIER_RE.findall(text):
+        lowered = identifier.lower()
+        if lowered in STOP_WORDS:
+            continue
+        terms.append(lowered)
+        parts = [part.lower() for piece in identifier.split('_') for part in CAMEL_CASE_RE.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1 and part not in STOP_WORDS)
+    return terms
+
+
+class BM25Index:
+    """
+    Inverted index scoring chunks with BM25 and ranking files by their best chunk.
+
+    Every file contributes one document for its path and one document per text chunk.
+    A file's score is its best chunk score plus the score of its path document.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Create an empty index
+
+        Args:
+            k1: BM25 term frequency saturation parameter
+            b: BM25 length normalisation parameter
+        """
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.doc_terms: Dict[int, Counter] = {}
+        self.doc_length: Dict[int, int] = {}
+        self.doc_path: Dict[int, str] = {}
+        self.doc_is_path: Dict[int, bool] = {}
+        self.file_docs: Dict[str, List[int]] = {}
+        self.total_length = 0
+        self.posting_count = 0
+        self._next_doc_id = 0
+
+    def __len__(self) -> int:
+        return len(self.file_docs)
+
+    def __contains__(self, path: str) -> bool:
+        return path in self.file_docs
+
+    def memory_estimate(self) -> int:
+        """
+        Roughly estimate the memory held by the index
+
+        Returns:
+            Approximate size in bytes
+        """
+        # Each posting appears in a postings dict and a per-document Counter
+        return self.posting_count * 200 + len(self.doc_terms) * 400
+
+    def _add_document(self, path: str, text: str, is_path: bool) -> int:
+        doc_id = self._next_doc_id
+        self._next_doc_id += 1
+        terms = Counter(tokenize(text))
+        self.doc_terms[doc_id] = terms
+        self.doc_length[doc_id] = sum(terms.values())
+        self.doc_path[doc_id] = path
+        self.doc_is_path[doc_id] = is_path
+        self.total_length += self.doc_length[doc_id]
+        for term, frequency in terms.items():
+            self.postings.setdefault(term, {})[doc_id] = frequency
+        self.posting_count += len(terms)
+        return doc_id
+
+    def add_file(self, path: str, chunks: List[str]):
+        """
+        Index (or re-index) a file
+
+        Args:
+            path: Relative path of the file
+            chunks: Text chunks of the file content
+        """
+        self.remove_file(path)
+        # Path separators and extensions become separate terms ("src/utils/file_utils.py")
+        doc_ids = [self._add_document(path, re.sub(r"[/\\.\-]", " ", path), True)]
+        doc_ids.extend(self._add_document(path, chunk, False) for chunk in chunks)
+        self.file_docs[path] = doc_ids
+
+    def remove_file(self, path: str):
+        """
+        Remove a file from the index if present
+
+        Args:
+            path: Relative path of the file
+        """
+        for doc_id in self.file_docs.pop(path, []):
+            terms = self.doc_terms.pop(doc_id)
+            self.total_length -= self.doc_length.pop(doc_id)
+            self.posting_count -= len(terms)
+            for term in terms:
+                postings = self.postings[term]
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+            del self.doc_path[doc_id]
+            del self.doc_is_path[doc_id]
+
+    def search(self, query: str, top_k: int = None) -> List[Tuple[str, float]]:
+        """
+        Rank files against a query
+
+        Args:
+            query: Free-text query
+            top_k: Optional maximum number of files to return
+
+        Returns:
+            List of (path, score) tuples for files with a positive score, best first
+        """
+        doc_count = len(self.doc_terms)
+        if not doc_count:
+            return []
+        average_length = self.total_length / doc_count or 1.0
+
+        doc_scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                length = self.doc_length[doc_id]
+                norm = frequency + self.k1 * (1 - self.b + self.b * length / average_length)
+                doc_scores[doc_id] = doc_scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / norm
+
+        best_chunk: Dict[str, float] = {}
+        path_score: Dict[str, float] = {}
+        for doc_id, score in doc_scores.items():
+            path = self.doc_path[doc_id]
+            if self.doc_is_path[doc_id]:
+                path_score[path] = score
+            elif score > best_chunk.get(path, 0.0):
+                best_chunk[path] = score
+
+        file_scores = {
+            path: best_chunk.get(path, 0.0) + path_score.get(path, 0.0)
+            for path in set(best_chunk) | set(path_score)
+        }
+        ranked = sorted(file_scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[:top_k] if top_k else ranked
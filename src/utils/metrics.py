@@ -0,0 +1,235 @@
+"""
+Tracing of query pipeline stages and Prometheus-style metrics for the GitRepoBot application.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Counters every span can accumulate
+SPAN_COUNTERS = ("prompt_tokens", "completion_tokens", "bytes_read", "cache_hits", "cache_misses", "coalesced")
+
+# Upper bounds, in seconds, of the stage duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed stage of a trace, with counters of the work done directly inside it
+    and the spans of its sub-stages.
+    """
+
+    def __init__(self, name: str, parent: Optional["Span"] = None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.attributes = attributes
+        self.counters: Dict[str, int] = dict.fromkeys(SPAN_COUNTERS, 0)
+        self.children: List[Span] = []
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._lock = threading.Lock()
+        if parent is not None:
+            with parent._lock:
+                parent.children.append(self)
+
+    def add(self, **counts: int):
+        """Add to the span's counters."""
+        with self._lock:
+            for key, value in counts.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def totals(self) -> Dict[str, int]:
+        """Counters of this span and all of its sub-stages."""
+        with self._lock:
+            totals = dict(self.counters)
+            children = list(self.children)
+        for child in children:
+            for key, value in child.totals().items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def to_dict(self) -> Dict[str, object]:
+        """
+        Describe the span and its sub-stages for a per-request trace
+
+        Returns:
+            Dictionary with name, duration in milliseconds, attributes, totals and children
+        """
+        with self._lock:
+            children = list(self.children)
+        duration = self.duration if self.duration is not None else time.perf_counter() - self.start
+        description = {
+            "name": self.name,
+            "duration_ms": round(duration * 1000, 1),
+            **{key: value for key, value in self.totals().items() if value},
+        }
+        if self.attributes:
+            description["attributes"] = self.attributes
+        if children:
+            description["children"] = [child.to_dict() for child in children]
+        return description
+
+
+class MetricsRegistry:
+    """
+    Process-wide aggregates of finished spans per stage, rendered in the Prometheus
+    text exposition format together with gauges sampled at scrape time.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = buckets
+        self._bucket_counts: Dict[str, List[int]] = defaultdict(lambda: [0] * len(self.buckets))
+        self._duration_count: Dict[str, int] = defaultdict(int)
+        self._duration_sum: Dict[str, float] = defaultdict(float)
+        self._counters: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._gauges: Dict[str, Tuple[str, Callable]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, span: Span):
+        """Add a finished span's duration and own counters to its stage's aggregates."""
+        with self._lock:
+            self._duration_count[span.name] += 1
+            self._duration_sum[span.name] += span.duration
+            counts = self._bucket_counts[span.name]
+            for i, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    counts[i] += 1
+            for key, value in span.counters.items():
+                if value:
+                    self._counters[(span.name, key)] += value
+
+    def register_gauge(self, name: str, help_text: str, fn: Callable[[], Union[float, List[Tuple[Dict[str, str], float]]]]):
+        """
+        Sample a value at every scrape
+
+        Args:
+            name: Metric name
+            help_text: Metric description
+            fn: Returns the value, or a list of (labels, value) pairs
+        """
+        with self._lock:
+            self._gauges[name] = (help_text, fn)
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Returns:
+            Metrics text
+        """
+        with self._lock:
+            stages = sorted(self._duration_count)
+            bucket_counts = {stage: list(self._bucket_counts[stage]) for stage in stages}
+            duration_count = dict(self._duration_count)
+            duration_sum = dict(self._duration_sum)
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+
+        lines = [
+            "# HELP raggit_stage_duration_seconds Wall time of query pipeline stages",
+            "# TYPE raggit_stage_duration_seconds histogram",
+        ]
+        for stage in stages:
+            for bound, count in zip(self.buckets, bucket_counts[stage]):
+                lines.append(f'raggit_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {count}')
+            lines.append(f'raggit_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {duration_count[stage]}')
+            lines.append(f'raggit_stage_duration_seconds_sum{{stage="{stage}"}} {duration_sum[stage]:.6f}')
+            lines.append(f'raggit_stage_duration_seconds_count{{stage="{stage}"}} {duration_count[stage]}')
+
+        for key in SPAN_COUNTERS:
+            lines.append(f"# HELP raggit_stage_{key}_total {key.replace('_', ' ').capitalize()} per pipeline stage")
+            lines.append(f"# TYPE raggit_stage_{key}_total counter")
+            for (stage, counter_key), value in sorted(counters.items()):
+                if counter_key == key:
+                    lines.append(f'raggit_stage_{key}_total{{stage="{stage}"}} {value}')
+
+        for name, (help_text, fn) in sorted(gauges.items()):
+            try:
+                value = fn()
+            except Exception as e:
+                print(f"Could not sample metric {name}: {e}")
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            samples = value if isinstance(value, list) else [({}, value)]
+            for labels, sample in samples:
+                label_text = ",".join(
+                    f'{key}="{str(label).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+                    for key, label in sorted(labels.items())
+                )
+                lines.append(f"{name}{{{label_text}}} {sample}" if label_text else f"{name} {sample}")
+
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics_registry() -> MetricsRegistry:
+    """
+    Get the process-wide metrics registry
+
+    Returns:
+        The shared MetricsRegistry
+    """
+    return _registry
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Time a pipeline stage as a child of the current span, or as the root of a new trace
+
+    Args:
+        name: Stage name, used as the metrics label
+        **attributes: Extra details shown in the per-request trace
+
+    Yields:
+        The span, which stays current for the block and for work it hands to run_concurrently
+    """
+    current = Span(name, parent=_current_span.get(), **attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    finally:
+        _current_span.reset(token)
+        current.duration = time.perf_counter() - current.start
+        _registry.observe(current)
+
+
+def traced(name: str) -> Callable:
+    """
+    Decorator running every call of a function inside span(name)
+
+    Args:
+        name: Stage name
+
+    Returns:
+        The decorator
+    """
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(**counts: int):
+    """
+    Add counters (prompt_tokens, completion_tokens, bytes_read, cache_hits, cache_misses,
+    coalesced) to the current span; does nothing outside a trace
+
+    Args:
+        **counts: Amounts to add
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.add(**counts)
@@ -0,0 +1,425 @@
+"""
+Persistent on-disk index of repository files for the GitRepoBot application.
+"""
+
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import INDEX_DIR_NAME, INDEX_REFRESH_INTERVAL, MMAP_THRESHOLD, DIGEST_TOKEN_BUDGET
+from src.utils.file_utils import get_cache_dir, is_code_file, check_readable, read_preview
+from src.utils.scanner import RepoScanner
+from src.utils.symbols import Definition, get_language, extract_symbols
+from src.utils.digest import build_digest
+from src.utils.metrics import record
+
+# Bump whenever the table layout changes so stale index files are rebuilt
+INDEX_SCHEMA_VERSION = "3"
+
+
+def hash_content(data: bytes) -> str:
+    """
+    Compute the content hash stored for each indexed file
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        Hex digest of the content
+    """
+    return hashlib.sha1(data).hexdigest()
+
+
+def hash_file(file_path: str, size: int) -> str:
+    """
+    Compute the content hash of a file, memory-mapping large files instead of copying them
+
+    Args:
+        file_path: Path to the file
+        size: File size from a stat call
+
+    Returns:
+        Hex digest of the content, equal to hash_content of the file bytes
+    """
+    with open(file_path, 'rb') as file:
+        if size < MMAP_THRESHOLD:
+            return hash_content(file.read())
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha1(mapped).hexdigest()
+
+
+def get_index_path(repo_path: str) -> str:
+    """
+    Get the location of the index database for a repository
+
+    Args:
+        repo_path: Path to the git repository
+
+    Returns:
+        Path to the SQLite index file under the cache directory
+    """
+    index_dir = os.path.join(get_cache_dir(), INDEX_DIR_NAME)
+    os.makedirs(index_dir, exist_ok=True)
+    repo_key = hashlib.sha1(os.path.abspath(repo_path).encode('utf-8')).hexdigest()[:16]
+    name = os.path.basename(os.path.abspath(repo_path)) or "repo"
+    return os.path.join(index_dir, f"{name}-{repo_key}.sqlite")
+
+
+class RepoIndex:
+    """
+    SQLite-backed index of the code files in a repository.
+
+    Each row stores the path, size, mtime, extension, preview and content hash of a file,
+    alongside the symbols the file defines and the names it references. Structural digests
+    are stored once per content hash.
+    A refresh only stats the files on disk and re-reads those whose size or mtime changed.
+    """
+
+    def __init__(self, repo_path: str, index_path: Optional[str] = None):
+        """
+        Open (or create) the index for a repository
+
+        Args:
+            repo_path: Path to the git repository
+            index_path: Optional explicit location of the index database
+        """
+        self.repo_path = repo_path
+        self.index_path = index_path or get_index_path(repo_path)
+        self.last_refresh = 0.0
+        # Lists the repository's code files for full refreshes
+        self.scanner = RepoScanner(repo_path)
+        self._last_listing: Optional[Dict[str, str]] = None
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False, timeout=30)
+        # WAL lets several server processes read while one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._init_schema()
+
+    def _init_schema(self):
+        """Create the tables, dropping an index written by an incompatible version."""
+        # Digests are rebuilt along with everything else when their size changes
+        schema_version = f"{INDEX_SCHEMA_VERSION}/digest-{DIGEST_TOKEN_BUDGET}"
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is None or row[0] != schema_version:
+                for table in ("files", "symbols", "symbol_refs", "digests"):
+                    self._conn.execute(f"DROP TABLE IF EXISTS {table}")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.execute(
+                    "INSERT INTO meta (key, value) VALUES ('schema_version', ?)", (schema_version,)
+                )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    extension TEXT NOT NULL,
+                    preview TEXT NOT NULL,
+                    hash TEXT NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS symbols (
+                    path TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    qualname TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    start_line INTEGER NOT NULL,
+                    end_line INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_qualname ON symbols (qualname)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbols_path ON symbols (path)")
+            # Lines of a file using a name, as comma-separated line numbers
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS symbol_refs (
+                    name TEXT NOT NULL,
+                    path TEXT NOT NULL,
+                    lines TEXT NOT NULL,
+                    PRIMARY KEY (name, path)
+                ) WITHOUT ROWID
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS symbol_refs_path ON symbol_refs (path)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS digests (hash TEXT PRIMARY KEY, digest TEXT NOT NULL)")
+
+    def get_meta(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """Read a value from the index metadata table."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key: str, value: str):
+        """Write a value to the index metadata table."""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _index_file(self, relative_path: str, full_path: str, stat: os.stat_result) -> Tuple[Tuple, Optional[Tuple], Optional[str]]:
+        """
+        Build the index row of a file, extract its symbols and digest it. Files without a
+        symbol extractor are hashed without decoding more than their preview.
+
+        Returns:
+            Tuple of (file row, (definitions, references) or None, digest or None if one
+            is already stored for the content hash)
+        """
+        # Hashing reads the whole file
+        record(bytes_read=stat.st_size)
+        preview = read_preview(full_path, stat.st_size)
+        symbols = None
+        content = None
+        if get_language(relative_path) is None:
+            content_hash = hash_file(full_path, stat.st_size)
+        else:
+            with open(full_path, 'rb') as file:
+                data = file.read()
+            content_hash = hash_content(data)
+            content = data.decode('utf-8', errors='replace')
+            symbols = extract_symbols(relative_path, content)
+
+        digest = None
+        if self._conn.execute("SELECT 1 FROM digests WHERE hash = ?", (content_hash,)).fetchone() is None:
+            digest = build_digest(preview, None) if symbols is None else build_digest(content, symbols[0])
+
+        row = (
+            relative_path,
+            stat.st_size,
+            stat.st_mtime_ns,
+            os.path.splitext(relative_path)[1],
+            preview,
+            content_hash,
+        )
+        return row, symbols, digest
+
+    def refresh(self, paths: Optional[List[str]] = None) -> Tuple[List[str], List[str]]:
+        """
+        Bring the index up to date with the files on disk
+
+        Args:
+            paths: Optional relative paths to re-index; when omitted the whole repository is
+                scanned and only files whose size or mtime changed are re-read
+
+        Returns:
+            Tuple of (changed_or_added_paths, removed_paths)
+        """
+        with self._lock:
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in self._conn.execute("SELECT path, size, mtime_ns FROM files")
+            }
+
+            if paths is None:
+                candidates = self.scanner.scan()
+                if candidates is self._last_listing:
+                    # Same memoized listing as the previous refresh in this query
+                    return [], []
+                self._last_listing = candidates
+                missing = [path for path in known if path not in candidates]
+            else:
+                candidates = {}
+                missing = []
+                for path in paths:
+                    full_path = os.path.join(self.repo_path, path)
+                    if is_code_file(path) and os.path.isfile(full_path):
+                        candidates[path] = full_path
+                        # Explicitly requested paths are always re-read
+                        known.pop(path, None)
+                    elif path in known:
+                        missing.append(path)
+
+            changed_rows = []
+            symbol_rows = []
+            reference_rows = []
+            digest_rows = {}
+            for relative_path, full_path in candidates.items():
+                try:
+                    stat = os.stat(full_path)
+                except OSError:
+                    if relative_path in known:
+                        missing.append(relative_path)
+                    continue
+                if known.get(relative_path) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                skip_reason = check_readable(full_path, stat.st_size)
+                if skip_reason:
+                    if relative_path in known:
+                        missing.append(relative_path)
+                    continue
+                try:
+                    row, symbols, digest = self._index_file(relative_path, full_path, stat)
+                except OSError as e:
+                    print(f"Skipping unreadable file {relative_path}: {e}")
+                    continue
+                changed_rows.append(row)
+                if digest is not None:
+                    digest_rows[row[5]] = digest
+                if symbols is not None:
+                    definitions, references = symbols
+                    symbol_rows.extend((relative_path, *definition) for definition in definitions)
+                    reference_rows.extend(
+                        (name, relative_path, ",".join(map(str, lines))) for name, lines in references.items()
+                    )
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO files (path, size, mtime_ns, extension, preview, hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    changed_rows,
+                )
+                self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in missing])
+                stale = [(row[0],) for row in changed_rows] + [(path,) for path in missing]
+                self._conn.executemany("DELETE FROM symbols WHERE path = ?", stale)
+                self._conn.executemany("DELETE FROM symbol_refs WHERE path = ?", stale)
+                self._conn.executemany(
+                    "INSERT INTO symbols (path, name, qualname, kind, start_line, end_line) VALUES (?, ?, ?, ?, ?, ?)",
+                    symbol_rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO symbol_refs (name, path, lines) VALUES (?, ?, ?)",
+                    reference_rows,
+                )
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO digests (hash, digest) VALUES (?, ?)", digest_rows.items()
+                )
+                if changed_rows or missing:
+                    # Drop digests of content no file has any more
+                    self._conn.execute("DELETE FROM digests WHERE hash NOT IN (SELECT hash FROM files)")
+
+            if paths is None:
+                self.last_refresh = time.time()
+
+        changed = [row[0] for row in changed_rows]
+        if changed or missing:
+            print(f"Index refreshed: {len(changed)} updated, {len(missing)} removed")
+        return changed, missing
+
+    def mark_fresh(self):
+        """Record that the index is known to match the working tree without re-scanning it."""
+        self.last_refresh = time.time()
+
+    def refresh_if_stale(self) -> Tuple[List[str], List[str]]:
+        """
+        Re-scan the repository if the last full refresh is older than INDEX_REFRESH_INTERVAL
+
+        Returns:
+            Tuple of (changed_or_added_paths, removed_paths)
+        """
+        if time.time() - self.last_refresh < INDEX_REFRESH_INTERVAL:
+            return [], []
+        return self.refresh()
+
+    def get_all_files(self) -> Dict[str, str]:
+        """
+        Get all indexed files
+
+        Returns:
+            Dictionary mapping relative paths to full paths
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT path FROM files ORDER BY path").fetchall()
+        return {path: os.path.join(self.repo_path, path) for (path,) in rows}
+
+    def get_file_summaries(self) -> Dict[str, Dict]:
+        """
+        Get the stored summary of every indexed file
+
+        Returns:
+            Dictionary with file summaries, in the same shape as file_utils.get_file_summaries
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT files.path, files.size, files.mtime_ns, files.extension, files.preview, files.hash, "
+                "digests.digest FROM files LEFT JOIN digests ON digests.hash = files.hash ORDER BY files.path"
+            ).fetchall()
+        return {
+            path: {
+                "path": path,
+                "size": size,
+                "mtime_ns": mtime_ns,
+                "extension": extension,
+                "preview": preview,
+                "hash": content_hash,
+                "digest": digest if digest is not None else preview,
+            }
+            for path, size, mtime_ns, extension, preview, content_hash, digest in rows
+        }
+
+    def get_hashes(self) -> Dict[str, str]:
+        """Get the stored content hash of every indexed file."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT path, hash FROM files"))
+
+    def get_hash(self, relative_path: str) -> Optional[str]:
+        """Get the stored content hash of a file, or None if it is not indexed."""
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM files WHERE path = ?", (relative_path,)).fetchone()
+        return row[0] if row else None
+
+    def find_definitions(self, identifier: str) -> List[Tuple[str, Definition]]:
+        """
+        Find where a name is defined
+
+        Args:
+            identifier: A plain name such as "refresh", or a dotted one such as
+                "RepoIndex.refresh" that must match the end of the qualified name
+
+        Returns:
+            List of (path, (name, qualname, kind, start_line, end_line)), ordered by path and line
+        """
+        name = identifier.split('.')[-1]
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, name, qualname, kind, start_line, end_line FROM symbols WHERE name = ? "
+                "ORDER BY path, start_line",
+                (name,),
+            ).fetchall()
+        if '.' in identifier:
+            rows = [row for row in rows if row[2] == identifier or row[2].endswith('.' + identifier)]
+        return [(row[0], tuple(row[1:])) for row in rows]
+
+    def find_references(self, name: str) -> Dict[str, List[int]]:
+        """
+        Find the files using a name
+
+        Args:
+            name: Plain name to look up
+
+        Returns:
+            Dictionary mapping relative paths to the lines referencing the name
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT path, lines FROM symbol_refs WHERE name = ?", (name,)).fetchall()
+        return {path: [int(line) for line in lines.split(',')] for path, lines in rows}
+
+    def get_symbols(self, relative_path: str) -> List[Definition]:
+        """
+        Get the definitions of a file
+
+        Args:
+            relative_path: Path relative to the repository root
+
+        Returns:
+            List of (name, qualname, kind, start_line, end_line) in line order
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, qualname, kind, start_line, end_line FROM symbols WHERE path = ? ORDER BY start_line",
+                (relative_path,),
+            ).fetchall()
+        return [tuple(row) for row in rows]
+
+    def close(self):
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,331 @@
+"""
+Fast listing of the code files in a repository for the GitRepoBot application.
+"""
+
+import os
+import re
+import subprocess
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import (
+    EXCLUDED_DIRS,
+    CODE_EXTENSIONS,
+    SCAN_USE_GIT_INDEX,
+    SCAN_RESPECT_GITIGNORE,
+)
+
+def translate_gitignore_pattern(pattern: str, base: str) -> "re.Pattern":
+    """
+    Compile one .gitignore pattern to a regex over repository-relative, '/'-separated paths
+
+    Args:
+        pattern: Pattern text without the leading "!" or trailing "/"
+        base: Directory of the .gitignore file relative to the repository root ("" for the root)
+
+    Returns:
+        Compiled regex matching the paths the pattern applies to
+    """
+    # Patterns with a slash are relative to the .gitignore directory, others match at any depth
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+            continue
+        if pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+            continue
+        if char == '*':
+            regex.append('[^/]*')
+        elif char == '?':
+            regex.append('[^/]')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end == -1:
+                regex.append(re.escape(char))
+            else:
+                members = pattern[i + 1:end]
+                if members.startswith('!'):
+                    members = '^' + members[1:]
+                regex.append('[' + members + ']')
+                i = end
+        elif char == '\\' and i + 1 < len(pattern):
+            i += 1
+            regex.append(re.escape(pattern[i]))
+        else:
+            regex.append(re.escape(char))
+        i += 1
+
+    prefix = re.escape(base + '/') if base else ''
+    if not anchored:
+        prefix += '(?:.*/)?'
+    return re.compile(prefix + ''.join(regex) + '$')
+
+
+def parse_gitignore(file_path: str, base: str) -> List[Tuple["re.Pattern", bool, bool]]:
+    """
+    Read the rules of a .gitignore file
+
+    Args:
+        file_path: Path to the .gitignore file
+        base: Directory of the file relative to the repository root ("" for the root)
+
+    Returns:
+        (pattern, negated, directories_only) rules in file order
+    """
+    rules = []
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            lines = file.read().splitlines()
+    except OSError:
+        return []
+
+    for line in lines:
+        line = line.rstrip()
+        if not line or line.startswith('#'):
+            continue
+        negated = line.startswith('!')
+        if negated:
+            line = line[1:]
+        directories_only = line.endswith('/')
+        line = line.rstrip('/')
+        if line:
+            rules.append((translate_gitignore_pattern(line, base), negated, directories_only))
+    return rules
+
+
+class GitignoreMatcher:
+    """
+    Immutable set of gitignore rules inherited by a directory. Without negated rules the
+    patterns are combined into one regex per path kind, so each path costs a single match.
+    """
+
+    def __init__(self, rules: Tuple[Tuple["re.Pattern", bool, bool], ...] = ()):
+        self.rules = rules
+        self._combined: Dict[bool, Optional["re.Pattern"]] = {}
+        if not any(negated for _, negated, _ in rules):
+            for is_dir in (True, False):
+                patterns = [pattern.pattern for pattern, _, directories_only in rules if is_dir or not directories_only]
+                self._combined[is_dir] = re.compile('|'.join(f'(?:{p})' for p in patterns)) if patterns else None
+
+    def __bool__(self) -> bool:
+        return bool(self.rules)
+
+    def extend(self, rules: List[Tuple["re.Pattern", bool, bool]]) -> "GitignoreMatcher":
+        """Get a matcher with more rules appended, e.g. from a subdirectory's .gitignore."""
+        return GitignoreMatcher(self.rules + tuple(rules)) if rules else self
+
+    def is_ignored(self, relative_path: str, is_dir: bool) -> bool:
+        """
+        Apply the rules to a path; the last matching rule wins
+
+        Args:
+            relative_path: '/'-separated path relative to the repository root
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path is ignored
+        """
+        if self._combined:
+            combined = self._combined[is_dir]
+            return combined is not None and combined.match(relative_path) is not None
+        ignored = False
+        for pattern, negated, directories_only in self.rules:
+            if directories_only and not is_dir:
+                continue
+            if pattern.match(relative_path):
+                ignored = not negated
+        return ignored
+
+
+def is_listed_code_file(relative_path: str) -> bool:
+    """Check a '/'-separated path has a code extension and no excluded directory."""
+    slash = relative_path.rfind('/')
+    # Same extension as os.path.splitext, without its overhead on every file
+    dot = relative_path.rfind('.')
+    if dot <= slash + 1 or relative_path[dot:] not in CODE_EXTENSIONS:
+        return False
+    return slash == -1 or EXCLUDED_DIRS.isdisjoint(relative_path[:slash].split('/'))
+
+
+class RepoScanner:
+    """
+    Lists the code files of a repository, either from the git index (`git ls-files`,
+    tracked files only) or by walking the working tree iteratively on the calling
+    thread, honouring .gitignore files. The walk is bound by per-entry Python work
+    under the GIL, so a thread pool does not make it faster.
+
+    Inside a `memoize()` block the first scan is reused by later scans on the same
+    thread, so one query never lists the repository twice.
+    """
+
+    def __init__(
+        self,
+        repo_path: str,
+        use_git_index: bool = SCAN_USE_GIT_INDEX,
+        respect_gitignore: bool = SCAN_RESPECT_GITIGNORE
+    ):
+        """
+        Create a scanner for a repository
+
+        Args:
+            repo_path: Path to the repository
+            use_git_index: List tracked files from the git index when the repository has one
+            respect_gitignore: Skip paths matched by .gitignore files when walking the tree
+        """
+        self.repo_path = repo_path
+        self.use_git_index = use_git_index
+        self.respect_gitignore = respect_gitignore
+        self.last_scan_source: Optional[str] = None
+        self.last_scan_seconds: Optional[float] = None
+        self._local = threading.local()
+
+    @contextmanager
+    def memoize(self):
+        """Reuse the first scan made on this thread until the block exits."""
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            yield self
+        finally:
+            self._local.depth = depth
+            if depth == 0:
+                self._local.result = None
+
+    def scan(self) -> Dict[str, str]:
+        """
+        List the code files of the repository
+
+        Returns:
+            Dictionary mapping relative paths to full paths
+        """
+        memoizing = getattr(self._local, 'depth', 0) > 0
+        if memoizing and getattr(self._local, 'result', None) is not None:
+            return self._local.result
+
+        start = time.perf_counter()
+        files = self.list_git_files() if self.use_git_index else None
+        if files is None:
+            files = self.walk()
+            self.last_scan_source = "walk"
+        else:
+            self.last_scan_source = "git"
+        self.last_scan_seconds = time.perf_counter() - start
+
+        if memoizing:
+            self._local.result = files
+        return files
+
+    def list_git_files(self) -> Optional[Dict[str, str]]:
+        """
+        List the tracked files from the git index without walking the working tree.
+        Files deleted since the last commit may still be listed; callers stat each
+        path anyway and treat missing ones as removed.
+
+        Returns:
+            Dictionary mapping relative paths to full paths, or None if git cannot list the repository
+        """
+        if not os.path.exists(os.path.join(self.repo_path, '.git')):
+            return None
+
+        try:
+            output = subprocess.run(
+                ['git', '-C', self.repo_path, 'ls-files', '-z', '--cached'],
+                capture_output=True, check=True
+            ).stdout
+        except (OSError, subprocess.CalledProcessError) as e:
+            print(f"git ls-files failed for {self.repo_path}, walking the tree instead: {e}")
+            return None
+
+        files = {}
+        prefix = os.path.join(self.repo_path, '')
+        for path in os.fsdecode(output).split('\0'):
+            if not is_listed_code_file(path):
+                continue
+            relative_path = path if os.sep == '/' else os.path.normpath(path)
+            files[relative_path] = prefix + relative_path
+        return files
+
+    def walk(self) -> Dict[str, str]:
+        """
+        Walk the working tree, skipping excluded directories and, if enabled, ignored paths
+
+        Returns:
+            Dictionary mapping relative paths to full paths
+        """
+        files: Dict[str, str] = {}
+        pending = [('', GitignoreMatcher())]
+        while pending:
+            found, subdirectories = self._scan_directory(*pending.pop())
+            files.update(found)
+            pending.extend(subdirectories)
+        return files
+
+    def _scan_directory(self, relative_dir: str, ignore: GitignoreMatcher) -> Tuple[Dict[str, str], List[Tuple[str, GitignoreMatcher]]]:
+        """
+        List one directory
+
+        Args:
+            relative_dir: '/'-separated directory path relative to the repository root
+            ignore: Gitignore rules inherited from parent directories
+
+        Returns:
+            Tuple of (code files found, (subdirectory, rules) pairs still to scan)
+        """
+        directory = os.path.join(self.repo_path, relative_dir) if relative_dir else self.repo_path
+        try:
+            with os.scandir(directory) as iterator:
+                entries = list(iterator)
+        except OSError:
+            print(f"Skipping inaccessible directory: {directory}")
+            return {}, []
+
+        if self.respect_gitignore and any(entry.name == '.gitignore' for entry in entries):
+            ignore = ignore.extend(parse_gitignore(os.path.join(directory, '.gitignore'), relative_dir))
+
+        files = {}
+        subdirectories = []
+        prefix = relative_dir + '/' if relative_dir else ''
+        is_ignored = ignore.is_ignored if ignore else None
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name in EXCLUDED_DIRS or (is_ignored and is_ignored(prefix + name, True)):
+                        continue
+                    subdirectories.append((prefix + name, ignore))
+                    continue
+                # Same extension as os.path.splitext, without its overhead on every file
+                dot = name.rfind('.')
+                if dot <= 0 or name[dot:] not in CODE_EXTENSIONS or not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            relative_path = prefix + name
+            if is_ignored and is_ignored(relative_path, False):
+                continue
+            files[relative_path if os.sep == '/' else os.path.normpath(relative_path)] = entry.path
+        return files, subdirectories
+
+
+def scan_repository(repo_path: str, **options) -> Dict[str, str]:
+    """
+    List the code files of a repository with a one-off RepoScanner
+
+    Args:
+        repo_path: Path to the repository
+        **options: RepoScanner options
+
+    Returns:
+        Dictionary mapping relative paths to full paths
+    """
+    return RepoScanner(repo_path, **options).scan()
@@ -0,0 +1,367 @@
+"""
+Admission control, fair queueing, per-query deadlines and cancellation for the GitRepoBot application.
+"""
+
+import contextvars
+import math
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from src.config.settings import (
+    SCHEDULER_MAX_CONCURRENT,
+    SCHEDULER_MAX_PER_REPO,
+    SCHEDULER_MAX_QUEUED,
+    SCHEDULER_MAX_PER_SESSION,
+    SCHEDULER_DEADLINE,
+    SCHEDULER_INITIAL_SERVICE_SECONDS,
+    SCHEDULER_WAIT_SAMPLES,
+    SCHEDULER_CANCEL_POLL_INTERVAL,
+)
+from src.utils.metrics import span
+
+_current_deadline: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("current_deadline", default=None)
+_current_cancel: "contextvars.ContextVar[Optional[threading.Event]]" = contextvars.ContextVar("current_cancel", default=None)
+
+
+class Overloaded(Exception):
+    """A query was refused or gave up waiting for a slot; the client should retry later."""
+
+    def __init__(self, message: str, status: int, retry_after: int):
+        """
+        Args:
+            message: Why the query was refused
+            status: HTTP status to answer with, 429 when the session has too many queries
+                and 503 when the server does
+            retry_after: Seconds after which a retry is likely to be admitted
+        """
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """A query ran out of time before one of its stages started."""
+
+
+class Cancelled(Exception):
+    """The client that asked a query went away, so the query stopped."""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Give the work inside the block, and the work it hands to run_concurrently, a time limit;
+    an enclosing deadline that is earlier still applies
+
+    Args:
+        seconds: Seconds from now, or None for no limit
+
+    Yields:
+        The monotonic time at which the block's deadline passes, or None
+    """
+    outer = _current_deadline.get()
+    at = time.monotonic() + seconds if seconds is not None else None
+    if outer is not None and (at is None or outer < at):
+        at = outer
+    token = _current_deadline.set(at)
+    try:
+        yield at
+    finally:
+        _current_deadline.reset(token)
+
+
+def time_left() -> Optional[float]:
+    """
+    Get the seconds left before the current deadline
+
+    Returns:
+        Seconds, possibly negative, or None outside a deadline
+    """
+    at = _current_deadline.get()
+    return None if at is None else at - time.monotonic()
+
+
+@contextmanager
+def cancellation(event: threading.Event) -> Iterator[threading.Event]:
+    """
+    Let the work inside the block, and the work it hands to run_concurrently, be stopped
+    by setting an event, such as when the client waiting for it disconnects
+
+    Args:
+        event: Event that is set to cancel the work
+
+    Yields:
+        The event
+    """
+    token = _current_cancel.set(event)
+    try:
+        yield event
+    finally:
+        _current_cancel.reset(token)
+
+
+def check_cancelled(stage: str):
+    """
+    Stop a query whose client went away
+
+    Args:
+        stage: What the query was about to do, for the error message
+
+    Raises:
+        Cancelled: If the current query was cancelled
+    """
+    event = _current_cancel.get()
+    if event is not None and event.is_set():
+        raise Cancelled(f"The query was cancelled before {stage}")
+
+
+def check_deadline(stage: str):
+    """
+    Stop a query that was cancelled or whose deadline has passed before it starts another stage
+
+    Args:
+        stage: The stage about to start, for the error message
+
+    Raises:
+        Cancelled: If the current query was cancelled
+        DeadlineExceeded: If the current deadline has passed
+    """
+    check_cancelled(stage)
+    left = time_left()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"The query ran out of time before {stage}")
+
+
+class Ticket:
+    """One query waiting for, or holding, a slot."""
+
+    def __init__(self, repo: str, session: str, deadline_at: float, position: int):
+        self.repo = repo
+        self.session = session
+        self.deadline_at = deadline_at
+        # Queries waiting ahead of this one when it arrived
+        self.position = position
+        self.enqueued_at = time.monotonic()
+        self.admitted_at: Optional[float] = None
+
+
+class QueryScheduler:
+    """
+    Thread-safe admission control in front of query answering.
+
+    At most max_concurrent queries run at once, and at most max_per_repo of them on one
+    repository. Queries beyond that wait in one queue per session; free slots go to the
+    sessions in turn, so a session sending a burst of questions cannot starve the others.
+    A query is refused straight away with 429 when its session already has max_per_session
+    queries waiting or running, and with 503 when max_queued queries are waiting; a query
+    that cannot start before its deadline leaves the queue with 503. Both carry a
+    Retry-After estimate based on recent query durations.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = SCHEDULER_MAX_CONCURRENT,
+        max_per_repo: int = SCHEDULER_MAX_PER_REPO,
+        max_queued: int = SCHEDULER_MAX_QUEUED,
+        max_per_session: int = SCHEDULER_MAX_PER_SESSION,
+        default_deadline: float = SCHEDULER_DEADLINE,
+        initial_service_seconds: float = SCHEDULER_INITIAL_SERVICE_SECONDS,
+        wait_samples: int = SCHEDULER_WAIT_SAMPLES
+    ):
+        """
+        Create an idle scheduler
+
+        Args:
+            max_concurrent: Queries answered at once across all repositories
+            max_per_repo: Queries answered at once on one repository
+            max_queued: Queries waiting for a slot before new ones are refused
+            max_per_session: Queries one session may have waiting or running
+            default_deadline: Seconds a query may take from arrival, and the most a client may ask for
+            initial_service_seconds: Assumed query duration until some have finished
+            wait_samples: Recent queue waits kept for percentiles
+        """
+        self.max_concurrent = max_concurrent
+        self.max_per_repo = max_per_repo
+        self.max_queued = max_queued
+        self.max_per_session = max_per_session
+        self.default_deadline = default_deadline
+        self.service_seconds = initial_service_seconds
+        self._queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._queued = 0
+        self._running = 0
+        self._running_by_repo = Counter()
+        self._by_session = Counter()
+        self._waits: Deque[float] = deque(maxlen=wait_samples)
+        self.admitted = 0
+        self.rejected = Counter()
+        self.expired = 0
+        self._cond = threading.Condition()
+
+    def retry_after(self) -> int:
+        """Seconds until the queries ahead of a new one are likely done; called with the lock held."""
+        rounds = (self._queued + 1) / max(1, self.max_concurrent)
+        return max(1, math.ceil(rounds * self.service_seconds))
+
+    def enqueue(self, repo: str, session: str, deadline_seconds: Optional[float] = None) -> Ticket:
+        """
+        Queue a query, or refuse it when its session or the server has too many
+
+        Args:
+            repo: Path of the repository the query is about
+            session: Identifier of the user's session
+            deadline_seconds: Seconds the query may take, capped at the default deadline
+
+        Returns:
+            Ticket to pass to run
+
+        Raises:
+            Overloaded: With status 429 or 503 if the query is refused
+        """
+        seconds = self.default_deadline if deadline_seconds is None else min(deadline_seconds, self.default_deadline)
+        with self._cond:
+            if self._by_session[session] >= self.max_per_session:
+                self.rejected["session_limit"] += 1
+                raise Overloaded(
+                    f"This session already has {self._by_session[session]} queries in progress",
+                    429, self.retry_after()
+                )
+            ticket = Ticket(repo, session, time.monotonic() + seconds, self._queued)
+            self._queues.setdefault(session, deque()).append(ticket)
+            self._queued += 1
+            self._by_session[session] += 1
+            self._dispatch()
+            if ticket.admitted_at is None and self._queued > self.max_queued:
+                self._leave(ticket)
+                self.rejected["queue_full"] += 1
+                raise Overloaded("The server is busy; too many queries are waiting", 503, self.retry_after())
+            return ticket
+
+    def _dispatch(self):
+        """Hand free slots to waiting queries, one session at a time; called with the lock held."""
+        while self._running < self.max_concurrent:
+            for session, queue in self._queues.items():
+                ticket = queue[0]
+                if self._running_by_repo[ticket.repo] < self.max_per_repo:
+                    break
+            else:
+                return
+            queue.popleft()
+            if queue:
+                # The session goes to the back of the line for the next slot
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            self._queued -= 1
+            self._running += 1
+            self._running_by_repo[ticket.repo] += 1
+            ticket.admitted_at = time.monotonic()
+            self._waits.append(ticket.admitted_at - ticket.enqueued_at)
+            self.admitted += 1
+            self._cond.notify_all()
+
+    def _leave(self, ticket: Ticket):
+        """Give up a ticket's slot, or its place in the queue; called with the lock held."""
+        self._by_session[ticket.session] -= 1
+        if self._by_session[ticket.session] <= 0:
+            del self._by_session[ticket.session]
+        if ticket.admitted_at is None:
+            queue = self._queues.get(ticket.session)
+            if queue is not None and ticket in queue:
+                queue.remove(ticket)
+                self._queued -= 1
+                if not queue:
+                    del self._queues[ticket.session]
+            return
+        self._running -= 1
+        self._running_by_repo[ticket.repo] -= 1
+        if self._running_by_repo[ticket.repo] <= 0:
+            del self._running_by_repo[ticket.repo]
+        # Moving average of how long a query holds its slot
+        self.service_seconds += 0.2 * (time.monotonic() - ticket.admitted_at - self.service_seconds)
+        self._dispatch()
+
+    @contextmanager
+    def run(self, ticket: Ticket) -> Iterator[Ticket]:
+        """
+        Wait for a queued query's turn, then hold its slot for the block, which runs under
+        the query's deadline
+
+        Args:
+            ticket: Ticket returned by enqueue
+
+        Yields:
+            The ticket
+
+        Raises:
+            Overloaded: With status 503 if the deadline passes before the query gets a slot
+            Cancelled: If the query is cancelled before it gets a slot
+        """
+        with span("queue_wait", position=ticket.position), self._cond:
+            while ticket.admitted_at is None:
+                left = ticket.deadline_at - time.monotonic()
+                if left <= 0:
+                    self.expired += 1
+                    self._leave(ticket)
+                    raise Overloaded("The server is busy; the query timed out waiting for its turn", 503, self.retry_after())
+                try:
+                    check_cancelled("its turn")
+                except Cancelled:
+                    self._leave(ticket)
+                    raise
+                self._cond.wait(min(left, SCHEDULER_CANCEL_POLL_INTERVAL))
+        try:
+            with deadline(ticket.deadline_at - time.monotonic()):
+                yield ticket
+        finally:
+            with self._cond:
+                self._leave(ticket)
+
+    @contextmanager
+    def admit(self, repo: str, session: str, deadline_seconds: Optional[float] = None) -> Iterator[Ticket]:
+        """
+        Queue a query and hold a slot for the block once it is admitted; see enqueue and run
+
+        Args:
+            repo: Path of the repository the query is about
+            session: Identifier of the user's session
+            deadline_seconds: Seconds the query may take, capped at the default deadline
+
+        Yields:
+            The admitted ticket
+        """
+        ticket = self.enqueue(repo, session, deadline_seconds)
+        with self.run(ticket):
+            yield ticket
+
+    def stats(self) -> Dict:
+        """
+        Get queue and admission counters
+
+        Returns:
+            Dictionary with the queries running and queued (in total and per repository),
+            the queries admitted, refused by reason and expired in the queue, the p50, p95
+            and maximum of recent queue waits in seconds and the average query duration
+        """
+        with self._cond:
+            waits = sorted(self._waits)
+            queued_by_repo = Counter(ticket.repo for queue in self._queues.values() for ticket in queue)
+            stats = {
+                "running": self._running,
+                "queued": self._queued,
+                "running_by_repo": dict(self._running_by_repo),
+                "queued_by_repo": dict(queued_by_repo),
+                "sessions_waiting": len(self._queues),
+                "admitted": self.admitted,
+                "rejected": dict(self.rejected),
+                "expired": self.expired,
+                "service_seconds": round(self.service_seconds, 3),
+            }
+
+        def quantile(fraction: float) -> float:
+            return round(waits[min(len(waits) - 1, int(fraction * len(waits)))], 3) if waits else 0.0
+
+        stats["wait_seconds"] = {"p50": quantile(0.5), "p95": quantile(0.95), "max": quantile(1.0)}
+        return stats
@@ -0,0 +1,189 @@
+"""
+Single-flight coalescing of identical concurrent work for the GitRepoBot application.
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+def make_key(*parts: str) -> str:
+    """
+    Build a flight key from the parts that make two pieces of work identical
+
+    Args:
+        *parts: Model, prompt, query and the like
+
+    Returns:
+        Hex digest of the parts
+    """
+    return hashlib.sha256("\x1f".join(parts).encode('utf-8')).hexdigest()
+
+
+class Flight:
+    """
+    One piece of work in progress, whose result every caller of the same key receives.
+    Progress events the work emits go to every subscribed caller; one that subscribes late
+    first gets the events it missed.
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+        self._events: List[Tuple[str, Dict[str, Any]]] = []
+        self._listeners: List[Callable[[str, Dict[str, Any]], None]] = []
+        self._events_lock = threading.Lock()
+
+    def subscribe(self, listener: Optional[Callable[[str, Dict[str, Any]], None]]):
+        """
+        Send the events emitted so far, then every later one, to a listener
+
+        Args:
+            listener: Callback receiving (event, data), or None to do nothing
+        """
+        if listener is None:
+            return
+        with self._events_lock:
+            for event, data in self._events:
+                listener(event, data)
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Optional[Callable[[str, Dict[str, Any]], None]]):
+        """Stop sending events to a listener, once its caller no longer waits."""
+        with self._events_lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def emit(self, event: str, data: Dict[str, Any]):
+        """
+        Send a progress event of the work to every listener. A listener that fails is
+        dropped, so one caller going away does not stop the work the others wait for.
+
+        Args:
+            event: Event name
+            data: Event payload
+        """
+        with self._events_lock:
+            self._events.append((event, data))
+            for listener in list(self._listeners):
+                try:
+                    listener(event, data)
+                except Exception as e:
+                    print(f"Dropping a listener of shared work: {e}")
+                    self._listeners.remove(listener)
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the leader to finish
+
+        Args:
+            timeout: Seconds to wait at most; None waits as long as the leader takes
+
+        Returns:
+            The leader's result
+
+        Raises:
+            TimeoutError: If the leader did not finish in time
+            Exception: Whatever the leader's work raised
+        """
+        if not self.done.wait(timeout):
+            raise TimeoutError("Timed out waiting for identical work in progress")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """
+    Thread-safe registry of work in progress by key. The first caller of a key leads and
+    does the work; callers arriving while it runs wait and share its result or exception.
+    Nothing is kept once the work finishes, so later callers start a new flight; caching
+    results is left to the caches.
+    """
+
+    def __init__(self, name: str):
+        """
+        Create an empty registry
+
+        Args:
+            name: What is being coalesced, for logs and stats
+        """
+        self.name = name
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self.led = 0
+        self.coalesced = 0
+
+    def claim(self, key: str) -> Tuple[Flight, bool]:
+        """
+        Join the flight of a key, starting one if there is none
+
+        Args:
+            key: Identity of the work
+
+        Returns:
+            Tuple of (flight, leader) where leader is True if the caller must do the work
+            and then call resolve
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.coalesced += 1
+                return flight, False
+            flight = Flight()
+            self._flights[key] = flight
+            self.led += 1
+            return flight, True
+
+    def resolve(self, key: str, flight: Flight, result: Any = None, error: Optional[BaseException] = None):
+        """
+        Finish a flight the caller leads and wake its followers
+
+        Args:
+            key: Key the flight was claimed under
+            flight: The flight returned by claim
+            result: Result shared with the followers
+            error: Exception the followers re-raise instead of getting a result
+        """
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight.done.set()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """
+        Run fn unless identical work is already running, in which case wait for its result
+
+        Args:
+            key: Identity of the work
+            fn: Does the work
+            timeout: Seconds a follower waits at most
+
+        Returns:
+            Tuple of (result, shared) where shared is True if another caller did the work
+        """
+        flight, leader = self.claim(key)
+        if not leader:
+            return flight.wait(timeout), True
+        try:
+            result = fn()
+        except BaseException as e:
+            self.resolve(key, flight, error=e)
+            raise
+        self.resolve(key, flight, result)
+        return result, False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dictionary with flights in progress, flights led and callers coalesced into them
+        """
+        with self._lock:
+            return {"in_flight": len(self._flights), "led": self.led, "coalesced": self.coalesced}
@@ -0,0 +1,429 @@
+"""
+Extraction of symbol definitions and references from source files, and of the identifiers named in a query.
+"""
+
+import ast
+import re
+from typing import Dict, List, Optional, Tuple
+
+from src.config.settings import SYMBOL_MAX_REFERENCE_LINES
+
+# A definition is (name, qualname, kind, start_line, end_line) with 1-based, inclusive lines
+Definition = Tuple[str, str, str, int, int]
+
+# Kinds of definitions that other definitions can be nested in
+CONTAINER_KINDS = {"class", "module", "impl"}
+
+# Line-ending rules of the regex extractors
+BRACES = "braces"
+END_KEYWORD = "end"
+SEMICOLON = "semicolon"
+INDENT = "indent"
+
+# Lines a signature may span before its body must start
+SIGNATURE_MAX_LINES = 8
+# Endings of a signature line that is continued on the next line
+SIGNATURE_CONTINUATIONS = ('(', ',', ')', '>', '=', ':', '|', '&', '\\')
+# Starts of the line after a complete-looking signature that still belong to it
+SIGNATURE_FOLLOWERS = ('{', ':', '->', 'throws', 'where', 'extends', 'implements')
+
+NAME = r"(?P<name>[A-Za-z_$][\w$]*)"
+JAVA_MODIFIERS = (
+    r"(?:(?:public|private|protected|internal|static|final|abstract|synchronized|native|virtual|override|"
+    r"async|sealed|partial|extern|unsafe|default|readonly|open|inline|suspend|operator|data|fileprivate|"
+    r"mutating|required|convenience)\s+)*"
+)
+
+# Definition patterns per language: (kind, pattern); a "parent" group names the enclosing type
+LANGUAGE_PATTERNS: Dict[str, List[Tuple[str, str]]] = {
+    # Only used for Python files that do not parse, e.g. Python 2 sources
+    "python": [
+        ("class", r"^\s*class\s+" + NAME),
+        ("function", r"^\s*(?:async\s+)?def\s+" + NAME),
+    ],
+    "javascript": [
+        ("function", r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*" + NAME),
+        ("class", r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+" + NAME),
+        ("class", r"^\s*(?:export\s+)?(?:declare\s+)?(?:interface|enum)\s+" + NAME),
+        ("type", r"^\s*(?:export\s+)?(?:declare\s+)?type\s+" + NAME + r"\s*(?:<[^=]*>)?\s*="),
+        ("function", r"^\s*(?:export\s+)?(?:const|let|var)\s+" + NAME
+            + r"\s*(?::[^=]+)?=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[A-Za-z_$][\w$]*\s*=>)"),
+        ("method", r"^\s+(?:(?:public|private|protected|static|async|readonly|override|get|set)\s+)*\*?"
+            + NAME + r"\s*\([^;]*\)\s*(?::\s*[^;{=]+)?\{\s*$"),
+    ],
+    "java": [
+        ("class", r"^\s*" + JAVA_MODIFIERS + r"(?:class|interface|enum|record|struct|@interface)\s+" + NAME),
+        ("method", r"^\s*" + JAVA_MODIFIERS + r"(?:<[^>]+>\s*)?[\w<>\[\],.?]+(?:\s*<[^>]*>)?\s+" + NAME
+            + r"\s*\([^;]*$"),
+    ],
+    "kotlin": [
+        ("class", r"^\s*" + JAVA_MODIFIERS + r"(?:class|interface|object|enum\s+class|trait|case\s+class)\s+" + NAME),
+        ("function", r"^\s*" + JAVA_MODIFIERS + r"(?:fun|def)\s+(?:<[^>]+>\s*)?(?:[\w.]+\.)?" + NAME),
+    ],
+    "swift": [
+        ("class", r"^\s*" + JAVA_MODIFIERS + r"(?:class|struct|enum|protocol|extension|actor)\s+" + NAME),
+        ("function", r"^\s*" + JAVA_MODIFIERS + r"(?:static\s+|class\s+)?func\s+" + NAME),
+    ],
+    "go": [
+        ("function", r"^func\s+(?:\(\s*\w*\s*\*?(?P<parent>\w+)(?:\[[^\]]*\])?\s*\)\s*)?" + NAME),
+        ("class", r"^type\s+" + NAME + r"(?:\[[^\]]*\])?\s+(?:struct|interface)\b"),
+        ("type", r"^type\s+" + NAME + r"\s+(?!struct\b|interface\b)"),
+    ],
+    "rust": [
+        ("function", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:default\s+)?(?:const\s+)?(?:async\s+)?(?:unsafe\s+)?"
+            r"(?:extern\s+\"[^\"]*\"\s+)?fn\s+" + NAME),
+        ("class", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|union)\s+" + NAME),
+        ("impl", r"^\s*(?:unsafe\s+)?impl(?:<[^>]*>)?\s+(?:[\w:]+(?:<[^>]*>)?\s+for\s+)?(?:[\w]+::)*" + NAME),
+        ("module", r"^\s*(?:pub(?:\([^)]*\))?\s+)?mod\s+" + NAME),
+        ("function", r"^\s*macro_rules!\s*" + NAME),
+    ],
+    "c": [
+        ("class", r"^\s*(?:typedef\s+)?(?:class|struct|union|enum(?:\s+class)?)\s+" + NAME + r"[^;]*$"),
+        ("module", r"^\s*namespace\s+" + NAME),
+        ("function", r"^(?:[\w:<>,*&~]+[ \t*&]+)+(?:(?P<parent>\w+)::)?" + r"(?P<name>~?[A-Za-z_]\w*)"
+            + r"\s*\([^;]*\)\s*(?:const\s*)?(?:noexcept\s*)?(?:override\s*)?\{?\s*$"),
+    ],
+    "php": [
+        ("class", r"^\s*(?:abstract\s+|final\s+|readonly\s+)*(?:class|interface|trait|enum)\s+" + NAME),
+        ("function", r"^\s*(?:(?:public|private|protected|static|abstract|final)\s+)*function\s+&?" + NAME),
+    ],
+    "ruby": [
+        ("class", r"^\s*(?:class|module)\s+(?:[\w:]+::)?" + NAME),
+        ("function", r"^\s*def\s+(?:self\.)?(?P<name>[A-Za-z_]\w*[?!=]?)"),
+    ],
+    "shell": [
+        ("function", r"^\s*function\s+(?P<name>[\w.-]+)"),
+        ("function", r"^\s*(?P<name>[A-Za-z_][\w.-]*)\s*\(\s*\)\s*\{?"),
+    ],
+    "sql": [
+        ("type", r"(?i)^\s*create\s+(?:or\s+replace\s+)?(?:temp(?:orary)?\s+)?(?:unique\s+)?"
+            r"(?:table|view|materialized\s+view|function|procedure|index|trigger|type|sequence)\s+"
+            r"(?:if\s+not\s+exists\s+)?(?:[\w\"`\[\]]+\.)?[\"`\[]?(?P<name>\w+)"),
+    ],
+    "graphql": [
+        ("class", r"^\s*(?:extend\s+)?(?:type|interface|input|enum|union|scalar|fragment|query|mutation|subscription)\s+"
+            + NAME),
+    ],
+    "proto": [
+        ("class", r"^\s*(?:message|enum|service)\s+" + NAME),
+        ("method", r"^\s*rpc\s+" + NAME),
+    ],
+}
+
+# How each language's definitions end
+LANGUAGE_ENDINGS = {
+    "python": INDENT,
+    "javascript": BRACES, "java": BRACES, "kotlin": BRACES, "swift": BRACES, "go": BRACES,
+    "rust": BRACES, "c": BRACES, "php": BRACES, "shell": BRACES, "graphql": BRACES, "proto": BRACES,
+    "ruby": END_KEYWORD, "sql": SEMICOLON,
+}
+
+EXTENSION_LANGUAGES = {
+    '.js': "javascript", '.jsx': "javascript", '.ts': "javascript", '.tsx': "javascript",
+    '.java': "java", '.cs': "java", '.kt': "kotlin", '.scala': "kotlin", '.swift': "swift",
+    '.go': "go", '.rs': "rust", '.c': "c", '.cpp': "c", '.h': "c", '.php': "php", '.rb': "ruby",
+    '.sh': "shell", '.sql': "sql", '.graphql': "graphql", '.proto': "proto",
+}
+
+COMPILED_PATTERNS = {
+    language: [(kind, re.compile(pattern)) for kind, pattern in patterns]
+    for language, patterns in LANGUAGE_PATTERNS.items()
+}
+
+# Words the regex extractors would otherwise take for names of methods or references
+KEYWORDS = {
+    'if', 'else', 'elif', 'for', 'while', 'do', 'switch', 'case', 'catch', 'try', 'return', 'new', 'throw',
+    'sizeof', 'typeof', 'delete', 'await', 'yield', 'function', 'class', 'const', 'let', 'var', 'def', 'fn',
+    'func', 'import', 'from', 'export', 'package', 'public', 'private', 'protected', 'static', 'void', 'int',
+    'char', 'bool', 'float', 'double', 'long', 'short', 'unsigned', 'string', 'true', 'false', 'null', 'nil',
+    'None', 'self', 'this', 'super', 'and', 'not', 'with', 'elseif', 'foreach', 'using', 'namespace', 'struct',
+    'enum', 'interface', 'type', 'then', 'end', 'echo', 'print', 'require', 'include', 'select', 'where',
+}
+
+CALL_RE = re.compile(r"(?<![\w$])(?P<name>[A-Za-z_$][\w$]*)\s*\(")
+MEMBER_RE = re.compile(r"(?:\.|->|::)(?P<name>[A-Za-z_$][\w$]*)")
+TYPE_RE = re.compile(r"(?<![\w$.])(?P<name>[A-Z][a-z0-9]+[A-Z]\w*|[A-Z][A-Z0-9]*_[A-Z0-9_]+)\b")
+STRING_RE = re.compile(r"\"(?:\\.|[^\"\\])*\"|'(?:\\.|[^'\\])*'|`(?:\\.|[^`\\])*`")
+LINE_COMMENT_RE = re.compile(r"(?://|#(?![\[!])).*$")
+
+# Identifiers written in a query: backticked names, calls, dotted names, snake_case and camelCase
+QUERY_CODE_RE = re.compile(r"`([^`\n]+)`")
+QUERY_IDENTIFIER_RE = re.compile(r"(?<![\w$./\\])[A-Za-z_$][\w$]*(?:(?:\.|::)[A-Za-z_$][\w$]*)*(?:\(\))?")
+
+
+def get_language(relative_path: str) -> Optional[str]:
+    """
+    Get the symbol extractor used for a file
+
+    Args:
+        relative_path: Path relative to the repository root
+
+    Returns:
+        "python", a LANGUAGE_PATTERNS key, or None when no symbols are extracted from the file
+    """
+    extension = relative_path[relative_path.rfind('.'):] if '.' in relative_path else ''
+    if extension == '.py':
+        return "python"
+    return EXTENSION_LANGUAGES.get(extension)
+
+
+class PythonSymbolVisitor(ast.NodeVisitor):
+    """Collects the definitions and references of a Python module."""
+
+    def __init__(self):
+        self.definitions: List[Definition] = []
+        self.references: Dict[str, List[int]] = {}
+        self.scope: List[Tuple[str, str]] = []
+
+    def add_reference(self, name: str, line: int):
+        lines = self.references.setdefault(name, [])
+        if len(lines) < SYMBOL_MAX_REFERENCE_LINES and (not lines or lines[-1] != line):
+            lines.append(line)
+
+    def define(self, node: ast.AST, name: str, kind: str):
+        start_line = min([node.lineno] + [decorator.lineno for decorator in getattr(node, 'decorator_list', [])])
+        end_line = getattr(node, 'end_lineno', None) or node.lineno
+        qualname = ".".join([scope_name for scope_name, _ in self.scope] + [name])
+        self.definitions.append((name, qualname, kind, start_line, end_line))
+
+    def visit_ClassDef(self, node: ast.ClassDef):
+        self.define(node, node.name, "class")
+        for expression in node.bases + node.keywords + node.decorator_list:
+            self.visit(expression)
+        self.scope.append((node.name, "class"))
+        for statement in node.body:
+            self.visit(statement)
+        self.scope.pop()
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        in_class = bool(self.scope) and self.scope[-1][1] == "class"
+        self.define(node, node.name, "method" if in_class else "function")
+        arguments = node.args.posonlyargs + node.args.args + node.args.kwonlyargs
+        annotations = [argument.annotation for argument in arguments] + [node.returns]
+        for expression in node.decorator_list + node.args.defaults + node.args.kw_defaults + annotations:
+            if expression is not None:
+                self.visit(expression)
+        self.scope.append((node.name, "function"))
+        for statement in node.body:
+            self.visit(statement)
+        self.scope.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Assign(self, node: ast.Assign):
+        if not self.scope:
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    self.define(node, target.id, "variable")
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign):
+        if not self.scope and isinstance(node.target, ast.Name):
+            self.define(node, node.target.id, "variable")
+        self.generic_visit(node)
+
+    def visit_Call(self, node: ast.Call):
+        if isinstance(node.func, ast.Name):
+            self.add_reference(node.func.id, node.lineno)
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute):
+        self.add_reference(node.attr, node.lineno)
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        # Locals are too noisy to index; classes and constants are worth finding uses of
+        if node.id[0].isupper():
+            self.add_reference(node.id, node.lineno)
+
+    def visit_ImportFrom(self, node: ast.ImportFrom):
+        for alias in node.names:
+            self.add_reference(alias.name, node.lineno)
+
+
+def find_block_end(lines: List[str], start: int, ending: str) -> int:
+    """
+    Find the last line of a definition found by a regex extractor
+
+    Args:
+        lines: Lines of the file
+        start: 0-based index of the definition's first line
+        ending: BRACES, END_KEYWORD or SEMICOLON
+
+    Returns:
+        0-based index of the definition's last line
+    """
+    if ending == SEMICOLON:
+        for i in range(start, len(lines)):
+            if ';' in STRING_RE.sub('', lines[i]):
+                return i
+        return len(lines) - 1
+
+    if ending == INDENT:
+        indent = len(lines[start]) - len(lines[start].lstrip())
+        end = start
+        for i in range(start + 1, len(lines)):
+            if not lines[i].strip():
+                continue
+            if len(lines[i]) - len(lines[i].lstrip()) <= indent:
+                break
+            end = i
+        return end
+
+    if ending == END_KEYWORD:
+        indent = len(lines[start]) - len(lines[start].lstrip())
+        for i in range(start + 1, len(lines)):
+            stripped = lines[i].strip()
+            if stripped == "end" or stripped.startswith("end ") or stripped.startswith("end#"):
+                if len(lines[i]) - len(lines[i].lstrip()) <= indent:
+                    return i
+        return start
+
+    depth = 0
+    opened = False
+    for i in range(start, len(lines)):
+        line = LINE_COMMENT_RE.sub('', STRING_RE.sub('""', lines[i]))
+        for char in line:
+            if char == '{':
+                depth += 1
+                opened = True
+            elif char == '}':
+                depth -= 1
+                if opened and depth <= 0:
+                    return i
+            elif char == ';' and not opened:
+                # A declaration without a body
+                return i
+        if opened:
+            continue
+        if i - start >= SIGNATURE_MAX_LINES:
+            return start
+        if line.rstrip().endswith(SIGNATURE_CONTINUATIONS):
+            continue
+        following = next((text.strip() for text in lines[i + 1:i + 3] if text.strip()), '')
+        if not following.startswith(SIGNATURE_FOLLOWERS):
+            # No body: a one-line definition such as an arrow function or a Go type alias
+            return i
+    return start if not opened else len(lines) - 1
+
+
+def extract_with_patterns(content: str, language: str) -> Tuple[List[Definition], Dict[str, List[int]]]:
+    """
+    Find definitions and references with the regex extractor of a language
+
+    Args:
+        content: File content
+        language: LANGUAGE_PATTERNS key
+
+    Returns:
+        Tuple of (definitions, references), see extract_symbols
+    """
+    lines = content.split('\n')
+    ending = LANGUAGE_ENDINGS[language]
+    found = []
+    for i, line in enumerate(lines):
+        for kind, pattern in COMPILED_PATTERNS[language]:
+            match = pattern.match(line)
+            if not match:
+                continue
+            name = match.group('name')
+            if name in KEYWORDS:
+                continue
+            parent = match.groupdict().get('parent')
+            found.append([name, parent, kind, i, find_block_end(lines, i, ending)])
+            break
+
+    # Nest definitions in the containers whose line span encloses them
+    definitions: List[Definition] = []
+    containers: List[list] = []
+    for name, parent, kind, start, end in found:
+        while containers and containers[-1][4] < start:
+            containers.pop()
+        if parent is None and containers and containers[-1][4] >= end:
+            parent = containers[-1][5]
+        if parent is not None and kind == "function":
+            kind = "method"
+        qualname = f"{parent}.{name}" if parent else name
+        definitions.append((name, qualname, kind, start + 1, end + 1))
+        if kind in CONTAINER_KINDS:
+            containers.append([name, parent, kind, start, end, qualname])
+
+    references: Dict[str, List[int]] = {}
+    for number, line in enumerate(lines, start=1):
+        line = STRING_RE.sub('""', line)
+        for pattern in (CALL_RE, MEMBER_RE, TYPE_RE):
+            for match in pattern.finditer(line):
+                name = match.group('name')
+                if name in KEYWORDS:
+                    continue
+                reference_lines = references.setdefault(name, [])
+                if len(reference_lines) < SYMBOL_MAX_REFERENCE_LINES and (not reference_lines or reference_lines[-1] != number):
+                    reference_lines.append(number)
+    return definitions, references
+
+
+def extract_symbols(relative_path: str, content: str) -> Tuple[List[Definition], Dict[str, List[int]]]:
+    """
+    Extract the function, class, method and module-level definitions of a file and the
+    names it references. Python files are parsed with ast; other languages use line
+    patterns, falling back to them for Python files that do not parse.
+
+    Args:
+        relative_path: Path relative to the repository root, used to pick the extractor
+        content: File content
+
+    Returns:
+        Tuple of (definitions, references): definitions are (name, qualname, kind, start_line,
+        end_line) tuples and references map each referenced name to the lines using it
+    """
+    language = get_language(relative_path)
+    if language is None:
+        return [], {}
+
+    if language == "python":
+        try:
+            tree = ast.parse(content)
+        except (SyntaxError, ValueError):
+            return extract_with_patterns(content, "python")
+        visitor = PythonSymbolVisitor()
+        visitor.visit(tree)
+        return visitor.definitions, visitor.references
+
+    return extract_with_patterns(content, language)
+
+
+def find_query_identifiers(query: str) -> List[str]:
+    """
+    Find the code identifiers a query names: backticked names, calls such as "load()",
+    dotted names such as "RepoIndex.refresh", and snake_case, camelCase or PascalCase words.
+    Plain words are left out, since "index" or "Config" at the start of a sentence is prose.
+
+    Args:
+        query: The user's query
+
+    Returns:
+        Identifiers in order of appearance, without call parentheses, "::" written as "."
+    """
+    identifiers: List[str] = []
+
+    def add(identifier: str):
+        identifier = identifier.strip().rstrip('()').replace('::', '.').strip('.')
+        if identifier and identifier not in identifiers and identifier.split('.')[-1] not in KEYWORDS:
+            identifiers.append(identifier)
+
+    for match in QUERY_CODE_RE.finditer(query):
+        for identifier in QUERY_IDENTIFIER_RE.findall(match.group(1)):
+            add(identifier)
+
+    prose = QUERY_CODE_RE.sub(' ', query)
+    for identifier in QUERY_IDENTIFIER_RE.findall(prose):
+        last = identifier.rstrip('()').replace('::', '.').split('.')[-1]
+        is_code = (
+            identifier.endswith('()')
+            or ('.' in identifier and not identifier.endswith('.') and last[:1].isalpha())
+            or '_' in identifier.strip('_')
+            or re.search(r"[a-z][A-Z]", identifier) is not None
+        )
+        if is_code:
+            add(identifier)
+    return identifiers
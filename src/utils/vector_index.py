@@ -0,0 +1,339 @@
+"""
+Persistent chunk-level vector index with memory-mapped embeddings for the GitRepoBot application.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.config.settings import (
+    EMBEDDING_BATCH_SIZE,
+    VECTOR_INDEX_INITIAL_CAPACITY,
+    VECTOR_SEARCH_TOP_K,
+    RANK_FUSION_K,
+)
+from src.utils.embeddings import Embedder
+
+# Bump whenever the on-disk layout changes so stale vector indexes are rebuilt
+VECTOR_SCHEMA_VERSION = "1"
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RANK_FUSION_K) -> List[str]:
+    """
+    Merge rankings by summing 1 / (k + rank) for every ranking an item appears in
+
+    Args:
+        rankings: Ranked lists, best first
+        k: Damping constant; larger values flatten the difference between top ranks
+
+    Returns:
+        All items, best fused score first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: -scores[item])
+
+
+class VectorIndex:
+    """
+    Embeddings of every chunk of every file, stored as rows of a memory-mapped float32
+    matrix with the chunk locations in SQLite next to it.
+
+    Files are upserted with the content hash they were embedded from, so unchanged files
+    are never re-embedded. Rows of deleted chunks are reused by later upserts. Searches
+    score all live rows with one matrix product for a whole batch of queries.
+    """
+
+    def __init__(self, index_dir: str, embedder: Embedder, initial_capacity: int = VECTOR_INDEX_INITIAL_CAPACITY):
+        """
+        Open (or create) a vector index
+
+        Args:
+            index_dir: Directory holding the matrix and its metadata
+            embedder: Embedder used for chunks and queries
+            initial_capacity: Rows allocated when the matrix is created
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        self.index_dir = index_dir
+        self.embedder = embedder
+        self.matrix_path = os.path.join(index_dir, "vectors.f32")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(index_dir, "chunks.sqlite"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._open(initial_capacity)
+
+    def _open(self, initial_capacity: int):
+        """Load the chunk table and map the matrix, starting over if it was written differently or not flushed."""
+        layout = f"{VECTOR_SCHEMA_VERSION}/{self.embedder.name}/{self.embedder.dimensions}"
+        with self._lock, self._conn:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = dict(self._conn.execute("SELECT key, value FROM meta"))
+            usable = (
+                meta.get("layout") == layout
+                and meta.get("clean") == "1"
+                and os.path.exists(self.matrix_path)
+            )
+            if not usable:
+                self._conn.execute("DROP TABLE IF EXISTS chunks")
+                self._conn.execute("DELETE FROM meta")
+                self._conn.execute("INSERT INTO meta (key, value) VALUES ('layout', ?)", (layout,))
+                if os.path.exists(self.matrix_path):
+                    os.remove(self.matrix_path)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunks (
+                    row INTEGER PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    hash TEXT NOT NULL,
+                    first_line INTEGER NOT NULL,
+                    last_line INTEGER NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_path ON chunks (path)")
+            rows = self._conn.execute("SELECT row, path, hash, first_line, last_line FROM chunks").fetchall()
+        self.clean = usable
+
+        capacity = max(initial_capacity, 1)
+        if os.path.exists(self.matrix_path):
+            capacity = os.path.getsize(self.matrix_path) // (4 * self.embedder.dimensions)
+        self._map(capacity, create=not os.path.exists(self.matrix_path))
+
+        # In-memory view of the chunk table for searches
+        self.row_count = max((row for row, *_ in rows), default=-1) + 1
+        self.live = np.zeros(capacity, dtype=bool)
+        self.row_path = np.full(capacity, -1, dtype=np.int32)
+        self.row_lines: Dict[int, Tuple[int, int]] = {}
+        self.path_ids: Dict[str, int] = {}
+        self.paths: List[str] = []
+        self.file_rows: Dict[str, List[int]] = {}
+        self.file_hashes: Dict[str, str] = {}
+        for row, path, content_hash, first_line, last_line in rows:
+            self._track(row, path, content_hash, first_line, last_line)
+        self.free_rows = [row for row in range(self.row_count) if not self.live[row]]
+
+    def _map(self, capacity: int, create: bool = False):
+        """Memory-map the matrix file with room for capacity rows."""
+        shape = (capacity, self.embedder.dimensions)
+        self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode='w+' if create else 'r+', shape=shape)
+        self.capacity = capacity
+
+    def _grow(self, needed: int):
+        """Double the matrix until it has room for needed rows."""
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        self.matrix.flush()
+        del self.matrix
+        with open(self.matrix_path, 'r+b') as file:
+            file.truncate(capacity * self.embedder.dimensions * 4)
+        self._map(capacity)
+        extra = capacity - len(self.live)
+        self.live = np.concatenate([self.live, np.zeros(extra, dtype=bool)])
+        self.row_path = np.concatenate([self.row_path, np.full(extra, -1, dtype=np.int32)])
+
+    def _track(self, row: int, path: str, content_hash: str, first_line: int, last_line: int):
+        """Record a stored chunk in the in-memory view."""
+        if path not in self.path_ids:
+            self.path_ids[path] = len(self.paths)
+            self.paths.append(path)
+        self.live[row] = True
+        self.row_path[row] = self.path_ids[path]
+        self.row_lines[row] = (first_line, last_line)
+        self.file_rows.setdefault(path, []).append(row)
+        self.file_hashes[path] = content_hash
+
+    def _set_clean(self, clean: bool):
+        """Mark whether every chunk row in SQLite has its vector flushed to the matrix file."""
+        if self.clean == clean:
+            return
+        self.clean = clean
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('clean', ?)", ("1" if clean else "0",))
+
+    def __len__(self) -> int:
+        return int(self.live.sum())
+
+    def get_hash(self, relative_path: str) -> Optional[str]:
+        """Content hash a file's chunks were embedded from, or None if it is not indexed."""
+        with self._lock:
+            return self.file_hashes.get(relative_path)
+
+    def indexed_paths(self) -> List[str]:
+        """Paths with chunks in the index."""
+        with self._lock:
+            return list(self.file_hashes)
+
+    def delete(self, relative_path: str):
+        """
+        Remove a file's chunks
+
+        Args:
+            relative_path: Path relative to the repository root
+        """
+        with self._lock:
+            rows = self.file_rows.pop(relative_path, [])
+            self.file_hashes.pop(relative_path, None)
+            if not rows:
+                return
+            self.live[rows] = False
+            self.row_path[rows] = -1
+            for row in rows:
+                self.row_lines.pop(row, None)
+            self.free_rows.extend(rows)
+            with self._conn:
+                self._conn.execute("DELETE FROM chunks WHERE path = ?", (relative_path,))
+
+    def upsert(self, relative_path: str, content_hash: str, chunks: List[Tuple[int, int, str]]) -> bool:
+        """
+        Embed and store a file's chunks unless they were already embedded from the same content
+
+        Args:
+            relative_path: Path relative to the repository root
+            content_hash: Hash of the file content the chunks come from
+            chunks: (first_line, last_line, text) tuples, as from context_packer.split_with_line_numbers
+
+        Returns:
+            True if the file was (re-)embedded
+        """
+        with self._lock:
+            if self.file_hashes.get(relative_path) == content_hash:
+                return False
+            self.delete(relative_path)
+            if not chunks:
+                return True
+
+            # The path is part of every chunk, so "scanner" also finds chunks of scanner.py
+            texts = [f"{relative_path}\n{text}" for _, _, text in chunks]
+            vectors = np.concatenate([
+                self.embedder.embed(texts[start:start + EMBEDDING_BATCH_SIZE])
+                for start in range(0, len(texts), EMBEDDING_BATCH_SIZE)
+            ])
+
+            rows = []
+            while self.free_rows and len(rows) < len(chunks):
+                rows.append(self.free_rows.pop())
+            if len(rows) < len(chunks):
+                first_new = self.row_count
+                self.row_count += len(chunks) - len(rows)
+                if self.row_count > self.capacity:
+                    self._grow(self.row_count)
+                rows.extend(range(first_new, self.row_count))
+
+            self._set_clean(False)
+            self.matrix[rows] = vectors
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (row, path, hash, first_line, last_line) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (row, relative_path, content_hash, first_line, last_line)
+                        for row, (first_line, last_line, _) in zip(rows, chunks)
+                    ],
+                )
+            for row, (first_line, last_line, _) in zip(rows, chunks):
+                self._track(row, relative_path, content_hash, first_line, last_line)
+            return True
+
+    def flush(self):
+        """Write pending vectors to disk so the index can be reopened as is."""
+        with self._lock:
+            self.matrix.flush()
+            self._set_clean(True)
+
+    def search(
+        self,
+        query: str,
+        top_k: int = VECTOR_SEARCH_TOP_K,
+        paths: Optional[List[str]] = None
+    ) -> List[Tuple[str, int, int, float]]:
+        """
+        Find the chunks most similar to a query
+
+        Args:
+            query: Query text
+            top_k: Maximum number of chunks to return
+            paths: Optional relative paths to restrict the search to
+
+        Returns:
+            List of (path, first_line, last_line, cosine similarity), most similar first
+        """
+        return self.search_batch([query], top_k, paths)[0]
+
+    def search_batch(
+        self,
+        queries: List[str],
+        top_k: int = VECTOR_SEARCH_TOP_K,
+        paths: Optional[List[str]] = None
+    ) -> List[List[Tuple[str, int, int, float]]]:
+        """
+        Find the chunks most similar to each of several queries with a single pass over the
+        matrix, which is much cheaper than one pass per query since search is memory-bound
+
+        Args:
+            queries: Query texts
+            top_k: Maximum number of chunks to return per query
+            paths: Optional relative paths to restrict the search to
+
+        Returns:
+            One result list per query, as returned by search
+        """
+        query_vectors = self.embedder.embed(queries)
+        results: List[List[Tuple[str, int, int, float]]] = [[] for _ in queries]
+
+        with self._lock:
+            count = self.row_count
+            mask = self.live[:count]
+            if paths is not None:
+                ids = [self.path_ids[path] for path in paths if path in self.path_ids]
+                mask = mask & np.isin(self.row_path[:count], ids)
+            candidates = np.flatnonzero(mask)
+            if not len(candidates):
+                return results
+
+            # Scoring contiguous rows avoids copying the matrix; masked rows are dropped afterwards
+            if len(candidates) > count // 2:
+                scores = (self.matrix[:count] @ query_vectors.T)[candidates]
+            else:
+                scores = self.matrix[candidates] @ query_vectors.T
+
+            k = min(top_k, len(candidates))
+            for column, result in enumerate(results):
+                column_scores = scores[:, column]
+                best = np.argpartition(-column_scores, k - 1)[:k]
+                best = best[np.argsort(-column_scores[best])]
+                for i in best:
+                    if column_scores[i] <= 0:
+                        break
+                    row = int(candidates[i])
+                    result.append((self.paths[self.row_path[row]], *self.row_lines[row], float(column_scores[i])))
+        return results
+
+    def search_files(self, query: str, top_k: int = VECTOR_SEARCH_TOP_K) -> List[str]:
+        """
+        Rank files by their best matching chunk
+
+        Args:
+            query: Query text
+            top_k: Number of chunks searched
+
+        Returns:
+            Relative paths, best first
+        """
+        ranked: List[str] = []
+        for path, _, _, _ in self.search(query, top_k):
+            if path not in ranked:
+                ranked.append(path)
+        return ranked
+
+    def close(self):
+        """Flush the matrix, unmap it and close the metadata database."""
+        with self._lock:
+            self.flush()
+            # The mapping is closed once its last reference is gone
+            del self.matrix
+            self._conn.close()
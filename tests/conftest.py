@@ -0,0 +1,86 @@
+"""
+Shared fixtures: an isolated cache directory and small git repositories.
+"""
+
+import os
+import subprocess
+
+import pytest
+
+from src.utils import analysis_cache
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path_factory, monkeypatch):
+    """Keep indexes and caches out of the user's cache directory."""
+    home = str(tmp_path_factory.mktemp("home"))
+    monkeypatch.setenv("HOME", home)
+    monkeypatch.setenv("LOCALAPPDATA", home)
+    monkeypatch.setattr(analysis_cache, "_analysis_cache", None)
+    return home
+
+
+def git(repo_path: str, *args: str) -> str:
+    """Run a git command in a repository and return its output."""
+    return subprocess.run(
+        ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+        cwd=repo_path, check=True, capture_output=True, text=True
+    ).stdout
+
+
+def write_files(repo_path: str, files: dict):
+    """Write files given as {relative path: content}."""
+    for path, content in files.items():
+        full_path = os.path.join(repo_path, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+
+@pytest.fixture
+def make_git_repo(tmp_path):
+    """Create a git repository with one commit of the given files."""
+    def make(name: str, files: dict) -> str:
+        repo_path = str(tmp_path / name)
+        os.makedirs(repo_path)
+        git(repo_path, "init", "-q", "-b", "main")
+        write_files(repo_path, files)
+        git(repo_path, "add", "-A")
+        git(repo_path, "commit", "-q", "-m", "Initial commit")
+        return repo_path
+    return make
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """Route every LLM request to a deterministic fake, without provider rate limits."""
+    from benchmarks.harness import FakeLLM, fake_llm
+    from src.models import git_repo_bot
+
+    monkeypatch.setattr(git_repo_bot, "get_rate_limiter", lambda provider: None)
+    with fake_llm(FakeLLM()) as fake:
+        yield fake
+
+
+@pytest.fixture
+def repo(make_git_repo):
+    """A small repository with a config module and an app using it."""
+    return make_git_repo("repo", {
+        "src/config.py": "def parse_config(path):\n    return {}\n",
+        "src/app.py": "from src.config import parse_config\n",
+    })
+
+
+@pytest.fixture
+def make_bot(fake, repo, tmp_path):
+    """Create bots answering from the fake LLM, sharing one state of the repository."""
+    from src.models.git_repo_bot import GitRepoBot
+    from src.models.repo_state import RepoState
+    from src.utils.analysis_cache import AnalysisCache
+
+    state = RepoState(repo)
+    state.analysis_cache = AnalysisCache(str(tmp_path / "analyses.sqlite"))
+
+    def make(**kwargs) -> GitRepoBot:
+        return GitRepoBot(repo_path=repo, state=state, **kwargs)
+    return make
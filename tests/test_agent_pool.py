@@ -0,0 +1,42 @@
+"""
+Tests for lazy imports and the process-wide agent pool.
+"""
+
+import os
+import subprocess
+import sys
+
+from src.models.agent_pool import AgentPool, get_agent_pool
+
+
+def test_importing_the_bot_leaves_heavy_dependencies_unloaded():
+    code = (
+        "import sys, src.models.git_repo_bot; "
+        "print(','.join(m for m in ('crewai', 'litellm', 'langchain', 'langchain_text_splitters', "
+        "'google.generativeai') if m in sys.modules))"
+    )
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=repo_root, capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == ""
+
+
+def test_agents_are_built_once_per_model_and_key():
+    pool = AgentPool()
+
+    first = pool.get("gemini/gemini-2.0-flash", api_key="key")
+    assert pool.get("gemini/gemini-2.0-flash", api_key="key") is first
+    assert pool.get("gemini/gemini-1.5-pro", api_key="key") is not first
+    assert pool.get("gemini/gemini-2.0-flash", api_key="other") is not first
+    assert pool.stats() == {"agent_sets": 3, "created": 3, "reused": 1}
+    assert first.file_selector_agent.llm is first.llm
+
+
+def test_bots_share_the_pooled_agents(make_bot):
+    created = get_agent_pool().stats()["created"]
+
+    first, second = make_bot(), make_bot()
+
+    assert second.llm is first.llm
+    assert second.file_analyzer_agent is first.file_analyzer_agent
+    assert get_agent_pool().stats()["created"] <= created + 1
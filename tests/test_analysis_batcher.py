@@ -0,0 +1,57 @@
+"""
+Tests for packing small files into shared analysis requests and splitting the responses.
+"""
+
+from src.utils.analysis_batcher import FILE_HEADING, format_batch_files, plan_batches, split_batch_response
+
+
+def excerpt(tokens: int) -> str:
+    # estimate_tokens counts about four characters per token
+    return "x" * (4 * tokens)
+
+
+def test_small_files_share_requests_and_large_files_get_their_own():
+    excerpts = {
+        "a.py": excerpt(100),
+        "big.py": excerpt(3000),
+        "b.py": excerpt(400),
+        "c.py": excerpt(300),
+        "d.py": excerpt(50),
+    }
+
+    batches = plan_batches(excerpts, token_budget=500, max_files=8, large_file_tokens=2000)
+
+    # Largest first: b.py and c.py do not fit together, so a.py joins c.py and d.py joins b.py
+    assert batches == [["a.py", "c.py"], ["big.py"], ["b.py", "d.py"]]
+
+
+def test_batches_respect_the_file_limit():
+    excerpts = {f"f{i}.py": excerpt(10) for i in range(5)}
+
+    assert plan_batches(excerpts, token_budget=1000, max_files=2) == [
+        ["f0.py", "f1.py"], ["f2.py", "f3.py"], ["f4.py"],
+    ]
+    assert plan_batches(excerpts, max_files=1) == [[path] for path in excerpts]
+
+
+def test_split_follows_the_headings_of_each_file():
+    response = (
+        "Overview first.\n"
+        f"{FILE_HEADING}a.py\nParses the config.\n"
+        "**FILE: `b.py`**\nUses the config.\n"
+        f"{FILE_HEADING}unknown.py\nNot in the batch.\n"
+        f"{FILE_HEADING}a.py\nAlso validates it.\n"
+    )
+
+    assert split_batch_response(response, ["a.py", "b.py", "c.py"]) == {
+        "a.py": "Parses the config.\n\nAlso validates it.",
+        "b.py": "Uses the config.",
+    }
+
+
+def test_formatted_batches_split_back_by_path():
+    excerpts = {"a.py": "1 | a = 1", "b.py": "1 | b = 2"}
+    prompt = format_batch_files(excerpts, ["a.py", "b.py"])
+
+    assert prompt.startswith(f"{FILE_HEADING}a.py\n```\n1 | a = 1\n```")
+    assert set(split_batch_response(prompt, ["a.py", "b.py"])) == {"a.py", "b.py"}
@@ -0,0 +1,90 @@
+"""
+Tests for the persistent analysis cache's keying, eviction and invalidation.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+from src.utils.analysis_cache import AnalysisCache, normalize_query
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return AnalysisCache(str(tmp_path / "analyses.sqlite"))
+
+
+def store(cache, repo, path, content_hash, analysis, query="How does auth work?"):
+    key = AnalysisCache.make_key(repo, content_hash, "model", query)
+    cache.put(key, repo, path, content_hash, analysis)
+    return key
+
+
+def test_normalize_query_ignores_case_punctuation_and_stop_words():
+    assert normalize_query("How does auth work?") == normalize_query("how does AUTH work") == "auth work"
+
+
+def test_key_depends_on_repository_content_model_and_query():
+    key = AnalysisCache.make_key("/repos/a", "h1", "model", "auth")
+    assert key == AnalysisCache.make_key("/repos/a/", "h1", "model", "Auth?")
+    assert key != AnalysisCache.make_key("/repos/b", "h1", "model", "auth")
+    assert key != AnalysisCache.make_key("/repos/a", "h2", "model", "auth")
+    assert key != AnalysisCache.make_key("/repos/a", "h1", "other", "auth")
+    assert key != AnalysisCache.make_key("/repos/a", "h1", "model", "routes")
+
+
+def test_get_counts_hits_and_misses(cache):
+    key = store(cache, "/repos/a", "auth.py", "h1", "Checks tokens.")
+    assert cache.get(key) == "Checks tokens."
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_invalidate_keeps_current_content_of_the_same_repository(cache):
+    old = store(cache, "/repos/a", "auth.py", "h1", "old")
+    new = store(cache, "/repos/a", "auth.py", "h2", "new")
+    assert cache.invalidate("/repos/a", "auth.py", keep_hash="h2") == 1
+    assert cache.get(old) is None
+    assert cache.get(new) == "new"
+
+
+def test_invalidate_leaves_other_repositories_with_the_same_path(cache):
+    mine = store(cache, "/repos/a", "src/config.py", "h1", "mine")
+    theirs = store(cache, "/repos/b", "src/config.py", "h1", "theirs")
+    other = store(cache, "/repos/b", "src/config.py", "h3", "theirs too")
+    assert cache.invalidate("/repos/a", "src/config.py") == 1
+    assert cache.get(mine) is None
+    assert cache.get(theirs) == "theirs"
+    assert cache.get(other) == "theirs too"
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "analyses.sqlite"), max_entries=2)
+    first = store(cache, "/repos/a", "a.py", "h1", "a")
+    store(cache, "/repos/a", "b.py", "h2", "b")
+    store(cache, "/repos/a", "c.py", "h3", "c")
+    assert cache.get(first) is None
+    assert cache.stats()["entries"] == 2
+
+
+def test_expired_entries_are_not_returned(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "analyses.sqlite"), ttl=-1)
+    key = store(cache, "/repos/a", "a.py", "h1", "a")
+    assert cache.get(key) is None
+
+
+def test_cache_written_without_repositories_is_dropped(tmp_path):
+    path = str(tmp_path / "analyses.sqlite")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE analyses (key TEXT PRIMARY KEY, path TEXT NOT NULL, content_hash TEXT NOT NULL, "
+        "analysis TEXT NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+    )
+    conn.execute("INSERT INTO analyses VALUES ('k', 'a.py', 'h1', 'old', 0, 0)")
+    conn.commit()
+    conn.close()
+    cache = AnalysisCache(path)
+    assert cache.stats()["entries"] == 0
+    store(cache, os.fspath(tmp_path), "a.py", "h1", "new")
+    assert cache.stats()["entries"] == 1
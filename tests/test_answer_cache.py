@@ -0,0 +1,56 @@
+"""
+Tests for the answer cache's local hit / miss / ambiguous decisions.
+"""
+
+import pytest
+
+from src.utils.answer_cache import AnswerCache, query_terms
+
+
+@pytest.fixture
+def cache():
+    cache = AnswerCache()
+    cache.add("What does parse_config do?", "It parses the config file.", ["config.py"])
+    return cache
+
+
+def test_repeated_query_is_a_hit(cache):
+    decision, entry = cache.lookup("what does parse_config do")
+    assert decision == "hit"
+    assert entry["answer"] == "It parses the config file."
+
+
+@pytest.mark.parametrize("query", [
+    "Who calls parse_config?",
+    "Where is parse_config defined?",
+    "Why does parse_config fail?",
+    "How do I test parse_config?",
+])
+def test_different_question_about_same_symbol_is_not_a_hit(cache, query):
+    decision, entry = cache.lookup(query)
+    assert decision == "ambiguous"
+    assert entry["query"] == "What does parse_config do?"
+
+
+def test_different_question_word_is_never_a_hit():
+    cache = AnswerCache(hit_threshold=0.5)
+    cache.add("What does parse_config do?", "It parses the config file.", ["config.py"])
+    decision, _ = cache.lookup("How does parse_config do?")
+    assert decision == "ambiguous"
+
+
+def test_identifiers_are_not_split_into_parts(cache):
+    assert query_terms("What does parseConfig do?") == {"what": 1, "parseconfig": 1}
+    decision, _ = cache.lookup("What does the config loader do?")
+    assert decision != "hit"
+
+
+def test_unrelated_query_is_a_miss(cache):
+    decision, _ = cache.lookup("List the HTTP routes")
+    assert decision == "miss"
+
+
+def test_invalidate_paths_drops_answers_based_on_changed_files(cache):
+    assert cache.invalidate_paths(["config.py"]) == 1
+    assert cache.lookup("What does parse_config do?")[0] == "miss"
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,106 @@
+"""
+Tests for the execution backends that send the pipeline's prompts to the LLM.
+"""
+
+import time
+from types import SimpleNamespace
+
+import litellm
+import pytest
+
+from src.models.backends import DirectLLMBackend, compact_prompt
+from src.utils.scheduler import DeadlineExceeded, deadline
+
+AGENT = SimpleNamespace(role="Code Analyst", goal="Explain code", backstory="Reads code")
+
+
+@pytest.fixture
+def backend(fake):
+    llm = SimpleNamespace(model="gemini/test-model", api_key="key", temperature=0.3)
+    return DirectLLMBackend(llm)
+
+
+class Recorder:
+    """Wraps the fake LLM and keeps the options of every request."""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.calls = []
+
+    def __call__(self, **kwargs):
+        self.calls.append(kwargs)
+        return self.fake(**kwargs)
+
+
+@pytest.fixture
+def recorder(fake, monkeypatch):
+    recorder = Recorder(fake)
+    monkeypatch.setattr(litellm, "completion", recorder)
+    return recorder
+
+
+def test_compact_prompt_strips_template_indentation():
+    prompt = """
+            QUERY: what?
+
+
+            Answer briefly.
+            """
+    assert compact_prompt(prompt) == "QUERY: what?\n\nAnswer briefly."
+
+
+def test_requests_without_a_deadline_have_no_timeout(backend, recorder):
+    backend.run(AGENT, "Summarize the code", "A summary")
+    assert "timeout" not in recorder.calls[0]
+
+
+def test_requests_give_up_at_the_querys_deadline(backend, recorder):
+    with deadline(5):
+        backend.run(AGENT, "Summarize the code", "A summary")
+        backend.stream(AGENT, "Summarize the code", lambda text: None)
+    assert all(0 < call["timeout"] <= 5 for call in recorder.calls)
+
+
+def test_no_request_is_sent_after_the_deadline(backend, recorder):
+    with deadline(-1):
+        with pytest.raises(DeadlineExceeded):
+            backend.run(AGENT, "Summarize the code", "A summary")
+    assert recorder.calls == []
+
+
+def test_llm_timeout_at_the_deadline_is_reported_as_deadline_exceeded(backend, monkeypatch):
+    def slow(**kwargs):
+        time.sleep(kwargs["timeout"])
+        raise litellm.Timeout("Request timed out", model="gemini/test-model", llm_provider="gemini")
+
+    monkeypatch.setattr(litellm, "completion", slow)
+    with deadline(0.1):
+        with pytest.raises(DeadlineExceeded):
+            backend.run(AGENT, "Summarize the code", "A summary")
+
+
+def test_streaming_sends_the_same_options_as_a_plain_request(backend, recorder):
+    backend.run(AGENT, "Summarize the code", "A summary")
+    tokens = []
+    answer = backend.stream(AGENT, "Summarize the code", tokens.append)
+
+    plain, streamed = recorder.calls
+    assert plain["temperature"] == streamed["temperature"] == 0.3
+    assert plain["messages"] == streamed["messages"]
+    assert streamed["stream"] is True
+    assert "".join(tokens) == answer
+
+
+def test_llm_without_a_temperature_sends_none(fake, recorder):
+    backend = DirectLLMBackend(SimpleNamespace(model="gemini/test-model", api_key="key", temperature=None))
+    backend.stream(AGENT, "Summarize the code", lambda text: None)
+    assert "temperature" not in recorder.calls[0]
+
+
+def test_answers_are_streamed_only_to_a_listener(make_bot, recorder):
+    make_bot().answer_query("How does the config loader work?")
+    assert recorder.calls and not any(call.get("stream") for call in recorder.calls)
+
+    recorder.calls.clear()
+    make_bot().answer_query("Which settings does the app read?", on_event=lambda event, data: None)
+    assert recorder.calls[-1]["stream"] is True
@@ -0,0 +1,83 @@
+"""
+Tests for sharing repository state between sessions and evicting idle repositories.
+"""
+
+import sqlite3
+
+import pytest
+
+from src.models.bot_registry import BotRegistry
+
+FILES = {"src/config.py": "def parse_config(path):\n    return {}\n"}
+
+
+@pytest.fixture
+def registry(fake):
+    return BotRegistry(max_repos=1, memory_budget=2**30, max_sessions=10)
+
+
+def test_sessions_on_a_repository_share_its_state(registry, make_git_repo):
+    repo = make_git_repo("repo", FILES)
+    first, second = registry.get_bot(repo, "a"), registry.get_bot(repo, "b")
+    assert first is not second
+    assert first.state is second.state
+    assert registry.get_bot(repo, "a") is first
+
+
+def test_eviction_closes_the_repositorys_indexes(registry, make_git_repo):
+    repo = make_git_repo("repo", FILES)
+    state = registry.get_repo(repo)
+    state.refresh_index()
+    assert registry.evict(repo)
+
+    assert state.released
+    with pytest.raises(sqlite3.ProgrammingError):
+        state.index.get_all_files()
+    if state.vector_index is not None:
+        assert not hasattr(state.vector_index, "matrix")
+    if state.history_index is not None:
+        with pytest.raises(sqlite3.ProgrammingError):
+            state.history_index.stats()
+    with pytest.raises(RuntimeError):
+        with state.in_use():
+            pass
+
+
+def test_repository_serving_a_query_is_not_evicted(registry, make_git_repo):
+    repo = make_git_repo("repo", FILES)
+    state = registry.get_repo(repo)
+    with state.in_use():
+        assert not registry.evict(repo)
+        registry.get_repo(make_git_repo("other", FILES))
+        assert not state.released
+    assert registry.evict(repo)
+
+
+def test_sessions_keep_their_conversation_when_their_repository_is_evicted(registry, make_git_repo):
+    repo, other = make_git_repo("repo", FILES), make_git_repo("other", FILES)
+    bot = registry.get_bot(repo, "a")
+    bot.add_to_history("What does parse_config do?", "It parses the config file.", ["src/config.py"])
+    bot.answer_cache.add("What does parse_config do?", "It parses the config file.", ["src/config.py"])
+    old_state = bot.state
+
+    # Loading another repository evicts the least recently used one
+    registry.get_bot(other, "b")
+    assert old_state.released
+    assert registry.stats()["sessions"] == 2
+
+    again = registry.get_bot(repo, "a")
+    assert again is bot
+    assert bot.state is not old_state and not bot.state.released
+    assert len(bot.memory) == 1
+    # Past answers may be based on files that changed while the repository was unloaded
+    assert bot.answer_cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_sessions_are_dropped_beyond_the_limit(fake, make_git_repo):
+    registry = BotRegistry(max_sessions=2)
+    repo = make_git_repo("repo", FILES)
+    first = registry.get_bot(repo, "a")
+    registry.get_bot(repo, "b")
+    registry.get_bot(repo, "c")
+    assert registry.stats()["sessions"] == 2
+    assert registry.get_bot(repo, "a") is not first
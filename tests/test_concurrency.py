@@ -0,0 +1,110 @@
+"""
+Tests for running independent calls concurrently under rate and time limits.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.concurrency import RateLimiter, abandoned_calls, get_provider, run_concurrently, run_with_timeouts
+from src.utils.scheduler import deadline, time_left
+
+
+def test_run_concurrently_keeps_item_order():
+    assert run_concurrently(lambda n: n * n, range(6), max_workers=3) == [0, 1, 4, 9, 16, 25]
+
+
+def test_run_concurrently_bounds_the_calls_in_flight():
+    lock = threading.Lock()
+    running = [0]
+    peak = [0]
+
+    def call(_):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+
+    start = time.monotonic()
+    run_concurrently(call, range(8), max_workers=4)
+
+    assert peak[0] == 4
+    assert time.monotonic() - start < 8 * 0.05
+
+
+def test_run_concurrently_raises_a_failed_call():
+    def call(n):
+        if n == 2:
+            raise ValueError("boom")
+        return n
+
+    with pytest.raises(ValueError):
+        run_concurrently(call, range(4), max_workers=2)
+
+
+def test_rate_limiter_allows_a_burst_then_spaces_requests():
+    limiter = RateLimiter(requests_per_minute=600, burst=3)
+    start = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.monotonic() - start < 0.05
+
+    limiter.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_run_concurrently_acquires_the_limiter_per_call():
+    limiter = RateLimiter(requests_per_minute=600, burst=1)
+    start = time.monotonic()
+
+    run_concurrently(lambda n: n, range(3), max_workers=3, rate_limiter=limiter)
+
+    assert time.monotonic() - start >= 0.19
+
+
+def test_provider_is_the_model_prefix():
+    assert get_provider("gemini/gemini-2.0-flash") == "gemini"
+    assert get_provider("gpt-4o") == "gpt-4o"
+
+
+def test_run_concurrently_passes_the_callers_deadline_on():
+    with deadline(5):
+        left = run_concurrently(lambda _: time_left(), range(3), max_workers=3)
+    assert all(0 < seconds <= 5 for seconds in left)
+
+
+def test_failed_and_timed_out_calls_give_none():
+    def call(n):
+        if n == 1:
+            raise ValueError("boom")
+        if n == 2:
+            time.sleep(0.5)
+        return n
+
+    assert run_with_timeouts(call, range(4), max_workers=4, timeout=0.2) == [0, None, None, 3]
+
+
+def test_each_call_runs_under_its_time_limit():
+    with deadline(60):
+        left = run_with_timeouts(lambda _: time_left(), range(3), max_workers=3, timeout=1)
+    assert all(0 < seconds <= 1 for seconds in left)
+
+
+def test_abandoned_calls_are_counted_until_they_return():
+    release = threading.Event()
+    baseline = abandoned_calls()
+
+    def call(_):
+        # Stands in for an LLM request that gives up at the call's deadline
+        release.wait(max(0, time_left()) + 0.2)
+
+    assert run_with_timeouts(call, range(2), max_workers=2, timeout=0.1) == [None, None]
+    assert abandoned_calls() == baseline + 2
+    release.set()
+    end = time.monotonic() + 5
+    while abandoned_calls() > baseline and time.monotonic() < end:
+        time.sleep(0.01)
+    assert abandoned_calls() == baseline
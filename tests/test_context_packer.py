@@ -0,0 +1,73 @@
+"""
+Tests for packing line-numbered file excerpts into a shared token budget.
+"""
+
+import pytest
+
+from src.utils.context_packer import (
+    estimate_tokens,
+    get_text_splitter,
+    pack_context,
+    render_line_ranges,
+    split_with_line_numbers,
+)
+
+
+def module(name: str, lines: int) -> str:
+    return "\n".join(f"def {name}_{i}(config):\n    return parse_config(config, {i})" for i in range(lines // 2))
+
+
+@pytest.fixture
+def splitter():
+    return get_text_splitter()
+
+
+def chunk_tokens(content: str, splitter) -> int:
+    return sum(
+        estimate_tokens(chunk) + 2 * (last_line - first_line + 1)
+        for first_line, last_line, chunk in split_with_line_numbers(content, splitter)
+    )
+
+
+def test_split_with_line_numbers_locates_chunks(splitter):
+    content = module("load", 400)
+    chunks = split_with_line_numbers(content, splitter)
+    assert len(chunks) > 1
+    for first_line, last_line, chunk in chunks:
+        assert content.split("\n")[first_line - 1:last_line] == chunk.split("\n")
+
+
+def test_render_line_ranges_numbers_lines_and_marks_gaps():
+    content = "a\nb\nc\nd\ne"
+    assert render_line_ranges(content, [(2, 2), (4, 4)]) == "...\n2 | b\n...\n4 | d\n..."
+
+
+def test_every_file_fits_in_a_large_budget(splitter):
+    contents = {"a.py": module("load", 20), "b.py": module("save", 20)}
+    excerpts = pack_context("parse_config", contents, splitter, token_budget=10_000)
+    assert set(excerpts) == {"a.py", "b.py"}
+    assert "..." not in excerpts["a.py"]
+
+
+def test_file_whose_best_chunk_does_not_fit_is_cut_short_not_dropped(splitter):
+    small, large = module("load", 20), module("save", 60)
+    budget = chunk_tokens(small, splitter) + chunk_tokens(large, splitter) // 2
+    excerpts = pack_context("load_0 save_0", {"a.py": small, "b.py": large}, splitter, token_budget=budget)
+
+    assert set(excerpts) == {"a.py", "b.py"}
+    assert excerpts["b.py"].startswith(" 1 | def save_0")
+    assert excerpts["b.py"].endswith("...")
+    assert estimate_tokens(excerpts["a.py"] + excerpts["b.py"]) <= budget + 2 * 80
+
+
+def test_file_is_left_out_only_when_no_line_fits(splitter):
+    contents = {"a.py": module("load", 20), "b.py": module("save", 20)}
+    budget = chunk_tokens(contents["a.py"], splitter)
+    excerpts = pack_context("load_0", contents, splitter, token_budget=budget)
+    assert set(excerpts) == {"a.py"}
+
+
+def test_pinned_spans_come_first(splitter):
+    contents = {"a.py": module("load", 200), "b.py": module("save", 20)}
+    excerpts = pack_context("save", contents, splitter, token_budget=60, pinned={"a.py": [(101, 102)]})
+    assert "101 | def load_50(config):" in excerpts["a.py"]
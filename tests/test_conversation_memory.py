@@ -0,0 +1,72 @@
+"""
+Tests for the bounded conversation memory and its per-stage views.
+"""
+
+from src.utils.context_packer import estimate_tokens
+from src.utils.conversation_memory import ConversationMemory, answer_gist, truncate_to_tokens
+
+BUDGETS = {"aggregate": 200, "selector": 40, "analysis": 0}
+
+
+def make_memory(**kwargs) -> ConversationMemory:
+    options = {"recent_turns": 1, "relevance_threshold": 0.2, "stage_budgets": BUDGETS, "summary_budget": 60}
+    options.update(kwargs)
+    memory = ConversationMemory(**options)
+    memory.add("How is the config file parsed?", "The parse_config function reads YAML. It validates keys.", ["src/config.py"])
+    memory.add("Which port does the server use?", "The server listens on port 8080.", ["src/server.py"])
+    memory.add("Who wrote the deploy script?", "Ada wrote deploy.sh in 2021.", ["deploy.sh"])
+    return memory
+
+
+def test_truncation_and_gists():
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("one two three four five six", 4) == "one two..."
+    answer = "# Answer\n```python\nx = 1\n```\n- The loader reads YAML. Then it checks keys."
+    assert answer_gist(answer) == "The loader reads YAML."
+
+
+def test_oldest_turns_are_dropped_past_the_limit():
+    memory = make_memory(max_turns=2)
+
+    assert len(memory) == 2
+    assert memory.stats() == {"turns": 2, "total_turns": 3}
+    assert "config file" not in memory.context_for("aggregate", "anything")
+
+
+def test_views_show_recent_and_relevant_turns_in_conversation_order():
+    memory = make_memory()
+
+    context = memory.context_for("aggregate", "Does the config parser validate keys?")
+
+    summary, shown = context.split("\n\n")
+    assert shown.index("How is the config file parsed?") < shown.index("Who wrote the deploy script?")
+    assert "Bot: The parse_config function reads YAML." in shown
+    # The unrelated older turn only appears as a summary line
+    assert "Which port" not in shown
+    assert summary == (
+        "Earlier in this conversation:\n"
+        "- Which port does the server use? -> The server listens on port 8080."
+    )
+
+
+def test_question_stages_see_questions_and_files_only():
+    memory = make_memory()
+
+    context = memory.context_for("selector", "Does the config parser validate keys?")
+
+    assert context.startswith("User asked: ")
+    assert "(answered from src/config.py)" in context
+    assert "Bot:" not in context and "Earlier" not in context
+    assert estimate_tokens(context) <= BUDGETS["selector"] + 1
+    assert memory.context_for("analysis", "config") == ""
+
+
+def test_views_stay_within_budget_however_long_the_conversation():
+    memory = ConversationMemory(stage_budgets={"aggregate": 150}, summary_budget=50)
+    for i in range(200):
+        memory.add(f"Question {i} about the config loader?", "The loader reads YAML files. " * 20)
+
+    context = memory.context_for("aggregate", "How does the config loader work?")
+
+    assert len(memory) == memory.turns.maxlen
+    assert sum(estimate_tokens(section) for section in context.split("\n\n")) <= 150 + 2
@@ -0,0 +1,99 @@
+"""
+Tests for the structural digests shown to the file selector.
+"""
+
+from src.utils.digest import build_digest, find_key_imports, first_doc_line, fit_list
+from src.utils.repo_index import RepoIndex
+from src.utils.symbols import extract_symbols
+
+MODULE = '''\
+#!/usr/bin/env python
+# Copyright 2024 Example Corp
+# Licensed under the MIT License
+"""
+Persistent index of repository files.
+"""
+
+import os
+import sqlite3
+from typing import Dict
+from src.utils.scanner import RepoScanner
+
+SCHEMA_VERSION = "1"
+
+
+class RepoIndex:
+    def refresh(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _init_schema(self):
+        pass
+
+
+def get_index_path(repo_path):
+    return repo_path
+
+
+def _hash(data):
+    return data
+'''
+
+
+def test_first_doc_line_skips_shebangs_and_license_headers():
+    assert first_doc_line(MODULE) == "Persistent index of repository files."
+    assert first_doc_line("/**\n * Copyright ACME\n */\n\n// Routes HTTP requests\nint x;") == "Routes HTTP requests"
+    assert first_doc_line("import os\n# Not documentation\n") == ""
+
+
+def test_key_imports_leave_out_ubiquitous_modules():
+    assert find_key_imports(MODULE) == ["sqlite3", "src.utils.scanner"]
+    assert find_key_imports("import React from 'react';\nimport { api } from './api';\n") == ["./api"]
+
+
+def test_digest_lists_structure_within_its_budget():
+    definitions, _ = extract_symbols("src/repo_index.py", MODULE)
+
+    digest = build_digest(MODULE, definitions)
+
+    assert digest.split("\n") == [
+        "Persistent index of repository files.",
+        "class RepoIndex: refresh, close",
+        "defines: get_index_path, _hash",
+        "imports: sqlite3, src.utils.scanner",
+        "names: SCHEMA_VERSION",
+    ]
+    small = build_digest(MODULE, definitions, token_budget=20)
+    assert len(small) <= 20 * 4
+    assert small.startswith("Persistent index")
+
+
+def test_digest_without_symbols_condenses_the_opening_lines():
+    content = "# Deployment notes\n\nRun the migrations first.\nThen restart the workers.\n"
+
+    assert build_digest(content) == "Deployment notes\nRun the migrations first.\nThen restart the workers."
+
+
+def test_fit_list_counts_what_was_left_out():
+    assert fit_list("defines", ["alpha", "beta", "gamma"], 100) == "defines: alpha, beta, gamma"
+    assert fit_list("defines", ["alpha", "beta", "gamma"], 25) == "defines: alpha (+2 more)"
+    assert fit_list("defines", ["alpha"], 5) is None
+
+
+def test_index_serves_digests_and_shares_them_by_content(tmp_path):
+    repo_path = tmp_path / "repo"
+    repo_path.mkdir()
+    (repo_path / "a.py").write_text(MODULE)
+    (repo_path / "b.py").write_text(MODULE)
+    index = RepoIndex(str(repo_path), str(tmp_path / "index.sqlite"))
+    try:
+        index.refresh()
+        summaries = index.get_file_summaries()
+
+        assert summaries["a.py"]["digest"] == build_digest(MODULE, extract_symbols("a.py", MODULE)[0])
+        assert summaries["b.py"]["digest"] == summaries["a.py"]["digest"]
+        assert index._conn.execute("SELECT COUNT(*) FROM digests").fetchone() == (1,)
+    finally:
+        index.close()
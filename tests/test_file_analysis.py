@@ -0,0 +1,112 @@
+"""
+Tests for analyzing the selected files of a query concurrently and in batches.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.analysis_batcher import FILE_HEADING
+from src.utils.scheduler import Cancelled, cancellation
+
+QUERY = "How is the configuration parsed?"
+FILES = ["src/config.py", "src/app.py"]
+
+
+def analyzed_path(description: str) -> str:
+    return next(path for path in FILES if f"File: {path}" in description)
+
+
+def test_files_are_analyzed_concurrently(make_bot):
+    bot = make_bot(analysis_batch_max_files=1, analysis_max_workers=2)
+    both_started = threading.Barrier(2, timeout=5)
+
+    def run(agent, description, expected_output=None):
+        # Only returns once both analyses are in flight
+        both_started.wait()
+        return f"Analysis of {analyzed_path(description)}"
+
+    bot.backend.run = run
+    analyses = bot.analyze_files_for_query(QUERY, FILES)
+
+    assert analyses == {path: f"Analysis of {path}" for path in FILES}
+
+
+def test_failed_analyses_are_left_out(make_bot):
+    bot = make_bot(analysis_batch_max_files=1, analysis_max_workers=2)
+
+    def run(agent, description, expected_output=None):
+        path = analyzed_path(description)
+        if path == "src/config.py":
+            raise RuntimeError("provider error")
+        return f"Analysis of {path}"
+
+    bot.backend.run = run
+    assert bot.analyze_files_for_query(QUERY, FILES) == {"src/app.py": "Analysis of src/app.py"}
+    assert bot.analysis_cache.stats()["entries"] == 1
+
+
+def test_slow_analyses_are_left_out(make_bot):
+    bot = make_bot(analysis_batch_max_files=1, analysis_max_workers=2, analysis_timeout=0.3)
+
+    def slow_run(agent, description, expected_output=None):
+        path = analyzed_path(description)
+        if path == "src/app.py":
+            time.sleep(1)
+        return f"Analysis of {path}"
+
+    bot.backend.run = slow_run
+    start = time.monotonic()
+    analyses = bot.analyze_files_for_query(QUERY, FILES)
+
+    assert analyses == {"src/config.py": "Analysis of src/config.py"}
+    assert time.monotonic() - start < 1
+
+
+def test_unknown_and_empty_files_are_skipped(make_bot, repo):
+    with open(f"{repo}/src/empty.py", "w"):
+        pass
+    bot = make_bot(analysis_batch_max_files=1)
+    bot.refresh_index()
+    calls = []
+    bot.backend.run = lambda agent, description, expected_output=None: calls.append(description) or "Analysis"
+
+    analyses = bot.analyze_files_for_query(QUERY, ["src/missing.py", "src/empty.py", "src/app.py"])
+
+    assert analyses == {"src/app.py": "Analysis"}
+    assert len(calls) == 1
+
+
+def test_small_files_share_a_request_and_skipped_files_are_retried(make_bot):
+    bot = make_bot(analysis_batch_max_files=8)
+    requests = []
+
+    def run(agent, description, expected_output=None):
+        requests.append(description)
+        if len(requests) == 1:
+            # The batched response only covers the first file
+            return f"{FILE_HEADING}src/config.py\nParses the config."
+        return f"Analysis of {analyzed_path(description)}"
+
+    bot.backend.run = run
+    analyses = bot.analyze_files_for_query(QUERY, FILES)
+
+    assert analyses == {"src/config.py": "Parses the config.", "src/app.py": "Analysis of src/app.py"}
+    assert len(requests) == 2
+    assert all(f"{FILE_HEADING}{path}" in requests[0] for path in FILES)
+
+
+def test_cancelling_while_claiming_leaves_no_analysis_in_flight(make_bot):
+    bot = make_bot(analysis_batch_max_files=1)
+    bot.backend.run = lambda agent, description, expected_output=None: f"Analysis of {analyzed_path(description)}"
+    # With src/app.py cached, its progress event comes after src/config.py was claimed
+    bot.analyze_files_for_query(QUERY, ["src/app.py"])
+
+    cancelled = threading.Event()
+    cancelled.set()
+    with cancellation(cancelled), pytest.raises(Cancelled):
+        bot.analyze_files_for_query(QUERY, FILES)
+
+    assert bot.state.analysis_flights.stats()["in_flight"] == 0
+    assert bot.analyze_files_for_query(QUERY, FILES) == {path: f"Analysis of {path}" for path in FILES}
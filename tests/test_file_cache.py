@@ -0,0 +1,84 @@
+"""
+Tests for the memory-bounded file content cache and cheap file previews.
+"""
+
+import sys
+
+from src.config.settings import MMAP_THRESHOLD, PREVIEW_LINES
+from src.utils.file_cache import FileCache
+from src.utils.file_utils import check_readable, make_preview, read_file, read_preview
+
+
+def content(character: str) -> str:
+    return character * 1000
+
+
+def test_least_recently_used_contents_are_evicted():
+    size = sys.getsizeof(content("a"))
+    cache = FileCache(max_bytes=2 * size)
+    cache["a.py"] = content("a")
+    cache["b.py"] = content("b")
+    # Reading a.py makes b.py the least recently used
+    assert cache.get("a.py") == content("a")
+
+    cache["c.py"] = content("c")
+
+    assert "b.py" not in cache
+    assert "a.py" in cache and "c.py" in cache
+    assert cache.stats()["bytes"] == 2 * size
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversize_contents_are_not_cached():
+    cache = FileCache(max_entry_bytes=100)
+    cache["small.py"] = "x = 1"
+    cache["small.py"] = content("x")
+
+    assert "small.py" not in cache
+    assert cache.stats()["bytes"] == 0
+
+
+def test_counters_and_removal():
+    cache = FileCache()
+    cache["a.py"] = "a = 1"
+
+    assert cache.get("missing.py") is None
+    assert cache.get("a.py") == "a = 1"
+    assert cache.pop("a.py") == "a = 1"
+    assert cache.pop("a.py", "gone") == "gone"
+    assert cache.stats() == {
+        "entries": 0, "bytes": 0, "max_bytes": cache.max_bytes, "hits": 1, "misses": 1, "evictions": 0,
+    }
+
+
+def test_read_file_fills_the_cache(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_text("a = 1\n")
+    cache = FileCache()
+
+    assert read_file(str(path), cache) == "a = 1\n"
+    path.write_text("a = 2\n")
+    assert read_file(str(path), cache) == "a = 1\n"
+    assert cache.stats()["hits"] == 1
+
+
+def test_binary_files_are_not_read(tmp_path):
+    path = tmp_path / "data.py"
+    path.write_bytes(b"x = 1\0\1\2")
+    cache = FileCache()
+
+    assert check_readable(str(path)) == "binary file"
+    assert read_file(str(path), cache).startswith("Error reading file")
+    assert "data.py" not in cache
+
+
+def test_previews_of_large_files_match_full_reads(tmp_path):
+    lines = [f"line {i} " + "x" * 50 for i in range(MMAP_THRESHOLD // 50 + PREVIEW_LINES)]
+    text = "\n".join(lines)
+    small = tmp_path / "small.py"
+    large = tmp_path / "large.py"
+    small.write_text("\n".join(lines[:3]))
+    large.write_text(text)
+
+    assert read_preview(str(small)) == make_preview("\n".join(lines[:3]))
+    assert read_preview(str(large)) == make_preview(text)
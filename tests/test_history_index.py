@@ -0,0 +1,113 @@
+"""
+Tests for the streaming commit history index.
+"""
+
+import pytest
+from git.exc import GitCommandError
+
+from src.utils import history_index
+from src.utils.history_index import HistoryIndex, is_history_query, parse_log
+from tests.conftest import git, write_files
+
+
+def commit(repo_path: str, author: str, message: str, files: dict, date: str):
+    write_files(repo_path, files)
+    git(repo_path, "add", "-A")
+    git(repo_path, "commit", "-q", "-m", message, f"--author={author} <{author.lower()}@example.com>", f"--date={date}")
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    path = str(tmp_path / "repo")
+    git(str(tmp_path), "init", "-q", "-b", "main", path)
+    commit(path, "Ada", "Add config loader", {"config.py": "a = 1\n", "app.py": "b = 1\n"}, "2024-01-01T00:00:00")
+    commit(path, "Grace", "Fix config parsing\n\nEmpty files crashed the loader.", {"config.py": "a = 2\nc = 3\n"}, "2024-02-01T00:00:00")
+    commit(path, "Ada", "Wire config into app", {"config.py": "a = 3\nc = 3\n", "app.py": "b = 2\n"}, "2024-03-01T00:00:00")
+    return path
+
+
+@pytest.fixture
+def index(repo_path, tmp_path):
+    index = HistoryIndex(repo_path, str(tmp_path / "history.sqlite"), batch_commits=2)
+    index.update()
+    yield index
+    index.close()
+
+
+def test_history_questions_are_recognized():
+    assert is_history_query("Who changed the config loader?")
+    assert is_history_query("When was retry support added?")
+    assert is_history_query("Show the recent changes")
+    assert not is_history_query("How does the config loader work?")
+
+
+def test_parse_log_reads_commits_and_numstat_lines():
+    output = [
+        b"\x1eabc\x1fAda\x1fada@example.com\x1f1700000000\x1fAdd loader\x1fFirst line\n",
+        b"second line\x1d\n",
+        b"\n",
+        b"3\t1\tsrc/loader.py\n",
+        b"-\t-\tlogo.png\n",
+        b"\x1edef\x1fGrace\x1fgrace@example.com\x1f1700000100\x1fFix\x1f\x1d\n",
+        b"1\t0\t\"src/na\\303\\257ve.py\"\n",
+    ]
+
+    commits = list(parse_log(output))
+
+    assert [commit["sha"] for commit in commits] == ["abc", "def"]
+    assert commits[0]["body"] == "First line\nsecond line"
+    assert commits[0]["files"] == [("src/loader.py", 3, 1), ("logo.png", None, None)]
+    assert commits[1]["files"] == [("src/naïve.py", 1, 0)]
+
+
+def test_update_indexes_churn_authors_and_co_changes(index):
+    assert index.stats()["commits"] == 3
+    assert index.churn(["config.py", "app.py", "missing.py"]) == {"config.py": 3, "app.py": 2}
+    assert index.co_changed(["app.py"]) == [("config.py", 2)]
+
+    summary = index.file_summary("config.py")
+    assert summary["authors"] == [("Ada", 2), ("Grace", 1)]
+    assert (summary["added"], summary["deleted"]) == (4, 2)
+    assert [commit["subject"] for commit in index.file_history("config.py")] == [
+        "Wire config into app", "Fix config parsing", "Add config loader",
+    ]
+
+
+def test_updates_read_only_new_commits_and_rebuild_after_a_force_push(index, repo_path):
+    assert index.update() == 0
+    commit(repo_path, "Grace", "Add retries", {"retry.py": "r = 1\n"}, "2024-04-01T00:00:00")
+    assert index.update() == 1
+    assert index.stats()["commits"] == 4
+
+    git(repo_path, "reset", "-q", "--hard", "HEAD~2")
+    commit(repo_path, "Ada", "Rewrite the loader", {"config.py": "loader = 1\n"}, "2024-05-01T00:00:00")
+
+    assert index.update() == 3
+    assert index.stats()["commits"] == 3
+    assert index.churn(["retry.py"]) == {}
+
+
+def test_failed_log_does_not_mark_head_as_indexed(repo_path, tmp_path, monkeypatch):
+    index = HistoryIndex(repo_path, str(tmp_path / "history.sqlite"))
+    monkeypatch.setattr(history_index, "get_head_commit", lambda path: "0" * 40)
+    try:
+        with pytest.raises(GitCommandError):
+            index.update()
+        assert index.indexed_commit is None
+
+        monkeypatch.undo()
+        assert index.update() == 3
+    finally:
+        index.close()
+
+
+def test_describe_sums_up_files_and_matching_commits(index):
+    text = index.describe("Who fixed the empty files crash?", ["config.py"])
+
+    assert text.startswith("config.py: changed in 3 commits (+4/-2 lines), last on 2024-03-01")
+    assert "Authors: Ada (2 commits), Grace (1 commits)" in text
+    assert "Often changed together with: app.py (2)" in text
+    assert "Commits matching the query:" in text and "Empty files crashed the loader." in text
+
+    overview = index.describe("Who works on this repository?")
+    assert overview.startswith("3 commits from 2024-01-01 to 2024-03-01")
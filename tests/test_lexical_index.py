@@ -0,0 +1,55 @@
+"""
+Tests for tokenizing code and ranking files with the BM25 index.
+"""
+
+from src.utils.lexical_index import BM25Index, tokenize
+
+
+def test_tokenize_splits_identifiers_and_drops_stop_words():
+    assert tokenize("How does parseConfig read the HTTPServer_port?") == [
+        "parseconfig", "parse", "config", "read", "httpserver_port", "http", "server", "port",
+    ]
+
+
+def make_index() -> BM25Index:
+    index = BM25Index()
+    index.add_file("src/config.py", ["def parse_config(path):\n    return load_yaml(path)\n"])
+    index.add_file("src/server.py", ["class HttpServer:\n    def listen(self, port):\n        pass\n"])
+    index.add_file("docs/notes.md", ["Release notes and the changelog.\n"])
+    return index
+
+
+def test_search_ranks_the_file_defining_the_terms_first():
+    ranked = make_index().search("where is the http server port set?")
+
+    assert ranked[0][0] == "src/server.py"
+    assert all(score > 0 for _, score in ranked)
+    assert "docs/notes.md" not in dict(ranked)
+
+
+def test_path_terms_count_towards_a_file():
+    assert make_index().search("notes", top_k=1)[0][0] == "docs/notes.md"
+
+
+def test_readding_a_file_replaces_its_documents():
+    index = make_index()
+    postings = index.posting_count
+
+    index.add_file("src/config.py", ["def read_settings():\n    pass\n"])
+
+    assert len(index) == 3
+    assert "src/config.py" not in dict(index.search("yaml"))
+    assert dict(index.search("settings")).keys() == {"src/config.py"}
+    assert index.posting_count != postings
+
+
+def test_removing_every_file_empties_the_index():
+    index = make_index()
+    for path in ["src/config.py", "src/server.py", "docs/notes.md"]:
+        index.remove_file(path)
+
+    assert len(index) == 0
+    assert index.postings == {}
+    assert index.total_length == 0
+    assert index.posting_count == 0
+    assert index.search("config") == []
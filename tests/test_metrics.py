@@ -0,0 +1,90 @@
+"""
+Tests for tracing pipeline stages and rendering Prometheus metrics.
+"""
+
+import pytest
+
+from src.models.bot_registry import BotRegistry
+from src.models.jobs import JobManager
+from src.utils.concurrency import run_concurrently
+from src.utils.metrics import MetricsRegistry, Span, record, span, traced
+from src.utils.scheduler import QueryScheduler
+
+
+def test_spans_nest_and_total_their_counters():
+    @traced("child")
+    def child(n):
+        record(prompt_tokens=n)
+
+    with span("root", query="q") as root:
+        record(cache_hits=1)
+        run_concurrently(child, [10, 20], max_workers=2)
+
+    trace = root.to_dict()
+    assert trace["name"] == "root"
+    assert trace["attributes"] == {"query": "q"}
+    assert trace["prompt_tokens"] == 30 and trace["cache_hits"] == 1
+    assert sorted(child["prompt_tokens"] for child in trace["children"]) == [10, 20]
+    assert root.counters["prompt_tokens"] == 0
+
+
+def test_record_outside_a_trace_does_nothing():
+    record(prompt_tokens=5)
+
+
+def finished_span(name: str, duration: float, **counts) -> Span:
+    finished = Span(name)
+    finished.add(**counts)
+    finished.duration = duration
+    return finished
+
+
+def test_render_histograms_counters_and_gauges():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe(finished_span("rank", 0.05, cache_hits=2))
+    registry.observe(finished_span("rank", 0.5))
+    registry.register_gauge("raggit_sessions", "Sessions", lambda: 3)
+    registry.register_gauge("raggit_repo_bytes", "Bytes", lambda: [({"repo": 'a"b'}, 7)])
+    registry.register_gauge("raggit_broken", "Fails", lambda: 1 / 0)
+
+    lines = registry.render().splitlines()
+
+    assert 'raggit_stage_duration_seconds_bucket{stage="rank",le="0.1"} 1' in lines
+    assert 'raggit_stage_duration_seconds_bucket{stage="rank",le="1.0"} 2' in lines
+    assert 'raggit_stage_duration_seconds_bucket{stage="rank",le="+Inf"} 2' in lines
+    assert 'raggit_stage_duration_seconds_count{stage="rank"} 2' in lines
+    assert 'raggit_stage_cache_hits_total{stage="rank"} 2' in lines
+    assert "raggit_sessions 3" in lines
+    assert 'raggit_repo_bytes{repo="a\\"b"} 7' in lines
+    assert not any(line.startswith("raggit_broken") for line in lines)
+
+
+@pytest.fixture
+def client(fake, repo, monkeypatch):
+    """A test client whose session has the repository loaded."""
+    import main
+
+    registry = BotRegistry()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "jobs", JobManager(registry))
+    monkeypatch.setattr(main, "scheduler", QueryScheduler())
+    main.app.config["TESTING"] = True
+    with main.app.test_client() as client:
+        with client.session_transaction() as session:
+            session["repo_path"] = repo
+            session["session_id"] = "session"
+        yield client
+
+
+def test_query_returns_its_trace_and_feeds_the_metrics(client):
+    result = client.post("/query", json={"query": "How does the config loader work?", "trace": True}).get_json()
+
+    assert result["status"] == "success"
+    trace = result["trace"]
+    assert trace["name"] == "request"
+    assert trace["prompt_tokens"] > 0 and trace["completion_tokens"] > 0
+    assert "children" in trace
+
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'raggit_stage_duration_seconds_count{stage="request"}' in metrics
+    assert "raggit_queries_running 0" in metrics
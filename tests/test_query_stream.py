@@ -0,0 +1,89 @@
+"""
+Tests for answering queries over Server-Sent Events.
+"""
+
+import json
+import time
+
+import pytest
+from flask import session
+
+from src.models.bot_registry import BotRegistry
+from src.models.jobs import JobManager
+from src.utils.scheduler import QueryScheduler
+
+
+@pytest.fixture
+def client(fake, repo, monkeypatch):
+    """A test client whose session has the repository loaded."""
+    import main
+
+    registry = BotRegistry()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "jobs", JobManager(registry))
+    monkeypatch.setattr(main, "scheduler", QueryScheduler())
+    main.app.config["TESTING"] = True
+    with main.app.test_client() as client:
+        with client.session_transaction() as session:
+            session["repo_path"] = repo
+            session["session_id"] = "session"
+        yield client
+
+
+def read_events(response):
+    """Parse the (event, data) pairs of a finished stream."""
+    events = []
+    for block in response.get_data(as_text=True).split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_stream_sends_progress_tokens_and_the_answer(client):
+    response = client.post("/query_stream", json={"query": "How does the config loader work?"})
+    events = read_events(response)
+    names = [event for event, _ in events]
+    assert names[0] == "stage"
+    assert "answer_token" in names
+    assert names[-1] == "done"
+    tokens = "".join(data["text"] for event, data in events if event == "answer_token")
+    assert tokens == events[-1][1]["response"]
+
+
+def assert_query_stopped(main, fake):
+    """Wait for the query to stop and check it sent no further LLM requests."""
+    deadline = time.monotonic() + 10
+    while main.scheduler.stats()["running"] and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert main.scheduler.stats()["running"] == 0
+
+    # No further LLM requests once the worker has stopped
+    requests = fake.requests
+    time.sleep(1)
+    assert fake.requests == requests
+    assert "aggregate" not in fake.requests_by_kind
+
+
+def test_disconnecting_client_stops_the_query(client, fake):
+    import main
+
+    fake.latency = 0.3
+    response = client.post("/query_stream", json={"query": "How does the config loader work?"}, buffered=False)
+    first = next(response.response)
+    assert b"event: stage" in first
+    response.close()
+    assert_query_stopped(main, fake)
+
+
+def test_client_gone_before_the_first_event_stops_the_query(client, fake, repo):
+    import main
+
+    fake.latency = 0.3
+    with main.app.test_request_context("/query_stream", method="POST", json={"query": "How does the config loader work?"}):
+        session["repo_path"] = repo
+        session["session_id"] = "session"
+        response = main.process_query_stream()
+    # The server closes the response without ever reading the stream
+    response.close()
+    assert_query_stopped(main, fake)
@@ -0,0 +1,91 @@
+"""
+Tests for the persistent per-repository file index.
+"""
+
+import os
+
+import pytest
+
+from src.utils.repo_index import RepoIndex, hash_content
+from tests.conftest import write_files
+
+
+@pytest.fixture
+def repo_path(tmp_path):
+    path = tmp_path / "repo"
+    write_files(str(path), {
+        "app.py": "import util\nprint(util.VALUE)\n",
+        "util.py": "VALUE = 1\n",
+        "notes.txt": "not code\n",
+    })
+    return str(path)
+
+
+@pytest.fixture
+def index(repo_path, tmp_path):
+    index = RepoIndex(repo_path, str(tmp_path / "index.sqlite"))
+    index.refresh()
+    yield index
+    index.close()
+
+
+def test_refresh_indexes_code_files(index, repo_path):
+    assert index.get_all_files() == {
+        "app.py": os.path.join(repo_path, "app.py"),
+        "util.py": os.path.join(repo_path, "util.py"),
+    }
+    summary = index.get_file_summaries()["util.py"]
+    assert summary["extension"] == ".py"
+    assert summary["size"] == len("VALUE = 1\n")
+    assert "VALUE = 1" in summary["preview"]
+    assert summary["hash"] == hash_content(b"VALUE = 1\n")
+
+
+def test_refresh_reports_only_changed_and_removed_files(index, repo_path):
+    assert index.refresh() == ([], [])
+
+    write_files(repo_path, {"util.py": "VALUE = 22\n", "new.py": "NEW = 1\n"})
+    os.remove(os.path.join(repo_path, "app.py"))
+    changed, removed = index.refresh()
+
+    assert sorted(changed) == ["new.py", "util.py"]
+    assert removed == ["app.py"]
+    assert set(index.get_all_files()) == {"new.py", "util.py"}
+    assert index.get_hash("util.py") == hash_content(b"VALUE = 22\n")
+    assert index.get_hash("app.py") is None
+
+
+def test_unchanged_files_are_not_reread(index, repo_path, monkeypatch):
+    reread = []
+    index_file = index._index_file
+    monkeypatch.setattr(index, "_index_file", lambda path, *args: reread.append(path) or index_file(path, *args))
+
+    write_files(repo_path, {"util.py": "VALUE = 333\n"})
+    index.refresh()
+
+    assert reread == ["util.py"]
+
+
+def test_refresh_of_given_paths(index, repo_path):
+    write_files(repo_path, {"util.py": "VALUE = 4444\n", "other.py": "OTHER = 1\n"})
+    os.remove(os.path.join(repo_path, "app.py"))
+
+    changed, removed = index.refresh(["util.py", "app.py", "notes.txt"])
+
+    assert changed == ["util.py"]
+    assert removed == ["app.py"]
+    # Paths that were not asked for are left for the next full refresh
+    assert "other.py" not in index.get_all_files()
+
+
+def test_index_persists_across_opens(index, repo_path, tmp_path):
+    index.set_meta("indexed_commit", "abc123")
+    index.close()
+
+    reopened = RepoIndex(repo_path, str(tmp_path / "index.sqlite"))
+    try:
+        assert set(reopened.get_all_files()) == {"app.py", "util.py"}
+        assert reopened.get_meta("indexed_commit") == "abc123"
+        assert reopened.refresh() == ([], [])
+    finally:
+        reopened.close()
@@ -0,0 +1,128 @@
+"""
+Tests for propagating file changes through a repository's shared caches and indexes.
+"""
+
+import os
+
+import pytest
+
+from src.models.repo_state import RepoState
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.file_utils import read_file
+from src.utils.git_utils import get_changed_paths, get_head_commit
+from tests.conftest import git, write_files
+
+
+def make_state(repo_path: str, cache: AnalysisCache) -> RepoState:
+    state = RepoState(repo_path)
+    state.analysis_cache = cache
+    state.refresh_index()
+    return state
+
+
+def rescan(state: RepoState):
+    """Make the next refresh_index re-scan straight away."""
+    state.index.last_refresh = 0
+    state.refresh_index()
+
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    return AnalysisCache(str(tmp_path / "analyses.sqlite"))
+
+
+def cache_analysis(state: RepoState, path: str, analysis: str) -> str:
+    content_hash = state.index.get_hash(path)
+    key = AnalysisCache.make_key(state.repo_path, content_hash, "model", "config")
+    state.analysis_cache.put(key, state.repo_path, path, content_hash, analysis)
+    return key
+
+
+def test_changed_file_is_evicted_from_the_file_cache(repo, shared_cache):
+    state = make_state(repo, shared_cache)
+    full_path = os.path.join(repo, "src", "config.py")
+    assert "parse_config" in read_file(full_path, state.file_cache)
+
+    write_files(repo, {"src/config.py": "def load_settings(path):\n    return {'debug': True}\n"})
+    rescan(state)
+
+    assert state.file_cache.get(full_path) is None
+    assert "load_settings" in read_file(full_path, state.file_cache)
+
+
+def test_removed_file_is_evicted_from_the_file_cache(repo, shared_cache):
+    state = make_state(repo, shared_cache)
+    full_path = os.path.join(repo, "src", "app.py")
+    read_file(full_path, state.file_cache)
+
+    os.remove(full_path)
+    rescan(state)
+
+    assert state.file_cache.get(full_path) is None
+    assert "src/app.py" not in state.index.get_all_files()
+
+
+def test_changed_file_drops_only_its_own_repository_analyses(make_git_repo, shared_cache):
+    files = {"src/config.py": "def parse_config(path):\n    return {}\n"}
+    first = make_state(make_git_repo("first", files), shared_cache)
+    second = make_state(make_git_repo("second", files), shared_cache)
+    first_key = cache_analysis(first, "src/config.py", "first analysis")
+    second_key = cache_analysis(second, "src/config.py", "second analysis")
+
+    write_files(first.repo_path, {"src/config.py": "def parse_config(path):\n    return None\n"})
+    rescan(first)
+
+    assert shared_cache.get(first_key) is None
+    assert shared_cache.get(second_key) == "second analysis"
+
+
+def test_unchanged_file_keeps_its_analyses(repo, shared_cache):
+    state = make_state(repo, shared_cache)
+    key = cache_analysis(state, "src/config.py", "analysis")
+    write_files(repo, {"src/app.py": "import os\n"})
+    rescan(state)
+    assert shared_cache.get(key) == "analysis"
+
+
+def commit(repo_path: str, message: str = "Change") -> str:
+    git(repo_path, "add", "-A")
+    git(repo_path, "commit", "-q", "-m", message)
+    return get_head_commit(repo_path)
+
+
+def test_changed_paths_include_both_sides_of_a_rename(repo):
+    old_head = get_head_commit(repo)
+    git(repo, "mv", "src/app.py", "src/main.py")
+    write_files(repo, {"src/config.py": "def parse_config(path):\n    return None\n"})
+    new_head = commit(repo)
+
+    assert get_changed_paths(repo, old_head, new_head) == ["src/app.py", "src/config.py", "src/main.py"]
+    assert get_changed_paths(repo, "0" * 40, new_head) is None
+
+
+def test_sync_with_head_reindexes_only_the_paths_a_pull_touched(repo, shared_cache):
+    state = make_state(repo, shared_cache)
+    state.sync_with_head()
+    app_path = os.path.join(repo, "src", "app.py")
+    read_file(app_path, state.file_cache)
+
+    write_files(repo, {"src/config.py": "def load_settings(path):\n    return {}\n"})
+    head = commit(repo)
+
+    assert state.sync_with_head() == ["src/config.py"]
+    assert state.indexed_commit == head
+    assert state.index.find_definitions("load_settings")
+    # Untouched files stay cached
+    assert state.file_cache.get(app_path) is not None
+    assert state.sync_with_head() == []
+
+
+def test_sync_with_head_rescans_when_the_indexed_commit_is_gone(repo, shared_cache):
+    state = make_state(repo, shared_cache)
+    state.index.set_meta("indexed_commit", "0" * 40)
+    os.remove(os.path.join(repo, "src", "app.py"))
+    head = commit(repo)
+
+    assert state.sync_with_head() == ["src/app.py"]
+    assert state.indexed_commit == head
+    assert set(state.index.get_all_files()) == {"src/config.py"}
@@ -0,0 +1,97 @@
+"""
+Tests for listing a repository's code files from the git index and by walking the tree.
+"""
+
+import os
+
+from src.utils.scanner import GitignoreMatcher, RepoScanner, parse_gitignore
+from tests.conftest import write_files
+
+FILES = {
+    "app.py": "print('app')\n",
+    "README.txt": "not code\n",
+    "src/core.py": "x = 1\n",
+    "src/debug.log.py": "y = 2\n",
+    "node_modules/dep/index.js": "module.exports = 1\n",
+    "out/gen.py": "z = 3\n",
+    "pkg/.gitignore": "*.gen.py\n!keep.gen.py\n",
+    "pkg/a.gen.py": "a = 1\n",
+    "pkg/keep.gen.py": "k = 1\n",
+    "pkg/b.py": "b = 1\n",
+    ".gitignore": "out/\n*.log.py\n",
+}
+
+
+def listed(files: dict) -> set:
+    return {path.replace(os.sep, "/") for path in files}
+
+
+def test_walk_skips_excluded_and_ignored_paths(tmp_path):
+    write_files(str(tmp_path), FILES)
+
+    files = RepoScanner(str(tmp_path), use_git_index=False).scan()
+
+    assert listed(files) == {"app.py", "src/core.py", "pkg/keep.gen.py", "pkg/b.py"}
+    assert files[os.path.join("src", "core.py")] == os.path.join(str(tmp_path), "src", "core.py")
+
+
+def test_walk_can_ignore_gitignore_files(tmp_path):
+    write_files(str(tmp_path), FILES)
+
+    files = RepoScanner(str(tmp_path), use_git_index=False, respect_gitignore=False).scan()
+
+    assert listed(files) == {
+        "app.py", "src/core.py", "src/debug.log.py", "out/gen.py",
+        "pkg/a.gen.py", "pkg/keep.gen.py", "pkg/b.py",
+    }
+
+
+def test_git_index_lists_tracked_files_only(make_git_repo):
+    repo_path = make_git_repo("repo", FILES)
+    write_files(repo_path, {"untracked.py": "u = 1\n"})
+
+    scanner = RepoScanner(repo_path)
+    files = scanner.scan()
+
+    assert scanner.last_scan_source == "git"
+    assert listed(files) == {"app.py", "src/core.py", "pkg/keep.gen.py", "pkg/b.py"}
+
+
+def test_git_index_falls_back_to_walk_without_git(tmp_path):
+    write_files(str(tmp_path), {"app.py": "x = 1\n"})
+
+    scanner = RepoScanner(str(tmp_path))
+
+    assert listed(scanner.scan()) == {"app.py"}
+    assert scanner.last_scan_source == "walk"
+
+
+def test_memoize_reuses_the_first_scan(tmp_path):
+    write_files(str(tmp_path), {"app.py": "x = 1\n"})
+    scanner = RepoScanner(str(tmp_path), use_git_index=False)
+
+    with scanner.memoize():
+        first = scanner.scan()
+        write_files(str(tmp_path), {"new.py": "y = 1\n"})
+        assert scanner.scan() is first
+    assert listed(scanner.scan()) == {"app.py", "new.py"}
+
+
+def test_gitignore_rules_follow_git_semantics(tmp_path):
+    (tmp_path / ".gitignore").write_text("/top.py\ndocs/**/*.py\ncache/\n!docs/keep/*.py\n")
+    matcher = GitignoreMatcher().extend(parse_gitignore(str(tmp_path / ".gitignore"), ""))
+
+    assert matcher.is_ignored("top.py", False)
+    assert not matcher.is_ignored("src/top.py", False)
+    assert matcher.is_ignored("docs/a/b/c.py", False)
+    assert not matcher.is_ignored("docs/keep/c.py", False)
+    assert matcher.is_ignored("src/cache", True)
+    assert not matcher.is_ignored("src/cache", False)
+
+
+def test_nested_gitignore_applies_below_its_directory(tmp_path):
+    write_files(str(tmp_path), {"a.gen.py": "", "pkg/a.gen.py": "", "pkg/.gitignore": "*.gen.py\n"})
+
+    files = RepoScanner(str(tmp_path), use_git_index=False).scan()
+
+    assert listed(files) == {"a.gen.py"}
@@ -0,0 +1,168 @@
+"""
+Tests for admission control, fair queueing, deadlines and cancellation of queries.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.scheduler import (
+    Cancelled,
+    DeadlineExceeded,
+    Overloaded,
+    QueryScheduler,
+    cancellation,
+    check_deadline,
+    deadline,
+    time_left,
+)
+
+
+def test_deadline_nests_and_keeps_the_earlier_limit():
+    assert time_left() is None
+    with deadline(10):
+        with deadline(60):
+            assert time_left() <= 10
+        with deadline(1):
+            assert time_left() <= 1
+    assert time_left() is None
+
+
+def test_check_deadline_raises_once_time_is_up():
+    with deadline(-1):
+        with pytest.raises(DeadlineExceeded, match="before analysis"):
+            check_deadline("analysis")
+    check_deadline("analysis")
+
+
+def test_check_deadline_raises_when_cancelled():
+    event = threading.Event()
+    with cancellation(event):
+        check_deadline("analysis")
+        event.set()
+        with pytest.raises(Cancelled):
+            check_deadline("analysis")
+    check_deadline("analysis")
+
+
+def test_cancelled_query_leaves_the_queue():
+    scheduler = QueryScheduler(max_concurrent=1)
+    holder = scheduler.enqueue("repo", "a")
+    waiting = scheduler.enqueue("repo", "b")
+    event = threading.Event()
+    outcome = []
+
+    def wait_for_turn():
+        with cancellation(event):
+            try:
+                with scheduler.run(waiting):
+                    outcome.append("ran")
+            except Cancelled as e:
+                outcome.append(e)
+
+    thread = threading.Thread(target=wait_for_turn)
+    thread.start()
+    event.set()
+    thread.join(5)
+
+    assert isinstance(outcome[0], Cancelled)
+    assert scheduler.stats()["queued"] == 0
+    with scheduler.run(holder):
+        pass
+    assert scheduler.stats()["running"] == 0
+
+
+def test_session_with_too_many_queries_is_refused_with_429():
+    scheduler = QueryScheduler(max_per_session=2)
+    scheduler.enqueue("repo", "a")
+    scheduler.enqueue("repo", "a")
+    with pytest.raises(Overloaded) as refused:
+        scheduler.enqueue("repo", "a")
+    assert refused.value.status == 429
+    assert refused.value.retry_after >= 1
+    scheduler.enqueue("repo", "b")
+
+
+def test_full_queue_is_refused_with_503():
+    scheduler = QueryScheduler(max_concurrent=1, max_queued=1)
+    scheduler.enqueue("repo", "a")
+    scheduler.enqueue("repo", "b")
+    with pytest.raises(Overloaded) as refused:
+        scheduler.enqueue("repo", "c")
+    assert refused.value.status == 503
+    assert scheduler.stats()["rejected"] == {"queue_full": 1}
+
+
+def test_slots_go_to_sessions_in_turn():
+    scheduler = QueryScheduler(max_concurrent=1, max_per_session=10)
+    holder = scheduler.enqueue("repo", "holder")
+    burst = [scheduler.enqueue("repo", "burst") for _ in range(3)]
+    other = scheduler.enqueue("repo", "other")
+
+    with scheduler.run(holder):
+        pass
+    # The burst's first query and then the other session's query get the next slots
+    assert burst[0].admitted_at is not None and other.admitted_at is None
+    with scheduler.run(burst[0]):
+        pass
+    assert other.admitted_at is not None and burst[1].admitted_at is None
+    for ticket in (other, burst[1], burst[2]):
+        with scheduler.run(ticket):
+            pass
+    assert scheduler.stats()["running"] == scheduler.stats()["queued"] == 0
+
+
+def test_repository_limit_leaves_slots_to_other_repositories():
+    scheduler = QueryScheduler(max_concurrent=3, max_per_repo=1)
+    first = scheduler.enqueue("busy", "a")
+    second = scheduler.enqueue("busy", "b")
+    elsewhere = scheduler.enqueue("quiet", "c")
+    assert first.admitted_at is not None
+    assert second.admitted_at is None
+    assert elsewhere.admitted_at is not None
+    assert scheduler.stats()["queued_by_repo"] == {"busy": 1}
+
+
+def test_query_that_cannot_start_before_its_deadline_gets_503():
+    scheduler = QueryScheduler(max_concurrent=1)
+    scheduler.enqueue("repo", "a")
+    waiting = scheduler.enqueue("repo", "b", deadline_seconds=0.1)
+    with pytest.raises(Overloaded) as expired:
+        with scheduler.run(waiting):
+            pass
+    assert expired.value.status == 503
+    assert scheduler.stats()["expired"] == 1
+    assert scheduler.stats()["queued"] == 0
+
+
+def test_admitted_query_runs_under_its_deadline():
+    scheduler = QueryScheduler(default_deadline=30)
+    with scheduler.admit("repo", "a", deadline_seconds=5):
+        assert 0 < time_left() <= 5
+    assert time_left() is None
+    # A client cannot ask for more than the server's deadline
+    ticket = scheduler.enqueue("repo", "a", deadline_seconds=600)
+    assert ticket.deadline_at - time.monotonic() <= 30
+
+
+def test_waiting_query_starts_when_a_slot_frees_up():
+    scheduler = QueryScheduler(max_concurrent=1)
+    holder = scheduler.enqueue("repo", "a")
+    waiting = scheduler.enqueue("repo", "b")
+    started = threading.Event()
+
+    def run_waiting():
+        with scheduler.run(waiting):
+            started.set()
+
+    thread = threading.Thread(target=run_waiting)
+    thread.start()
+    assert not started.wait(0.1)
+    with scheduler.run(holder):
+        pass
+    assert started.wait(5)
+    thread.join()
+    stats = scheduler.stats()
+    assert stats["admitted"] == 2 and stats["running"] == 0
+    assert stats["wait_seconds"]["max"] >= 0.1
@@ -0,0 +1,123 @@
+"""
+Tests for setting up a repository in the background through the web server.
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.models import jobs as jobs_module
+from src.models.bot_registry import BotRegistry
+from src.models.jobs import JobManager
+from src.utils.scheduler import QueryScheduler
+from tests.conftest import git
+
+FILES = {
+    "src/config.py": "def parse_config(path):\n    return {}\n",
+    "src/app.py": "from src.config import parse_config\n",
+}
+
+
+@pytest.fixture
+def server(fake, monkeypatch):
+    """The Flask app with its own registry, jobs and scheduler."""
+    import main
+
+    registry = BotRegistry()
+    monkeypatch.setattr(main, "registry", registry)
+    monkeypatch.setattr(main, "jobs", JobManager(registry))
+    monkeypatch.setattr(main, "scheduler", QueryScheduler())
+    main.app.config["TESTING"] = True
+    return main
+
+
+@pytest.fixture
+def bare_repo(make_git_repo, tmp_path):
+    work = make_git_repo("work", FILES)
+    bare = str(tmp_path / "origin.git")
+    git(str(tmp_path), "clone", "-q", "--bare", work, bare)
+    return bare
+
+
+@pytest.fixture
+def clone_gate(monkeypatch):
+    """Hold every clone until the test releases the gate."""
+    gate = threading.Event()
+    clone = jobs_module.clone_or_update_repo
+
+    def gated_clone(*args, **kwargs):
+        gate.wait(10)
+        return clone(*args, **kwargs)
+
+    monkeypatch.setattr(jobs_module, "clone_or_update_repo", gated_clone)
+    return gate
+
+
+def wait_for_job(client, job_id: str, timeout: float = 30) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}").get_json()["job"]
+        if job["status"] in ("done", "failed"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+def test_setup_job_clones_and_indexes_a_local_bare_repository(server, bare_repo, clone_gate, tmp_path):
+    target = str(tmp_path / "clones")
+    with server.app.test_client() as client:
+        response = client.post("/setup_repo", json={"repo_url": bare_repo, "target_directory": target})
+        assert response.status_code == 202
+        job_id = response.get_json()["job_id"]
+
+        # While the job runs, the session's repository is not served
+        job = client.get(f"/jobs/{job_id}").get_json()["job"]
+        assert job["status"] in ("queued", "cloning")
+        with pytest.raises(ValueError, match="still being loaded"):
+            server.get_session_bot()
+        assert "still being loaded" in client.post("/query", json={"query": "What does parse_config do?"}).get_json()["message"]
+
+        clone_gate.set()
+        job = wait_for_job(client, job_id)
+        assert job["status"] == "done", job["error"]
+        assert job["files_indexed"] == 2
+
+        client.get(f"/jobs/{job_id}")
+        bot = server.get_session_bot()
+        repo_dir = os.path.join(target, "origin")
+        assert bot.repo_path == repo_dir
+        assert bot.state is server.registry.get_repo(repo_dir)
+        assert sorted(bot.index.get_all_files()) == ["src/app.py", "src/config.py"]
+
+        result = client.post("/query", json={"query": "What does parse_config do?"}).get_json()
+        assert result["status"] == "success"
+        assert result["response"]
+
+
+def test_second_setup_of_the_same_repository_joins_the_running_job(server, bare_repo, clone_gate, tmp_path):
+    target = str(tmp_path / "clones")
+    with server.app.test_client() as client:
+        first = client.post("/setup_repo", json={"repo_url": bare_repo, "target_directory": target}).get_json()
+        second = client.post("/setup_repo", json={"repo_url": bare_repo, "target_directory": target}).get_json()
+        assert first["job_id"] == second["job_id"]
+        clone_gate.set()
+        assert wait_for_job(client, first["job_id"])["status"] == "done"
+
+
+def test_failed_clone_is_reported_by_the_job(server, tmp_path):
+    with server.app.test_client() as client:
+        response = client.post("/setup_repo", json={
+            "repo_url": str(tmp_path / "missing.git"),
+            "target_directory": str(tmp_path / "clones"),
+        })
+        job = wait_for_job(client, response.get_json()["job_id"])
+        assert job["status"] == "failed"
+        assert job["error"]
+        assert not os.path.exists(tmp_path / "clones" / "missing")
+
+
+def test_unknown_job_is_not_found(server):
+    with server.app.test_client() as client:
+        assert client.get("/jobs/unknown").status_code == 404
@@ -0,0 +1,275 @@
+"""
+Tests for coalescing identical work: flights, and queries sharing one pipeline run.
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.utils.scheduler import Cancelled, DeadlineExceeded, cancellation, check_deadline, deadline
+from src.utils.single_flight import Flight, SingleFlight
+
+RESULT = ("answer", "context", ["src/config.py"])
+
+
+def test_do_runs_work_once_for_concurrent_callers():
+    flights = SingleFlight("test")
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "result"
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", work)))
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=lambda: results.append(flights.do("key", work)))
+    follower.start()
+    while flights.stats()["coalesced"] == 0:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    follower.join()
+
+    assert len(calls) == 1
+    assert sorted(results) == [("result", False), ("result", True)]
+    assert flights.stats() == {"in_flight": 0, "led": 1, "coalesced": 1}
+
+
+def test_flight_replays_missed_events_to_late_subscribers():
+    flight = Flight()
+    early, late = [], []
+    flight.subscribe(lambda event, data: early.append(event))
+    flight.emit("stage", {"name": "selecting_files"})
+    flight.subscribe(lambda event, data: late.append(event))
+    flight.emit("answer_token", {"text": "Hi"})
+    assert early == late == ["stage", "answer_token"]
+
+
+def test_failing_listener_is_dropped_without_stopping_the_others():
+    flight = Flight()
+    received = []
+
+    def broken(event, data):
+        raise RuntimeError("client went away")
+
+    flight.subscribe(broken)
+    flight.subscribe(lambda event, data: received.append(event))
+    flight.emit("first", {})
+    flight.emit("second", {})
+    assert received == ["first", "second"]
+
+
+class Pipeline:
+    """A pipeline run a test controls: it emits an event, then waits to be released."""
+
+    def __init__(self, result=RESULT, error=None, hold=5.0):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.result = result
+        self.error = error
+        self.hold = hold
+        self.runs = 0
+
+    def __call__(self, emit):
+        self.runs += 1
+        emit("stage", {"name": "selecting_files"})
+        self.started.set()
+        self.release.wait(self.hold)
+        emit("answer_token", {"text": "answer"})
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def ask(bot, pipeline, events, outcome, seconds=None, cancel=None):
+    """Share the pipeline from a thread; record events and the result or exception."""
+    def target():
+        with deadline(seconds), cancellation(cancel or threading.Event()):
+            try:
+                outcome.append(bot.share_pipeline("key", pipeline, lambda event, data: events.append(event)))
+            except BaseException as e:
+                outcome.append(e)
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def wait_for_follower(bot):
+    while bot.state.query_flights.stats()["coalesced"] == 0:
+        time.sleep(0.01)
+
+
+def test_followers_receive_the_leaders_progress_and_answer_tokens(make_bot):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    pipeline = Pipeline()
+    leader_events, follower_events, leader_outcome, follower_outcome = [], [], [], []
+
+    leader = ask(leader_bot, pipeline, leader_events, leader_outcome)
+    pipeline.started.wait(5)
+    follower = ask(follower_bot, pipeline, follower_events, follower_outcome)
+    wait_for_follower(follower_bot)
+    pipeline.release.set()
+    leader.join()
+    follower.join()
+
+    assert pipeline.runs == 1
+    assert leader_outcome == [(RESULT, False)]
+    assert follower_outcome == [(RESULT, True)]
+    assert leader_events == follower_events == ["stage", "answer_token"]
+
+
+def test_leader_failure_reaches_followers(make_bot):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    pipeline = Pipeline(error=ValueError("LLM unavailable"))
+    leader_outcome, follower_outcome = [], []
+
+    leader = ask(leader_bot, pipeline, [], leader_outcome)
+    pipeline.started.wait(5)
+    follower = ask(follower_bot, pipeline, [], follower_outcome)
+    wait_for_follower(follower_bot)
+    pipeline.release.set()
+    leader.join()
+    follower.join()
+
+    assert pipeline.runs == 1
+    assert isinstance(leader_outcome[0], ValueError)
+    assert isinstance(follower_outcome[0], ValueError)
+    assert follower_bot.state.query_flights.stats()["in_flight"] == 0
+
+
+def test_leader_deadline_does_not_fail_a_follower_with_time_left(make_bot):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    started = threading.Event()
+    runs = []
+
+    def run(emit):
+        runs.append(1)
+        if len(runs) == 1:
+            started.set()
+            time.sleep(0.3)
+            check_deadline("aggregation")
+        return RESULT
+
+    leader_outcome, follower_outcome = [], []
+    leader = ask(leader_bot, run, [], leader_outcome, seconds=0.2)
+    started.wait(5)
+    follower = ask(follower_bot, run, [], follower_outcome, seconds=5)
+    leader.join()
+    follower.join()
+
+    assert isinstance(leader_outcome[0], DeadlineExceeded)
+    # The follower ran the pipeline again under its own deadline
+    assert follower_outcome == [(RESULT, False)]
+    assert len(runs) == 2
+
+
+@pytest.mark.parametrize("seconds", [0.1, -1])
+def test_follower_stops_waiting_at_its_own_deadline(make_bot, seconds):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    pipeline = Pipeline()
+    leader_outcome, follower_outcome = [], []
+
+    leader = ask(leader_bot, pipeline, [], leader_outcome)
+    pipeline.started.wait(5)
+    follower = ask(follower_bot, pipeline, [], follower_outcome, seconds=seconds)
+    follower.join(5)
+    assert isinstance(follower_outcome[0], DeadlineExceeded)
+
+    # The leader is unaffected and finishes normally
+    pipeline.release.set()
+    leader.join()
+    assert leader_outcome == [(RESULT, False)]
+
+
+def test_leader_cancellation_does_not_fail_its_followers(make_bot):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    pipeline = Pipeline(hold=0.2)
+    cancel = threading.Event()
+    leader_outcome, follower_outcome = [], []
+
+    def run(emit):
+        result = pipeline(emit)
+        check_deadline("aggregation")
+        return result
+
+    leader = ask(leader_bot, run, [], leader_outcome, cancel=cancel)
+    pipeline.started.wait(5)
+    follower = ask(follower_bot, run, [], follower_outcome)
+    wait_for_follower(follower_bot)
+    cancel.set()
+    leader.join()
+    follower.join()
+
+    assert isinstance(leader_outcome[0], Cancelled)
+    assert follower_outcome == [(RESULT, False)]
+    assert pipeline.runs == 2
+
+
+def test_cancelled_follower_stops_waiting(make_bot):
+    leader_bot, follower_bot = make_bot(), make_bot()
+    pipeline = Pipeline()
+    cancel = threading.Event()
+    leader_outcome, follower_outcome = [], []
+
+    leader = ask(leader_bot, pipeline, [], leader_outcome)
+    pipeline.started.wait(5)
+    follower = ask(follower_bot, pipeline, [], follower_outcome, cancel=cancel)
+    wait_for_follower(follower_bot)
+    cancel.set()
+    follower.join(5)
+    assert isinstance(follower_outcome[0], Cancelled)
+
+    pipeline.release.set()
+    leader.join()
+    assert leader_outcome == [(RESULT, False)]
+
+
+def select_in_thread(bot, outcome, seconds):
+    """Select files from a thread under a deadline; record the selection or exception."""
+    def target():
+        with deadline(seconds):
+            try:
+                outcome.append(bot.select_relevant_files("How is the config loaded?"))
+            except BaseException as e:
+                outcome.append(e)
+    thread = threading.Thread(target=target)
+    thread.start()
+    return thread
+
+
+def test_selector_batches_are_shared_within_each_sessions_deadline(make_bot):
+    leader_bot, follower_bot, late_bot = make_bot(), make_bot(), make_bot()
+    started = threading.Event()
+    runs = []
+
+    def run(agent, description, expected_output=None):
+        runs.append(1)
+        if len(runs) == 1:
+            started.set()
+            time.sleep(0.4)
+            check_deadline("file selection")
+        return "src/config.py"
+
+    for bot in (leader_bot, follower_bot, late_bot):
+        bot.backend.run = run
+    leader_outcome, follower_outcome, late_outcome = [], [], []
+    leader = select_in_thread(leader_bot, leader_outcome, seconds=0.3)
+    started.wait(5)
+    follower = select_in_thread(follower_bot, follower_outcome, seconds=5)
+    late = select_in_thread(late_bot, late_outcome, seconds=0.1)
+    late.join(5)
+    leader.join()
+    follower.join()
+
+    # A follower stops waiting at its own deadline, and reruns a batch whose leader ran out of time
+    assert isinstance(late_outcome[0], DeadlineExceeded)
+    assert isinstance(leader_outcome[0], DeadlineExceeded)
+    assert follower_outcome == [["src/config.py"]]
+    assert len(runs) == 2
+    assert follower_bot.state.selector_flights.stats()["in_flight"] == 0
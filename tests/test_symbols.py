@@ -0,0 +1,107 @@
+"""
+Tests for extracting symbol definitions and references and resolving the names a query uses.
+"""
+
+from src.models.repo_state import RepoState
+from src.utils.analysis_cache import AnalysisCache
+from src.utils.symbols import extract_symbols, find_query_identifiers
+from tests.conftest import write_files
+
+PYTHON = '''\
+MAX_RETRIES = 3
+
+
+class RepoIndex:
+    @property
+    def size(self):
+        return 0
+
+    def refresh(self, paths):
+        return load_rows(paths, MAX_RETRIES)
+
+
+def load_rows(paths, retries):
+    return [RepoIndex().refresh(path) for path in paths]
+'''
+
+JAVASCRIPT = '''\
+class Server {
+  listen(port) {
+    return bind(port);
+  }
+}
+
+function bind(port) {
+  return new Server().listen(port);
+}
+'''
+
+
+def test_python_definitions_and_references():
+    definitions, references = extract_symbols("src/index.py", PYTHON)
+
+    assert definitions == [
+        ("MAX_RETRIES", "MAX_RETRIES", "variable", 1, 1),
+        ("RepoIndex", "RepoIndex", "class", 4, 10),
+        ("size", "RepoIndex.size", "method", 5, 7),
+        ("refresh", "RepoIndex.refresh", "method", 9, 10),
+        ("load_rows", "load_rows", "function", 13, 14),
+    ]
+    assert references["load_rows"] == [10]
+    # Capitalized names count wherever they appear, their own assignment included
+    assert references["MAX_RETRIES"] == [1, 10]
+    assert references["refresh"] == [14]
+    assert references["RepoIndex"] == [14]
+    # Locals and arguments are not indexed
+    assert "paths" not in references
+
+
+def test_pattern_extractor_nests_methods_in_classes():
+    definitions, references = extract_symbols("src/server.js", JAVASCRIPT)
+
+    assert definitions == [
+        ("Server", "Server", "class", 1, 5),
+        ("listen", "Server.listen", "method", 2, 4),
+        ("bind", "bind", "function", 7, 9),
+    ]
+    # The pattern extractor also sees definition lines as calls
+    assert references["bind"] == [3, 7]
+    assert references["listen"] == [2, 8]
+
+
+def test_unparsable_python_falls_back_to_patterns():
+    definitions, _ = extract_symbols("broken.py", "def load(path:\n    pass\n\nclass Loader:\n    pass\n")
+
+    assert [name for name, *_ in definitions] == ["load", "Loader"]
+    assert extract_symbols("notes.txt", "def load(): pass") == ([], {})
+
+
+def test_query_identifiers_skip_prose():
+    query = "Where is `RepoIndex` refreshed, who calls load_rows() and how does Index.refresh use parseConfig?"
+
+    assert find_query_identifiers(query) == ["RepoIndex", "load_rows", "Index.refresh", "parseConfig"]
+    assert find_query_identifiers("How does the Index work?") == []
+
+
+def test_query_names_resolve_to_definition_and_reference_spans(tmp_path):
+    repo_path = str(tmp_path / "repo")
+    write_files(repo_path, {
+        "src/index.py": PYTHON,
+        "src/jobs.py": "from src.index import load_rows\n\n\ndef run():\n    return load_rows([], 1)\n",
+        "src/other.py": "def load_rows():\n    pass\n",
+    })
+    state = RepoState(repo_path)
+    state.analysis_cache = AnalysisCache(str(tmp_path / "analyses.sqlite"))
+    state.refresh_index()
+
+    spans = state.resolve_symbols("What does RepoIndex.refresh do?", context_lines=1)
+
+    assert spans == {"src/index.py": [(9, 10)]}
+    # Definitions come first, then the lines around each use in other files
+    assert state.resolve_symbols("Who calls load_rows()?", context_lines=3) == {
+        "src/index.py": [(13, 14)],
+        "src/other.py": [(1, 2)],
+        "src/jobs.py": [(1, 4), (2, 8)],
+    }
+    # A name defined in more files than allowed is too ambiguous to pin
+    assert state.resolve_symbols("Who calls load_rows()?", max_definition_files=1) == {}
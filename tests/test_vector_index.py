@@ -0,0 +1,84 @@
+"""
+Tests for the hashing embedder, the memory-mapped chunk vector index and rank fusion.
+"""
+
+import numpy as np
+import pytest
+
+from src.utils.embeddings import HashingEmbedder, create_embedder
+from src.utils.vector_index import VectorIndex, reciprocal_rank_fusion
+
+CONFIG_CHUNKS = [
+    (1, 3, "def parse_config(path):\n    return load_yaml(path)"),
+    (5, 6, "def validate_settings(settings):\n    check_schema(settings)"),
+]
+SERVER_CHUNKS = [(1, 4, "class HttpServer:\n    def listen(self, port):\n        bind_socket(port)")]
+
+
+def test_hashing_embeddings_are_unit_length_and_deterministic():
+    embedder = HashingEmbedder(dimensions=64)
+    vectors = embedder.embed(["parse the config file", "", "parse the config file"])
+
+    assert vectors.shape == (3, 64) and vectors.dtype == np.float32
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert not vectors[1].any()
+    assert np.array_equal(vectors[0], vectors[2])
+    assert embedder.name == "hashing-64"
+    with pytest.raises(ValueError):
+        create_embedder("unknown")
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = VectorIndex(str(tmp_path / "vectors"), HashingEmbedder(dimensions=256), initial_capacity=2)
+    index.upsert("src/config.py", "hash-1", CONFIG_CHUNKS)
+    index.upsert("src/server.py", "hash-2", SERVER_CHUNKS)
+    yield index
+    if hasattr(index, "matrix"):
+        index.close()
+
+
+def test_search_finds_the_closest_chunk(index):
+    results = index.search("how does the http server listen on a port?", top_k=2)
+
+    assert results[0][:3] == ("src/server.py", 1, 4)
+    assert all(score > 0 for *_, score in results)
+    assert index.search("where are settings validated?", top_k=1)[0][:3] == ("src/config.py", 5, 6)
+    assert {path for path, *_ in index.search("listen port", paths=["src/config.py"])} <= {"src/config.py"}
+    assert index.search_files("parse config yaml") == ["src/config.py"]
+
+
+def test_unchanged_files_are_not_reembedded_and_rows_are_reused(index):
+    assert not index.upsert("src/config.py", "hash-1", CONFIG_CHUNKS)
+    assert index.capacity == 4
+
+    assert index.upsert("src/config.py", "hash-3", CONFIG_CHUNKS[:1])
+    index.delete("src/server.py")
+    assert index.upsert("src/new.py", "hash-4", SERVER_CHUNKS * 2)
+
+    assert len(index) == 3
+    assert index.capacity == 4
+    assert sorted(index.indexed_paths()) == ["src/config.py", "src/new.py"]
+    assert index.get_hash("src/config.py") == "hash-3"
+
+
+def test_flushed_index_reopens_and_unflushed_index_is_rebuilt(index, tmp_path):
+    index.close()
+    reopened = VectorIndex(str(tmp_path / "vectors"), HashingEmbedder(dimensions=256))
+    assert reopened.get_hash("src/server.py") == "hash-2"
+    assert reopened.search("http server listen", top_k=1)[0][0] == "src/server.py"
+
+    reopened.upsert("src/other.py", "hash-5", SERVER_CHUNKS)
+    # Reopening before a flush, as after a crash, starts over
+    crashed = VectorIndex(str(tmp_path / "vectors"), HashingEmbedder(dimensions=256))
+    assert len(crashed) == 0
+    # So does reopening with a different embedder
+    crashed.close()
+    resized = VectorIndex(str(tmp_path / "vectors"), HashingEmbedder(dimensions=128))
+    assert len(resized) == 0
+    resized.close()
+
+
+def test_reciprocal_rank_fusion_rewards_items_ranked_by_several_lists():
+    assert reciprocal_rank_fusion([["a", "b"], ["b", "c"]], k=60) == ["b", "a", "c"]
+    assert reciprocal_rank_fusion([]) == []